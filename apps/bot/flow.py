@@ -4,7 +4,8 @@ import tempfile
 from django.core.files import File
 from django.conf import settings
 from apps.claims.models import Case, CaseDocument
-from apps.claims.tasks import analyze_document_task
+from apps.claims.tasks import dispatch_upload_batch
+from config.celery import PRIORITY_INTERACTIVE
 from .utils import WhatsAppClient, WebChatClient
 
 
@@ -82,7 +83,7 @@ class FlowManager:
         if "da" in text or "deschide" in text:
             # Trecem la pasul următor
             self.case.stage = Case.Stage.COLLECTING_DOCS
-            self.case.save()
+            self.case.save(update_fields=["stage", "updated_at"])
 
             # 1. Mesaj UNIC: Documente + Context
             msg_full = (
@@ -114,7 +115,7 @@ class FlowManager:
 
         elif "alta" in text or "nu" in text:
             self.case.is_human_managed = True
-            self.case.save()
+            self.case.save(update_fields=["is_human_managed", "updated_at"])
             self.client.send_text(
                 self.case,
                 "Am înțeles. Un operator uman a fost notificat și te va contacta în curând.",
@@ -129,7 +130,8 @@ class FlowManager:
 
     def _handle_image_upload(self, media_urls, silent=False):
         saved_count = 0
-        has_async_processing = False
+        # Imaginile/PDF-urile din acest mesaj: analizate ca un singur lot (o singură notificare)
+        batch_docs = []
 
         for url, mime_type in media_urls:
             try:
@@ -179,17 +181,24 @@ class FlowManager:
 
                     if is_video:
                         self.case.has_scene_video = True
-                        self.case.save()
+                        self.case.save(update_fields=["has_scene_video", "updated_at"])
                         # Nu trimitem la AI video-ul
                     else:
                         # Trimitem la AI doar imaginile/pdf
-                        analyze_document_task.delay(doc.id)
-                        has_async_processing = True
+                        batch_docs.append(doc)
 
                     saved_count += 1
             except Exception as e:
                 print(f"Eroare download {url}: {e}")
 
+        if batch_docs:
+            try:
+                # Clientul așteaptă răspunsul în chat: înaintea atașamentelor din email
+                dispatch_upload_batch(self.case, batch_docs, priority=PRIORITY_INTERACTIVE)
+            except Exception as e:
+                print(f"Eroare pornire analiză lot: {e}")
+        has_async_processing = bool(batch_docs)
+
         if saved_count > 0 and not silent:
             self.client.send_text(self.case, f"Am primit {saved_count} fișier(e). Analizez...")
             # Verificăm statusul imediat DOAR daca nu avem procesare asincrona (ex: doar video)
@@ -203,7 +212,7 @@ class FlowManager:
         if "service" in text or "rar" in text:
             self.case.resolution_choice = Case.Resolution.SERVICE_RAR
             self.case.is_human_managed = True
-            self.case.save()
+            self.case.save(update_fields=["resolution_choice", "is_human_managed", "updated_at"])
             self.client.send_text(
                 self.case,
                 "✅ Am notat opțiunea Service. Un coleg va prelua dosarul pentru a stabili programarea.",
@@ -221,7 +230,7 @@ class FlowManager:
             self.client.send_text(self.case, "✅ Am notat: Daună Totală.")
 
         if choice_made:
-            self.case.save()
+            self.case.save(update_fields=["resolution_choice", "updated_at"])
             self._check_documents_status()
             return True
 
@@ -310,13 +319,13 @@ class FlowManager:
         # Acum mergem la urmatorul pas (Semnatura sau Alegere Rezolutie)
         if self.case.resolution_choice != self.case.Resolution.UNDECIDED:
             self.case.stage = self.case.Stage.SIGNING_MANDATE
-            self.case.save()
+            self.case.save(update_fields=["stage", "updated_at"])
             self._send_signature_link()
         else:
             # Trecem in stadiu de colectare docs ca sa lase _check_documents_status sa evalueze
             # sau afisam direct butoanele
             self.case.stage = self.case.Stage.COLLECTING_DOCS
-            self.case.save()
+            self.case.save(update_fields=["stage", "updated_at"])
             self.client.send_buttons(
                 self.case,
                 "Cum dorești să soluționezi dosarul?",
@@ -340,7 +349,8 @@ class FlowManager:
         # Conditie: Video 360 SAU Minim 4 Poze
         damage_photos_count = CaseDocument.objects.filter(
             case=self.case,
-            doc_type=CaseDocument.DocType.DAMAGE_PHOTO
+            doc_type=CaseDocument.DocType.DAMAGE_PHOTO,
+            duplicate_of__isnull=True,
         ).count()
 
         if not self.case.has_scene_video and damage_photos_count < 4:
@@ -365,7 +375,7 @@ class FlowManager:
             if self.case.resolution_choice != Case.Resolution.UNDECIDED:
                 # TOTUL GATA -> Mandat
                 self.case.stage = Case.Stage.SIGNING_MANDATE
-                self.case.save()
+                self.case.save(update_fields=["stage", "updated_at"])
                 self._send_signature_link()
             else:
                  self.client.send_buttons(
@@ -382,9 +392,9 @@ class FlowManager:
         # We need to save the user's message somehow so it gets picked up in 30 mins
         # FlowManager already creates a CommunicationLog in the webhook view!
         # But for media, if we delay, we might need a way to track the media.
-        # Actually, let's just trigger the relay task with a 30-minute delay.
+        # Actually, let's just trigger the relay task with a 30-minute delay (debounce per dosar).
         # The task itself can just pull all IN logs and unsent documents from the last 30 minutes.
-        from apps.claims.tasks import trigger_delayed_relay_task
+        from apps.claims.tasks import schedule_insurer_relay
 
         # Dacă userul apasă un buton de decizie în faza asta
         text_lower = text.lower()
@@ -398,7 +408,7 @@ class FlowManager:
             # We must process the media locally immediately so we have the files saved
             self._handle_image_upload(media_urls, silent=True)
 
-        trigger_delayed_relay_task.delay(self.case.id)
+        schedule_insurer_relay(self.case.id)
 
         # Cache or state to not spam the user
         from django.core.cache import cache
@@ -416,7 +426,7 @@ class FlowManager:
         # 1. Accept
         if "accept" in text:
             self.case.stage = Case.Stage.PROCESSING_INSURER # Back to waiting
-            self.case.save()
+            self.case.save(update_fields=["stage", "updated_at"])
 
             from apps.claims.tasks import send_offer_acceptance_email_task
             send_offer_acceptance_email_task.delay(self.case.id)
@@ -442,7 +452,7 @@ class FlowManager:
         if "service" in text or "rar" in text:
             self.case.resolution_choice = Case.Resolution.SERVICE_RAR
             self.case.is_human_managed = True
-            self.case.save()
+            self.case.save(update_fields=["resolution_choice", "is_human_managed", "updated_at"])
 
             send_option_change_email_task.delay(self.case.id, "Service Autorizat RAR")
 
@@ -455,7 +465,7 @@ class FlowManager:
         elif "regie" in text:
             self.case.resolution_choice = Case.Resolution.OWN_REGIME
             self.case.stage = Case.Stage.PROCESSING_INSURER # Back to waiting for new offer
-            self.case.save()
+            self.case.save(update_fields=["resolution_choice", "stage", "updated_at"])
 
             send_option_change_email_task.delay(self.case.id, "Regie Proprie")
 
@@ -468,7 +478,7 @@ class FlowManager:
         elif "totala" in text:
             self.case.resolution_choice = Case.Resolution.TOTAL_LOSS
             self.case.stage = Case.Stage.PROCESSING_INSURER
-            self.case.save()
+            self.case.save(update_fields=["resolution_choice", "stage", "updated_at"])
 
             send_option_change_email_task.delay(self.case.id, "Dauna Totala")
 
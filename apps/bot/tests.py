@@ -74,7 +74,7 @@ class FlowManagerTestCase(TestCase):
         self.assertTrue(self.case.is_human_managed)
         mock_wa.send_text.assert_called()
 
-    @patch("apps.bot.flow.analyze_document_task")
+    @patch("apps.bot.flow.dispatch_upload_batch")
     @patch("apps.bot.flow.WhatsAppClient")
     def test_image_upload(self, mock_wa_cls, mock_task):
         self.manager = FlowManager(self.case, "123")
@@ -100,8 +100,8 @@ class FlowManagerTestCase(TestCase):
             self.assertIsNotNone(doc)
             self.assertEqual(doc.doc_type, "UNK") # Defaults to UNKNOWN
 
-            # Should call analyze task
-            mock_task.delay.assert_called_with(doc.id)
+            # Should dispatch the upload batch (analysis chord)
+            mock_task.assert_called_once_with(self.case, [doc], priority=0)
 
             # Should send ack
             mock_wa.send_text.assert_called()
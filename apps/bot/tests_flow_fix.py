@@ -12,7 +12,7 @@ class FlowFixTestCase(TestCase):
             stage=Case.Stage.COLLECTING_DOCS
         )
 
-    @patch("apps.bot.flow.analyze_document_task.delay")
+    @patch("apps.bot.flow.dispatch_upload_batch")
     @patch("apps.bot.flow.requests.get")
     def test_async_upload_no_immediate_missing_msg(self, mock_get, mock_task):
         """
@@ -46,7 +46,7 @@ class FlowFixTestCase(TestCase):
         missing_msg = logs.filter(content__contains="Mai am nevoie de").first()
         self.assertIsNone(missing_msg, "Should NOT immediately ask for missing docs for async uploads")
 
-    @patch("apps.bot.flow.analyze_document_task.delay")
+    @patch("apps.bot.flow.dispatch_upload_batch")
     @patch("apps.bot.flow.requests.get")
     def test_sync_video_upload_immediate_msg(self, mock_get, mock_task):
         """
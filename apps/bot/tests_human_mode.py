@@ -12,7 +12,7 @@ class HumanModeTestCase(TestCase):
             is_human_managed=True
         )
 
-    @patch("apps.bot.flow.analyze_document_task.delay")
+    @patch("apps.bot.flow.dispatch_upload_batch")
     @patch("apps.bot.flow.requests.get")
     def test_whatsapp_human_managed_ignored(self, mock_get, mock_task):
         """
@@ -30,7 +30,7 @@ class HumanModeTestCase(TestCase):
         logs = CommunicationLog.objects.filter(case=self.case, direction="OUT")
         self.assertFalse(logs.exists())
 
-    @patch("apps.bot.flow.analyze_document_task.delay")
+    @patch("apps.bot.flow.dispatch_upload_batch")
     @patch("apps.bot.flow.requests.get")
     def test_web_human_managed_processed_silently(self, mock_get, mock_task):
         """
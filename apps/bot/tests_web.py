@@ -77,7 +77,7 @@ class WebChatTestCase(TestCase):
         out_msgs = [m for m in msgs if m['direction'] == 'OUT']
         self.assertTrue(len(out_msgs) > 0)
 
-    @patch("apps.claims.tasks.analyze_document_task.delay")
+    @patch("apps.bot.flow.dispatch_upload_batch")
     @patch("apps.bot.flow.requests.get")
     def test_file_upload(self, mock_get, mock_task):
         # Login first to establish session
@@ -127,8 +127,7 @@ def api_send_message(request, case_id):
         # The prompt says: "client e pe WhatsApp -> Twilio, client e pe Web -> Web DB".
         # We need to detect the active channel.
         # A simple heuristic: check the last IN message's channel.
-        last_in_msg = case.logs.filter(direction="IN").order_by('-created_at').first()
-        target_channel = last_in_msg.channel if last_in_msg else "WEB"
+        target_channel = case.last_inbound_channel or "WEB"
 
         # 3. Send Logic
         # For this task, the user said: "3 uita complet de twilio, raman doar pe chatul nostru"
@@ -12,6 +12,7 @@ from .models import (
     CaseDocument,
     CommunicationLog,
     Insurer,
+    OutboundEmail,
 )
 
 
@@ -53,7 +54,7 @@ class InvolvedVehicleInline(TabularInline):
 class CaseDocumentInline(TabularInline):
     model = CaseDocument
     extra = 0
-    readonly_fields = ("ocr_data", "uploaded_at")
+    readonly_fields = ("ocr_data", "uploaded_at", "phash", "duplicate_of")
     verbose_name = "Document"
     verbose_name_plural = "Documente la Dosar"
 
@@ -198,6 +199,14 @@ class CommunicationLogAdmin(ModelAdmin):
     list_filter = ("direction", "channel")
 
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(ModelAdmin):
+    list_display = ("kind", "case", "subject", "status", "attempts", "created_at", "sent_at", "send_ms")
+    list_filter = ("status", "kind")
+    search_fields = ("subject", "message_id")
+    readonly_fields = ("message_id", "attempts", "last_error", "created_at", "sent_at", "send_ms")
+
+
 @admin.register(Insurer)
 class InsurerAdmin(ModelAdmin):
     list_display = ("name", "email_claims", "identifiers")
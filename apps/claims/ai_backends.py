@@ -0,0 +1,227 @@
+"""
+Backend-uri pentru apelul vision din DocumentAnalyzer, alese din settings.DOCUMENT_ANALYZER_BACKEND:
+
+- "openai": apelul real (client partajat + guvernor de rată).
+- "record": apelul real, dar salvează fiecare răspuns pe disc (cheie = hash prompt + imagini).
+- "replay": servește răspunsurile salvate, fără rețea; cheie lipsă => ReplayMiss.
+- "stub": rezultate sintetice deterministe cu latență configurabilă (load test offline).
+
+Toate primesc aceleași argumente și întorc JSON-ul parsat (dict), ca `_call_model`.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from openai import RateLimitError
+
+from . import imaging, prompts
+from .openai_client import get_openai_client, timed
+from .rate_governor import RateLimited, estimate_tokens, governor
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "gpt-4o"
+
+
+class BaseAnalyzerBackend:
+    name = "base"
+
+    def complete(self, prompt_text, payloads, detail="high", max_tokens=1000, label="extract"):
+        raise NotImplementedError
+
+
+class OpenAIBackend(BaseAnalyzerBackend):
+    name = "openai"
+
+    def complete(self, prompt_text, payloads, detail="high", max_tokens=1000, label="extract"):
+        content = [{"type": "text", "text": prompt_text}]
+        for payload in payloads:
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{imaging.to_base64(payload)}",
+                    "detail": detail,
+                },
+            })
+
+        # Capacitate comună tuturor workerilor (RPM + TPM); poate arunca RateLimited
+        governor.acquire(estimate_tokens(prompt_text, len(payloads), detail, max_tokens))
+        try:
+            with timed(label):
+                response = get_openai_client().chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=[{"role": "user", "content": content}],
+                    max_tokens=max_tokens,
+                    temperature=0.0,
+                    response_format={"type": "json_object"},
+                )
+        except RateLimitError as e:
+            # 429 după retry-urile SDK-ului: task-ul se re-programează, nu raportăm eroare clientului
+            retry_after = getattr(getattr(e, "response", None), "headers", {}).get("retry-after") or 20
+            raise RateLimited(float(retry_after)) from e
+        return json.loads(response.choices[0].message.content)
+
+
+class ReplayMiss(KeyError):
+    """Nu există răspuns înregistrat pentru acest prompt + aceste imagini."""
+
+
+class RecordReplayBackend(BaseAnalyzerBackend):
+    """
+    Răspunsurile sunt fișiere JSON în `directory`, cu numele = SHA-256 peste
+    eticheta apelului, prompt și octeții imaginilor trimise (după preprocesare).
+    """
+    name = "replay"
+
+    def __init__(self, directory, record=False, inner=None):
+        self.directory = directory
+        self.record = record
+        self.inner = inner or OpenAIBackend()
+
+    @staticmethod
+    def make_key(prompt_text, payloads, label):
+        digest = hashlib.sha256()
+        for part in [label.encode("utf-8"), prompt_text.encode("utf-8")] + list(payloads):
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(hashlib.sha256(part).digest())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def complete(self, prompt_text, payloads, detail="high", max_tokens=1000, label="extract"):
+        path = self._path(self.make_key(prompt_text, payloads, label))
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        if not self.record:
+            raise ReplayMiss(f"Niciun răspuns înregistrat ({label}): {os.path.basename(path)}")
+
+        data = self.inner.complete(prompt_text, payloads, detail=detail, max_tokens=max_tokens, label=label)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return data
+
+
+class StubBackend(BaseAnalyzerBackend):
+    """
+    Rezultate sintetice, deterministe pentru aceleași imagini, fără rețea.
+    Tipul documentului e ales din hash-ul imaginii după o distribuție apropiată de cea reală
+    (majoritatea upload-urilor sunt poze cu mașina).
+    """
+    name = "stub"
+
+    TYPE_WEIGHTS = (
+        ("FOTO_AUTO", 50), ("CI", 8), ("TALON", 8), ("CIV", 6), ("RCA_PAGUBIT", 6),
+        ("AMIABILA", 8), ("EXTRAS", 4), ("PV_POLITIE", 2), ("PERMIS", 4), ("ALTELE", 4),
+    )
+
+    def __init__(self, latency=1.5, jitter=0.5):
+        self.latency = latency
+        self.jitter = jitter
+        self._prompt_types = {prompts.AMIABILA_PROMPT: "AMIABILA", prompts.MULTIPLE_PROMPT: "CIV"}
+        self._prompt_types.update({text: tip for tip, text in prompts.EXTRACTION_PROMPTS.items()})
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _sleep(self, rng):
+        delay = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+        if delay:
+            time.sleep(delay)
+
+    def _pick_type(self, rng):
+        total = sum(weight for _, weight in self.TYPE_WEIGHTS)
+        point = rng.uniform(0, total)
+        for tip, weight in self.TYPE_WEIGHTS:
+            point -= weight
+            if point <= 0:
+                return tip
+        return self.TYPE_WEIGHTS[0][0]
+
+    @staticmethod
+    def _plate(rng):
+        county = rng.choice(["B", "AG", "CJ", "DB", "IS", "PH", "TM"])
+        number = rng.randint(100, 999) if county == "B" else rng.randint(10, 99)
+        letters = "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ") for _ in range(3))
+        return f"{county} {number} {letters}"
+
+    @staticmethod
+    def _iban(rng):
+        bban = "BTRL" + "".join(rng.choice("0123456789") for _ in range(16))
+        digits = "".join(str(int(ch, 36)) for ch in bban + "RO00")
+        return f"RO{98 - int(digits) % 97:02d}{bban}"
+
+    def _fields(self, tip, rng):
+        vin = "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ0123456789") for _ in range(17))
+        values = {
+            "nr_auto": self._plate(rng), "nr_auto_a": self._plate(rng), "nr_auto_b": self._plate(rng),
+            "vin": vin, "marca": "VOLKSWAGEN", "model": "GOLF",
+            "nume": "POPESCU ION", "cnp": f"1{rng.randint(10 ** 11, 10 ** 12 - 1)}",
+            "nr_polita": f"RO/25/V25/BZ {rng.randint(10 ** 8, 10 ** 9 - 1)}",
+            "asigurator": "ALLIANZ", "asigurator_a": "ALLIANZ", "asigurator_b": "GROUPAMA",
+            "data_expirare": "31.12.2026", "data_accident": "15.10.2026",
+            "nume_sofer_a": "POPESCU ION", "nume_sofer_b": "IONESCU VASILE",
+            "iban": self._iban(rng),
+        }
+        keys = set(prompts.REQUIRED_FIELDS.get(tip, ()))
+        if tip == "AMIABILA":
+            keys |= {"data_accident", "asigurator_a", "asigurator_b", "nume_sofer_a", "nume_sofer_b"}
+        elif tip == "RCA_PAGUBIT":
+            keys.add("asigurator")
+        return {key: values[key] for key in sorted(keys)}
+
+    def complete(self, prompt_text, payloads, detail="high", max_tokens=1000, label="extract"):
+        seed = hashlib.sha256(b"".join(hashlib.sha256(p).digest() for p in payloads)).hexdigest()
+        rng = random.Random(seed)
+        with self._lock:
+            self.calls += 1
+        self._sleep(random.Random(f"{seed}:{label}:{self.calls}"))
+
+        if label == "classify":
+            # Aceeași imagine => același tip la clasificare și la extragere
+            return {"tip_document": self._pick_type(rng)}
+
+        tip = self._prompt_types.get(prompt_text) or self._pick_type(rng)
+        return {"tip_document": tip, "date_extrase": self._fields(tip, rng)}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def build_backend(name=None):
+    name = (name or getattr(settings, "DOCUMENT_ANALYZER_BACKEND", "openai")).lower()
+    if name == "openai":
+        return OpenAIBackend()
+    if name in ("record", "replay"):
+        directory = getattr(settings, "ANALYZER_REPLAY_DIR", os.path.join(settings.BASE_DIR, "analyzer_replay"))
+        return RecordReplayBackend(directory, record=(name == "record"))
+    if name == "stub":
+        return StubBackend(
+            latency=getattr(settings, "ANALYZER_STUB_LATENCY", 1.5),
+            jitter=getattr(settings, "ANALYZER_STUB_JITTER", 0.5),
+        )
+    raise ValueError(f"DOCUMENT_ANALYZER_BACKEND necunoscut: {name}")
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_backend()
+                logger.info(f"Backend analiză documente: {_backend.name}")
+    return _backend
+
+
+def set_backend(backend):
+    """Înlocuiește backend-ul procesului curent (load test, teste). None => re-citit din settings."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
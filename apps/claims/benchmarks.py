@@ -0,0 +1,233 @@
+"""
+Benchmark pentru preprocesarea din DocumentAnalyzer (fără apeluri la model).
+
+Fixture-urile sunt generate determinist (poze de telefon JPEG de diverse rezoluții,
+screenshot-uri PNG, PDF-uri de 1-20 pagini), apoi trecute prin aceleași etape ca
+în DocumentAnalyzer._analyze_uncached:
+
+    render (PDF) -> decode -> classify_thumb -> enhance -> crops -> base64
+
+Pentru fiecare etapă raportăm timpul (minimul din `repeat` rulări), octeții alocați
+în Python (tracemalloc) și dimensiunea payload-ului. Fiecare fixture rulează într-un
+proces separat ca vârful de RSS să îi aparțină doar lui.
+Baseline-ul salvat (benchmarks_baseline.json) e comparat la fiecare rulare.
+"""
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import time
+import tracemalloc
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw
+
+from . import imaging, prompts
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmarks_baseline.json")
+
+# Toleranțe pentru regresii: timpii variază între mașini și rulări (±40% pe VM-uri partajate),
+# dimensiunile payload-urilor sunt deterministe
+TIME_TOLERANCE = 1.5
+TIME_SLACK_MS = 25.0
+SIZE_TOLERANCE = 1.02
+
+# (nume, tip, parametri)
+FIXTURES = (
+    ("phone_2mp.jpg", "jpeg", {"size": (1632, 1224)}),
+    ("phone_8mp.jpg", "jpeg", {"size": (3264, 2448)}),
+    ("phone_12mp.jpg", "jpeg", {"size": (4032, 3024)}),
+    ("screenshot_phone.png", "png", {"size": (1080, 2400)}),
+    ("screenshot_desktop.png", "png", {"size": (1920, 1080)}),
+    ("scan_1p.pdf", "pdf", {"pages": 1}),
+    ("scan_5p.pdf", "pdf", {"pages": 5}),
+    ("scan_20p.pdf", "pdf", {"pages": 20}),
+)
+
+
+def _document_image(size, seed):
+    """Imagine cu text + gradient + zgomot ușor, ca să se comprime aproape ca o poză reală."""
+    width, height = size
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    # Zgomot determinist (tile 256x256 dintr-un seed) => aceleași dimensiuni de payload la fiecare rulare
+    tile = Image.frombytes("L", (256, 256), random.Random(seed).randbytes(256 * 256))
+    noise = Image.new("L", size)
+    for x in range(0, width, 256):
+        for y in range(0, height, 256):
+            noise.paste(tile, (x, y))
+    img = Image.blend(img, noise.convert("RGB"), 0.25)
+    draw = ImageDraw.Draw(img)
+    step = max(16, height // 60)
+    for row, y in enumerate(range(step, height - step, step)):
+        draw.text((width // 20, y), f"Rubrica {row} / doc {seed}: AG 22 PAW  RO49AAAA1B31007593840000", fill=(20, 20, 20))
+    draw.rectangle((width // 10, height // 3, width // 2, height // 2), outline=(0, 0, 200), width=max(2, width // 400))
+    return img
+
+
+def make_fixture(kind, params, seed=0):
+    if kind in ("jpeg", "png"):
+        img = _document_image(params["size"], seed)
+        buffered = io.BytesIO()
+        if kind == "jpeg":
+            img.save(buffered, format="JPEG", quality=92)
+        else:
+            img.save(buffered, format="PNG")
+        return buffered.getvalue()
+
+    # PDF "scanat": fiecare pagină A4 conține o imagine JPEG + puțin text
+    doc = fitz.open()
+    page_image = io.BytesIO()
+    _document_image((1240, 1754), seed).save(page_image, format="JPEG", quality=80)
+    for index in range(params["pages"]):
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=page_image.getvalue())
+        page.insert_text((40, 40), f"Pagina {index + 1}", fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    def measure(self, name, func, *args):
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self.stages[name] = {"ms": round(elapsed * 1000, 2), "alloc_bytes": peak}
+        return result
+
+
+def _current_rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def run_pipeline(name, data, profile=None):
+    """O rulare completă a preprocesării; întoarce etapele + dimensiunile payload-urilor."""
+    profile = profile or imaging.upload_profile("AMIABILA")
+    max_edge = profile["max_edge"]
+    timer = StageTimer()
+    sizes = {"bytes_in": len(data)}
+
+    if name.endswith(".pdf"):
+        pages = timer.measure("render_first_page", lambda: next(imaging.iter_pdf_pages(data, max_edge)))
+        timer.measure("render_all_pages", lambda: sum(len(p) for p in imaging.iter_pdf_pages(data, max_edge)))
+        source = pages
+    else:
+        source = data
+
+    def decode():
+        img = Image.open(io.BytesIO(source))
+        imaging.apply_draft(img, max_edge)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img = imaging.fit_within(img, max_edge)
+        img.load()
+        return img
+
+    img = timer.measure("decode", decode)
+    thumb = timer.measure(
+        "classify_thumb", lambda: imaging.encode_jpeg(imaging.fit_within(img, prompts.CLASSIFY_MAX_EDGE), 80)
+    )
+    from .services import DocumentAnalyzer
+
+    enhanced = timer.measure("enhance", DocumentAnalyzer._enhance, img, profile)
+
+    def crops():
+        width, height = enhanced.size
+        left = enhanced.crop((0, 0, int(width * 0.55), height))
+        right = enhanced.crop((int(width * 0.45), 0, width, height))
+        return [imaging.encode_jpeg(part, profile["quality"]) for part in (enhanced, left, right)]
+
+    payloads = timer.measure("crops", crops)
+    encoded = timer.measure("base64", lambda: [imaging.to_base64(p) for p in payloads])
+
+    sizes.update({
+        "thumb_bytes": len(thumb),
+        "payload_bytes": sum(len(p) for p in payloads),
+        "base64_chars": sum(len(e) for e in encoded),
+        "decoded_size": list(img.size),
+    })
+    return timer.stages, sizes
+
+
+def bench_fixture(name, kind, params, repeat=3):
+    """Rulează `repeat` iterații și păstrează minimul per etapă (cel mai puțin zgomotos)."""
+    data = make_fixture(kind, params)
+    rss_before = _current_rss()
+    best = None
+    sizes = None
+    for _ in range(repeat):
+        stages, sizes = run_pipeline(name, data)
+        if best is None:
+            best = stages
+        else:
+            for stage, values in stages.items():
+                if values["ms"] < best[stage]["ms"]:
+                    best[stage] = values
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    total_ms = round(sum(v["ms"] for k, v in best.items() if k != "render_all_pages"), 2)
+    return {
+        "name": name,
+        "stages": best,
+        "sizes": sizes,
+        "total_ms": total_ms,
+        "peak_rss_delta": max(0, peak_rss - rss_before),
+    }
+
+
+def _child(queue, name, kind, params, repeat):
+    import django
+    django.setup()
+    queue.put(bench_fixture(name, kind, params, repeat))
+
+
+def bench_isolated(name, kind, params, repeat=3):
+    """Fixture-ul într-un proces nou (spawn), ca vârful de RSS să fie doar al lui."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(queue, name, kind, params, repeat))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    data = {r["name"]: {"stages": r["stages"], "sizes": r["sizes"], "total_ms": r["total_ms"]} for r in results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(result, baseline):
+    """Lista de regresii (text) pentru un fixture față de baseline."""
+    previous = baseline.get(result["name"])
+    if not previous:
+        return []
+    problems = []
+    for stage, values in result["stages"].items():
+        old = previous["stages"].get(stage)
+        if old and values["ms"] > old["ms"] * TIME_TOLERANCE + TIME_SLACK_MS:
+            problems.append(f"{stage}: {old['ms']}ms -> {values['ms']}ms")
+    for key in ("thumb_bytes", "payload_bytes", "base64_chars"):
+        old = previous["sizes"].get(key)
+        if old and result["sizes"][key] > old * SIZE_TOLERANCE:
+            problems.append(f"{key}: {old} -> {result['sizes'][key]}")
+    return problems
@@ -0,0 +1,279 @@
+"""
+Index multi-pattern (Aho-Corasick) pentru asocierea emailurilor de la asiguratori cu dosarele.
+
+Strategiile pe text parcurgeau, pentru fiecare email, toate dosarele cu număr de dosar la
+asigurator, toate numerele auto ale păgubiților (câte un re.sub per număr) și toți clienții
+(câte două re.search per client): O(dosare x lungimea emailului), tot mai lent pe măsură ce
+crește baza. Acum fiecare worker ține un automat construit peste:
+- numerele de dosar ale asiguratorului (lowercase, căutate ca subșir, ca înainte);
+- numerele auto ale vehiculelor păgubite (lowercase, fără spații / cratime);
+- prenumele și numele clienților (lowercase, cuvinte întregi; clientul se potrivește doar
+  dacă apar ambele),
+iar un email e parcurs o singură dată per normalizare, indiferent de câte dosare există.
+
+Indexul e ținut la zi incremental: semnalele modelelor (apps/claims/signals.py) publică în
+cache-ul partajat o versiune nouă și diferența (pattern vechi -> pattern nou). Un worker care
+vede altă versiune aplică diferențele lipsă în memorie; dacă nu le mai găsește (expirate,
+cache golit) sau indexul e mai vechi de CASE_INDEX_MAX_AGE, îl reconstruiește din baza de date.
+"""
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "case_index:version"
+DELTA_KEY = "case_index:delta:{}"
+DELTA_TTL = 24 * 3600
+# Peste atâtea diferențe lipsă e mai ieftin să reconstruim din baza de date
+MAX_DELTAS = 500
+
+CLAIM, PLATE, NAME = "claim", "plate", "name"
+
+_PLATE_NOISE = re.compile(r"[\s\-]")
+
+
+def normalize_claim(value):
+    return (value or "").lower()
+
+
+def normalize_plate(value):
+    return _PLATE_NOISE.sub("", (value or "").lower())
+
+
+def name_parts(first_name, last_name):
+    """(prenume, nume) normalizate, sau None dacă lipsește unul (strategia cere ambele)."""
+    first, last = (first_name or "").strip().lower(), (last_name or "").strip().lower()
+    return (first, last) if first and last else None
+
+
+class Automaton:
+    """Aho-Corasick clasic: trie + legături de eșec; `scan` e liniar în lungimea textului."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._link()
+
+    def _add(self, pattern):
+        node = 0
+        for char in pattern:
+            following = self.goto[node].get(char)
+            if following is None:
+                following = len(self.goto)
+                self.goto[node][char] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = following
+        self.output[node].append(pattern)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, following in self.goto[node].items():
+                queue.append(following)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[following] = target if target != following else 0
+                self.output[following] = self.output[following] + self.output[self.fail[following]]
+
+    def scan(self, text):
+        """Generează (poziția de final, pattern) pentru fiecare apariție."""
+        node = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for pattern in output[node]:
+                yield position, pattern
+
+
+def _is_word(char):
+    return char.isalnum() or char == "_"
+
+
+class CaseIndex:
+    """Pattern -> ID-uri (dosare / clienți), plus automatele construite peste ele."""
+
+    def __init__(self, claims=None, plates=None, names=None, version=0):
+        self.claims = claims or {}  # număr dosar -> {case_id}
+        self.plates = plates or {}  # număr auto -> {case_id}
+        self.names = names or {}  # prenume / nume -> {(client_id, "first" | "last")}
+        self.version = version
+        self.built_at = time.monotonic()
+        self._automata = None
+
+    @classmethod
+    def from_database(cls, version=0):
+        from .models import Case, Client, InvolvedVehicle
+
+        index = cls(version=version)
+        claims = Case.objects.exclude(insurer_claim_number__isnull=True).exclude(insurer_claim_number__exact="")
+        for case_id, claim in claims.values_list("id", "insurer_claim_number").iterator():
+            index.add(CLAIM, normalize_claim(claim), str(case_id))
+        plates = (
+            InvolvedVehicle.objects.filter(role=InvolvedVehicle.Role.VICTIM)
+            .exclude(license_plate__isnull=True)
+            .exclude(license_plate__exact="")
+        )
+        for case_id, plate in plates.values_list("case_id", "license_plate").iterator():
+            index.add(PLATE, normalize_plate(plate), str(case_id))
+        for client_id, first_name, last_name in Client.objects.values_list("id", "first_name", "last_name").iterator():
+            for name, payload in client_name_entries(client_id, first_name, last_name):
+                index.add(NAME, name, payload)
+        return index
+
+    def _table(self, kind):
+        return {CLAIM: self.claims, PLATE: self.plates, NAME: self.names}[kind]
+
+    def add(self, kind, pattern, payload):
+        if pattern:
+            self._table(kind).setdefault(pattern, set()).add(payload)
+            self._automata = None
+
+    def remove(self, kind, pattern, payload):
+        table = self._table(kind)
+        payloads = table.get(pattern)
+        if payloads is None:
+            return
+        payloads.discard(payload)
+        if not payloads:
+            del table[pattern]
+        self._automata = None
+
+    def apply(self, delta):
+        for kind, pattern, payload in delta.get("remove", []):
+            self.remove(kind, pattern, _payload(payload))
+        for kind, pattern, payload in delta.get("add", []):
+            self.add(kind, pattern, _payload(payload))
+
+    @property
+    def automata(self):
+        # Reconstruit leneș (după diferențe), doar în memorie: O(lungimea totală a pattern-urilor)
+        if self._automata is None:
+            self._automata = (Automaton(set(self.claims) | set(self.names)), Automaton(self.plates))
+        return self._automata
+
+    def search(self, text):
+        """
+        O trecere peste text (și una peste textul normalizat pentru numere auto).
+        Întoarce {"claim": {case_id}, "plate": {case_id}, "client": {client_id}}.
+        """
+        text = text.lower()
+        words, plates = self.automata
+        claims, found_names = set(), {}
+        for end, pattern in words.scan(text):
+            claims |= self.claims.get(pattern, set())
+            start = end - len(pattern) + 1
+            # Nume: doar cuvinte întregi (ca \b...\b: 'Ion' nu se potrivește în 'Action')
+            if pattern in self.names and (start == 0 or not _is_word(text[start - 1])) and (
+                end + 1 == len(text) or not _is_word(text[end + 1])
+            ):
+                for client_id, part in self.names[pattern]:
+                    found_names.setdefault(client_id, set()).add(part)
+        plate_cases = set()
+        for _, pattern in plates.scan(normalize_plate(text)):
+            plate_cases |= self.plates[pattern]
+        clients = {client_id for client_id, parts in found_names.items() if parts == {"first", "last"}}
+        return {CLAIM: claims, PLATE: plate_cases, "client": clients}
+
+
+def client_name_entries(client_id, first_name, last_name):
+    parts = name_parts(first_name, last_name)
+    if not parts:
+        return []
+    return [(parts[0], (client_id, "first")), (parts[1], (client_id, "last"))]
+
+
+def _payload(value):
+    # JSON (cache) transformă tuplurile în liste; setul are nevoie de valori hashable
+    return tuple(value) if isinstance(value, list) else value
+
+
+# --- Cache per worker ---
+_index = None
+_lock = threading.Lock()
+
+
+def _current_version():
+    try:
+        return cache.get(VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Index dosare: versiunea din cache indisponibilă: {e}")
+        return None
+
+
+def get_index():
+    """Indexul acestui worker, adus la versiunea din cache (diferențe sau reconstrucție)."""
+    global _index
+    version = _current_version()
+    max_age = getattr(settings, "CASE_INDEX_MAX_AGE", 3600)
+    with _lock:
+        index = _index
+        if index is not None and time.monotonic() - index.built_at > max_age:
+            index = None
+        if index is not None and version is not None and version != index.version:
+            index = _catch_up(index, version)
+        if index is None:
+            index = CaseIndex.from_database(version or 0)
+            logger.info(f"Index dosare reconstruit (versiunea {index.version})")
+        _index = index
+        return index
+
+
+def _catch_up(index, version):
+    if not 0 < version - index.version <= MAX_DELTAS:
+        return None
+    try:
+        keys = [DELTA_KEY.format(v) for v in range(index.version + 1, version + 1)]
+        deltas = cache.get_many(keys)
+    except Exception:
+        return None
+    if len(deltas) != len(keys):
+        return None
+    for key in keys:
+        index.apply(deltas[key])
+    index.version = version
+    return index
+
+
+def reset():
+    """Uită indexul local (teste / comenzi de administrare)."""
+    global _index
+    with _lock:
+        _index = None
+
+
+def publish(remove=(), add=()):
+    """
+    Publică o diferență (listă de (tip, pattern, payload)) pentru toți workerii, după commit.
+    Apelat din semnale; dacă cache-ul nu e disponibil, workerii se bazează pe CASE_INDEX_MAX_AGE.
+    """
+    remove, add = [item for item in remove if item[1]], [item for item in add if item[1]]
+    if set(remove) == set(add):
+        return
+    transaction.on_commit(lambda: _publish(remove, add))
+
+
+def _publish(remove, add):
+    try:
+        cache.add(VERSION_KEY, 0, timeout=None)
+        version = cache.incr(VERSION_KEY)
+        cache.set(DELTA_KEY.format(version), {"remove": remove, "add": add}, timeout=DELTA_TTL)
+    except Exception as e:
+        logger.warning(f"Index dosare: nu pot publica modificarea ({e})")
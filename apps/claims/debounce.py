@@ -0,0 +1,117 @@
+"""
+Debounce per (dosar, scop) într-un sorted set Redis, golit de un singur sweeper (Celery beat).
+
+Fiecare eveniment (poză neidentificată, mesaj către asigurator, document clasificat) doar mută termenul
+membrului "scop|case_id" în ZSET; nu se creează niciun mesaj Celery per eveniment.
+Sweeper-ul scoate atomic membrii expirați și pornește o singură execuție per membru,
+deci traficul pe broker e O(dosare), nu O(mesaje).
+
+Scorul e timpul Redis (TIME), ca workerii de pe mașini diferite să folosească același ceas.
+Dacă Redis nu răspunde, `touch` întoarce False și apelantul cade pe countdown-ul clasic.
+"""
+import logging
+from importlib import import_module
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# scop -> task-ul pornit la expirare (primește case_id)
+HANDLERS = {
+    "grouped_unknowns": "apps.claims.tasks.process_grouped_unknowns_task",
+    "insurer_relay": "apps.claims.tasks.trigger_delayed_relay_task",
+    "dossier": "apps.claims.tasks.update_dossier_task",
+}
+
+TOUCH_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+return 1
+"""
+
+POP_DUE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, tonumber(ARGV[1]))
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+PENDING_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local items = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+local result = {}
+for i = 1, #items, 2 do
+    table.insert(result, items[i])
+    table.insert(result, tostring(tonumber(items[i + 1]) - now))
+end
+return result
+"""
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class Debouncer:
+    def __init__(self, key="debounce:deadlines", redis_client=None):
+        self.key = key
+        self._redis = redis_client
+        self._scripts = {}
+
+    def _script(self, source):
+        if source not in self._scripts:
+            self._scripts[source] = (self._redis or get_redis()).register_script(source)
+        return self._scripts[source]
+
+    @staticmethod
+    def member(purpose, case_id):
+        if purpose not in HANDLERS:
+            raise ValueError(f"Scop debounce necunoscut: {purpose}")
+        return f"{purpose}|{case_id}"
+
+    def touch(self, purpose, case_id, delay):
+        """Termenul devine acum + delay (secunde). False dacă Redis e indisponibil."""
+        member = self.member(purpose, case_id)
+        try:
+            self._script(TOUCH_LUA)(keys=[self.key], args=[member, float(delay)])
+        except Exception as e:
+            logger.warning(f"Debounce indisponibil (Redis: {e}) pentru {member}")
+            return False
+        return True
+
+    def cancel(self, purpose, case_id):
+        try:
+            (self._redis or get_redis()).zrem(self.key, self.member(purpose, case_id))
+        except Exception as e:
+            logger.warning(f"Debounce: nu pot anula {purpose} pentru {case_id} (Redis: {e})")
+
+    def pop_due(self, limit=500):
+        """Scoate atomic membrii expirați; fiecare e întors unui singur sweeper."""
+        due = self._script(POP_DUE_LUA)(keys=[self.key], args=[limit])
+        result = []
+        for raw in due:
+            purpose, _, case_id = _text(raw).partition("|")
+            result.append((purpose, case_id))
+        return result
+
+    def pending(self):
+        """Lista (scop, case_id, secunde rămase), în ordinea termenelor."""
+        items = self._script(PENDING_LUA)(keys=[self.key])
+        result = []
+        for index in range(0, len(items), 2):
+            purpose, _, case_id = _text(items[index]).partition("|")
+            result.append((purpose, case_id, float(_text(items[index + 1]))))
+        return result
+
+
+def handler_for(purpose):
+    module_name, _, attr = HANDLERS[purpose].rpartition(".")
+    return getattr(import_module(module_name), attr)
+
+
+debouncer = Debouncer()
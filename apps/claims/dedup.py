@@ -0,0 +1,157 @@
+"""
+Detectare poze duplicate în cadrul unui dosar (hash perceptual).
+
+Clienții retrimit des aceeași poză (WhatsApp + web chat, sau de 2-3 ori la rând).
+Fiecare copie devine un CaseDocument; în loc să o trimitem din nou la model,
+o legăm de documentul original deja analizat (CaseDocument.duplicate_of).
+
+Indexul per dosar e coloana `phash` (indexată împreună cu `case`): un dosar are
+zeci de documente, deci comparăm distanța Hamming în Python pe lista (id, phash).
+
+dHash-ul de 64 de biți e doar un filtru: două poze diferite ale aceleiași mașini, din
+aproape același unghi, pot cădea sub prag. O potrivire e confirmată doar de același fișier
+(SHA-256) sau de un dHash fin (32x32) aproape identic; altfel poza e analizată normal.
+Potrivirea nu ține cont de tip: deduplicarea rulează înainte de clasificare, când noul
+document nu are încă tip (sau are doar tipul presupus de flux). Confirmarea cere aceeași
+imagine, deci o copie preia tipul originalului, oricare ar fi acesta.
+"""
+import hashlib
+import io
+import logging
+
+from django.conf import settings
+from PIL import Image
+
+from . import imaging
+from .models import CaseDocument
+
+logger = logging.getLogger(__name__)
+
+# Latura pentru decodarea redusă (draft JPEG) înainte de hash; dHash folosește oricum 9x8 pixeli
+HASH_DECODE_EDGE = 256
+
+# Confirmarea unei potriviri: dHash de 1024 biți pe o decodare mai mare. O poză retrimisă
+# (recomprimată / redimensionată) rămâne sub ~20 de biți; un unghi puțin diferit trece de 40
+CONFIRM_HASH_SIZE = 32
+CONFIRM_DECODE_EDGE = 512
+
+# Tipuri de fișiere pentru care nu calculăm hash (PDF-urile au deja cache-ul OCR pe conținut)
+SKIP_EXTENSIONS = (".pdf", ".mp4", ".mov", ".avi", ".3gp")
+
+
+def compute_phash(data):
+    """dHash pentru o imagine (bytes); None dacă nu e o imagine decodabilă."""
+    try:
+        img = Image.open(io.BytesIO(data))
+        imaging.apply_draft(img, HASH_DECODE_EDGE)
+        return imaging.dhash(img)
+    except Exception as e:
+        logger.debug(f"Hash perceptual indisponibil: {e}")
+        return None
+
+
+def fine_hash(data):
+    try:
+        img = Image.open(io.BytesIO(data))
+        imaging.apply_draft(img, CONFIRM_DECODE_EDGE)
+        return imaging.dhash(img, CONFIRM_HASH_SIZE)
+    except Exception as e:
+        logger.debug(f"Hash fin indisponibil: {e}")
+        return None
+
+
+def _read(doc):
+    try:
+        with doc.file.open("rb") as f:
+            return f.read()
+    except (OSError, ValueError) as e:
+        logger.warning(f"Nu pot citi {doc.file.name} pentru confirmarea duplicatului: {e}")
+        return None
+
+
+def confirm_duplicate(data, candidate):
+    """Același fișier (SHA-256) sau dHash fin la distanță <= PHASH_CONFIRM_DISTANCE."""
+    candidate_data = _read(candidate)
+    if data is None or candidate_data is None:
+        return False
+    if hashlib.sha256(data).digest() == hashlib.sha256(candidate_data).digest():
+        return True
+    fine, candidate_fine = fine_hash(data), fine_hash(candidate_data)
+    if fine is None or candidate_fine is None:
+        return False
+    return imaging.hamming_distance(fine, candidate_fine) <= getattr(settings, "PHASH_CONFIRM_DISTANCE", 32)
+
+
+def phash_for_document(doc):
+    name = (doc.file.name or "").lower()
+    if not name or name.endswith(SKIP_EXTENSIONS):
+        return None
+    try:
+        with doc.file.open("rb") as f:
+            return compute_phash(f.read())
+    except OSError as e:
+        # Detectarea duplicatelor nu trebuie să blocheze analiza documentului
+        logger.warning(f"Nu pot citi {doc.file.name} pentru hash: {e}")
+        return None
+
+
+def find_original(doc, max_distance=None):
+    """
+    Cel mai apropiat document analizat din același dosar, de orice tip, la distanță
+    <= max_distance și confirmat de confirm_duplicate.
+    Documentele încă în procesare (ocr_data gol) și cele neidentificate nu contează.
+    """
+    if not doc.phash:
+        return None
+    if max_distance is None:
+        max_distance = getattr(settings, "PHASH_DUPLICATE_DISTANCE", 5)
+
+    candidates = (
+        CaseDocument.objects.filter(case_id=doc.case_id, phash__isnull=False, duplicate_of__isnull=True)
+        .exclude(id=doc.id)
+        .exclude(doc_type=CaseDocument.DocType.UNKNOWN)
+        .exclude(ocr_data__exact={})
+        .exclude(ocr_data__isnull=True)
+    )
+    near = []
+    for candidate_id, candidate_hash in candidates.order_by("id").values_list("id", "phash"):
+        distance = imaging.hamming_distance(doc.phash, candidate_hash)
+        if distance <= max_distance:
+            near.append((distance, candidate_id))
+    if not near:
+        return None
+
+    # Doar pentru candidații apropiați (de obicei unul) citim fișierele
+    data = _read(doc)
+    for _, candidate_id in sorted(near):
+        candidate = CaseDocument.objects.get(id=candidate_id)
+        if confirm_duplicate(data, candidate):
+            return candidate
+    logger.info(f"Document #{doc.id}: seamănă cu #{near[0][1]}, dar nu e aceeași poză; îl analizez")
+    return None
+
+
+def link_duplicate(doc):
+    """
+    Calculează și salvează phash-ul documentului; dacă e duplicatul unui document deja
+    analizat, îl leagă de original (același tip, fără date OCR proprii) și întoarce originalul.
+    """
+    if not getattr(settings, "DUPLICATE_DETECTION", True):
+        return None
+    if doc.phash is None:
+        doc.phash = phash_for_document(doc)
+        if doc.phash is None:
+            return None
+        CaseDocument.objects.filter(pk=doc.pk).update(phash=doc.phash)
+
+    original = find_original(doc)
+    if original is None:
+        return None
+
+    doc.duplicate_of = original
+    doc.doc_type = original.doc_type
+    # Fără "tip_document": semnalele nu mai populează încă o dată vehiculele/clientul
+    doc.ocr_data = {"note": f"Duplicat al documentului #{original.id}.", "duplicate_of": original.id}
+    doc.save(update_fields=["duplicate_of", "doc_type", "ocr_data"])
+    logger.info(f"Document #{doc.id} = duplicat al #{original.id} (dosar {doc.case_id})")
+    return original
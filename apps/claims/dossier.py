@@ -0,0 +1,328 @@
+"""
+Dosarul PDF unificat trimis asiguratorului (în locul pozelor JPEG separate).
+
+Un singur PDF per dosar, cu o secțiune (bookmark) per tip de document, în ordinea din
+SECTION_ORDER. Imaginile sunt aduse la rezoluție de tipar (~150 DPI pe A4), PDF-urile
+primite sunt inserate ca atare.
+
+Actualizarea e incrementală: CaseDossier.entries ține paginile fiecărui document, deci
+un document nou (sau re-clasificat) înseamnă randarea doar a paginilor lui și inserarea
+lor la sfârșitul secțiunii; documentele șterse își pierd doar paginile. Fișierul din
+storage e numit după cheia setului de hash-uri (content_key): dacă documentele nu s-au
+schimbat, emailul îl atașează direct, fără nicio citire sau randare.
+
+Un relay către asigurator trimite doar documentele noi, ca PDF de completare (render_selection).
+Un PDF peste bugetul emailului e împărțit (split) în părți la granițe de document; un singur
+document prea mare (ex. un scan cu multe pagini) e împărțit pe intervale de pagini.
+Emailurile referă fișierul de la enqueue; completările și părțile sunt șterse după trimitere
+(mailer.release_generated), iar versiunea veche a dosarului, împreună cu părțile ei, când e
+înlocuită (doar dacă niciun email netrimis nu o mai referă).
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+
+import fitz  # PyMuPDF
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import imaging, mailer
+from .models import CaseDocument, CaseDossier
+
+logger = logging.getLogger(__name__)
+
+# Rezoluție de tipar: A4 la 150 DPI are latura lungă de 1754px
+PRINT_DPI = 150
+PRINT_MAX_EDGE = 1754
+PRINT_QUALITY = 80
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+DOSSIER_EXTENSIONS = IMAGE_EXTENSIONS + (".pdf",)
+
+DocType = CaseDocument.DocType
+SECTION_ORDER = [
+    DocType.ACCIDENT_REPORT,
+    DocType.ID_CARD,
+    DocType.DRIVERS_LICENSE,
+    DocType.CAR_REGISTRATION,
+    DocType.CAR_IDENTITY,
+    DocType.VICTIM_RCA,
+    DocType.GUILTY_PARTY_DOCS,
+    DocType.MANDATE_SIGNED,
+    DocType.MANDATE_UNSIGNED,
+    DocType.COMPENSATION_CLAIM,
+    DocType.REPAIR_AUTH,
+    DocType.BANK_STATEMENT,
+    DocType.DAMAGE_PHOTO,
+    DocType.OTHER_DOCS,
+    DocType.UNKNOWN,
+]
+
+
+def _section(doc_type):
+    try:
+        return SECTION_ORDER.index(doc_type)
+    except ValueError:
+        return len(SECTION_ORDER)
+
+
+def _extension(name):
+    return os.path.splitext(name.lower())[1]
+
+
+def content_key(entries):
+    """Cheia setului de documente: nu depinde de ordinea în care au fost adăugate."""
+    items = sorted(f"{entry['hash']}:{entry['type']}" for entry in entries)
+    return hashlib.sha256("\n".join(items).encode("utf-8")).hexdigest()
+
+
+def dossier_documents(case):
+    """Actele și pozele dosarului (fără videoclipuri și fără duplicatele legate)."""
+    docs = case.documents.filter(duplicate_of__isnull=True).order_by("uploaded_at", "id")
+    return [
+        doc
+        for doc in docs
+        if doc.file and _extension(doc.file.name) in DOSSIER_EXTENSIONS and doc.file.storage.exists(doc.file.name)
+    ]
+
+
+def print_jpeg(data):
+    img = Image.open(io.BytesIO(data))
+    imaging.apply_draft(img, PRINT_MAX_EDGE)
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img = imaging.fit_within(img, PRINT_MAX_EDGE)
+    return imaging.encode_jpeg(img, PRINT_QUALITY), img.size
+
+
+def render_document(doc):
+    """(PDF cu paginile documentului, SHA-256 al fișierului). Citește fișierul o singură dată."""
+    with doc.file.open("rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if _extension(doc.file.name) == ".pdf":
+        return fitz.open("pdf", data), digest
+
+    jpeg, (width, height) = print_jpeg(data)
+    pdf = fitz.open()
+    page = pdf.new_page(width=width * 72 / PRINT_DPI, height=height * 72 / PRINT_DPI)
+    page.insert_image(page.rect, stream=jpeg)
+    return pdf, digest
+
+
+def _is_current(entry, doc):
+    return doc is not None and entry["name"] == doc.file.name and entry["type"] == doc.doc_type
+
+
+def _table_of_contents(entries):
+    entries = [entry for entry in entries if entry["pages"]]
+    toc, page, counts = [], 1, {}
+    for entry in entries:
+        counts[entry["type"]] = counts.get(entry["type"], 0) + 1
+    for entry in entries:
+        if not toc or toc[-1][3] != entry["type"]:
+            label = DocType(entry["type"]).label if entry["type"] in DocType.values else entry["type"]
+            toc.append([1, f"{label} ({counts[entry['type']]})", page, entry["type"]])
+        page += entry["pages"]
+    return [item[:3] for item in toc]
+
+
+def _open_existing(dossier):
+    if not dossier.file or not dossier.entries:
+        return None
+    try:
+        with dossier.file.open("rb") as f:
+            return fitz.open("pdf", f.read())
+    except Exception as e:
+        logger.warning(f"Dosar PDF {dossier.case_id} ilizibil, îl refac: {e}")
+        return None
+
+
+def sync(case):
+    """
+    Aduce PDF-ul dosarului la zi și întoarce CaseDossier (file gol dacă nu există documente).
+    Doar documentele noi / schimbate sunt citite și randate.
+    """
+    docs = {doc.id: doc for doc in dossier_documents(case)}
+
+    with transaction.atomic():
+        dossier, _ = CaseDossier.objects.select_for_update().get_or_create(case=case)
+        pdf = _open_existing(dossier)
+        previous = dossier.entries if pdf else []
+
+        kept = [entry for entry in previous if _is_current(entry, docs.get(entry["doc"]))]
+        kept_ids = {entry["doc"] for entry in kept}
+        added = [doc for doc in docs.values() if doc.id not in kept_ids]
+        if pdf and not added and len(kept) == len(previous):
+            pdf.close()
+            return dossier
+        pdf = pdf or fitz.open()
+
+        try:
+            # 1. Paginile documentelor șterse / schimbate (de la coadă, ca indicii să rămână valizi)
+            ranges, page = [], 0
+            for entry in previous:
+                if entry["doc"] not in kept_ids and entry["pages"]:
+                    ranges.append((page, page + entry["pages"] - 1))
+                page += entry["pages"]
+            for first, last in reversed(ranges):
+                pdf.delete_pages(from_page=first, to_page=last)
+
+            # 2. Documentele noi, la sfârșitul secțiunii lor
+            entries = list(kept)
+            for doc in added:
+                section = _section(doc.doc_type)
+                index = next((i for i, e in enumerate(entries) if _section(e["type"]) > section), len(entries))
+                entry = {"doc": doc.id, "name": doc.file.name, "hash": "", "type": doc.doc_type, "pages": 0}
+                try:
+                    source, entry["hash"] = render_document(doc)
+                except Exception as e:
+                    # Rămâne în entries cu 0 pagini: nu reîncercăm până nu se schimbă fișierul
+                    logger.warning(f"Dosar PDF {case.id}: nu pot include {doc.file.name}: {e}")
+                else:
+                    pdf.insert_pdf(source, start_at=sum(e["pages"] for e in entries[:index]))
+                    entry["pages"] = source.page_count
+                    source.close()
+                entries.insert(index, entry)
+
+            old_name = dossier.file.name if dossier.file else None
+            if pdf.page_count:
+                pdf.set_toc(_table_of_contents(entries))
+                key = content_key(entries)
+                data = pdf.tobytes(garbage=3, deflate=True)
+                dossier.file.name = default_storage.save(f"dossiers/{case.id}/{key[:16]}.pdf", ContentFile(data))
+                dossier.content_key = key
+            else:
+                dossier.file.name = ""
+                dossier.content_key = ""
+            dossier.entries = entries
+            dossier.save(update_fields=["file", "content_key", "entries", "updated_at"])
+        finally:
+            pdf.close()
+
+    if old_name and old_name != dossier.file.name:
+        in_use = mailer.paths_in_use(case.id)
+        for name in [old_name] + parts_of(old_name):
+            if name in in_use:
+                continue  # șters de mailer.release_generated după trimiterea emailului
+            try:
+                default_storage.delete(name)
+            except OSError as e:
+                logger.warning(f"Nu pot șterge versiunea veche a dosarului PDF {name}: {e}")
+    logger.info(f"Dosar PDF {case.id}: +{len(added)} / -{len(previous) - len(kept)} documente")
+    return dossier
+
+
+def render_selection(case, docs):
+    """
+    PDF doar cu documentele date, în ordinea secțiunilor (ex. cele sosite după ultimul email).
+    Întoarce (nume în storage, entries) sau (None, []) dacă niciunul nu poate fi randat.
+    """
+    docs = sorted(docs, key=lambda doc: (_section(doc.doc_type), doc.uploaded_at, doc.id))
+    pdf, entries = fitz.open(), []
+    try:
+        for doc in docs:
+            try:
+                source, digest = render_document(doc)
+            except Exception as e:
+                logger.warning(f"Completare dosar {case.id}: nu pot include {doc.file.name}: {e}")
+                continue
+            pdf.insert_pdf(source)
+            entries.append({"doc": doc.id, "name": doc.file.name, "hash": digest, "type": doc.doc_type, "pages": source.page_count})
+            source.close()
+        if not pdf.page_count:
+            return None, []
+        pdf.set_toc(_table_of_contents(entries))
+        name = f"dossiers/{case.id}/addenda/{content_key(entries)[:16]}.pdf"
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(pdf.tobytes(garbage=3, deflate=True)))
+        return name, entries
+    finally:
+        pdf.close()
+
+
+def _range_size(pdf, first, last):
+    part = fitz.open()
+    try:
+        part.insert_pdf(pdf, from_page=first, to_page=last)
+        return len(part.tobytes(garbage=3, deflate=True))
+    finally:
+        part.close()
+
+
+def page_ranges(pdf, entries, budget):
+    """
+    Intervale de pagini [(prima, ultima)] consecutive, fiecare sub `budget` octeți, tăiate la
+    granițe de document; doar un document care depășește singur bugetul e tăiat pe pagini.
+    """
+    units, page = [], 0
+    for entry in entries:
+        if not entry["pages"]:
+            continue
+        last = page + entry["pages"] - 1
+        size = _range_size(pdf, page, last)
+        if size > budget and entry["pages"] > 1:
+            units += [(number, number, _range_size(pdf, number, number)) for number in range(page, last + 1)]
+        else:
+            units.append((page, last, size))
+        page = last + 1
+
+    ranges = []
+    for first, last, size in units:
+        if ranges and ranges[-1][2] + size <= budget:
+            ranges[-1] = (ranges[-1][0], last, ranges[-1][2] + size)
+        else:
+            ranges.append((first, last, size))
+    return [(first, last) for first, last, _ in ranges]
+
+
+def _part_toc(toc, first, last):
+    """Bookmark-urile paginilor [first, last]; secțiunea în curs la `first` rămâne pe pagina 1."""
+    items = [[level, title, page - first] for level, title, page, *_ in toc if first < page <= last + 1]
+    current = [item for item in toc if item[2] <= first + 1]
+    if current and (not items or items[0][2] != 1):
+        items.insert(0, [current[-1][0], current[-1][1], 1])
+    return items
+
+
+def parts_of(name):
+    """Părțile (split) deja scrise în storage pentru fișierul `name`."""
+    directory, filename = os.path.split(name)
+    pattern = re.compile(rf"^{re.escape(os.path.splitext(filename)[0])}_\d+of\d+\.pdf$")
+    try:
+        _, files = default_storage.listdir(directory)
+    except OSError:
+        return []
+    return [f"{directory}/{part}" for part in files if pattern.match(part)]
+
+
+def split(name, entries, budget):
+    """
+    Fișierul PDF `name` în părți de cel mult `budget` octeți (page_ranges). Întoarce [(nume, mărime)].
+    Părțile sunt numite după fișierul sursă (deja unic per conținut) și rămân în storage
+    până la trimiterea emailurilor care le referă (mailer.release_generated).
+    """
+    with default_storage.open(name, "rb") as f:
+        pdf = fitz.open("pdf", f.read())
+    try:
+        ranges = page_ranges(pdf, entries, budget)
+        toc, stem, parts = pdf.get_toc(), os.path.splitext(name)[0], []
+        for index, (first, last) in enumerate(ranges, start=1):
+            part_name = f"{stem}_{index}of{len(ranges)}.pdf"
+            if not default_storage.exists(part_name):
+                part = fitz.open()
+                try:
+                    part.insert_pdf(pdf, from_page=first, to_page=last)
+                    part.set_toc(_part_toc(toc, first, last))
+                    part_name = default_storage.save(part_name, ContentFile(part.tobytes(garbage=3, deflate=True)))
+                finally:
+                    part.close()
+            parts.append((part_name, default_storage.size(part_name)))
+        return parts
+    finally:
+        pdf.close()
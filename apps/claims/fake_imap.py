@@ -0,0 +1,367 @@
+"""
+Server IMAP minimal, local (fără TLS), pentru teste și pentru rularea listener-ului în dezvoltare.
+
+Implementează doar ce folosește apps/claims/inbound.py: LOGIN, SELECT (cu UIDVALIDITY /
+UIDNEXT), UID SEARCH, UID FETCH (UID, FLAGS, BODYSTRUCTURE, BODY.PEEK[...] cu secțiuni și
+intervale parțiale), UID STORE, IDLE, NOOP, CLOSE, LOGOUT. Mesajele sunt ținute în memorie;
+`append` le adaugă și anunță conexiunile aflate în IDLE (`* N EXISTS`).
+
+BODYSTRUCTURE e generat din mesajul parsat (text/*, multipart/*, părți de bază);
+message/rfc822 imbricat nu e modelat.
+"""
+import email
+import re
+import select
+import socket
+import socketserver
+import threading
+
+CRLF = b"\r\n"
+
+_ITEM = re.compile(rb"BODY(?:\.PEEK)?\[[^\]]*\](?:<\d+\.\d+>)?|[A-Z0-9.]+", re.IGNORECASE)
+_SECTION = re.compile(rb"BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?", re.IGNORECASE)
+_ARG = re.compile(rb'"((?:[^"\\]|\\.)*)"|(\S+)')
+
+
+def _quote(value):
+    if value is None:
+        return "NIL"
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _params(pairs):
+    if not pairs:
+        return "NIL"
+    return "(" + " ".join(f"{_quote(k.upper())} {_quote(v)}" for k, v in pairs) + ")"
+
+
+def _raw_payload(part):
+    payload = part.get_payload()
+    if isinstance(payload, str):
+        return payload.encode("ascii", "surrogateescape")
+    return payload or b""
+
+
+def bodystructure(part):
+    if part.is_multipart():
+        children = "".join(bodystructure(child) for child in part.get_payload())
+        return f"({children} {_quote(part.get_content_subtype().upper())} {_params(part.get_params()[1:])} NIL NIL)"
+
+    maintype, subtype = part.get_content_maintype().upper(), part.get_content_subtype().upper()
+    payload = _raw_payload(part)
+    fields = [
+        _quote(maintype),
+        _quote(subtype),
+        _params(part.get_params()[1:] if part.get_params() else None),
+        _quote(part.get("Content-ID")),
+        _quote(part.get("Content-Description")),
+        _quote((part.get("Content-Transfer-Encoding") or "7BIT").upper()),
+        str(len(payload)),
+    ]
+    if maintype == "TEXT":
+        fields.append(str(payload.count(b"\n")))
+    disposition = part.get("Content-Disposition")
+    if disposition:
+        kind = disposition.split(";")[0].strip().upper()
+        filename = part.get_param("filename", header="Content-Disposition")
+        disposition = f"({_quote(kind)} {_params([('filename', filename)] if filename else None)})"
+    fields += ["NIL", disposition or "NIL", "NIL"]
+    return "(" + " ".join(fields) + ")"
+
+
+def _part(message, section):
+    part = message
+    for number in section.split("."):
+        if not part.is_multipart():
+            if number == "1":
+                continue
+            return None
+        children = part.get_payload()
+        index = int(number) - 1
+        if index >= len(children):
+            return None
+        part = children[index]
+    return part
+
+
+class Mailbox:
+    def __init__(self, uidvalidity=1):
+        self.uidvalidity = uidvalidity
+        self.next_uid = 1
+        self.messages = []  # [uid, set(flags), bytes]
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def append(self, raw, flags=()):
+        raw = raw.replace(CRLF, b"\n").replace(b"\n", CRLF)
+        with self.lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.messages.append([uid, set(flags), raw])
+            self.changed.notify_all()
+        return uid
+
+    def reset(self, uidvalidity):
+        """Simulează o cutie re-creată: UID-urile vechi nu mai sunt valide."""
+        with self.lock:
+            self.uidvalidity = uidvalidity
+            self.next_uid = 1
+            self.messages = []
+            self.changed.notify_all()
+
+    def uid_set(self, spec):
+        uids = [m[0] for m in self.messages]
+        if not uids:
+            return []
+        top = uids[-1]
+        wanted = set()
+        for item in spec.split(","):
+            if ":" in item:
+                first, last = item.split(":")
+                first = top if first == "*" else int(first)
+                last = top if last == "*" else int(last)
+                low, high = sorted((first, last))
+                wanted.update(uid for uid in uids if low <= uid <= high)
+            else:
+                wanted.add(top if item == "*" else int(item))
+        return [m for m in self.messages if m[0] in wanted]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # Fără buffer la citire: în IDLE așteptăm DONE cu select() direct pe socket
+    rbufsize = 0
+
+    def setup(self):
+        super().setup()
+        self.server.connections.append(self.connection)
+        self.selected = False
+
+    def finish(self):
+        if self.connection in self.server.connections:
+            self.server.connections.remove(self.connection)
+        super().finish()
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def handle(self):
+        self.send(b"* OK IMAP4rev1 fake server ready\r\n")
+        while True:
+            try:
+                line = self.rfile.readline()
+            except OSError:
+                return
+            if not line:
+                return
+            self.server.commands.append(line.rstrip(CRLF))
+            tag, _, rest = line.rstrip(CRLF).partition(b" ")
+            command, _, args = rest.partition(b" ")
+            command = command.upper()
+            if command == b"UID":
+                command, _, args = args.partition(b" ")
+                command = b"UID " + command.upper()
+            handler = getattr(self, "do_" + command.decode().replace(" ", "_"), None)
+            if handler is None:
+                self.send(tag + b" BAD unknown command\r\n")
+                continue
+            if handler(tag, args) is False:
+                return
+
+    def do_CAPABILITY(self, tag, args):
+        self.send(b"* CAPABILITY IMAP4rev1 IDLE UIDPLUS\r\n" + tag + b" OK CAPABILITY completed\r\n")
+
+    def do_LOGIN(self, tag, args):
+        values = [m.group(1).decode() if m.group(1) is not None else m.group(2).decode() for m in _ARG.finditer(args)]
+        if tuple(values) != (self.server.user, self.server.password):
+            self.send(tag + b" NO [AUTHENTICATIONFAILED] invalid credentials\r\n")
+            return
+        self.server.logins += 1
+        self.send(tag + b" OK LOGIN completed\r\n")
+
+    def do_SELECT(self, tag, args):
+        box = self.server.mailbox
+        with box.lock:
+            self.send(
+                f"* {len(box.messages)} EXISTS\r\n* 0 RECENT\r\n"
+                f"* OK [UIDVALIDITY {box.uidvalidity}] UIDs valid\r\n"
+                f"* OK [UIDNEXT {box.next_uid}] Predicted next UID\r\n"
+                f"* FLAGS (\\Answered \\Flagged \\Deleted \\Seen \\Draft)\r\n"
+            )
+        self.selected = True
+        self.send(tag + b" OK [READ-WRITE] SELECT completed\r\n")
+
+    do_EXAMINE = do_SELECT
+
+    def do_NOOP(self, tag, args):
+        self.send(tag + b" OK NOOP completed\r\n")
+
+    def do_CLOSE(self, tag, args):
+        self.selected = False
+        self.send(tag + b" OK CLOSE completed\r\n")
+
+    def do_LOGOUT(self, tag, args):
+        self.send(b"* BYE logging out\r\n" + tag + b" OK LOGOUT completed\r\n")
+        return False
+
+    def do_UID_SEARCH(self, tag, args):
+        box = self.server.mailbox
+        criteria = args.upper().split()
+        with box.lock:
+            messages = list(box.messages)
+            if b"UID" in criteria:
+                messages = box.uid_set(criteria[criteria.index(b"UID") + 1].decode())
+        if b"UNSEEN" in criteria:
+            messages = [m for m in messages if "\\Seen" not in m[1]]
+        self.send("* SEARCH" + "".join(f" {m[0]}" for m in messages) + "\r\n")
+        self.send(tag + b" OK SEARCH completed\r\n")
+
+    def do_UID_STORE(self, tag, args):
+        spec, mode, flags = args.split(b" ", 2)
+        flags = set(flags.strip(b"()").decode().split())
+        box = self.server.mailbox
+        with box.lock:
+            for seq, message in enumerate(box.messages, start=1):
+                if message in box.uid_set(spec.decode()):
+                    if mode.startswith(b"+"):
+                        message[1] |= flags
+                    elif mode.startswith(b"-"):
+                        message[1] -= flags
+                    else:
+                        message[1] = set(flags)
+                    self.send(f"* {seq} FETCH (UID {message[0]} FLAGS ({' '.join(sorted(message[1]))}))\r\n")
+        self.send(tag + b" OK STORE completed\r\n")
+
+    def do_UID_FETCH(self, tag, args):
+        spec, _, items = args.partition(b" ")
+        items = _ITEM.findall(items.strip()[1:-1] if items.strip().startswith(b"(") else items)
+        box = self.server.mailbox
+        with box.lock:
+            selected = box.uid_set(spec.decode())
+            sequence = {m[0]: seq for seq, m in enumerate(box.messages, start=1)}
+        for uid, flags, raw in selected:
+            self.server.fetched.append((uid, [item.decode() for item in items]))
+            parts = [f"UID {uid}".encode()]
+            message = email.message_from_bytes(raw)
+            for item in items:
+                upper = item.upper()
+                if upper == b"UID":
+                    continue
+                if upper == b"FLAGS":
+                    parts.append(f"FLAGS ({' '.join(sorted(flags))})".encode())
+                elif upper == b"BODYSTRUCTURE":
+                    parts.append(b"BODYSTRUCTURE " + bodystructure(message).encode())
+                elif upper == b"RFC822.SIZE":
+                    parts.append(f"RFC822.SIZE {len(raw)}".encode())
+                elif upper.startswith(b"BODY"):
+                    section, origin, length = _SECTION.match(item).groups()
+                    data = self.section_data(message, raw, section.decode())
+                    name = b"BODY[" + section + b"]"
+                    if origin is not None:
+                        data = data[int(origin):int(origin) + int(length)]
+                        name += b"<" + origin + b">"
+                    parts.append(name + b" {" + str(len(data)).encode() + b"}\r\n" + data)
+                    if not upper.startswith(b"BODY.PEEK"):
+                        flags.add("\\Seen")
+            self.send(f"* {sequence[uid]} FETCH (".encode() + b" ".join(parts) + b")\r\n")
+        self.send(tag + b" OK FETCH completed\r\n")
+
+    def section_data(self, message, raw, section):
+        header_end = raw.find(CRLF + CRLF) + 4
+        upper = section.upper()
+        if upper == "":
+            return raw
+        if upper == "HEADER":
+            return raw[:header_end]
+        if upper == "TEXT":
+            return raw[header_end:]
+        if upper.startswith("HEADER.FIELDS"):
+            wanted = set(upper[upper.index("(") + 1:upper.index(")")].split())
+            lines = [f"{k}: {v}" for k, v in message.items() if k.upper() in wanted]
+            return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", "surrogateescape")
+        part = _part(message, section)
+        if part is None:
+            return b""
+        if part.is_multipart():
+            return part.as_bytes().split(b"\n\n", 1)[-1].replace(b"\n", CRLF)
+        return _raw_payload(part).replace(CRLF, b"\n").replace(b"\n", CRLF)
+
+    def do_IDLE(self, tag, args):
+        box = self.server.mailbox
+        with box.lock:
+            known = len(box.messages)
+        self.send(b"+ idling\r\n")
+        self.server.idling.set()
+        try:
+            while True:
+                with box.lock:
+                    box.changed.wait(0.05)
+                    count = len(box.messages)
+                if count != known:
+                    known = count
+                    self.send(f"* {count} EXISTS\r\n")
+                if not select.select([self.connection], [], [], 0)[0]:
+                    continue
+                line = self.rfile.readline()
+                if not line:
+                    return False
+                if line.strip().upper() == b"DONE":
+                    break
+        except OSError:
+            return False
+        finally:
+            self.server.idling.clear()
+        self.send(tag + b" OK IDLE terminated\r\n")
+
+
+class FakeIMAPServer(socketserver.ThreadingTCPServer):
+    """
+    with FakeIMAPServer() as server:
+        server.mailbox.append(raw_bytes)
+        imaplib.IMAP4("127.0.0.1", server.port)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, user="office@autodaune.ro", password="secret", uidvalidity=1):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.user = user
+        self.password = password
+        self.mailbox = Mailbox(uidvalidity)
+        self.connections = []
+        self.commands = []
+        self.fetched = []
+        self.logins = 0
+        self.idling = threading.Event()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def drop_connections(self):
+        """Închide brusc toate conexiunile (server repornit / rețea căzută)."""
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.shutdown()
+        self.drop_connections()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
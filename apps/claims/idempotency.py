@@ -0,0 +1,95 @@
+"""
+Idempotență pentru analyze_document_task.
+
+Un worker oprit după apelul OpenAI dar înainte de doc.save(), sau un mesaj re-livrat de
+Redis, rulează task-ul încă o dată. Fiecare (document, SHA-256 fișier) are un AnalysisRun:
+
+    CLAIMED -> RUNNING -> (rezultat salvat) -> DONE
+                   \\-> FAILED (RateLimited / eroare) -> poate fi preluat din nou
+
+- DONE: invocarea duplicată iese imediat (fără apel la model, fără mesaje către client).
+- CLAIMED/RUNNING cu lease valid: alt worker lucrează pe document, ieșim.
+- Lease expirat sau FAILED: preluăm rularea; dacă rezultatul modelului e deja salvat, îl refolosim.
+"""
+import datetime
+import hashlib
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AnalysisRun
+
+logger = logging.getLogger(__name__)
+
+# Decizii întoarse de claim_run
+PROCEED = "proceed"
+ALREADY_DONE = "done"
+IN_PROGRESS = "in_progress"
+
+
+def content_fingerprint(doc):
+    """SHA-256 al fișierului; "" dacă fișierul nu poate fi citit (cheia rămâne doar documentul)."""
+    digest = hashlib.sha256()
+    try:
+        with doc.file.open("rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Nu pot calcula hash-ul pentru doc #{doc.id}: {e}")
+        return ""
+    return digest.hexdigest()
+
+
+def claim_run(doc, task_id=None):
+    """Întoarce (decizie, AnalysisRun). Doar la PROCEED apelantul are voie să analizeze."""
+    fingerprint = content_fingerprint(doc)
+    lease = datetime.timedelta(seconds=getattr(settings, "ANALYSIS_LEASE_SECONDS", 600))
+
+    with transaction.atomic():
+        run, created = AnalysisRun.objects.select_for_update().get_or_create(
+            document=doc, content_hash=fingerprint, defaults={"task_id": task_id}
+        )
+        if created:
+            return PROCEED, run
+        if run.state == AnalysisRun.State.DONE:
+            return ALREADY_DONE, run
+        active = run.state in (AnalysisRun.State.CLAIMED, AnalysisRun.State.RUNNING)
+        if active and run.updated_at > timezone.now() - lease:
+            return IN_PROGRESS, run
+
+        # FAILED sau worker dispărut (lease expirat): preluăm rularea
+        run.state = AnalysisRun.State.CLAIMED
+        run.task_id = task_id
+        run.attempts += 1
+        run.save(update_fields=["state", "task_id", "attempts", "updated_at"])
+        return PROCEED, run
+
+
+def _set_state(run, state, **fields):
+    for name, value in fields.items():
+        setattr(run, name, value)
+    run.state = state
+    run.save(update_fields=["state", "updated_at"] + list(fields))
+
+
+def mark_running(run):
+    _set_state(run, AnalysisRun.State.RUNNING)
+
+
+def store_result(run, result):
+    """Salvat imediat după apelul la model: o re-livrare nu mai plătește încă un apel."""
+    _set_state(run, AnalysisRun.State.RUNNING, result=result)
+
+
+def mark_done(run):
+    _set_state(run, AnalysisRun.State.DONE)
+
+
+def release(run):
+    """Eroare / RateLimited: rularea poate fi preluată de retry (rezultatul salvat rămâne)."""
+    try:
+        _set_state(run, AnalysisRun.State.FAILED)
+    except Exception as e:
+        logger.warning(f"Nu pot elibera rularea #{run.id}: {e}")
@@ -0,0 +1,147 @@
+import base64
+import io
+import math
+import logging
+import fitz  # PyMuPDF
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Profile de upload către modelul vision, per tip de document.
+# gpt-4o (detail=high) redimensionează oricum imaginea la max 2048px pe latura lungă
+# și apoi la 768px pe latura scurtă, deci tot ce trimitem peste 2048px e trafic pierdut.
+# Calitatea JPEG e mai mare unde avem text scris de mână / numere de înmatriculare.
+UPLOAD_PROFILES = {
+    "DEFAULT": {"max_edge": 2048, "quality": 85},
+    "AMIABILA": {"max_edge": 2048, "quality": 88},
+    "PV_POLITIE": {"max_edge": 2048, "quality": 85},
+    "CIV": {"max_edge": 2048, "quality": 85},
+    "TALON": {"max_edge": 1800, "quality": 85},
+    "RCA_PAGUBIT": {"max_edge": 1800, "quality": 82},
+    "EXTRAS": {"max_edge": 1800, "quality": 80},
+    "CI": {"max_edge": 1600, "quality": 82},
+    "FOTO_AUTO": {"max_edge": 1024, "quality": 70},
+}
+
+# Zoom maxim la randarea paginilor PDF (3x ~ 216 DPI); paginile mici nu se măresc peste asta
+PDF_MAX_ZOOM = 3.0
+PDF_JPEG_QUALITY = 90
+
+# Cât de mult sub max_edge poate coborî decodarea redusă JPEG (vezi apply_draft)
+DRAFT_TOLERANCE = 0.85
+
+
+def upload_profile(doc_type=None):
+    """Returnează profilul (max_edge, quality) pentru un tip_document (sau DEFAULT)."""
+    if doc_type:
+        doc_type = doc_type.upper()
+        for key, profile in UPLOAD_PROFILES.items():
+            if key != "DEFAULT" and key in doc_type:
+                return profile
+    return UPLOAD_PROFILES["DEFAULT"]
+
+
+def _target_size(size, max_edge):
+    width, height = size
+    longest = max(width, height)
+    if not max_edge or longest <= max_edge:
+        return width, height
+    scale = max_edge / float(longest)
+    return max(1, int(math.ceil(width * scale))), max(1, int(math.ceil(height * scale)))
+
+
+def apply_draft(img, max_edge):
+    """
+    Pentru JPEG-uri, cere decoderului o versiune redusă (1/2, 1/4, 1/8) direct din DCT.
+    Decodarea unei poze de 12MP la 1/4 e de câteva ori mai rapidă și ocupă mult mai puțină memorie.
+    Trebuie apelat ÎNAINTE de orice operație care încarcă pixelii.
+    """
+    if getattr(img, "format", None) != "JPEG" or not max_edge:
+        return img
+    # draft() garantează o dimensiune >= cea cerută și lucrează doar cu factori 1/2, 1/4, 1/8.
+    # Acceptăm o latură cu până la 15% sub max_edge ca să nu pierdem un nivel de reducere
+    # (ex: 4000px -> 2000px în loc de decodare completă pentru max_edge=2048).
+    target = _target_size(img.size, int(max_edge * DRAFT_TOLERANCE))
+    if target != tuple(img.size):
+        img.draft("RGB", target)
+    return img
+
+
+def fit_within(img, max_edge):
+    """Micșorează imaginea astfel încât latura lungă să fie <= max_edge (nu mărește niciodată)."""
+    target = _target_size(img.size, max_edge)
+    if target == tuple(img.size):
+        return img
+    return img.resize(target, Image.Resampling.LANCZOS)
+
+
+def encode_jpeg(img, quality):
+    buffered = io.BytesIO()
+    img.save(buffered, format="JPEG", quality=quality, optimize=True)
+    return buffered.getvalue()
+
+
+def to_base64(data):
+    return base64.b64encode(data).decode("utf-8")
+
+
+def payload_stats(bytes_in, payloads):
+    """Raport octeți înainte/după preprocesare (după = suma JPEG-urilor trimise)."""
+    bytes_out = sum(len(p) for p in payloads)
+    return {
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "ratio": round(bytes_in / bytes_out, 2) if bytes_out else None,
+    }
+
+
+def pdf_zoom(page_rect, max_edge):
+    """DPI adaptiv: latura lungă a paginii randate ajunge la max_edge (plafonat la PDF_MAX_ZOOM)."""
+    longest = max(page_rect.width, page_rect.height)
+    if not max_edge or not longest:
+        return 2.0
+    return min(PDF_MAX_ZOOM, max_edge / float(longest))
+
+
+def iter_pdf_pages(pdf_bytes, max_edge, max_pages=None, quality=PDF_JPEG_QUALITY):
+    """
+    Generator leneș: randează câte o pagină, direct în JPEG, la DPI adaptiv.
+    În memorie există cel mult un pixmap o dată, indiferent de numărul de pagini.
+    Consumatorul se poate opri oricând (ex: câmpurile obligatorii sunt complete).
+    """
+    doc = fitz.open("pdf", pdf_bytes)
+    try:
+        if doc.page_count == 0:
+            raise Exception("PDF gol (0 pagini).")
+        page_count = doc.page_count if not max_pages else min(doc.page_count, max_pages)
+        for index in range(page_count):
+            page = doc.load_page(index)
+            zoom = pdf_zoom(page.rect, max_edge)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB, alpha=False)
+            data = pix.tobytes("jpeg", jpg_quality=quality)
+            pix = None
+            page = None
+            yield data
+    finally:
+        doc.close()
+
+
+def dhash(img, hash_size=8):
+    """
+    Difference hash (dHash) pe 64 de biți, ca hex de 16 caractere.
+    Imaginea e redusă la (hash_size+1) x hash_size în tonuri de gri și fiecare bit spune
+    dacă un pixel e mai luminos decât vecinul din dreapta. Rezistă la recomprimare JPEG,
+    redimensionare și mici diferențe de luminozitate (ex: aceeași poză retrimisă pe WhatsApp).
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | int(pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
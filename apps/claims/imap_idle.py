@@ -0,0 +1,181 @@
+"""
+Listener IMAP IDLE (RFC 2177): reply-urile asiguratorilor sunt procesate la câteva secunde
+după sosire, nu abia la următoarea rulare a check_email_replies_task.
+
+Un singur proces (`python manage.py imap_idle`) ține o conexiune autentificată, cu cutia
+selectată, și stă în IDLE. Când serverul anunță `* N EXISTS`, iese din IDLE și rulează
+inbound.poll pe aceeași conexiune (aceeași livrare ca task-ul: handle_insurer_reply), apoi
+reintră în IDLE. Nu se mai plătește TLS + LOGIN + SELECT la fiecare verificare.
+
+IDLE e reînnoit la IMAP_IDLE_REFRESH secunde (serverele închid IDLE-ul după ~30 min).
+Conexiunea căzută e refăcută cu backoff exponențial (IMAP_RECONNECT_BACKOFF .. IMAP_RECONNECT_MAX),
+iar după reconectare poll-ul recuperează tot ce a sosit între timp (checkpoint-ul UID).
+Cât timp listener-ul e activ, reîmprospătează în cache un heartbeat scurt (IMAP_IDLE_HEARTBEAT_TTL);
+check_email_replies_task (programat de beat) îl vede și nu mai citește în paralel aceeași cutie.
+Dacă procesul cade (inclusiv SIGKILL / OOM), heartbeat-ul expiră în câteva secunde și task-ul preia.
+"""
+import imaplib
+import itertools
+import logging
+import re
+import select
+import ssl
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from . import inbound
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_KEY = "imap_idle:heartbeat"
+# Cât de des verificăm cererea de oprire în timp ce așteptăm în IDLE
+STOP_CHECK_SECONDS = 1.0
+
+_NEW_MAIL = re.compile(rb"^\* \d+ (EXISTS|RECENT)\b", re.IGNORECASE)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def listener_alive():
+    try:
+        return bool(cache.get(HEARTBEAT_KEY))
+    except Exception:
+        return False
+
+
+def _heartbeat():
+    try:
+        cache.set(HEARTBEAT_KEY, 1, timeout=int(_setting("IMAP_IDLE_HEARTBEAT_TTL", 30)))
+    except Exception as e:
+        logger.warning(f"IMAP IDLE: heartbeat indisponibil ({e})")
+
+
+def _readable(imap, timeout):
+    """Are serverul ceva de spus în `timeout` secunde? (buffer-ul imaplib întâi, apoi socket-ul)"""
+    sock = imap.sock
+    sock.setblocking(False)
+    try:
+        if imap.file.peek(1):
+            return True
+    except (BlockingIOError, ssl.SSLWantReadError):
+        pass
+    finally:
+        sock.setblocking(True)
+    return bool(select.select([sock], [], [], timeout)[0])
+
+
+def _readline(imap):
+    line = imap.readline()
+    if not line:
+        raise imaplib.IMAP4.abort("IMAP IDLE: conexiune închisă de server")
+    if line.startswith(b"* BYE"):
+        raise imaplib.IMAP4.abort(f"IMAP IDLE: {line.strip()!r}")
+    return line
+
+
+class IdleListener:
+    """
+    listener = IdleListener(deliver)   # deliver(case, envelope), ca la inbound.poll
+    listener.run()                     # până la listener.stop()
+    """
+
+    def __init__(self, deliver, mailbox=None):
+        self.deliver = deliver
+        self.mailbox = mailbox or _setting("IMAP_MAILBOX", "INBOX")
+        self.refresh = float(_setting("IMAP_IDLE_REFRESH", 1500))
+        self.backoff = float(_setting("IMAP_RECONNECT_BACKOFF", 1))
+        self.backoff_max = float(_setting("IMAP_RECONNECT_MAX", 300))
+        self._stop = threading.Event()
+        self._tags = itertools.count(1)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        failures = 0
+        while not self._stop.is_set():
+            imap = None
+            try:
+                imap = inbound.connect()
+                self.sync(imap)
+                failures = 0
+                supports_idle = "IDLE" in imap.capabilities
+                if not supports_idle:
+                    logger.warning("IMAP IDLE: serverul nu suportă IDLE, verificăm periodic pe aceeași conexiune")
+                while not self._stop.is_set():
+                    if self.idle(imap) if supports_idle else self._noop_wait(imap):
+                        self.sync(imap)
+            except Exception as e:
+                # Rețea, server IMAP sau baza de date: procesul nu moare, reia cu backoff
+                failures += 1
+                delay = min(self.backoff_max, self.backoff * 2 ** (failures - 1))
+                logger.warning(f"IMAP IDLE: conexiune pierdută ({e}), reconectare în {delay:.1f}s")
+                self._stop.wait(delay)
+            finally:
+                if imap is not None:
+                    try:
+                        imap.logout()
+                    except Exception:
+                        pass
+        try:
+            cache.delete(HEARTBEAT_KEY)
+        except Exception:
+            pass
+
+    def sync(self, imap):
+        """Mesajele noi de la checkpoint încoace (inbound.poll pe conexiunea deja deschisă)."""
+        _heartbeat()
+        close_old_connections()
+        stats = inbound.poll(imap, self._deliver, mailbox=self.mailbox)
+        if stats["new"]:
+            logger.info(f"IMAP IDLE: mesaje noi {stats['new']}, asociate unui dosar: {stats['matched']}")
+        return stats
+
+    def _deliver(self, case, envelope):
+        # Un mesaj cu atașamente mari poate dura: heartbeat-ul nu expiră în mijlocul sincronizării
+        _heartbeat()
+        self.deliver(case, envelope)
+
+    def idle(self, imap):
+        """Un ciclu IDLE (până la mesaj nou, reînnoire sau oprire); True dacă au sosit mesaje."""
+        _heartbeat()
+        tag = f"IDLE{next(self._tags)}".encode()
+        imap.send(tag + b" IDLE\r\n")
+        line = _readline(imap)
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE refuzat: {line.strip()!r}")
+
+        new_mail = False
+        waited = 0.0
+        while not new_mail and waited < self.refresh and not self._stop.is_set():
+            _heartbeat()
+            timeout = min(STOP_CHECK_SECONDS, self.refresh - waited)
+            if _readable(imap, timeout):
+                new_mail = bool(_NEW_MAIL.match(_readline(imap)))
+            else:
+                waited += timeout
+
+        imap.send(b"DONE\r\n")
+        while True:
+            line = _readline(imap)
+            if line.startswith(tag + b" "):
+                if not line[len(tag) + 1:].upper().startswith(b"OK"):
+                    raise imaplib.IMAP4.error(f"IDLE: {line.strip()!r}")
+                return new_mail
+            new_mail = new_mail or bool(_NEW_MAIL.match(line))
+
+    def _noop_wait(self, imap):
+        """Fără IDLE: NOOP la IMAP_IDLE_POLL_INTERVAL secunde (tot fără reconectare)."""
+        interval = float(_setting("IMAP_IDLE_POLL_INTERVAL", 30))
+        waited = 0.0
+        while waited < interval and not self._stop.is_set():
+            _heartbeat()
+            self._stop.wait(min(STOP_CHECK_SECONDS, interval - waited))
+            waited += STOP_CHECK_SECONDS
+        imap.noop()
+        return not self._stop.is_set()
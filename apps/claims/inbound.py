@@ -0,0 +1,502 @@
+"""
+Citirea reply-urilor de la asiguratori din IMAP, incrementală după UID.
+
+Înainte, fiecare rulare căuta (UNSEEN) și descărca RFC822 complet (cu atașamente) pentru
+fiecare mesaj, chiar și pentru cele care nu țin de niciun dosar. Acum:
+- MailboxState ține (UIDVALIDITY, ultimul UID procesat): o rulare cere doar UID-urile noi;
+- prima trecere aduce doar câteva headere și BODYSTRUCTURE (câteva sute de octeți/mesaj);
+- un reply care citează (In-Reply-To / References) un Message-ID trimis sau primit pentru
+  un dosar (EmailThreadRef) e asociat printr-o singură căutare indexată;
+- altfel, dacă nici subiectul nu identifică dosarul, se descarcă doar partea text/plain, pentru
+  strategiile pe text (nr. dosar asigurator, CNP, număr auto, nume - apps/claims/case_index.py);
+- textul și atașamentele sunt descărcate (pe secțiuni) doar pentru mesajele asociate unui dosar;
+  atașamentele vin în bucăți (BODY.PEEK[secțiune]<start.lungime>), decodate pe loc într-un
+  fișier temporar: în memorie rămân cel mult IMAP_ATTACHMENT_MEMORY_MB per mesaj + o bucată.
+
+Traficul și durata unei rulări depind de mailul nou relevant, nu de mărimea inboxului.
+Mesajele sunt citite cu BODY.PEEK (nu schimbă \\Seen); cele asociate unui dosar sunt
+marcate citite după procesare.
+"""
+import base64
+import binascii
+import email
+import imaplib
+import itertools
+import logging
+import quopri
+import re
+import tempfile
+from email.header import decode_header, make_header
+
+from django.conf import settings
+
+from . import case_index
+from .models import Case, Client, EmailThreadRef, MailboxState
+
+logger = logging.getLogger(__name__)
+
+HEADER_FIELDS = ("SUBJECT", "FROM", "DATE", "MESSAGE-ID", "IN-REPLY-TO", "REFERENCES")
+ENVELOPE_ITEMS = f"(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({' '.join(HEADER_FIELDS)})])"
+
+_TOKEN = re.compile(
+    rb'\s*(?:(?P<open>\()|(?P<close>\))|"(?P<string>(?:[^"\\]|\\.)*)"'
+    rb"|\{(?P<literal>\d+)\}$|(?P<atom>[^\s()\"\[]+(?:\[[^\]]*\](?:<\d+>)?)?))"
+)
+_ESCAPE = re.compile(rb"\\(.)")
+_BASE64_NOISE = re.compile(rb"[^A-Za-z0-9+/=]")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# --- Conexiune ---
+def connect():
+    """Conexiune autentificată la IMAP_HOST (TLS implicit)."""
+    host, port = _setting("IMAP_HOST", "imap.gmail.com"), _setting("IMAP_PORT", 993)
+    imap = imaplib.IMAP4_SSL(host, port) if _setting("IMAP_USE_SSL", True) else imaplib.IMAP4(host, port)
+    imap.login(_setting("IMAP_USER", ""), _setting("IMAP_PASSWORD", ""))
+    return imap
+
+
+def mailbox_key(mailbox):
+    return f"{_setting('IMAP_USER', '')}@{_setting('IMAP_HOST', '')}/{mailbox}"
+
+
+def select(imap, mailbox):
+    """SELECT; întoarce (UIDVALIDITY, UIDNEXT) din răspunsul serverului."""
+    status, data = imap.select(mailbox)
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"SELECT {mailbox}: {data}")
+    uidvalidity = imap.response("UIDVALIDITY")[1][0]
+    uidnext = imap.response("UIDNEXT")[1][0]
+    if uidvalidity is None:
+        _, data = imap.status(mailbox, "(UIDVALIDITY UIDNEXT)")
+        found = dict(re.findall(rb"(UIDVALIDITY|UIDNEXT) (\d+)", data[0]))
+        uidvalidity, uidnext = found.get(b"UIDVALIDITY"), found.get(b"UIDNEXT")
+    return int(uidvalidity), int(uidnext) if uidnext else None
+
+
+# --- Parsarea răspunsurilor FETCH ---
+def _tokens(data):
+    tokens = []
+    for piece in data:
+        if piece is None:
+            continue
+        text, literal = piece if isinstance(piece, tuple) else (piece, None)
+        position = 0
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if not match or match.end() == position:
+                break
+            position = match.end()
+            kind = match.lastgroup
+            if kind == "literal":
+                tokens.append(("value", literal))
+            elif kind == "string":
+                tokens.append(("value", _ESCAPE.sub(rb"\1", match.group("string"))))
+            elif kind == "atom":
+                atom = match.group("atom")
+                tokens.append(("value", None if atom.upper() == b"NIL" else atom))
+            else:
+                tokens.append((kind, None))
+    return tokens
+
+
+def _parse(tokens, index):
+    kind, value = tokens[index]
+    if kind != "open":
+        return value, index + 1
+    items, index = [], index + 1
+    while tokens[index][0] != "close":
+        item, index = _parse(tokens, index)
+        items.append(item)
+    return items, index + 1
+
+
+def parse_fetch(data):
+    """
+    Răspunsul imaplib pentru (UID) FETCH -> listă de dicționare {ITEM: valoare}, ex.
+    {"UID": b"12", "BODYSTRUCTURE": [...], "BODY[HEADER.FIELDS (SUBJECT)]": b"Subject: ..."}.
+    """
+    tokens, index, messages = _tokens(data), 0, []
+    while index < len(tokens):
+        index += 1  # numărul de secvență
+        if index >= len(tokens) or tokens[index][0] != "open":
+            continue
+        items, index = _parse(tokens, index)
+        fields = {}
+        for key, value in zip(items[::2], items[1::2]):
+            fields[key.decode().upper()] = value
+        messages.append(fields)
+    return messages
+
+
+def _body(fields, section):
+    """Valoarea BODY[section] (serverele pot ecoua diferit lista HEADER.FIELDS)."""
+    prefix = f"BODY[{section}".upper()
+    for key, value in fields.items():
+        if key == f"{prefix}]" or (section.upper().startswith("HEADER.FIELDS") and key.startswith(prefix)):
+            return value or b""
+    return b""
+
+
+def _text(value):
+    return value.decode("utf-8", "replace") if isinstance(value, bytes) else (value or "")
+
+
+def _pairs(values):
+    values = values or []
+    return {_text(k).lower(): _text(v) for k, v in zip(values[::2], values[1::2])}
+
+
+def decode_words(value):
+    """Header RFC 2047 (=?utf-8?B?...?=) -> text."""
+    if not value:
+        return ""
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+
+def body_parts(structure, prefix=""):
+    """
+    Părțile-frunză din BODYSTRUCTURE: secțiunea IMAP ("1", "2.1"), tipul, charset-ul,
+    encoding-ul, mărimea și numele fișierului (pentru atașamente).
+    """
+    if structure and isinstance(structure[0], list):
+        parts = []
+        # Copiii sunt listele de la început; după ei vin subtipul și extensiile (tot liste)
+        for index, child in enumerate(itertools.takewhile(lambda c: isinstance(c, list), structure)):
+            parts += body_parts(child, f"{prefix}{index + 1}.")
+        return parts
+
+    content_type = f"{_text(structure[0])}/{_text(structure[1])}".lower()
+    params = _pairs(structure[2])
+    # Extensiile (MD5, Content-Disposition) vin după câmpurile specifice tipului
+    if content_type.startswith("text/"):
+        disposition_index = 9
+    elif content_type == "message/rfc822":
+        disposition_index = 11
+    else:
+        disposition_index = 8
+    disposition = structure[disposition_index] if len(structure) > disposition_index else None
+    disposition_params = _pairs(disposition[1]) if isinstance(disposition, list) and len(disposition) > 1 else {}
+    filename = decode_words(disposition_params.get("filename") or params.get("name"))
+    return [
+        {
+            "section": prefix.rstrip(".") or "1",
+            "type": content_type,
+            "charset": params.get("charset") or "utf-8",
+            "encoding": _text(structure[5]).lower() or "7bit",
+            "size": int(structure[6] or 0),
+            "filename": filename,
+            "disposition": _text(disposition[0]).lower() if isinstance(disposition, list) else "",
+        }
+    ]
+
+
+def text_part(parts):
+    """Partea text/plain a mesajului (sau unica parte text a unui mesaj simplu)."""
+    for part in parts:
+        if part["type"] == "text/plain" and not part["filename"] and part["disposition"] != "attachment":
+            return part
+    if len(parts) == 1 and parts[0]["type"].startswith("text/"):
+        return parts[0]
+    return None
+
+
+def attachment_parts(parts):
+    return [part for part in parts if part["filename"]]
+
+
+def decode_transfer(data, encoding):
+    if encoding == "base64":
+        try:
+            return base64.b64decode(data)
+        except (binascii.Error, ValueError):
+            return binascii.a2b_base64(_BASE64_NOISE.sub(b"", data) + b"==")
+    if encoding == "quoted-printable":
+        return quopri.decodestring(data)
+    return data
+
+
+class TransferDecoder:
+    """Decodare incrementală (base64 / quoted-printable): bucățile pot tăia oriunde."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.pending = b""
+
+    def feed(self, data):
+        if self.encoding == "base64":
+            data = self.pending + _BASE64_NOISE.sub(b"", data)
+            usable = len(data) - len(data) % 4
+            self.pending = data[usable:]
+            return decode_transfer(data[:usable], "base64")
+        if self.encoding == "quoted-printable":
+            # Doar linii complete: un "=XX" sau o întrerupere soft nu e tăiat la mijloc
+            data = self.pending + data
+            cut = data.rfind(b"\n") + 1
+            self.pending = data[cut:]
+            return quopri.decodestring(data[:cut])
+        return data
+
+    def flush(self):
+        data, self.pending = self.pending, b""
+        if not data:
+            return b""
+        if self.encoding == "base64":
+            return decode_transfer(data + b"=" * (-len(data) % 4), "base64")
+        return decode_transfer(data, self.encoding)
+
+
+def decode_text(data, part):
+    payload = decode_transfer(data, part["encoding"])
+    try:
+        return payload.decode(part["charset"], errors="ignore")
+    except LookupError:
+        return payload.decode("utf-8", errors="ignore")
+
+
+# --- Descărcare ---
+def search(imap, criteria):
+    status, data = imap.uid("SEARCH", None, criteria)
+    if status != "OK" or not data or not data[0]:
+        return []
+    return sorted(int(uid) for uid in data[0].split())
+
+
+def fetch_envelopes(imap, uids):
+    """Headerele de identificare + BODYSTRUCTURE pentru UID-urile date (loturi de IMAP_FETCH_BATCH)."""
+    batch_size = _setting("IMAP_FETCH_BATCH", 200)
+    envelopes = []
+    for start in range(0, len(uids), batch_size):
+        chunk = ",".join(str(uid) for uid in uids[start:start + batch_size])
+        status, data = imap.uid("FETCH", chunk, ENVELOPE_ITEMS)
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"UID FETCH: {data}")
+        for fields in parse_fetch(data):
+            if "UID" not in fields:
+                continue
+            headers = email.message_from_bytes(_body(fields, "HEADER.FIELDS"))
+            envelopes.append(
+                {
+                    "uid": int(fields["UID"]),
+                    "subject": decode_words(headers.get("Subject")),
+                    "sender": decode_words(headers.get("From")),
+                    "message_id": (headers.get("Message-ID") or "").strip(),
+                    "in_reply_to": (headers.get("In-Reply-To") or "").strip(),
+                    "references": (headers.get("References") or "").strip(),
+                    "parts": body_parts(fields.get("BODYSTRUCTURE") or []),
+                }
+            )
+    return sorted(envelopes, key=lambda e: e["uid"])
+
+
+def fetch_sections(imap, uid, sections):
+    """Conținutul (încă codat) al secțiunilor cerute, într-un singur UID FETCH."""
+    if not sections:
+        return {}
+    items = "(" + " ".join(f"BODY.PEEK[{section}]" for section in sections) + ")"
+    status, data = imap.uid("FETCH", str(uid), items)
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID FETCH {uid}: {data}")
+    fields = next((f for f in parse_fetch(data) if f.get("UID") == str(uid).encode()), {})
+    return {section: _body(fields, section) for section in sections}
+
+
+def fetch_text(imap, envelope):
+    """Doar corpul text (câțiva KB), fără atașamente; păstrat pe envelope."""
+    if "body" not in envelope:
+        part = text_part(envelope["parts"])
+        if part is None:
+            envelope["body"] = ""
+        else:
+            data = fetch_sections(imap, envelope["uid"], [part["section"]])[part["section"]]
+            envelope["body"] = decode_text(data, part)
+    return envelope["body"]
+
+
+def fetch_range(imap, uid, section, origin, length):
+    """Octeții [origin, origin + length) din secțiune, încă codați (gol după sfârșitul ei)."""
+    status, data = imap.uid("FETCH", str(uid), f"(BODY.PEEK[{section}]<{origin}.{length}>)")
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID FETCH {uid}: {data}")
+    fields = next((f for f in parse_fetch(data) if f.get("UID") == str(uid).encode()), {})
+    prefix = f"BODY[{section}]".upper()
+    return next((value or b"" for key, value in fields.items() if key.startswith(prefix)), b"")
+
+
+def _spool(memory_budget):
+    # Sub buget în memorie (trecut pe disc la depășire), altfel direct pe disc
+    directory = _setting("FILE_UPLOAD_TEMP_DIR", None)
+    if memory_budget > 0:
+        return tempfile.SpooledTemporaryFile(max_size=memory_budget, dir=directory)
+    return tempfile.TemporaryFile(dir=directory)
+
+
+def fetch_attachments(imap, envelope):
+    """
+    [{"filename", "file", "size"}] pentru atașamentele mesajului (descărcate doar acum).
+    `file` e un fișier temporar, poziționat la final; cine îl primește îl închide.
+    """
+    chunk = _setting("IMAP_FETCH_CHUNK_KB", 1024) * 1024
+    budget = _setting("IMAP_ATTACHMENT_MEMORY_MB", 8) * 1024 * 1024
+    attachments = []
+    try:
+        for part in attachment_parts(envelope["parts"]):
+            spool, decoder, size, origin = _spool(budget), TransferDecoder(part["encoding"]), 0, 0
+            attachments.append({"filename": part["filename"], "file": spool, "size": 0})
+            while True:
+                data = fetch_range(imap, envelope["uid"], part["section"], origin, chunk)
+                size += spool.write(decoder.feed(data))
+                origin += len(data)
+                if len(data) < chunk:
+                    break
+            size += spool.write(decoder.flush())
+            attachments[-1]["size"] = size
+            budget -= size
+            if not size:
+                attachments.pop()["file"].close()
+    except Exception:
+        close_attachments(attachments)
+        raise
+    return attachments
+
+
+def close_attachments(attachments):
+    for attachment in attachments:
+        attachment["file"].close()
+
+
+# --- Asocierea cu un dosar ---
+_MESSAGE_ID = re.compile(r"<[^<>\s]+>")
+
+
+def thread_ids(envelope):
+    """Message-ID-urile citate: In-Reply-To, apoi References de la cel mai recent la cel mai vechi."""
+    ids = _MESSAGE_ID.findall(envelope.get("in_reply_to") or "")
+    ids += reversed(_MESSAGE_ID.findall(envelope.get("references") or ""))
+    return list(dict.fromkeys(ids))
+
+
+def match_by_thread(envelope):
+    """Dosarul celui mai recent Message-ID citat care ne aparține (o interogare pe index unic)."""
+    ids = thread_ids(envelope)
+    if not ids:
+        return None
+    refs = {ref.message_id: ref.case for ref in EmailThreadRef.objects.filter(message_id__in=ids).select_related("case")}
+    return next((refs[message_id] for message_id in ids if message_id in refs), None)
+
+
+def remember(envelope, case):
+    """Message-ID-ul reply-ului asociat: următorul mesaj din fir (chiar fără al nostru în References) îl găsește."""
+    message_id = envelope.get("message_id") or ""
+    if _MESSAGE_ID.fullmatch(message_id) and len(message_id) <= 255:
+        EmailThreadRef.objects.bulk_create(
+            [EmailThreadRef(message_id=message_id, case=case, direction=EmailThreadRef.Direction.IN)],
+            ignore_conflicts=True,
+        )
+
+
+def match_by_subject(subject):
+    """A) ID Dosar din subiect (Pattern: "Dosar [a-f0-9]{8}")."""
+    match = re.search(r"Dosar ([a-f0-9]{8})", subject, re.IGNORECASE)
+    if match:
+        case_id_prefix = match.group(1).lower()
+        return Case.objects.filter(id__startswith=case_id_prefix).order_by('-created_at').first()
+    return None
+
+
+def match_by_text(subject, body):
+    """
+    Strategiile pe text (prioritate: NrDosar -> CNP -> NrInmatriculare -> NumePăgubit).
+    Numerele de dosar, numerele auto și numele vin dintr-o singură trecere prin indexul
+    multi-pattern (apps/claims/case_index.py), nu dintr-o buclă peste toate dosarele.
+    """
+    full_text = f"{subject} {body}"
+    found = case_index.get_index().search(full_text)
+
+    # B) Număr Dosar Asigurator (dacă există)
+    case = Case.objects.filter(id__in=found[case_index.CLAIM]).order_by('-created_at').first()
+
+    # C) CNP Păgubit
+    if not case:
+        cnp_match = re.search(r"\b([1-9][0-9]{12})\b", full_text)
+        if cnp_match:
+            extracted_cnp = cnp_match.group(1)
+            case = Case.objects.filter(client__cnp=extracted_cnp).order_by('-created_at').first()
+
+    # D) Număr Înmatriculare Păgubit (cel mai nou dosar cu vehiculul păgubit respectiv)
+    if not case:
+        case = Case.objects.filter(id__in=found[case_index.PLATE]).order_by('-created_at').first()
+
+    # E) Nume și Prenume Păgubit (ambele, ca cuvinte întregi): cel mai nou client, cel mai nou dosar
+    if not case:
+        for client_id in Client.objects.filter(id__in=found["client"]).order_by('-created_at').values_list("id", flat=True):
+            case = Case.objects.filter(client_id=client_id).order_by('-created_at').first()
+            if case:
+                break
+
+    return case
+
+
+def match_case(imap, envelope):
+    """Dosarul mesajului: firul (headere), apoi subiectul; corpul text e descărcat doar dacă nu ajung."""
+    case = match_by_thread(envelope)
+    if case is None:
+        case = match_by_subject(envelope["subject"])
+    if case is None:
+        case = match_by_text(envelope["subject"], fetch_text(imap, envelope))
+    return case
+
+
+# --- Rularea ---
+def poll(imap, deliver, mailbox=None):
+    """
+    Procesează mesajele sosite după checkpoint. Pentru fiecare mesaj asociat unui dosar
+    apelează deliver(case, envelope), cu envelope["body"] și envelope["attachments"] completate.
+    Întoarce {"new": n, "matched": m}.
+    """
+    mailbox = mailbox or _setting("IMAP_MAILBOX", "INBOX")
+    uidvalidity, uidnext = select(imap, mailbox)
+    state, _ = MailboxState.objects.get_or_create(mailbox=mailbox_key(mailbox))
+
+    if state.uidvalidity != uidvalidity:
+        # Prima rulare sau cutie re-creată pe server: UID-urile vechi nu mai înseamnă nimic,
+        # preluăm mesajele necitite (ca înainte) și pornim checkpoint-ul de la zero
+        logger.info(f"IMAP {state.mailbox}: UIDVALIDITY {state.uidvalidity} -> {uidvalidity}, resincronizare")
+        state.uidvalidity, state.last_uid = uidvalidity, 0
+        uids = search(imap, "UNSEEN")
+    else:
+        # "n:*" întoarce mereu cel puțin ultimul mesaj, chiar dacă UID-ul lui e < n
+        uids = [uid for uid in search(imap, f"UID {state.last_uid + 1}:*") if uid > state.last_uid]
+
+    stats = {"new": len(uids), "matched": 0}
+    for envelope in fetch_envelopes(imap, uids):
+        try:
+            case = match_case(imap, envelope)
+            if case is None:
+                logger.info(f"Nu am putut asocia emailul '{envelope['subject']}' niciunui dosar existent. Ignorat.")
+            else:
+                fetch_text(imap, envelope)
+                envelope["attachments"] = fetch_attachments(imap, envelope)
+                try:
+                    deliver(case, envelope)
+                finally:
+                    close_attachments(envelope["attachments"])
+                remember(envelope, case)
+                imap.uid("STORE", str(envelope["uid"]), "+FLAGS", "(\\Seen)")
+                stats["matched"] += 1
+        except Exception as e:
+            logger.error(f"Eroare procesare email UID {envelope['uid']}: {e}")
+        # Un mesaj care eșuează nu e reluat la infinit (ca înainte, când FETCH RFC822 îl marca citit)
+        state.last_uid = max(state.last_uid, envelope["uid"])
+        state.save(update_fields=["uidvalidity", "last_uid", "updated_at"])
+
+    if uidnext:
+        state.last_uid = max(state.last_uid, uidnext - 1)
+    state.save(update_fields=["uidvalidity", "last_uid", "updated_at"])
+    return stats
@@ -0,0 +1,243 @@
+"""
+Outbox pentru emailurile trimise (asigurator, admin).
+
+Task-urile nu mai deschid câte o sesiune SMTP per mesaj: `enqueue` scrie un rând
+OutboundEmail (atașamentele doar ca referințe în storage) și, după commit, pornește
+drain_outbox_task. `drain` preia mesajele scadente în loturi (SELECT ... FOR UPDATE
+SKIP LOCKED, deci doi workeri nu iau același mesaj) și le trimite pe o singură
+conexiune SMTP autentificată, ținută deschisă cât durează golirea.
+
+Eșecurile sunt reluate cu backoff exponențial; după OUTBOX_MAX_ATTEMPTS mesajul rămâne
+FAILED (vizibil în admin). Un worker oprit în timpul trimiterii lasă rândul în SENDING,
+care redevine scadent după OUTBOX_SEND_LEASE_SECONDS.
+
+Atașamentele marcate "generated" (dosarul PDF la momentul enqueue, completări, părți) sunt
+create doar pentru emailuri: rămân în storage cât timp un email netrimis le referă și sunt
+șterse de release_generated după trimitere sau abandon.
+
+Pe backend-ul SMTP mesajul e scris direct pe socket (apps/claims/mime_stream.py):
+atașamentele sunt citite din storage în bucăți, fără copie și fără mesajul întreg în memorie.
+"""
+import datetime
+import logging
+import os
+import smtplib
+import time
+from email.utils import make_msgid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .mime_stream import StreamingMessage, send_streaming
+from .models import CaseDossier, EmailThreadRef, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Extensie -> tip MIME pentru documentele atașate (o singură sursă pentru toate emailurile)
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".mp4": "video/mp4",
+    ".mov": "video/quicktime",
+    ".avi": "video/x-msvideo",
+}
+
+
+def content_type_for(name):
+    return CONTENT_TYPES.get(os.path.splitext(name.lower())[1], "application/octet-stream")
+
+
+def attachment_ref(file_field, filename, content_type):
+    """Referință la un fișier din storage; conținutul e citit abia la trimitere."""
+    return {"path": file_field.name, "filename": filename, "content_type": content_type}
+
+
+def enqueue(*, kind, subject, body, to, cc=None, headers=None, attachments=(), case=None, from_email=None):
+    """Pune emailul în outbox și întoarce rândul creat (Message-ID e fixat de acum)."""
+    message_id = make_msgid(domain=_setting("OUTBOX_MESSAGE_ID_DOMAIN", None))
+    outbound = OutboundEmail.objects.create(
+        case=case,
+        kind=kind,
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+        cc=list(cc or []),
+        headers=dict(headers or {}),
+        attachments=list(attachments),
+        message_id=message_id,
+    )
+    if case is not None:
+        # Răspunsul asiguratorului (In-Reply-To / References) găsește dosarul după acest Message-ID
+        EmailThreadRef.objects.create(message_id=message_id, case=case, direction=EmailThreadRef.Direction.OUT)
+    transaction.on_commit(_schedule_drain)
+    return outbound
+
+
+def _schedule_drain():
+    from .tasks import drain_outbox_task
+
+    try:
+        drain_outbox_task.delay()
+    except Exception as e:
+        # Beat golește oricum outbox-ul periodic
+        logger.warning(f"Outbox: nu pot porni drain_outbox_task ({e})")
+
+
+def build_message(outbound, connection=None):
+    """EmailMessage Django cu atașamentele în memorie (backend-urile non-SMTP: locmem, consolă)."""
+    message = EmailMessage(
+        subject=outbound.subject,
+        body=outbound.body,
+        from_email=outbound.from_email,
+        to=outbound.to,
+        cc=outbound.cc,
+        headers={**outbound.headers, "Message-ID": outbound.message_id},
+        connection=connection,
+    )
+    for attachment in outbound.attachments:
+        try:
+            with default_storage.open(attachment["path"], "rb") as f:
+                message.attach(attachment["filename"], f.read(), attachment["content_type"])
+        except OSError as e:
+            logger.warning(f"Outbox #{outbound.id}: atașament lipsă {attachment['path']} ({e})")
+    return message
+
+
+def retry_delay(attempts):
+    base = _setting("OUTBOX_RETRY_BASE_SECONDS", 60)
+    return datetime.timedelta(seconds=min(base * 2 ** (attempts - 1), _setting("OUTBOX_RETRY_MAX_SECONDS", 3600)))
+
+
+def claim_batch(limit):
+    """Mesajele scadente, marcate SENDING cu un lease (alt worker nu le mai vede)."""
+    now = timezone.now()
+    lease = datetime.timedelta(seconds=_setting("OUTBOX_SEND_LEASE_SECONDS", 300))
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=[OutboundEmail.Status.PENDING, OutboundEmail.Status.SENDING],
+                next_attempt_at__lte=now,
+            )
+            .order_by("next_attempt_at")[:limit]
+        )
+        OutboundEmail.objects.filter(id__in=[o.id for o in batch]).update(
+            status=OutboundEmail.Status.SENDING, next_attempt_at=now + lease
+        )
+    return batch
+
+
+def paths_in_use(case_id, exclude=None):
+    """Fișierele generate referite de emailurile încă netrimise ale dosarului."""
+    unsent = OutboundEmail.objects.filter(
+        case_id=case_id, status__in=[OutboundEmail.Status.PENDING, OutboundEmail.Status.SENDING]
+    )
+    if exclude is not None:
+        unsent = unsent.exclude(id=exclude)
+    return {
+        attachment["path"]
+        for attachments in unsent.values_list("attachments", flat=True)
+        for attachment in attachments
+        if attachment.get("generated")
+    }
+
+
+def release_generated(outbound):
+    """Șterge fișierele generate ale emailului, dacă nu le mai referă alt email sau dosarul curent."""
+    paths = {attachment["path"] for attachment in outbound.attachments if attachment.get("generated")}
+    if not paths:
+        return
+    paths -= paths_in_use(outbound.case_id, exclude=outbound.id)
+    paths.discard(CaseDossier.objects.filter(case_id=outbound.case_id).values_list("file", flat=True).first())
+    for path in paths:
+        try:
+            default_storage.delete(path)
+        except OSError as e:
+            logger.warning(f"Outbox #{outbound.id}: nu pot șterge {path} ({e})")
+
+
+def _mark_sent(outbound, elapsed):
+    outbound.status = OutboundEmail.Status.SENT
+    outbound.attempts += 1
+    outbound.sent_at = timezone.now()
+    outbound.send_ms = int(elapsed * 1000)
+    outbound.last_error = ""
+    outbound.save(update_fields=["status", "attempts", "sent_at", "send_ms", "last_error"])
+    release_generated(outbound)
+
+
+def _mark_failed(outbound, error):
+    outbound.attempts += 1
+    outbound.last_error = str(error)[:2000]
+    if outbound.attempts >= _setting("OUTBOX_MAX_ATTEMPTS", 8):
+        outbound.status = OutboundEmail.Status.FAILED
+        logger.error(f"Outbox #{outbound.id} ({outbound.kind}) abandonat după {outbound.attempts} încercări: {error}")
+    else:
+        outbound.status = OutboundEmail.Status.PENDING
+        outbound.next_attempt_at = timezone.now() + retry_delay(outbound.attempts)
+    outbound.save(update_fields=["status", "attempts", "last_error", "next_attempt_at"])
+    if outbound.status == OutboundEmail.Status.FAILED:
+        release_generated(outbound)
+
+
+def send(connection, outbound):
+    """Pe SMTP: mesajul e scris în flux pe sesiunea deschisă; altfel prin backend-ul Django."""
+    smtp = getattr(connection, "connection", None)
+    if isinstance(smtp, smtplib.SMTP):
+        send_streaming(smtp, StreamingMessage(outbound))
+    else:
+        connection.send_messages([build_message(outbound, connection)])
+
+
+def drain(batch_size=None, max_batches=None):
+    """
+    Trimite mesajele scadente pe o singură conexiune SMTP. Întoarce {"sent": n, "failed": n}.
+    Dacă serverul nu acceptă conexiunea, lotul curent e re-programat și golirea se oprește.
+    """
+    batch_size = batch_size or _setting("OUTBOX_BATCH_SIZE", 50)
+    stats = {"sent": 0, "failed": 0}
+    connection = get_connection()
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            batch = claim_batch(batch_size)
+            if not batch:
+                break
+            batches += 1
+            for index, outbound in enumerate(batch):
+                try:
+                    connection.open()  # no-op dacă sesiunea e deja deschisă
+                except Exception as e:
+                    logger.warning(f"Outbox: conexiune SMTP eșuată ({e}), re-programez {len(batch) - index} mesaje")
+                    for pending in batch[index:]:
+                        _mark_failed(pending, e)
+                    stats["failed"] += len(batch) - index
+                    return stats
+
+                start = time.perf_counter()
+                try:
+                    send(connection, outbound)
+                except Exception as e:
+                    _mark_failed(outbound, e)
+                    stats["failed"] += 1
+                    # Sesiunea poate fi coruptă (ex: SMTPServerDisconnected): o redeschidem la următorul mesaj
+                    connection.close()
+                    continue
+                _mark_sent(outbound, time.perf_counter() - start)
+                stats["sent"] += 1
+    finally:
+        connection.close()
+    return stats
+
@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import resource
+import shutil
+import smtplib
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand
+
+from apps.claims.mailer import content_type_for
+from apps.claims.mime_stream import StreamingMessage, send_streaming
+from apps.claims.models import OutboundEmail
+
+
+class NullSMTP(smtplib.SMTP):
+    """Sesiune SMTP care acceptă tot și doar numără octeții primiți (fără rețea)."""
+
+    def __init__(self):
+        super().__init__()
+        self.received = 0
+        self._replies = []
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def mail(self, sender, options=()):
+        return 250, b"OK"
+
+    def rcpt(self, recip, options=()):
+        return 250, b"OK"
+
+    def putcmd(self, cmd, args=""):
+        self._replies.append((354, b"Go ahead"))
+
+    def send(self, s):
+        self.received += len(s)
+        if s.endswith(b".\r\n"):
+            self._replies.append((250, b"Queued"))
+
+    def getreply(self):
+        return self._replies.pop(0)
+
+
+def rss_mb():
+    # ru_maxrss e în KB pe Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def legacy_send(files):
+    """Calea veche: copie în director temporar, attach_file (tot fișierul în RAM), mesajul întreg ca bytes."""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        email = EmailMessage(subject="Avizare", body="corp", from_email="office@autodaune.ro", to=["daune@asigurator.test"])
+        for index, path in enumerate(files):
+            tmp_path = os.path.join(tmp_dir, f"doc_{index}{os.path.splitext(path)[1]}")
+            shutil.copy(path, tmp_path)
+            email.attach_file(tmp_path, content_type_for(path))
+        return len(email.message().as_bytes())  # ce primea smtplib.sendmail()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def streaming_send(root, files):
+    outbound = OutboundEmail(
+        subject="Avizare",
+        body="corp",
+        from_email="office@autodaune.ro",
+        to=["daune@asigurator.test"],
+        message_id="<bench@autodaune.ro>",
+        attachments=[
+            {"path": os.path.relpath(path, root), "filename": os.path.basename(path), "content_type": content_type_for(path)}
+            for path in files
+        ],
+    )
+    smtp = NullSMTP()
+    send_streaming(smtp, StreamingMessage(outbound, storage=FileSystemStorage(location=root)))
+    return smtp.received
+
+
+def _measure(queue, mode, root, files):
+    baseline = rss_mb()
+    start = time.perf_counter()
+    size = legacy_send(files) if mode == "legacy" else streaming_send(root, files)
+    queue.put((mode, size, time.perf_counter() - start, baseline, rss_mb()))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compară memoria maximă (peak RSS) la asamblarea emailului către asigurator: copie în "
+        "director temporar + attach_file vs. atașamente scrise în flux din storage. Fiecare variantă "
+        "rulează într-un proces separat, pe un dosar sintetic (video mare + poze)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--video-mb", type=int, default=100)
+        parser.add_argument("--photos", type=int, default=12)
+        parser.add_argument("--photo-mb", type=float, default=4)
+
+    def handle(self, *args, **options):
+        root = tempfile.mkdtemp()
+        try:
+            storage = FileSystemStorage(location=root)
+            files = [storage.path(storage.save("video.mp4", ContentFile(os.urandom(options["video_mb"] * 1024 * 1024))))]
+            for index in range(options["photos"]):
+                data = os.urandom(int(options["photo_mb"] * 1024 * 1024))
+                files.append(storage.path(storage.save(f"poza_{index}.jpg", ContentFile(data))))
+            total_mb = sum(os.path.getsize(f) for f in files) / 1024 / 1024
+            self.stdout.write(f"Dosar sintetic: {len(files)} fișiere, {total_mb:.0f} MB")
+
+            queue = multiprocessing.Queue()
+            for mode in ("legacy", "streaming"):
+                process = multiprocessing.Process(target=_measure, args=(queue, mode, root, files))
+                process.start()
+                mode, size, elapsed, baseline, peak = queue.get()
+                process.join()
+                self.stdout.write(
+                    f"{mode:10s} mesaj {size / 1024 / 1024:7.1f} MB  {elapsed:5.2f}s  "
+                    f"peak RSS {peak:7.1f} MB (+{peak - baseline:.1f} MB peste procesul de start)"
+                )
+        finally:
+            shutil.rmtree(root)
@@ -0,0 +1,132 @@
+import io
+import os
+import time
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.claims import imaging
+from apps.claims.services import DocumentAnalyzer
+
+SUPPORTED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".pdf")
+PLATE_VIN_KEYS = ("nr_auto", "nr_auto_a", "nr_auto_b", "vin", "vin_a", "vin_b")
+
+# Profil care reproduce comportamentul vechi (fără limită de rezoluție)
+ORIGINAL_PROFILE = {"max_edge": None, "quality": 95}
+
+
+def legacy_payload(path, data):
+    """
+    Reconstituie payload-ul trimis înainte de preprocesare:
+    fișierul original (sau PNG-ul 2x din PDF) + două crop-uri JPEG la rezoluție completă.
+    """
+    if path.lower().endswith(".pdf"):
+        doc = fitz.open("pdf", data)
+        try:
+            data = doc.load_page(0).get_pixmap(matrix=fitz.Matrix(2.0, 2.0)).tobytes("png")
+        finally:
+            doc.close()
+
+    img = Image.open(io.BytesIO(data))
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img = ImageOps.autocontrast(img)
+    width, height = img.size
+
+    payloads = [data]
+    for box in ((0, 0, int(width * 0.55), height), (int(width * 0.45), 0, width, height)):
+        buffered = io.BytesIO()
+        img.crop(box).save(buffered, format="JPEG")
+        payloads.append(buffered.getvalue())
+    return payloads
+
+
+class Command(BaseCommand):
+    help = (
+        "Compară dimensiunea payload-ului trimis la modelul vision înainte/după preprocesare "
+        "(downscale + re-encodare JPEG) pe documente reale. Cu --compare-model verifică și "
+        "că numerele de înmatriculare / VIN extrase rămân identice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="Fișiere sau directoare (implicit MEDIA_ROOT/uploads)")
+        parser.add_argument("--doc-type", default=None, help="Profil de preprocesare (ex: AMIABILA, CI)")
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument(
+            "--compare-model",
+            action="store_true",
+            help="Rulează analiza reală (cost OpenAI!) pe varianta originală și pe cea preprocesată.",
+        )
+
+    def _collect(self, paths):
+        if not paths:
+            paths = [os.path.join(settings.MEDIA_ROOT, "uploads")]
+        found = []
+        for p in paths:
+            if os.path.isdir(p):
+                for root, _, names in os.walk(p):
+                    for name in sorted(names):
+                        if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                            found.append(os.path.join(root, name))
+            elif p.lower().endswith(SUPPORTED_EXTENSIONS):
+                found.append(p)
+        return found
+
+    def handle(self, *args, **options):
+        files = self._collect(options["paths"])[: options["limit"]]
+        if not files:
+            self.stdout.write(self.style.WARNING("Nu am găsit documente de test."))
+            return
+
+        profile = imaging.upload_profile(options["doc_type"])
+        total_before = total_after = 0
+        mismatches = 0
+
+        self.stdout.write(f"Profil: {profile}")
+        self.stdout.write(f"{'fișier':<48} {'înainte':>10} {'după':>10} {'x':>6} {'t_vechi':>8} {'t_nou':>8}")
+
+        for path in files:
+            with open(path, "rb") as f:
+                data = f.read()
+            try:
+                t0 = time.perf_counter()
+                before = sum(len(p) for p in legacy_payload(path, data))
+                t1 = time.perf_counter()
+                payloads, _ = DocumentAnalyzer.prepare_split_payload(path, data, profile)
+                t2 = time.perf_counter()
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{os.path.basename(path)}: {e}"))
+                continue
+
+            after = sum(len(p) for p in payloads)
+            total_before += before
+            total_after += after
+            self.stdout.write(
+                f"{os.path.basename(path)[-48:]:<48} {before:>10} {after:>10} "
+                f"{before / after if after else 0:>6.2f} {(t1 - t0) * 1000:>7.0f}ms {(t2 - t1) * 1000:>7.0f}ms"
+            )
+
+            if options["compare_model"]:
+                original = DocumentAnalyzer._analyze_uncached(path, data, profile=ORIGINAL_PROFILE)
+                reduced = DocumentAnalyzer._analyze_uncached(path, data, profile=profile)
+                a = original.get("date_extrase") or {}
+                b = reduced.get("date_extrase") or {}
+                diff = {k: (a.get(k), b.get(k)) for k in PLATE_VIN_KEYS if a.get(k) != b.get(k)}
+                if original.get("tip_document") != reduced.get("tip_document"):
+                    diff["tip_document"] = (original.get("tip_document"), reduced.get("tip_document"))
+                if diff:
+                    mismatches += 1
+                    self.stdout.write(self.style.WARNING(f"    diferențe: {diff}"))
+                else:
+                    self.stdout.write("    nr. auto / VIN identice")
+
+        ratio = total_before / total_after if total_after else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"TOTAL {len(files)} documente: {total_before} -> {total_after} octeți (x{ratio:.2f})"
+            )
+        )
+        if options["compare_model"]:
+            self.stdout.write(f"Documente cu diferențe nr. auto / VIN: {mismatches}/{len(files)}")
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.claims import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark pentru preprocesarea imaginilor din DocumentAnalyzer (randare PDF, decodare, "
+        "miniatură, autocontrast, crop-uri, base64) pe fixture-uri generate. Compară cu baseline-ul salvat."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", nargs="*", help="Doar fixture-urile cu aceste nume (ex: phone_12mp.jpg)")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--in-process", action="store_true", help="Fără proces separat per fixture (RSS neizolat)")
+        parser.add_argument("--baseline", default=benchmarks.BASELINE_PATH)
+        parser.add_argument("--update-baseline", action="store_true", help="Suprascrie baseline-ul cu rezultatele curente")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        fixtures = [f for f in benchmarks.FIXTURES if not options["only"] or f[0] in options["only"]]
+        if not fixtures:
+            raise CommandError("Niciun fixture selectat.")
+
+        baseline = benchmarks.load_baseline(options["baseline"])
+        run = benchmarks.bench_fixture if options["in_process"] else benchmarks.bench_isolated
+
+        self.stdout.write(
+            f"{'fixture':<24} {'in':>10} {'payload':>10} {'total':>9} {'rss+':>8}  etape (ms)"
+        )
+        results, regressions = [], 0
+        for name, kind, params in fixtures:
+            result = run(name, kind, params, options["repeat"])
+            results.append(result)
+            stages = ", ".join(f"{stage} {values['ms']:.1f}" for stage, values in result["stages"].items())
+            self.stdout.write(
+                f"{name:<24} {result['sizes']['bytes_in']:>10} {result['sizes']['payload_bytes']:>10} "
+                f"{result['total_ms']:>7.1f}ms {result['peak_rss_delta'] // (1024 * 1024):>6}MB  {stages}"
+            )
+            for problem in benchmarks.compare(result, baseline):
+                regressions += 1
+                self.stdout.write(self.style.WARNING(f"    REGRESIE {problem}"))
+
+        if options["update_baseline"]:
+            benchmarks.save_baseline(results, options["baseline"])
+            self.stdout.write(self.style.SUCCESS(f"Baseline salvat în {options['baseline']}"))
+
+        if regressions:
+            message = f"{regressions} regresii față de baseline"
+            if options["fail_on_regression"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        elif baseline:
+            self.stdout.write(self.style.SUCCESS("Fără regresii față de baseline"))
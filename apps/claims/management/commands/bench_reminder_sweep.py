@@ -0,0 +1,92 @@
+import datetime
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.claims.models import Case, Client
+from apps.claims.tasks import due_reminders_queryset
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_due_ids(now):
+    """Selecția veche: toate dosarele PROCESSING_INSURER, cache.get + case.client per dosar."""
+    threshold = datetime.timedelta(hours=24)
+    due = []
+    for case in Case.objects.filter(stage=Case.Stage.PROCESSING_INSURER):
+        last_to, last_from = case.last_message_to_insurer_at, case.last_message_from_insurer_at
+        if not last_to:
+            continue
+        waiting_on_insurer = not last_from or last_to > last_from
+        time_since = now - (last_to if waiting_on_insurer else last_from)
+        if time_since >= threshold and not cache.get(f"reminder_24h_sent_{case.id}"):
+            case.client.full_name  # subiectul emailului folosea clientul (query lazy)
+            if not waiting_on_insurer or case.insurer_email:
+                due.append(case.id)
+    return due
+
+
+class Command(BaseCommand):
+    help = (
+        "Măsoară selecția dosarelor pentru reminderul de 24h (bucla veche per dosar vs. query-ul adnotat) "
+        "pe un set sintetic de dosare deschise. Datele sunt create într-o tranzacție anulată la final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cases", type=int, default=50000)
+        parser.add_argument("--due-ratio", type=float, default=0.1, help="Fracțiunea dosarelor scadente")
+
+    def _create_fixtures(self, count, due_ratio, now):
+        rng = random.Random(0)
+        run_id = rng.randint(0, 10 ** 6)
+        clients = Client.objects.bulk_create(
+            [Client(phone_number=f"+4078{run_id:06d}{i:06d}", first_name="Bench") for i in range(count)],
+            batch_size=2000,
+        )
+        cases = []
+        for i, client in enumerate(clients):
+            due = rng.random() < due_ratio
+            age = datetime.timedelta(hours=rng.uniform(25, 72) if due else rng.uniform(0, 23))
+            insurer_turn = rng.random() < 0.5
+            cases.append(
+                Case(
+                    client=client,
+                    stage=Case.Stage.PROCESSING_INSURER,
+                    insurer_email="daune@asigurator.test",
+                    last_message_to_insurer_at=now - age if insurer_turn else now - age - datetime.timedelta(hours=1),
+                    last_message_from_insurer_at=None if insurer_turn else now - age,
+                )
+            )
+        Case.objects.bulk_create(cases, batch_size=2000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                self._create_fixtures(options["cases"], options["due_ratio"], now)
+                self.stdout.write(f"Fixture: {options['cases']} dosare în {time.perf_counter() - start:.1f}s")
+
+                start = time.perf_counter()
+                legacy = legacy_due_ids(now)
+                legacy_s = time.perf_counter() - start
+
+                start = time.perf_counter()
+                current = list(due_reminders_queryset(now).values_list("id", flat=True))
+                current_s = time.perf_counter() - start
+
+                self.stdout.write(f"Buclă per dosar:  {legacy_s * 1000:9.1f} ms ({len(legacy)} scadente)")
+                self.stdout.write(f"Query adnotat:    {current_s * 1000:9.1f} ms ({len(current)} scadente)")
+                if set(legacy) != set(current):
+                    self.stdout.write(self.style.WARNING("Selecțiile diferă!"))
+                elif current_s:
+                    self.stdout.write(self.style.SUCCESS(f"Aceleași dosare, {legacy_s / current_s:.0f}x mai rapid"))
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.claims.debounce import debouncer
+
+
+class Command(BaseCommand):
+    help = "Afișează termenele de debounce în așteptare (dosar, scop, secunde rămase) din Redis."
+
+    def handle(self, *args, **options):
+        pending = debouncer.pending()
+        if not pending:
+            self.stdout.write("Niciun termen de debounce în așteptare.")
+            return
+        for purpose, case_id, remaining in pending:
+            state = "scadent" if remaining <= 0 else f"{remaining:.0f}s"
+            self.stdout.write(f"{purpose:<18} {case_id}  {state}")
+        self.stdout.write(self.style.SUCCESS(f"{len(pending)} termene în așteptare"))
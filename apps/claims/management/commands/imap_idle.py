@@ -0,0 +1,29 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.claims.imap_idle import IdleListener
+from apps.claims.tasks import handle_insurer_reply
+
+
+class Command(BaseCommand):
+    help = (
+        "Ascultă cutia IMAP (IDLE) pe o singură conexiune și procesează reply-urile asiguratorilor "
+        "la câteva secunde după sosire. Rulează ca proces separat (un singur exemplar)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mailbox", default=None, help="Implicit IMAP_MAILBOX")
+
+    def handle(self, *args, **options):
+        if not getattr(settings, "IMAP_USER", "") or not getattr(settings, "IMAP_PASSWORD", ""):
+            raise CommandError("Lipsă credențiale IMAP (IMAP_USER / IMAP_PASSWORD)")
+
+        listener = IdleListener(handle_insurer_reply, mailbox=options["mailbox"])
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: listener.stop())
+
+        self.stdout.write(f"IMAP IDLE pe {settings.IMAP_HOST} ({listener.mailbox}); Ctrl+C pentru oprire")
+        listener.run()
+        self.stdout.write(self.style.SUCCESS("IMAP IDLE oprit"))
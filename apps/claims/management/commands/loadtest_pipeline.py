@@ -0,0 +1,160 @@
+import io
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models.signals import post_save
+
+from apps.claims import ai_backends
+from apps.claims.models import Case, CaseDocument, Client, CommunicationLog, UploadBatch
+from apps.claims.signals import notify_admin_new_case
+from apps.claims.tasks import analyze_document_task, dispatch_upload_batch, finalize_upload_batch_task
+
+
+def synthetic_photo(seed, size=(1600, 1200)):
+    """JPEG unic per document (altfel cache-ul OCR ar răspunde în locul backend-ului)."""
+    rng = random.Random(seed)
+    img = Image.effect_noise(size, 64).convert("RGB")
+    img.paste((rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)), (0, 0, size[0] // 2, size[1] // 2))
+    buffered = io.BytesIO()
+    img.save(buffered, format="JPEG", quality=85)
+    return buffered.getvalue()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test offline pentru lot upload -> analyze_document_task -> signals -> check_status_and_notify, "
+        "cu backend-ul stub (fără OpenAI, fără WhatsApp: dosarele sunt pe canalul WEB). "
+        "Documentele fiecărui dosar formează un lot (UploadBatch) cu o singură notificare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--documents", type=int, default=100)
+        parser.add_argument("--cases", type=int, default=10)
+        parser.add_argument("--concurrency", type=int, default=8, help="Thread-uri care rulează task-urile (mod inline)")
+        parser.add_argument("--latency", type=float, default=1.5, help="Latența simulată per apel AI (secunde)")
+        parser.add_argument("--jitter", type=float, default=0.5)
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Trimite task-urile la workerii reali (.delay). Workerii trebuie porniți cu DOCUMENT_ANALYZER_BACKEND=stub.",
+        )
+        parser.add_argument("--timeout", type=int, default=600, help="Timp maxim de așteptare în modul --celery")
+        parser.add_argument("--keep", action="store_true", help="Nu șterge dosarele și fișierele create")
+
+    def _create_fixtures(self, cases, documents):
+        run_id = random.randint(0, 10 ** 6)
+        # Fără email la admin pentru dosarele de test
+        post_save.disconnect(notify_admin_new_case, sender=Case)
+        try:
+            created_cases = []
+            for i in range(cases):
+                client = Client.objects.create(phone_number=f"+4079{run_id:06d}{i:04d}", first_name="Load", last_name="Test")
+                case = Case.objects.create(client=client, stage=Case.Stage.COLLECTING_DOCS)
+                # Ultimul mesaj primit pe WEB => Case.last_inbound_channel = WEB => WebChatClient (doar DB)
+                CommunicationLog.objects.create(case=case, direction="IN", channel="WEB", content="loadtest")
+                created_cases.append(case)
+        finally:
+            post_save.connect(notify_admin_new_case, sender=Case)
+
+        docs = []
+        for i in range(documents):
+            doc = CaseDocument(case=created_cases[i % cases], doc_type=CaseDocument.DocType.UNKNOWN, ocr_data={})
+            doc.file.save(f"loadtest_{run_id}_{i}.jpg", ContentFile(synthetic_photo(f"{run_id}:{i}")), save=False)
+            doc.save()
+            docs.append(doc)
+        return created_cases, docs
+
+    @staticmethod
+    def _run_inline(doc_id):
+        start = time.perf_counter()
+        try:
+            result = analyze_document_task.apply(args=[doc_id])
+            return time.perf_counter() - start, result.failed()
+        finally:
+            close_old_connections()
+
+    def handle(self, *args, **options):
+        documents = options["documents"]
+        cases = max(1, min(options["cases"], documents))
+
+        stub = ai_backends.StubBackend(latency=options["latency"], jitter=options["jitter"])
+        if not options["celery"]:
+            ai_backends.set_backend(stub)
+
+        self.stdout.write(f"Pregătesc {documents} documente în {cases} dosare...")
+        created_cases, docs = self._create_fixtures(cases, documents)
+        out_before = CommunicationLog.objects.filter(case__in=created_cases, direction="OUT").count()
+
+        start = time.perf_counter()
+        durations, failures = [], 0
+        try:
+            if options["celery"]:
+                # Latența raportată e per lot (până la callback-ul chord-ului)
+                pending = [
+                    (time.perf_counter(), dispatch_upload_batch(case, [d for d in docs if d.case_id == case.id]))
+                    for case in created_cases
+                ]
+                for sent_at, result in pending:
+                    try:
+                        result.get(timeout=options["timeout"], propagate=False)
+                    finally:
+                        durations.append(time.perf_counter() - sent_at)
+                    failures += int(result.failed())
+            else:
+                batches = []
+                for case in created_cases:
+                    case_docs = [d.id for d in docs if d.case_id == case.id]
+                    batch = UploadBatch.objects.create(case=case, document_count=len(case_docs))
+                    CaseDocument.objects.filter(id__in=case_docs).update(batch=batch)
+                    batches.append(batch)
+
+                if options["concurrency"] <= 1:
+                    results = map(self._run_inline, [doc.id for doc in docs])
+                    for duration, failed in results:
+                        durations.append(duration)
+                        failures += int(failed)
+                else:
+                    with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                        for duration, failed in pool.map(self._run_inline, [doc.id for doc in docs]):
+                            durations.append(duration)
+                            failures += int(failed)
+                # Echivalentul callback-ului chord: o notificare per lot
+                for batch in batches:
+                    finalize_upload_batch_task.apply(args=[str(batch.id)])
+            elapsed = time.perf_counter() - start
+
+            processed = CaseDocument.objects.filter(id__in=[d.id for d in docs]).exclude(ocr_data={}).count()
+            notifications = CommunicationLog.objects.filter(case__in=created_cases, direction="OUT").count() - out_before
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{documents} documente în {elapsed:.1f}s ({documents / elapsed:.2f} doc/s), "
+                    f"procesate {processed}, eșuate {failures}"
+                )
+            )
+            self.stdout.write(
+                f"Latență {'lot' if options['celery'] else 'task'}: p50 {percentile(durations, 0.5):.2f}s, p95 {percentile(durations, 0.95):.2f}s, "
+                f"max {max(durations or [0]):.2f}s"
+            )
+            backend_calls = "n/a" if options["celery"] else stub.calls
+            self.stdout.write(f"Notificări trimise clienților: {notifications}; apeluri backend AI: {backend_calls}")
+        finally:
+            if not options["celery"]:
+                ai_backends.set_backend(None)
+            if not options["keep"]:
+                for doc in docs:
+                    doc.file.delete(save=False)
+                clients = [case.client_id for case in created_cases]
+                CommunicationLog.objects.filter(case__in=created_cases).delete()
+                Case.objects.filter(id__in=[case.id for case in created_cases]).delete()
+                Client.objects.filter(id__in=clients).delete()
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0012_case_last_message_from_insurer_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='casedocument',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='claims.casedocument', verbose_name='Duplicat al'),
+        ),
+        migrations.AddField(
+            model_name='casedocument',
+            name='phash',
+            field=models.CharField(blank=True, help_text='Hash perceptual (dHash, 64 biți, hex)', max_length=16, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='casedocument',
+            index=models.Index(fields=['case', 'phash'], name='casedoc_case_phash_idx'),
+        ),
+    ]
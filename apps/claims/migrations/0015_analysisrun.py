@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0014_uploadbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(help_text='SHA-256 al fișierului analizat', max_length=64)),
+                ('state', models.CharField(choices=[('CLAIMED', 'Preluat'), ('RUNNING', 'În analiză'), ('DONE', 'Finalizat'), ('FAILED', 'Eșuat (se poate relua)')], default='CLAIMED', max_length=10)),
+                ('task_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('result', models.JSONField(blank=True, help_text='Răspunsul modelului, păstrat pentru re-livrări', null=True)),
+                ('attempts', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_runs', to='claims.casedocument')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('document', 'content_hash'), name='unique_analysis_run_per_content')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+
+def backfill_last_inbound(apps, schema_editor):
+    Case = apps.get_model("claims", "Case")
+    CommunicationLog = apps.get_model("claims", "CommunicationLog")
+    latest = (
+        CommunicationLog.objects.filter(case=models.OuterRef("pk"), direction="IN")
+        .order_by("-created_at")
+    )
+    Case.objects.update(
+        last_inbound_channel=models.Subquery(latest.values("channel")[:1]),
+        last_inbound_at=models.Subquery(latest.values("created_at")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0015_analysisrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='case',
+            name='last_inbound_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='case',
+            name='last_inbound_channel',
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.RunPython(backfill_last_inbound, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-17 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0016_case_last_inbound_channel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='case',
+            name='reminder_24h_sent_at',
+            field=models.DateTimeField(blank=True, help_text='Ultimul reminder de 24h (asigurator sau client)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['stage', 'reminder_24h_sent_at'], name='case_stage_reminder_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0018_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseDossier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(blank=True, upload_to='dossiers/')),
+                ('content_key', models.CharField(blank=True, default='', help_text='SHA-256 peste (hash, tip) al documentelor incluse', max_length=64)),
+                ('entries', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('case', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dossier', to='claims.case')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0019_casedossier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailboxState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mailbox', models.CharField(help_text='user@host/INBOX', max_length=255, unique=True)),
+                ('uidvalidity', models.BigIntegerField(default=0)),
+                ('last_uid', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
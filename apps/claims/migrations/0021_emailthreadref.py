@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-17 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_thread_refs(apps, schema_editor):
+    Case = apps.get_model("claims", "Case")
+    EmailThreadRef = apps.get_model("claims", "EmailThreadRef")
+    OutboundEmail = apps.get_model("claims", "OutboundEmail")
+    refs = {}
+    for message_id, case_id in OutboundEmail.objects.filter(case__isnull=False).values_list("message_id", "case_id"):
+        refs[message_id] = (case_id, "OUT")
+    for case_id, message_id in Case.objects.exclude(last_email_message_id__isnull=True).exclude(
+        last_email_message_id__exact=""
+    ).values_list("id", "last_email_message_id"):
+        refs.setdefault(message_id.strip(), (case_id, "IN"))
+    EmailThreadRef.objects.bulk_create(
+        [
+            EmailThreadRef(message_id=message_id, case_id=case_id, direction=direction)
+            for message_id, (case_id, direction) in refs.items()
+            if len(message_id) <= 255
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0020_mailboxstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailThreadRef',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_id', models.CharField(max_length=255, unique=True)),
+                ('direction', models.CharField(choices=[('OUT', 'Trimis'), ('IN', 'Primit')], max_length=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('case', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='email_refs', to='claims.case')),
+            ],
+        ),
+        migrations.RunPython(backfill_thread_refs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,135 @@
+"""
+Emailuri cu atașamente mari trimise fără a ține mesajul în memorie.
+
+Scheletul MIME (headere, text, headerele fiecărui atașament) e generat de biblioteca
+standard, cu un marcaj în locul conținutului fiecărui atașament. La trimitere marcajul
+e înlocuit cu fișierul citit din storage în bucăți și codat base64 linie cu linie, direct
+pe socket-ul SMTP (faza DATA). Memoria folosită e O(ATTACHMENT_READ_SIZE), indiferent
+de mărimea fișierelor.
+"""
+import base64
+import re
+import uuid
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import formatdate
+
+from django.core.files.storage import default_storage
+
+# 57 octeți => o linie base64 de 76 de caractere; citim 1024 de linii odată
+BASE64_LINE_BYTES = 57
+ATTACHMENT_READ_SIZE = BASE64_LINE_BYTES * 1024
+
+_LEADING_DOT = re.compile(rb"^\.", re.MULTILINE)
+
+
+class StreamingMessage:
+    """Un OutboundEmail ca flux de bucăți CRLF, fiecare începând la început de linie."""
+
+    def __init__(self, outbound, storage=None):
+        self.outbound = outbound
+        self.storage = storage or default_storage
+        self._markers = {}
+
+    @property
+    def from_email(self):
+        return self.outbound.from_email
+
+    @property
+    def recipients(self):
+        return list(self.outbound.to) + list(self.outbound.cc)
+
+    def skeleton(self):
+        outbound = self.outbound
+        msg = EmailMessage(policy=SMTP)
+        msg["Subject"] = outbound.subject
+        msg["From"] = outbound.from_email
+        msg["To"] = ", ".join(outbound.to)
+        if outbound.cc:
+            msg["Cc"] = ", ".join(outbound.cc)
+        msg["Date"] = formatdate(localtime=True)
+        msg["Message-ID"] = outbound.message_id
+        for name, value in outbound.headers.items():
+            msg[name] = value
+        msg.set_content(outbound.body)
+
+        self._markers = {}
+        for attachment in outbound.attachments:
+            maintype, _, subtype = attachment["content_type"].partition("/")
+            msg.add_attachment(b"", maintype=maintype, subtype=subtype or "octet-stream", filename=attachment["filename"])
+            marker = f"@@ATTACHMENT-{uuid.uuid4().hex}@@"
+            msg.get_payload()[-1].set_payload(marker)
+            self._markers[marker] = attachment
+        return msg.as_bytes()
+
+    def chunks(self):
+        raw = self.skeleton()
+        if not self._markers:
+            yield raw
+            return
+        pattern = re.compile(b"(" + b"|".join(re.escape(m.encode()) for m in self._markers) + rb")\r\n")
+        position = 0
+        for match in pattern.finditer(raw):
+            yield raw[position:match.start()]
+            yield from self._encoded_file(self._markers[match.group(1).decode()])
+            position = match.end()
+        yield raw[position:]
+
+    def _encoded_file(self, attachment):
+        try:
+            f = self.storage.open(attachment["path"], "rb")
+        except OSError:
+            # Fișier dispărut între enqueue și trimitere: atașament gol, restul mesajului pleacă
+            return
+        with f:
+            for block in iter(lambda: f.read(ATTACHMENT_READ_SIZE), b""):
+                yield base64.encodebytes(block).replace(b"\n", b"\r\n")
+
+
+def send_streaming(smtp, message):
+    """
+    MAIL / RCPT / DATA pe o conexiune smtplib deja autentificată, scriind mesajul
+    bucată cu bucată (cu dot-stuffing), în locul lui sendmail() care cere tot mesajul.
+    """
+    import smtplib
+
+    smtp.ehlo_or_helo_if_needed()
+    code, response = smtp.mail(message.from_email)
+    if code != 250:
+        _reset(smtp)
+        raise smtplib.SMTPSenderRefused(code, response, message.from_email)
+
+    refused = {}
+    for recipient in message.recipients:
+        code, response = smtp.rcpt(recipient)
+        if code not in (250, 251):
+            refused[recipient] = (code, response)
+    if len(refused) == len(message.recipients):
+        _reset(smtp)
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    smtp.putcmd("data")
+    code, response = smtp.getreply()
+    if code != 354:
+        _reset(smtp)
+        raise smtplib.SMTPDataError(code, response)
+
+    ends_with_crlf = True
+    for chunk in message.chunks():
+        if not chunk:
+            continue
+        smtp.send(_LEADING_DOT.sub(b"..", chunk))
+        ends_with_crlf = chunk.endswith(b"\r\n")
+    smtp.send(b".\r\n" if ends_with_crlf else b"\r\n.\r\n")
+    code, response = smtp.getreply()
+    if code != 250:
+        _reset(smtp)
+        raise smtplib.SMTPDataError(code, response)
+    return refused
+
+
+def _reset(smtp):
+    try:
+        smtp.rset()
+    except Exception:
+        pass
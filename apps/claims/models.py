@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
 
 
 # --- 1. Clientul ---
@@ -119,9 +120,17 @@ class Case(models.Model):
     # Email Threading
     last_email_message_id = models.CharField(max_length=255, blank=True, null=True, help_text="Message-ID pentru threading email")
 
+    # Canalul activ al clientului (ultimul mesaj IN), ținut la zi de signals.track_inbound_channel.
+    # Codul care ține o copie mai veche a dosarului (FlowManager, task-uri) salvează cu update_fields
+    last_inbound_channel = models.CharField(max_length=10, blank=True, null=True)
+    last_inbound_at = models.DateTimeField(null=True, blank=True)
+
     # Tracking timp mesaje pt remindere
     last_message_from_insurer_at = models.DateTimeField(null=True, blank=True)
     last_message_to_insurer_at = models.DateTimeField(null=True, blank=True)
+    reminder_24h_sent_at = models.DateTimeField(
+        null=True, blank=True, help_text="Ultimul reminder de 24h (asigurator sau client)"
+    )
 
     # Date Eveniment
     accident_date = models.DateField(blank=True, null=True, verbose_name="Data Eveniment")
@@ -129,6 +138,9 @@ class Case(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["stage", "reminder_24h_sent_at"], name="case_stage_reminder_idx")]
+
     def __str__(self):
         hum = " [UMAN]" if self.is_human_managed else ""
         return f"Dosar {str(self.id)[:8]} - {self.stage}{hum}"
@@ -162,6 +174,22 @@ class InvolvedVehicle(models.Model):
         return f"{self.license_plate} ({self.role})"
 
 
+# --- 3.5 Lot de Upload (fișierele primite într-un singur mesaj) ---
+class UploadBatch(models.Model):
+    """
+    Documentele unui lot sunt analizate ca un group Celery; callback-ul chord-ului
+    notifică clientul o singură dată, după ce toate analizele s-au terminat.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="upload_batches")
+    document_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(null=True, blank=True, verbose_name="Client notificat la")
+
+    def __str__(self):
+        return f"Lot {str(self.id)[:8]} - {self.document_count} documente"
+
+
 # --- 4. Documente (Poze/PDF) ---
 class CaseDocument(models.Model):
     class DocType(models.TextChoices):
@@ -192,10 +220,80 @@ class CaseDocument(models.Model):
     ocr_data = models.JSONField(blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    batch = models.ForeignKey(
+        UploadBatch, on_delete=models.SET_NULL, blank=True, null=True, related_name="documents"
+    )
+
+    # Detectare duplicate (vezi apps/claims/dedup.py)
+    phash = models.CharField(
+        max_length=16, blank=True, null=True, help_text="Hash perceptual (dHash, 64 biți, hex)"
+    )
+    duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="duplicates",
+        verbose_name="Duplicat al",
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["case", "phash"], name="casedoc_case_phash_idx")]
+
     def __str__(self):
         return f"{self.doc_type} - {self.file.name}"
 
 
+# --- 4.5 Execuții analiză (idempotență analyze_document_task) ---
+class AnalysisRun(models.Model):
+    """
+    O analiză per (document, hash conținut). Un task re-livrat sau duplicat găsește
+    rularea existentă și iese (DONE / în lucru) sau refolosește rezultatul deja plătit.
+    """
+    class State(models.TextChoices):
+        CLAIMED = "CLAIMED", _("Preluat")
+        RUNNING = "RUNNING", _("În analiză")
+        DONE = "DONE", _("Finalizat")
+        FAILED = "FAILED", _("Eșuat (se poate relua)")
+
+    document = models.ForeignKey(CaseDocument, on_delete=models.CASCADE, related_name="analysis_runs")
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 al fișierului analizat")
+    state = models.CharField(max_length=10, choices=State.choices, default=State.CLAIMED)
+    task_id = models.CharField(max_length=255, blank=True, null=True)
+    result = models.JSONField(blank=True, null=True, help_text="Răspunsul modelului, păstrat pentru re-livrări")
+    attempts = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["document", "content_hash"], name="unique_analysis_run_per_content")
+        ]
+
+    def __str__(self):
+        return f"Analiză doc #{self.document_id} - {self.state}"
+
+
+# --- 4.6 Dosarul PDF unificat (apps/claims/dossier.py) ---
+class CaseDossier(models.Model):
+    """
+    Un PDF per dosar cu toate actele și pozele, câte o secțiune (bookmark) per tip.
+    `entries` descrie paginile în ordine, ca actualizarea să insereze/șteargă doar
+    paginile documentelor schimbate.
+    """
+    case = models.OneToOneField(Case, on_delete=models.CASCADE, related_name="dossier")
+    file = models.FileField(upload_to="dossiers/", blank=True)
+    content_key = models.CharField(
+        max_length=64, blank=True, default="", help_text="SHA-256 peste (hash, tip) al documentelor incluse"
+    )
+    # [{"doc": id, "name": fișier, "hash": sha256, "type": doc_type, "pages": n}]
+    entries = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dosar PDF {str(self.case_id)[:8]} - {len(self.entries)} documente"
+
+
 # --- 5. Jurnal Conversație (Log) ---
 class CommunicationLog(models.Model):
     case = models.ForeignKey(
@@ -218,6 +316,83 @@ class CommunicationLog(models.Model):
         return f"{self.direction} - {self.created_at}"
 
 
+# --- 5.5 Outbox email (golit de apps/claims/mailer.py pe o singură conexiune SMTP) ---
+class OutboundEmail(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("În așteptare")
+        SENDING = "SENDING", _("În trimitere")
+        SENT = "SENT", _("Trimis")
+        FAILED = "FAILED", _("Eșuat definitiv")
+
+    case = models.ForeignKey(
+        Case, on_delete=models.SET_NULL, null=True, blank=True, related_name="outbound_emails"
+    )
+    kind = models.CharField(max_length=30, help_text="Ex: claim, relay, reminder, admin_alert")
+    subject = models.CharField(max_length=998)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    # [{"path": nume în storage, "filename": ..., "content_type": ...}] - citite abia la trimitere
+    attachments = models.JSONField(default=list, blank=True)
+    message_id = models.CharField(max_length=255, unique=True)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    send_ms = models.PositiveIntegerField(null=True, blank=True, help_text="Durata sesiunii SMTP pentru mesaj")
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_status_due_idx")]
+
+    @property
+    def latency(self):
+        """De la punerea în outbox până la acceptarea de serverul SMTP."""
+        return self.sent_at - self.created_at if self.sent_at else None
+
+    def __str__(self):
+        return f"{self.kind} -> {', '.join(self.to)} ({self.status})"
+
+
+# --- 5.6 Checkpoint IMAP (citire incrementală în apps/claims/inbound.py) ---
+class MailboxState(models.Model):
+    """
+    Ultimul UID procesat dintr-o cutie IMAP. UID-urile sunt valabile doar cât timp
+    UIDVALIDITY rămâne același; dacă serverul îl schimbă, checkpoint-ul e refăcut.
+    """
+    mailbox = models.CharField(max_length=255, unique=True, help_text="user@host/INBOX")
+    uidvalidity = models.BigIntegerField(default=0)
+    last_uid = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.mailbox} (UIDVALIDITY {self.uidvalidity}, UID {self.last_uid})"
+
+
+# --- 5.7 Firul emailurilor (Message-ID -> dosar, pentru In-Reply-To / References) ---
+class EmailThreadRef(models.Model):
+    """
+    Fiecare Message-ID trimis (outbox) sau primit (reply asociat) pentru un dosar.
+    Un răspuns care citează unul dintre ele e asociat dosarului printr-o singură căutare indexată.
+    """
+    class Direction(models.TextChoices):
+        OUT = "OUT", _("Trimis")
+        IN = "IN", _("Primit")
+
+    message_id = models.CharField(max_length=255, unique=True)
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="email_refs")
+    direction = models.CharField(max_length=3, choices=Direction.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.message_id} -> {self.case_id} ({self.direction})"
+
+
 # --- 6. Baza de Date Asiguratori (Pentru Email) ---
 class Insurer(models.Model):
     name = models.CharField(max_length=100, verbose_name="Nume Asigurator")
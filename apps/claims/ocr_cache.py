@@ -0,0 +1,133 @@
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class OCRResultCache:
+    """
+    Cache adresat pe conținut pentru rezultatele DocumentAnalyzer.
+
+    Nivel 1: LRU în memoria procesului (limitat ca număr de intrări, cu TTL).
+    Nivel 2: cache-ul Django (Redis în producție), partajat între workeri.
+
+    Cheia = SHA-256 peste conținutul normalizat + versiunea prompt/model, deci orice
+    schimbare de prompt invalidează automat rezultatele vechi. Pentru imagini conținutul
+    e pixelii imaginii decodate din care sunt construite payload-urile trimise modelului
+    (DocumentAnalyzer.normalized_content), nu octeții fișierului: aceeași poză cu alte
+    metadate sau re-salvată fără pierderi nu mai plătește încă un apel. O re-comprimare
+    JPEG schimbă pixelii, deci rămâne un miss. PDF-urile sunt cheiate pe octeții fișierului.
+    """
+
+    KEY_PREFIX = "ocr_result"
+
+    def __init__(self, max_entries=512, ttl=7 * 24 * 3600, shared=True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self._entries = OrderedDict()  # key -> (expires_at, data)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(blobs, version):
+        """
+        Construiește cheia dintr-o listă de conținuturi (bytes) și versiunea analizorului.
+        Ordinea contează (ex: paginile unui CIV trimise în analyze_multiple).
+        """
+        digest = hashlib.sha256()
+        digest.update(version.encode("utf-8"))
+        for blob in blobs:
+            # Prefixăm cu lungimea ca să nu existe coliziuni prin concatenare
+            digest.update(len(blob).to_bytes(8, "big"))
+            digest.update(hashlib.sha256(blob).digest())
+        return f"{OCRResultCache.KEY_PREFIX}:{digest.hexdigest()}"
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, data = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(data)
+                # Expirat
+                del self._entries[key]
+
+        if self.shared:
+            try:
+                data = cache.get(key)
+            except Exception as e:
+                logger.warning(f"OCR cache (shared) indisponibil: {e}")
+                data = None
+            if data is not None:
+                self._store_local(key, data)
+                with self._lock:
+                    self.shared_hits += 1
+                return copy.deepcopy(data)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, data):
+        data = copy.deepcopy(data)
+        self._store_local(key, data)
+        if self.shared:
+            try:
+                cache.set(key, data, timeout=self.ttl)
+            except Exception as e:
+                logger.warning(f"OCR cache (shared) indisponibil: {e}")
+
+    def _store_local(self, key, data):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Golește nivelul local și cheile partajate scrise de acest proces."""
+        with self._lock:
+            keys = list(self._entries.keys())
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = self.evictions = 0
+        if self.shared and keys:
+            try:
+                cache.delete_many(keys)
+            except Exception as e:
+                logger.warning(f"OCR cache (shared) indisponibil: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+ocr_cache = OCRResultCache(
+    max_entries=getattr(settings, "OCR_CACHE_MAX_ENTRIES", 512),
+    ttl=getattr(settings, "OCR_CACHE_TTL", 7 * 24 * 3600),
+    shared=getattr(settings, "OCR_CACHE_SHARED", True),
+)
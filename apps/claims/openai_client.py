@@ -0,0 +1,116 @@
+"""
+Client OpenAI partajat la nivel de proces (un singur pool HTTPS per worker Celery).
+
+Înainte, fiecare analiză construia un OpenAI() nou => pool nou + handshake TLS la fiecare document.
+Clientul e creat leneș la primul apel și re-creat după fork (worker-ii prefork moștenesc
+memoria părintelui, dar conexiunile TCP nu se pot partaja între procese).
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import httpx
+from django.conf import settings
+from openai import DefaultHttpxClient, OpenAI
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def _build_client():
+    pool_size = getattr(settings, "OPENAI_POOL_SIZE", 10)
+    timeout = httpx.Timeout(
+        getattr(settings, "OPENAI_READ_TIMEOUT", 60.0),
+        connect=getattr(settings, "OPENAI_CONNECT_TIMEOUT", 5.0),
+    )
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=getattr(settings, "OPENAI_KEEPALIVE_EXPIRY", 60.0),
+        ),
+        timeout=timeout,
+    )
+    return OpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        timeout=timeout,
+        max_retries=getattr(settings, "OPENAI_MAX_RETRIES", 2),
+        http_client=http_client,
+    )
+
+
+def get_openai_client():
+    """Returnează clientul partajat al procesului curent (thread-safe)."""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = _build_client()
+                _client_pid = pid
+                logger.info(f"Client OpenAI creat pentru procesul {pid}")
+    return _client
+
+
+def reset_openai_client():
+    """Închide pool-ul curent (ex: după schimbarea setărilor, în teste)."""
+    global _client, _client_pid
+    with _lock:
+        client, _client, _client_pid = _client, None, None
+    if client is not None:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"Eroare la închiderea clientului OpenAI: {e}")
+
+
+class LatencyTracker:
+    """Latența apelurilor către OpenAI (ultimele `window` apeluri), per etichetă (classify/extract/...)."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds):
+        with self._lock:
+            self._samples.setdefault(label, deque(maxlen=self.window)).append(seconds)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def stats(self):
+        result = {}
+        with self._lock:
+            for label, samples in self._samples.items():
+                ordered = sorted(samples)
+                result[label] = {
+                    "count": len(ordered),
+                    "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                    "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                    "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                    "max_ms": round(ordered[-1] * 1000, 1),
+                }
+        return result
+
+
+latency = LatencyTracker()
+
+
+@contextmanager
+def timed(label):
+    """Măsoară un apel; latența se înregistrează și când apelul aruncă excepție."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        latency.record(label, elapsed)
+        logger.info(f"OpenAI {label}: {elapsed * 1000:.0f}ms")
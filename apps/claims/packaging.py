@@ -0,0 +1,234 @@
+"""
+Împachetarea documentelor unui dosar pentru emailurile către asigurator, într-un buget de mărime.
+
+Căsuțele asiguratorilor resping mesajele de peste ~20-25 MB, iar un dosar cu poze 4K și un
+video trece ușor de asta. Înainte de enqueue:
+- actele și pozele (imagini, PDF) pleacă într-un singur PDF al dosarului, cu câte o secțiune
+  per tip de document, la rezoluție de tipar (apps/claims/dossier.py, actualizat incremental);
+  relay-urile trimit doar un PDF de completare cu documentele noi; un PDF peste buget e
+  împărțit în părți la granițe de document (sau de pagină, pentru un scan prea mare);
+- videoclipurile prea mari devin linkuri de descărcare semnate, cu expirare;
+- ce nu încape într-un email pleacă în continuări numerotate ("(2/3)"), legate de primul
+  email prin In-Reply-To / References, ca să rămână în același fir la asigurator.
+"""
+import datetime
+import logging
+import os
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+
+from . import dossier, mailer
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_SALT = "claims.document-download"
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".3gp")
+
+# Headere, corp text și limite MIME, peste atașamente
+MESSAGE_OVERHEAD_BYTES = 256 * 1024
+
+# Ordinea în email: dosarul PDF întâi (ajunge sigur în primul mesaj), apoi video, apoi restul
+PRIORITY_SCAN, PRIORITY_PHOTO, PRIORITY_OTHER = 0, 1, 2
+
+MB = 1024 * 1024
+
+
+def attachment_budget():
+    """Octeți de atașament (ne-codați) per email: base64 crește mărimea cu 4/3."""
+    max_message = getattr(settings, "EMAIL_MAX_MESSAGE_MB", 20) * MB
+    return int(max_message * 3 / 4) - MESSAGE_OVERHEAD_BYTES
+
+
+def _extension(doc):
+    return os.path.splitext(doc.file.name.lower())[1]
+
+
+def _label(doc):
+    return doc.get_doc_type_display().replace("/", "_").replace(" ", "_")
+
+
+def _original(doc, filename, priority):
+    ref = mailer.attachment_ref(doc.file, filename, mailer.content_type_for(doc.file.name))
+    ref.update(size=doc.file.size, priority=priority)
+    return ref
+
+
+def _pdf_ref(path, filename, size):
+    # "generated": fișierul e păstrat până la trimitere, apoi șters (mailer.release_generated)
+    return {
+        "path": path,
+        "filename": filename,
+        "content_type": "application/pdf",
+        "size": size,
+        "priority": PRIORITY_SCAN,
+        "generated": True,
+    }
+
+
+def _split_refs(path, entries, filename, budget):
+    parts = dossier.split(path, entries, budget)
+    stem = os.path.splitext(filename)[0]
+    logger.info(f"{filename} depășește bugetul emailului: {len(parts)} părți")
+    return [
+        _pdf_ref(part, f"{stem}_partea_{index}_din_{len(parts)}.pdf", size)
+        for index, (part, size) in enumerate(parts, start=1)
+    ]
+
+
+def dossier_attachments(case, docs=None, budget=None):
+    """
+    Referințele PDF pentru actele și pozele emailului.
+    - docs=None: dosarul întreg, adus la zi; emailul pleacă exact cu fișierul de acum
+      (mărimea și împărțirea pe emailuri rămân valabile chiar dacă dosarul e regenerat între timp);
+    - docs dat (relay): un PDF de completare doar cu documentele respective.
+    Peste buget, PDF-ul pleacă în părți (dossier.split), fiecare încăpând într-un email.
+    """
+    budget = budget or attachment_budget()
+    prefix = str(case.id)[:8]
+    if docs is None:
+        current = dossier.sync(case)
+        if not current.file:
+            return []
+        filename = f"Dosar_{prefix}.pdf"
+        if current.file.size > budget:
+            return _split_refs(current.file.name, current.entries, filename, budget)
+        return [_pdf_ref(current.file.name, filename, current.file.size)]
+
+    path, entries = dossier.render_selection(case, docs)
+    if path is None:
+        return []
+    filename, size = f"Completare_Dosar_{prefix}.pdf", default_storage.size(path)
+    if size > budget:
+        return _split_refs(path, entries, filename, budget)
+    return [_pdf_ref(path, filename, size)]
+
+
+def download_link(doc):
+    token = signing.dumps({"doc": doc.id}, salt=DOWNLOAD_SALT)
+    return f"{settings.APP_DOMAIN}{reverse('document_download', args=[token])}"
+
+
+def link_max_age():
+    return getattr(settings, "DOWNLOAD_LINK_MAX_AGE_DAYS", 30) * 24 * 3600
+
+
+def load_download_token(token):
+    """ID-ul documentului din link; ridică signing.BadSignature / SignatureExpired."""
+    return signing.loads(token, salt=DOWNLOAD_SALT, max_age=link_max_age())["doc"]
+
+
+def package_documents(case, docs, full_dossier=True):
+    """
+    Întoarce (atașamente, linkuri): referințe pentru outbox (cu "size" și "priority")
+    și lista (nume, url) pentru videoclipurile care nu se atașează.
+    Cu full_dossier=False (relay), actele și pozele sunt doar cele din `docs`, nu tot dosarul.
+    """
+    video_limit = min(getattr(settings, "EMAIL_VIDEO_ATTACH_MAX_MB", 10) * MB, attachment_budget())
+    attachments, links, dossier_docs = [], [], []
+
+    for doc in docs:
+        if not doc.file or doc.duplicate_of_id:
+            continue
+        if not doc.file.storage.exists(doc.file.name):
+            logger.warning(f"Atașament lipsă în storage: {doc.file.name}")
+            continue
+        extension = _extension(doc)
+        filename = f"{_label(doc)}_{len(attachments) + len(links)}{extension}"
+
+        if extension in dossier.DOSSIER_EXTENSIONS:
+            dossier_docs.append(doc)
+        elif extension in VIDEO_EXTENSIONS:
+            if doc.file.size > video_limit:
+                links.append((filename, download_link(doc)))
+            else:
+                attachments.append(_original(doc, filename, PRIORITY_PHOTO))
+        else:
+            attachments.append(_original(doc, filename, PRIORITY_OTHER))
+
+    if dossier_docs:
+        attachments += dossier_attachments(case, None if full_dossier else dossier_docs)
+
+    attachments.sort(key=lambda a: a["priority"])
+    return attachments, links
+
+
+def split_into_parts(attachments, budget=None):
+    """
+    First-fit în ordinea priorității: actele rămân în primul email, pozele umplu restul.
+    Un fișier mai mare decât bugetul (ex. o singură pagină uriașă) pleacă singur.
+    """
+    budget = budget or attachment_budget()
+    parts, sizes = [], []
+    for attachment in attachments:
+        size = attachment.get("size") or 0
+        for index, used in enumerate(sizes):
+            if used + size <= budget:
+                parts[index].append(attachment)
+                sizes[index] += size
+                break
+        else:
+            if size > budget:
+                logger.warning(f"{attachment['filename']} ({size // MB} MB) depășește singur bugetul emailului")
+            parts.append([attachment])
+            sizes.append(size)
+    return parts or [[]]
+
+
+def links_paragraph(links):
+    expires = timezone.localtime(timezone.now() + datetime.timedelta(seconds=link_max_age()))
+    lines = "\n".join(f"- {name}: {url}" for name, url in links)
+    return (
+        f"\n\nFișierele video sunt prea mari pentru email și pot fi descărcate de aici "
+        f"(linkuri valabile până la {expires:%d.%m.%Y}):\n{lines}"
+    )
+
+
+def enqueue_case_email(case, *, kind, subject, body, to, cc=None, headers=None, docs=(), full_dossier=True):
+    """
+    Împachetează documentele și pune în outbox emailul principal plus continuările.
+    Întoarce lista OutboundEmail (primul e emailul principal).
+    """
+    attachments, links = package_documents(case, docs, full_dossier=full_dossier)
+    if links:
+        body += links_paragraph(links)
+    parts = split_into_parts(attachments)
+    total = len(parts)
+
+    first = mailer.enqueue(
+        kind=kind,
+        case=case,
+        subject=subject if total == 1 else f"{subject} (1/{total})",
+        body=body,
+        to=to,
+        cc=cc,
+        headers=headers,
+        attachments=parts[0],
+    )
+    sent = [first]
+
+    references = " ".join(filter(None, [(headers or {}).get("References"), first.message_id]))
+    reply_subject = subject if subject.lower().startswith("re:") else f"Re: {subject}"
+    for number, part in enumerate(parts[1:], start=2):
+        sent.append(
+            mailer.enqueue(
+                kind=kind,
+                case=case,
+                subject=f"{reply_subject} ({number}/{total})",
+                body=(
+                    f"Buna ziua,\n\nContinuarea emailului anterior (partea {number}/{total}): "
+                    f"documentele care nu au încăput în primul mesaj.\n\nCu stima,\nEchipa Auto Daune"
+                ),
+                to=to,
+                cc=cc,
+                headers={"In-Reply-To": first.message_id, "References": references},
+                attachments=part,
+            )
+        )
+    if total > 1:
+        logger.info(f"Dosar {case.id}: {len(attachments)} atașamente împărțite în {total} emailuri")
+    return sent
@@ -0,0 +1,177 @@
+"""
+Fast path pentru PDF-uri digitale (polițe RCA, extrase de cont generate de bancă/asigurator).
+
+Dacă PDF-ul are strat de text, clasificăm și extragem câmpurile cu reguli locale,
+fără niciun apel la modelul vision. Rezultatul are același format ca DocumentAnalyzer
+("tip_document" + "date_extrase") plus "sursa_extragere": "text_pdf".
+La încredere scăzută (lipsește un câmp obligatoriu) întoarcem None => fallback pe vision.
+"""
+import logging
+import re
+import unicodedata
+
+import fitz  # PyMuPDF
+
+from .prompts import REQUIRED_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Sub acest număr de caractere PDF-ul e aproape sigur scanat (doar imagine)
+MIN_TEXT_CHARS = 200
+MAX_PAGES = 3
+SOURCE = "text_pdf"
+
+COUNTIES = (
+    "AB|AR|AG|BC|BH|BN|BR|BT|BV|BZ|CJ|CL|CS|CT|CV|DB|DJ|GJ|GL|GR|HD|HR|IF|IL|IS|"
+    "MH|MM|MS|NT|OT|PH|SB|SJ|SM|SV|TL|TM|TR|VL|VN|VS"
+)
+PLATE_RE = re.compile(rf"\b(?:(B)\s?-?(\d{{2,3}})|({COUNTIES})\s?-?(\d{{2}}))\s?-?([A-Z]{{3}})\b")
+IBAN_RE = re.compile(r"\bRO\s?\d{2}(?:\s?[A-Z0-9]){20}\b")
+DATE_RE = re.compile(r"\b(\d{2})[./-](\d{2})[./-](\d{4})\b")
+POLICY_RES = (
+    re.compile(r"\bSERIA?\s*[:.]?\s*([A-Z0-9/]{2,20})\s+NR\.?\s*[:.]?\s*(\d{8,12})\b"),
+    re.compile(r"\b(?:NR\.?|NUMAR)\s*(?:POLITA|POLITEI|CONTRACT)\s*[:.]?\s*([A-Z0-9][A-Z0-9/-]{5,24})\b"),
+)
+EXPIRY_RE = re.compile(r"(?:PANA LA|EXPIRA(?:RE)?|VALABILA? PANA)\D{0,20}(\d{2}[./-]\d{2}[./-]\d{4})")
+
+KNOWN_INSURERS = (
+    "ALLIANZ", "GROUPAMA", "OMNIASIG", "ASIROM", "GENERALI", "GRAWE", "EUROINS",
+    "AXERIA", "UNIQA", "SIGNAL IDUNA", "HELLAS DIRECT", "ETHNIKI", "ABC ASIGURARI",
+)
+
+# Cuvinte cheie pentru clasificare (după eliminarea diacriticelor)
+TYPE_KEYWORDS = {
+    "RCA_PAGUBIT": ("RASPUNDERE CIVILA AUTO", "POLITA DE ASIGURARE", "ASIGURARE OBLIGATORIE", "POLITA RCA"),
+    "EXTRAS": ("EXTRAS DE CONT", "SOLD INITIAL", "SOLD FINAL", "TITULAR CONT"),
+}
+
+
+def normalize_text(text):
+    """Majuscule, fără diacritice (ș/ş/ț/ţ -> S/T), spații compactate."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"[ \t]+", " ", text.upper())
+
+
+def extract_text(pdf_bytes, max_pages=MAX_PAGES):
+    doc = fitz.open("pdf", pdf_bytes)
+    try:
+        return "\n".join(doc.load_page(i).get_text() for i in range(min(doc.page_count, max_pages)))
+    finally:
+        doc.close()
+
+
+def iban_is_valid(iban):
+    """Verificare ISO 13616 (mod 97) pentru IBAN-uri românești (24 caractere)."""
+    iban = iban.replace(" ", "").upper()
+    if len(iban) != 24 or not iban.startswith("RO"):
+        return False
+    rearranged = iban[4:] + iban[:4]
+    digits = "".join(str(int(ch, 36)) for ch in rearranged)
+    return int(digits) % 97 == 1
+
+
+def classify_text(text):
+    scores = {
+        tip: sum(1 for kw in keywords if kw in text)
+        for tip, keywords in TYPE_KEYWORDS.items()
+    }
+    best = max(scores, key=scores.get)
+    ranked = sorted(scores.values(), reverse=True)
+    # Ambiguu (nimic sau egalitate) => lăsăm modelul să decidă
+    if ranked[0] == 0 or ranked[0] == ranked[1]:
+        return None
+    return best
+
+
+def find_iban(text):
+    for match in IBAN_RE.finditer(text):
+        iban = match.group(0).replace(" ", "")
+        if iban_is_valid(iban):
+            return iban
+    return None
+
+
+def find_plate(text):
+    # Întâi lângă eticheta "Nr. înmatriculare", apoi oriunde în document
+    idx = text.find("INMATRICULARE")
+    match = (PLATE_RE.search(text, idx, idx + 200) if idx >= 0 else None) or PLATE_RE.search(text)
+    if not match:
+        return None
+    county = match.group(1) or match.group(3)
+    number = match.group(2) or match.group(4)
+    return f"{county} {number} {match.group(5)}"
+
+
+def find_policy_number(text):
+    for regex in POLICY_RES:
+        match = regex.search(text)
+        if match:
+            return " ".join(match.groups())
+    return None
+
+
+def find_expiry(text):
+    match = EXPIRY_RE.search(text)
+    if match:
+        return _format_date(DATE_RE.search(match.group(1)))
+    # Fallback: perioada de valabilitate "dd.mm.yyyy - dd.mm.yyyy" => a doua dată
+    for line in text.splitlines():
+        if "VALABILITATE" in line:
+            dates = list(DATE_RE.finditer(line))
+            if len(dates) >= 2:
+                return _format_date(dates[1])
+    return None
+
+
+def _format_date(match):
+    return f"{match.group(1)}.{match.group(2)}.{match.group(3)}" if match else None
+
+
+def extract_fields(tip, text):
+    if tip == "EXTRAS":
+        return {"iban": find_iban(text)}
+    if tip == "RCA_PAGUBIT":
+        return {
+            "nr_polita": find_policy_number(text),
+            "asigurator": next((name for name in KNOWN_INSURERS if name in text), None),
+            "data_expirare": find_expiry(text),
+            "nr_auto": find_plate(text),
+        }
+    return {}
+
+
+def analyze_pdf_text(pdf_bytes, doc_type=None):
+    """
+    Returnează (rezultat, tip_detectat).
+    rezultat = None când PDF-ul nu are text suficient sau lipsesc câmpuri obligatorii;
+    tip_detectat poate fi folosit totuși ca să sărim peste clasificarea vision.
+    """
+    try:
+        raw_text = extract_text(pdf_bytes)
+    except Exception as e:
+        logger.warning(f"Nu pot citi stratul de text PDF: {e}")
+        return None, None
+
+    text = normalize_text(raw_text)
+    if len(text.strip()) < MIN_TEXT_CHARS:
+        return None, None
+
+    if doc_type:
+        tip = doc_type.upper()
+        # Tip cunoscut, dar fără reguli locale (ex: CI scanat ca PDF)
+        if tip not in TYPE_KEYWORDS:
+            return None, None
+    else:
+        tip = classify_text(text)
+    if not tip:
+        return None, None
+
+    fields = extract_fields(tip, text)
+    missing = [key for key in REQUIRED_FIELDS[tip] if not fields.get(key)]
+    if missing:
+        logger.info(f"PDF text {tip}: lipsesc {missing}, fallback pe modelul vision")
+        return None, tip
+
+    date_extrase = {key: value for key, value in fields.items() if value}
+    return {"tip_document": tip, "date_extrase": date_extrase, "sursa_extragere": SOURCE}, tip
@@ -0,0 +1,369 @@
+"""
+Prompt-urile trimise la modelul vision de DocumentAnalyzer.
+
+Analiza se face în două etape:
+1. CLASIFICARE: o singură miniatură (detail=low) -> doar tip_document.
+2. EXTRAGERE: prompt specific tipului (doar AMIABILA primește crop-urile stânga/dreapta).
+
+COMBINED_PROMPT este prompt-ul complet (clasificare + extragere într-un singur apel),
+folosit ca fallback când clasificarea nu reușește.
+Orice modificare aici trebuie să incrementeze PROMPT_VERSION din services.py.
+"""
+
+DOC_TYPES = [
+    "CI", "PERMIS", "TALON", "CIV", "RCA_PAGUBIT", "AMIABILA", "PROCURA",
+    "EXTRAS", "ACTE_VINOVAT", "FOTO_AUTO", "PV_POLITIE", "ALTELE",
+]
+
+# Tipuri pentru care nu extragem nimic (analyze_document_task folosește doar tipul)
+NO_EXTRACTION_TYPES = {"FOTO_AUTO", "PROCURA", "ACTE_VINOVAT", "PERMIS", "ALTELE"}
+
+# Câmpuri obligatorii per tip: oprim randarea paginilor PDF când sunt toate completate
+# (și criteriul de încredere pentru extragerea din stratul de text, vezi pdf_text.py)
+REQUIRED_FIELDS = {
+    "AMIABILA": ("nr_auto_a", "nr_auto_b"),
+    "PV_POLITIE": ("data_accident", "nr_auto_a", "nr_auto_b"),
+    "CI": ("nume", "cnp"),
+    "TALON": ("nr_auto", "vin"),
+    "CIV": ("vin", "marca", "model"),
+    "RCA_PAGUBIT": ("nr_polita", "data_expirare", "nr_auto"),
+    "EXTRAS": ("iban",),
+}
+
+# Miniatura pentru etapa de clasificare (detail=low => imaginea e oricum redusă la 512px)
+CLASSIFY_MAX_EDGE = 512
+
+EXPERT_INTRO = """
+        Ești un expert în asigurări auto și procesare de documente (OCR), specializat pe documente românești.
+"""
+
+DISAMBIGUATION_RULES = """
+        INSTRUCȚIUNI DE DEZAMBIGUIZARE ÎNTRE CI, CIV și TALON:
+           - ATENȚIE MAXIMĂ: Nu confunda "Cartea de Identitate" (CI/Buletin) a persoanei cu "Cartea de Identitate a Vehiculului" (CIV) sau cu "Certificatul de Înmatriculare" (TALON).
+           - BULETIN (CI): Identifică strict o persoană fizică ("CARTEA DE IDENTITATE", CNP, Adresa). Nu are date tehnice auto.
+           - TALON: Este "Certificatul de Înmatriculare". Are dimensiuni mai mici, format pe 3 pagini pliate, și conține cuvintele "CERTIFICAT DE ÎNMATRICULARE". Conține date tehnice auto (Marca, Model, VIN).
+           - CARTEA MAȘINII (CIV): Este documentul format A4 (adesea pliat) ce conține cuvintele "CARTEA DE IDENTITATE A VEHICULULUI". Conține date tehnice auto detaliate.
+           - REGULĂ: Doar prezența "Serie Șasiu", "Marca", "Model" NU înseamnă automat "CIV". Verifică titlul documentului: "CERTIFICAT DE ÎNMATRICULARE" = TALON, "CARTEA DE IDENTITATE A VEHICULULUI" = CIV.
+"""
+
+PLATE_RULES = """
+        NUMERE DE ÎNMATRICULARE (Format Românesc):
+           - Format uzual: [JJ NN LLL] sau [B NNN LLL] (ex: AG 22 PAW, B 101 ABC).
+           - JUDEȚE VALIDE: B, AB, AR, AG, BC, BH, BN, BR, BT, BV, BZ, CJ, CL, CS, CT, CV, DB, DJ, GJ, GL, GR, HD, HR, IF, IL, IS, MH, MM, MS, NT, OT, PH, SB, SJ, SM, SV, TL, TM, TR, VL, VN, VS.
+           - ATENȚIE JUDEȚE: Fii foarte atent la județul 'DB' (Dâmbovița). Adesea este scris de mână să semene cu 'B' sau '0B'.
+             Dacă vezi un număr de forma "B NN LLL" (ex: B 86 MYH), acesta este INVALID pentru București. București are forma "B NNN LLL".
+             În acest caz, verifică dacă prima literă poate fi 'D' (DB) sau alt județ (SB, AB, UB).
+           - CONFUZII FRECVENTE CARACTERE: 'D'/'B'/'0', 'M'/'N'/'H', '3'/'8'/'B', '1'/'I'/'L', 'Z'/'2'/'7'.
+           - Dacă ești nesigur de un caracter, returnează null pentru tot numărul decât să inventezi.
+"""
+
+JSON_ANSWER = """
+        Răspunde STRICT în format JSON:
+        {
+            "tip_document": "%s",
+            "date_extrase": { ... }
+        }
+"""
+
+# --- ETAPA 1: CLASIFICARE ---
+
+CLASSIFY_PROMPT = EXPERT_INTRO + """
+        Ai la dispoziție o miniatură a unui document (sau a unei fotografii) încărcat de un client pentru un dosar de daună auto.
+
+        SARCINA: Identifică DOAR tipul documentului. Nu extrage date.
+""" + DISAMBIGUATION_RULES + """
+        ALTE INDICII:
+           - AMIABILA: formularul "Constatare Amiabilă de Accident" (două coloane colorate, albastră și galbenă, schiță la mijloc).
+           - PV_POLITIE: proces verbal / anexa emisă de Poliție.
+           - RCA_PAGUBIT: poliță de asigurare RCA.
+           - EXTRAS: extras de cont bancar (IBAN, Sold, Tranzacții).
+           - FOTO_AUTO: fotografie a unui vehicul (avariat sau nu), nu un document.
+
+        TIPURI ACCEPTATE (tip_document):
+        [%s]
+        Dacă nu poți stabili tipul nici măcar aproximativ, returnează "UNKNOWN".
+
+        Răspunde STRICT în format JSON:
+        { "tip_document": "CI" }
+""" % ", ".join(f'"{t}"' for t in DOC_TYPES)
+
+# --- ETAPA 2: EXTRAGERE SPECIFICĂ TIPULUI ---
+
+AMIABILA_PROMPT = EXPERT_INTRO + """
+        Documentul este o Constatare Amiabilă de Accident (AMIABILA).
+        Ai la dispoziție 3 imagini pentru a asigura o precizie maximă a datelor.
+
+        IMAGINILE PRIMITE:
+        1. IMAGINEA COMPLETĂ (Original): Pentru context general și analiza schiței accidentului.
+        2. CROP STÂNGA (Vehicul A): Conține DOAR datele pentru Vehiculul A (Coloana Albastră). Folosește-o pentru a extrage datele vehiculului A.
+        3. CROP DREAPTA (Vehicul B): Conține DOAR datele pentru Vehiculul B (Coloana Galbenă). Folosește-o pentru a extrage datele vehiculului B.
+
+        UTILIZAREA IMAGINILOR:
+           - Pentru 'nr_auto_a', 'nume_sofer_a', 'asigurator_a': Bazează-te PRIORITAR pe Imaginea 2 (Stânga).
+           - Pentru 'nr_auto_b', 'nume_sofer_b', 'asigurator_b': Bazează-te PRIORITAR pe Imaginea 3 (Dreapta).
+           - Nu amesteca datele între cele două vehicule!
+""" + PLATE_RULES + """
+        NUME ȘI PRENUME:
+           - PRIORITATE MAXIMĂ: Extrage numele din Rubrica 6 ("Asigurat/Deținător"). Acesta este numele legal al deținătorului.
+           - FALLBACK: Folosește Rubrica 9 ("Conducător vehicul") DOAR DACĂ Rubrica 6 este ilizibilă sau goală.
+           - CORECȚII LOGICE: Corectează numele trunchiate sau scrise neclar ("ILE" -> "ILIE", "GHE" -> "GHEORGHE", "NIC" -> "NICOLAE").
+           - Verifică prima literă: 'D' poate fi confundat cu 'B' și invers (ex: DOBLEA vs BOBLEA).
+           - Transcrie numele complet, corectând evidentele erori de scriere olografă.
+
+        EXTRAGERE DATE (date_extrase):
+           - 'data_accident': Data evenimentului (ex: 20.05.2023).
+           - Vehicul A (Imaginea 2 - Stânga):
+             - 'nr_auto_a': Nr. Înmatriculare (Rubrica 7).
+             - 'vin_a': Serie Șasiu (Opțional/Dacă este lizibil).
+             - 'nume_sofer_a': Numele din Rubrica 6 (Prioritar) sau Rubrica 9.
+             - 'asigurator_a': Societatea de asigurări (Rubrica 8).
+           - Vehicul B (Imaginea 3 - Dreapta):
+             - 'nr_auto_b': Nr. Înmatriculare (Rubrica 7).
+             - 'vin_b': Serie Șasiu (Opțional/Dacă este lizibil).
+             - 'nume_sofer_b': Numele din Rubrica 6 (Prioritar) sau Rubrica 9.
+             - 'asigurator_b': Societatea de asigurări (Rubrica 8).
+""" + JSON_ANSWER % "AMIABILA"
+
+SINGLE_IMAGE_INTRO = EXPERT_INTRO + """
+        Documentul a fost clasificat ca {tip}. Extrage datele cu maximă precizie din imaginea primită.
+        Dacă imaginea NU este de fapt un document de tip {tip}, returnează tipul corect în "tip_document" și "date_extrase" gol.
+"""
+
+EXTRACTION_PROMPTS = {
+    "CI": SINGLE_IMAGE_INTRO.format(tip="CI") + DISAMBIGUATION_RULES + """
+        EXTRAGERE DATE (date_extrase) - DOCUMENT DE IDENTITATE (CI/BULETIN):
+           - 'nume': Nume complet.
+           - 'cnp': Cod Numeric Personal.
+           - 'adresa_domiciliu': Adresa completă de domiciliu (Strada, Nr, Bloc, Scara, Etaj, Ap, Loc, Judet).
+           - 'seria_ci': Seria CI (ex: RX).
+           - 'numar_ci': Numărul CI (ex: 123456).
+""" + JSON_ANSWER % "CI",
+    "TALON": SINGLE_IMAGE_INTRO.format(tip="TALON") + DISAMBIGUATION_RULES + PLATE_RULES + """
+        EXTRAGERE DATE (date_extrase) - TALON (CERTIFICAT ÎNMATRICULARE):
+           - 'nr_auto': Nr. Înmatriculare.
+           - 'vin': Serie Șasiu.
+           - 'nume': Nume proprietar/utilizator.
+           - 'cnp': CNP proprietar (dacă apare).
+           - 'marca': Marca vehiculului (ex: VW, Ford).
+           - 'model': Modelul vehiculului (ex: Golf, Focus).
+""" + JSON_ANSWER % "TALON",
+    "CIV": SINGLE_IMAGE_INTRO.format(tip="CIV") + DISAMBIGUATION_RULES + """
+        EXTRAGERE DATE (date_extrase) - CARTEA DE IDENTITATE A VEHICULULUI (CIV):
+           - 'vin': Serie Șasiu.
+           - 'marca': Marca vehiculului.
+           - 'model': Modelul vehiculului.
+           - 'nr_auto': Nr. Înmatriculare (dacă este menționat, uneori este trecut cu pixul sau pe o anexă).
+""" + JSON_ANSWER % "CIV",
+    "RCA_PAGUBIT": SINGLE_IMAGE_INTRO.format(tip="RCA_PAGUBIT") + PLATE_RULES + """
+        EXTRAGERE DATE (date_extrase) - POLIȚA RCA A PĂGUBITULUI (RCA_PAGUBIT):
+           - 'nr_polita': Numărul poliței de asigurare.
+           - 'asigurator': Societatea de asigurare.
+           - 'data_expirare': Data expirării poliței.
+           - 'nr_auto': Nr. Înmatriculare al vehiculului asigurat.
+""" + JSON_ANSWER % "RCA_PAGUBIT",
+    "EXTRAS": SINGLE_IMAGE_INTRO.format(tip="EXTRAS") + """
+        INSTRUCȚIUNI PENTRU EXTRAS DE CONT (BANCAR):
+           - SCOP PRINCIPAL: Extrage codul IBAN complet.
+           - FORMAT IBAN ROMÂNIA: Începe obligatoriu cu "RO", urmat de 2 cifre de control, 4 caractere (cod bancă) și 16 caractere alfanumerice. Lungime totală: 24 caractere.
+           - EXEMPLU: RO98 BTRL 0120 1234 5678 90XX.
+           - IGNORĂ spațiile din IBAN la extragere (sau returnează-l compact).
+           - VERIFICĂ vizual dacă IBAN-ul este valid și complet.
+
+        EXTRAGERE DATE (date_extrase) - PENTRU EXTRAS DE CONT:
+           - 'iban': IBAN-ul complet identificat (RO...).
+""" + JSON_ANSWER % "EXTRAS",
+    "PV_POLITIE": SINGLE_IMAGE_INTRO.format(tip="PV_POLITIE") + PLATE_RULES + """
+        EXTRAGERE DATE (date_extrase) - PROCES VERBAL POLIȚIE / ANEXA 2 (PV_POLITIE):
+           - 'data_accident': Data evenimentului (ex: 20.05.2023).
+           - Vehicul A (De regulă Victima / Păgubitul):
+             - 'nr_auto_a': Nr. Înmatriculare.
+             - 'nume_proprietar_a': Numele proprietarului.
+             - 'nume_sofer_a': Numele conducătorului auto.
+             - 'avarii_a': Avariile vehiculului (ex: "bara fata, far stanga").
+           - Vehicul B (De regulă Vinovatul, menționat la sancțiuni):
+             - 'nr_auto_b': Nr. Înmatriculare.
+             - 'nume_proprietar_b': Numele proprietarului.
+             - 'nume_sofer_b': Numele conducătorului auto (vinovatului).
+             - 'avarii_b': Avariile vehiculului.
+             - 'asigurator_b': Societatea de asigurări (RCA).
+""" + JSON_ANSWER % "PV_POLITIE",
+}
+
+# --- FALLBACK: prompt complet într-un singur apel (3 imagini) ---
+
+COMBINED_PROMPT = """
+        Ești un expert în asigurări auto și procesare de documente (OCR), specializat pe documente românești.
+        Ai la dispoziție 3 imagini pentru a asigura o precizie maximă a datelor.
+
+        IMAGINILE PRIMITE:
+        1. IMAGINEA COMPLETĂ (Original): Pentru context general, tip document și analiza schiței accidentului.
+        2. CROP STÂNGA (Vehicul A): Conține DOAR datele pentru Vehiculul A (Coloana Albastră). Folosește-o pentru a extrage datele vehiculului A.
+        3. CROP DREAPTA (Vehicul B): Conține DOAR datele pentru Vehiculul B (Coloana Galbenă). Folosește-o pentru a extrage datele vehiculului B.
+
+        SARCINA PRINCIPALĂ:
+        Identifică tipul documentului și extrage datele cu maximă precizie.
+
+        INSTRUCȚIUNI CRITICE PENTRU AMIABILĂ (Constatare Amiabilă de Accident):
+
+        1. UTILIZAREA IMAGINILOR:
+           - Pentru 'nr_auto_a', 'nume_sofer_a', 'asigurator_a': Bazează-te PRIORITAR pe Imaginea 2 (Stânga).
+           - Pentru 'nr_auto_b', 'nume_sofer_b', 'asigurator_b': Bazează-te PRIORITAR pe Imaginea 3 (Dreapta).
+           - Nu amesteca datele între cele două vehicule!
+
+        2. NUMERE DE ÎNMATRICULARE (Format Românesc):
+           - Format uzual: [JJ NN LLL] sau [B NNN LLL] (ex: AG 22 PAW, B 101 ABC).
+           - JUDEȚE VALIDE: B, AB, AR, AG, BC, BH, BN, BR, BT, BV, BZ, CJ, CL, CS, CT, CV, DB, DJ, GJ, GL, GR, HD, HR, IF, IL, IS, MH, MM, MS, NT, OT, PH, SB, SJ, SM, SV, TL, TM, TR, VL, VN, VS.
+           - ATENȚIE JUDEȚE: Fii foarte atent la județul 'DB' (Dâmbovița). Adesea este scris de mână să semene cu 'B' sau '0B'.
+             Dacă vezi un număr de forma "B NN LLL" (ex: B 86 MYH), acesta este INVALID pentru București. București are forma "B NNN LLL".
+             În acest caz, verifică dacă prima literă poate fi 'D' (DB) sau alt județ (SB, AB, UB).
+             Exemplu: "B 36 NYH" -> VERIFICĂ DACA ESTE "DB 86 MYH" sau "AB 96 MYH".
+             Exemplu: "B 356 NYH" -> VERIFICĂ DACA ESTE "DB 86 MYH". Adesea "8" este citit greșit ca "3" sau "35".
+
+           - CONFUZII FRECVENTE CARACTERE:
+             - 'D' vs 'B' vs '0' (Zero)
+             - 'M' vs 'N' vs 'H'
+             - '3' vs '8' vs 'B' (Atenție la numărul 8 care poate părea 3 sau 35)
+             - '1' vs 'I' vs 'L'
+             - 'Z' vs '2' vs '7'
+
+           - Dacă ești nesigur de un caracter, returnează null pentru tot numărul decât să inventezi.
+
+        3. NUME ȘI PRENUME:
+           - PRIORITATE MAXIMĂ: Extrage numele din Rubrica 6 ("Asigurat/Deținător"). Acesta este numele legal al deținătorului.
+           - FALLBACK: Folosește Rubrica 9 ("Conducător vehicul") DOAR DACĂ Rubrica 6 este ilizibilă sau goală.
+           - CORECȚII LOGICE: Corectează numele trunchiate sau scrise neclar.
+             - "ILE" -> "ILIE"
+             - "GHE" -> "GHEORGHE"
+             - "NIC" -> "NICOLAE"
+             - "BOBLEA" -> Este aproape sigur "BOBLEAC". Verifică dacă nu cumva terminația 'C' sau 'AC' este mică/înghesuită.
+             - "DOBLEA" -> Verifică dacă este "BOBLEA" sau "BOBLEAC". 'D' inițial poate fi confundat cu 'B'.
+             - Verifică prima literă: 'D' poate fi confundat cu 'B' și invers (ex: DOBLEA vs BOBLEA).
+           - Transcrie numele complet, corectând evidentele erori de scriere olografă.
+
+        INSTRUCȚIUNI PENTRU EXTRAS DE CONT (BANCAR):
+           - IDENTIFICARE: Caută termeni precum "Extras de cont", "Cont curent", "IBAN", "Banca", "Sold", "Tranzactii".
+           - SCOP PRINCIPAL: Extrage codul IBAN complet.
+           - FORMAT IBAN ROMÂNIA: Începe obligatoriu cu "RO", urmat de 2 cifre de control, 4 caractere (cod bancă) și 16 caractere alfanumerice. Lungime totală: 24 caractere.
+           - EXEMPLU: RO98 BTRL 0120 1234 5678 90XX.
+           - IGNORĂ spațiile din IBAN la extragere (sau returnează-l compact).
+           - VERIFICĂ vizual dacă IBAN-ul este valid și complet.
+
+        INSTRUCȚIUNI PENTRU POZE CU MAȘINA (FOTO_AUTO):
+           - Dacă imaginea este o fotografie a unui vehicul (avariat sau nu) și pare a fi făcută la fața locului sau pentru dosarul de daună, clasific-o ca 'FOTO_AUTO'.
+           - Nu este nevoie să extragi date specifice (nr. înmatriculare etc.) din aceste poze, doar confirmă tipul.
+
+        INSTRUCȚIUNI DE DEZAMBIGUIZARE ÎNTRE CI, CIV și TALON:
+           - ATENȚIE MAXIMĂ: Nu confunda "Cartea de Identitate" (CI/Buletin) a persoanei cu "Cartea de Identitate a Vehiculului" (CIV) sau cu "Certificatul de Înmatriculare" (TALON).
+           - BULETIN (CI): Identifică strict o persoană fizică ("CARTEA DE IDENTITATE", CNP, Adresa). Nu are date tehnice auto.
+           - TALON: Este "Certificatul de Înmatriculare". Are dimensiuni mai mici, format pe 3 pagini pliate, și conține cuvintele "CERTIFICAT DE ÎNMATRICULARE". Conține date tehnice auto (Marca, Model, VIN).
+           - CARTEA MAȘINII (CIV): Este documentul format A4 (adesea pliat) ce conține cuvintele "CARTEA DE IDENTITATE A VEHICULULUI". Conține date tehnice auto detaliate.
+           - REGULĂ: Doar prezența "Serie Șasiu", "Marca", "Model" NU înseamnă automat "CIV". Verifică titlul documentului: "CERTIFICAT DE ÎNMATRICULARE" = TALON, "CARTEA DE IDENTITATE A VEHICULULUI" = CIV.
+
+        TIPURI ACCEPTATE (tip_document):
+        ["CI", "PERMIS", "TALON", "CIV", "RCA_PAGUBIT", "AMIABILA", "PROCURA", "EXTRAS", "ACTE_VINOVAT", "FOTO_AUTO", "PV_POLITIE", "ALTELE"]
+
+        EXTRAGERE DATE (date_extrase):
+
+        1. PENTRU AMIABILA:
+           - 'data_accident': Data evenimentului (ex: 20.05.2023).
+           - Vehicul A (Imaginea 2 - Stânga):
+             - 'nr_auto_a': Nr. Înmatriculare (Rubrica 7).
+             - 'vin_a': Serie Șasiu (Opțional/Dacă este lizibil).
+             - 'nume_sofer_a': Numele din Rubrica 6 (Prioritar) sau Rubrica 9.
+             - 'asigurator_a': Societatea de asigurări (Rubrica 8).
+
+           - Vehicul B (Imaginea 3 - Dreapta):
+             - 'nr_auto_b': Nr. Înmatriculare (Rubrica 7).
+             - 'vin_b': Serie Șasiu (Opțional/Dacă este lizibil).
+             - 'nume_sofer_b': Numele din Rubrica 6 (Prioritar) sau Rubrica 9.
+             - 'asigurator_b': Societatea de asigurări (Rubrica 8).
+
+        2. PENTRU EXTRAS DE CONT (Folosește Imaginea 1):
+           - 'iban': IBAN-ul complet identificat (RO...).
+
+        3. PENTRU POZE AUTO (FOTO_AUTO):
+           - Nu extrage nimic. Returnează doar "tip_document": "FOTO_AUTO".
+
+        4. PENTRU DOCUMENTE DE IDENTITATE (CI/BULETIN):
+           - 'nume': Nume complet.
+           - 'cnp': Cod Numeric Personal.
+           - 'adresa_domiciliu': Adresa completă de domiciliu (Strada, Nr, Bloc, Scara, Etaj, Ap, Loc, Judet).
+           - 'seria_ci': Seria CI (ex: RX).
+           - 'numar_ci': Numărul CI (ex: 123456).
+           - ATENȚIE: Nu clasifica un document drept "CI" dacă se referă la un vehicul ("Cartea de Identitate a Vehiculului" sau CIV).
+
+        5. PENTRU TALON (CERTIFICAT ÎNMATRICULARE):
+           - 'nr_auto': Nr. Înmatriculare.
+           - 'vin': Serie Șasiu.
+           - 'nume': Nume proprietar/utilizator.
+           - 'cnp': CNP proprietar (dacă apare).
+           - 'marca': Marca vehiculului (ex: VW, Ford).
+           - 'model': Modelul vehiculului (ex: Golf, Focus).
+
+        6. PENTRU CARTEA DE IDENTITATE A VEHICULULUI (CIV):
+           - 'vin': Serie Șasiu.
+           - 'marca': Marca vehiculului.
+           - 'model': Modelul vehiculului.
+           - 'nr_auto': Nr. Înmatriculare (dacă este menționat, uneori este trecut cu pixul sau pe o anexă).
+           - ATENȚIE: Documentul trebuie clasificat "CIV" și nu "CI" dacă reprezintă "Cartea de Identitate a Vehiculului".
+
+        7. PENTRU POLIȚA RCA A PĂGUBITULUI (RCA_PAGUBIT):
+           - 'nr_polita': Numărul poliței de asigurare.
+           - 'asigurator': Societatea de asigurare.
+           - 'data_expirare': Data expirării poliței.
+           - 'nr_auto': Nr. Înmatriculare al vehiculului asigurat.
+
+        8. PENTRU PROCES VERBAL POLIȚIE / ANEXA 2 (PV_POLITIE):
+           - 'data_accident': Data evenimentului (ex: 20.05.2023).
+           - Vehicul A (De regulă Victima / Păgubitul):
+             - 'nr_auto_a': Nr. Înmatriculare.
+             - 'nume_proprietar_a': Numele proprietarului.
+             - 'nume_sofer_a': Numele conducătorului auto.
+             - 'avarii_a': Avariile vehiculului (ex: "bara fata, far stanga").
+           - Vehicul B (De regulă Vinovatul, menționat la sancțiuni):
+             - 'nr_auto_b': Nr. Înmatriculare.
+             - 'nume_proprietar_b': Numele proprietarului.
+             - 'nume_sofer_b': Numele conducătorului auto (vinovatului).
+             - 'avarii_b': Avariile vehiculului.
+             - 'asigurator_b': Societatea de asigurări (RCA).
+
+        Răspunde STRICT în format JSON:
+        {
+            "tip_document": "AMIABILA",
+            "date_extrase": { ... }
+        }
+"""
+
+# --- ANALIZĂ MULTIPLĂ (pagini ale aceluiași document, ex: CIV) ---
+
+MULTIPLE_PROMPT = """
+        Ești un expert în asigurări auto și procesare de documente (OCR), specializat pe documente românești.
+        Ai primit mai multe imagini simultan. Aceste imagini reprezintă probabil DIFERITE PAGINI SAU SECȚIUNI ALE ACELUIAȘI DOCUMENT (cum ar fi "Cartea de Identitate a Vehiculului" - CIV, care este pliată și fotografiată pe bucăți).
+
+        SARCINA TA:
+        - Analizează toate imaginile împreună ca un tot unitar.
+        - Identifică tipul documentului asamblat. Dacă măcar una din imagini este clar o parte din CIV (Cartea Mașinii) și celelalte par a fi celelalte pagini ale CIV-ului, returnează tipul "CIV".
+        - Extrage datele relevante coroborând informațiile din toate paginile.
+
+        INSTRUCȚIUNI DE DEZAMBIGUIZARE ÎNTRE CI, CIV și TALON:
+        - ATENȚIE MAXIMĂ: Nu confunda "Cartea de Identitate" (CI/Buletin) a persoanei cu "Cartea de Identitate a Vehiculului" (CIV) sau cu "Certificatul de Înmatriculare" (TALON).
+        - BULETIN (CI): Identifică strict o persoană fizică. Nu are date tehnice auto.
+        - TALON: Este "Certificatul de Înmatriculare". Are dimensiuni mai mici, format pe 3 pagini pliate, și conține cuvintele "CERTIFICAT DE ÎNMATRICULARE". Conține date tehnice auto (Marca, Model, VIN).
+        - CARTEA MAȘINII (CIV): Este documentul format A4 (adesea pliat) ce conține cuvintele "CARTEA DE IDENTITATE A VEHICULULUI". Conține date tehnice auto detaliate.
+        - REGULĂ: Doar prezența "Serie Șasiu", "Marca", "Model" NU înseamnă automat "CIV". Verifică titlul documentului asamblat: "CERTIFICAT DE ÎNMATRICULARE" = TALON, "CARTEA DE IDENTITATE A VEHICULULUI" = CIV.
+
+        TIPURI ACCEPTATE (tip_document):
+        ["CI", "PERMIS", "TALON", "CIV", "RCA_PAGUBIT", "AMIABILA", "PROCURA", "EXTRAS", "ACTE_VINOVAT", "FOTO_AUTO", "PV_POLITIE", "ALTELE", "UNKNOWN"]
+
+        EXTRAGERE DATE (date_extrase) - PENTRU CARTEA DE IDENTITATE A VEHICULULUI (CIV):
+        - 'vin': Serie Șasiu (de obicei se găsește pe prima pagină a CIV).
+        - 'marca': Marca vehiculului.
+        - 'model': Modelul vehiculului.
+        - 'nr_auto': Nr. Înmatriculare (dacă este menționat, uneori pe anexe).
+
+        Răspunde STRICT în format JSON:
+        {
+            "tip_document": "CIV",
+            "date_extrase": { "vin": "...", "marca": "...", "model": "..." }
+        }
+"""
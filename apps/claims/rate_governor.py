@@ -0,0 +1,136 @@
+"""
+Limitator de rată OpenAI comun pentru toți workerii Celery (token bucket în Redis).
+
+Două găleți, reumplute continuu: cereri/minut (RPM) și tokeni/minut (TPM).
+Scriptul Lua verifică și scade atomic ambele găleți folosind ceasul Redis,
+deci workerii de pe mașini diferite văd aceeași stare.
+
+- Capacitate liberă => apelul pleacă imediat.
+- Lipsă capacitate, dar așteptarea < max_wait => worker-ul doarme și reîncearcă.
+- Altfel => RateLimited(retry_after): task-ul se re-programează cu countdown.
+
+Dacă Redis nu răspunde, guvernorul lasă apelurile să treacă (fail-open) și nu
+mai încearcă Redis timp de `cooldown` secunde (circuit breaker).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Tokeni facturați per imagine (gpt-4o): detail=low e fix 85; detail=high pentru o imagine
+# redusă la 768px pe latura scurtă = 4 tile-uri * 170 + 85.
+IMAGE_TOKENS = {"low": 85, "high": 765}
+
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local need = math.min(tonumber(ARGV[3]), tpm)
+
+local function refill(key, capacity)
+    local v = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(v[1])
+    local ts = tonumber(v[2])
+    if level == nil or ts == nil then
+        level = capacity
+        ts = now
+    end
+    local rate = capacity / 60000.0
+    return math.min(capacity, level + math.max(0, now - ts) * rate), rate
+end
+
+local req_level, req_rate = refill(KEYS[1], rpm)
+local tok_level, tok_rate = refill(KEYS[2], tpm)
+
+local wait = 0
+if req_level < 1 then
+    wait = math.max(wait, (1 - req_level) / req_rate)
+end
+if tok_level < need then
+    wait = math.max(wait, (need - tok_level) / tok_rate)
+end
+if wait == 0 then
+    req_level = req_level - 1
+    tok_level = tok_level - need
+end
+
+redis.call('HSET', KEYS[1], 'level', tostring(req_level), 'ts', now)
+redis.call('HSET', KEYS[2], 'level', tostring(tok_level), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+redis.call('PEXPIRE', KEYS[2], 120000)
+return math.ceil(wait)
+"""
+
+
+class RateLimited(Exception):
+    """Nu există capacitate OpenAI în următoarele `retry_after` secunde."""
+
+    def __init__(self, retry_after, message=None):
+        self.retry_after = max(1, int(round(retry_after)))
+        super().__init__(message or f"Limită OpenAI atinsă, reîncercare în {self.retry_after}s")
+
+
+def estimate_tokens(prompt_text, images=0, detail="high", max_tokens=1000):
+    """Estimare conservatoare: ~4 caractere/token pentru text + costul fix al imaginilor + output."""
+    return len(prompt_text) // 4 + images * IMAGE_TOKENS.get(detail, IMAGE_TOKENS["high"]) + max_tokens
+
+
+class RateGovernor:
+    def __init__(self, rpm, tpm, max_wait=20.0, cooldown=30.0, prefix="openai_rate", redis_client=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        self.cooldown = cooldown
+        self.prefix = prefix
+        self._redis = redis_client
+        self._script = None
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def keys(self):
+        return [f"{self.prefix}:rpm", f"{self.prefix}:tpm"]
+
+    def _get_script(self):
+        if self._script is None:
+            self._script = (self._redis or get_redis()).register_script(TOKEN_BUCKET_LUA)
+        return self._script
+
+    def try_acquire(self, tokens):
+        """Returnează 0 dacă s-a rezervat capacitate, altfel secundele de așteptat."""
+        if time.monotonic() < self._open_until:
+            return 0
+        try:
+            wait_ms = self._get_script()(keys=self.keys, args=[self.rpm, self.tpm, int(tokens)])
+        except Exception as e:
+            with self._lock:
+                self._open_until = time.monotonic() + self.cooldown
+            logger.warning(f"Rate governor indisponibil (Redis: {e}), apelurile trec nelimitat {self.cooldown}s")
+            return 0
+        return int(wait_ms) / 1000.0
+
+    def acquire(self, tokens, max_wait=None):
+        """Blochează până la max_wait secunde; peste asta aruncă RateLimited."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                raise RateLimited(wait)
+            time.sleep(wait)
+
+
+governor = RateGovernor(
+    rpm=getattr(settings, "OPENAI_RPM_LIMIT", 500),
+    tpm=getattr(settings, "OPENAI_TPM_LIMIT", 30000),
+    max_wait=getattr(settings, "OPENAI_RATE_MAX_WAIT", 20.0),
+)
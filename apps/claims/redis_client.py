@@ -0,0 +1,28 @@
+"""
+Conexiune Redis partajată per proces, pentru structurile de coordonare între workeri
+(rate limiting etc.) care nu încap în API-ul cache-ului Django.
+"""
+import os
+import threading
+
+import redis
+from django.conf import settings
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def get_redis():
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = redis.Redis.from_url(
+                    getattr(settings, "REDIS_URL", "redis://localhost:6379/0"),
+                    socket_connect_timeout=2,
+                    socket_timeout=2,
+                )
+                _client_pid = pid
+    return _client
@@ -1,272 +1,296 @@
-import base64
-import json
 import logging
 import io
-import fitz  # PyMuPDF
 from PIL import Image, ImageOps
-from openai import OpenAI
 from django.conf import settings
+from .ocr_cache import ocr_cache
+from . import imaging, pdf_text, prompts
+from .ai_backends import MODEL_NAME, get_backend
+from .rate_governor import RateLimited
 
 logger = logging.getLogger(__name__)
 
+# Model + versiunea prompt-urilor. Se include în cheia cache-ului OCR:
+# orice modificare de prompt trebuie să incrementeze versiunea.
+PROMPT_VERSION = "2026-10.5"
+ANALYZER_VERSION = f"{MODEL_NAME}:{PROMPT_VERSION}"
+
+
+def cache_version():
+    """Rezultatele backend-urilor de test (stub/replay) nu ajung în cache-ul celor reale."""
+    backend = get_backend().name
+    return ANALYZER_VERSION if backend == "openai" else f"{ANALYZER_VERSION}:{backend}"
+
 
 class DocumentAnalyzer:
     @staticmethod
-    def analyze(image_path):
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-        # 1. Load image and generate splits using Pillow
+    def analyze(image_path, doc_type=None):
+        """
+        Analiză în două etape: clasificare din miniatură, apoi extragere specifică tipului.
+        doc_type: tipul deja cunoscut (ex: "AMIABILA") => se sare direct la extragere.
+        """
         try:
             with open(image_path, "rb") as image_file:
                 original_bytes = image_file.read()
+        except Exception as e:
+            logger.error(f"Eroare citire fișier {image_path}: {e}")
+            return {"tip_document": "UNKNOWN", "date_extrase": {}, "error": f"File read error: {str(e)}"}
+
+        # Cache adresat pe conținut: aceeași poză re-trimisă nu mai costă un apel gpt-4o
+        content, image = DocumentAnalyzer.normalized_content(
+            image_path, original_bytes, imaging.UPLOAD_PROFILES["DEFAULT"]["max_edge"]
+        )
+        variant = f"single:{(doc_type or 'DEFAULT').upper()}".encode("utf-8")
+        cache_key = ocr_cache.make_key([variant, content], cache_version())
+        cached = ocr_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"OCR cache HIT pentru {image_path} ({ocr_cache.stats()})")
+            return cached
+
+        result = DocumentAnalyzer._analyze_uncached(image_path, original_bytes, doc_type=doc_type, image=image)
+
+        # Nu păstrăm erorile (timeout, PDF corupt etc.) - merită reîncercate
+        if result and not result.get("error"):
+            ocr_cache.set(cache_key, result)
+        return result
 
-            # If it's a PDF, convert the first page to a PNG byte stream
-            if image_path.lower().endswith(".pdf"):
-                try:
-                    doc = fitz.open("pdf", original_bytes)
-                    if doc.page_count > 0:
-                        page = doc.load_page(0)
-                        # Zoom slightly for better OCR resolution
-                        zoom_matrix = fitz.Matrix(2.0, 2.0)
-                        pix = page.get_pixmap(matrix=zoom_matrix)
-                        original_bytes = pix.tobytes("png")
-                        doc.close()
-                    else:
-                        raise Exception("PDF gol (0 pagini).")
-                except Exception as e:
-                    logger.error(f"Eroare procesare PDF: {e}")
-                    return {"tip_document": "UNKNOWN", "date_extrase": {}, "error": f"PDF processing error: {str(e)}"}
+    @staticmethod
+    def normalized_content(image_path, original_bytes, max_edge):
+        """
+        Conținutul pe care e calculată cheia cache-ului OCR. Tot ce primește modelul (miniatura de
+        clasificare, JPEG-urile de extragere) e derivat din imaginea decodată la max_edge, deci
+        cheia e peste pixelii ei: aceeași poză cu alte metadate (EXIF, ICC) sau re-salvată fără
+        pierderi în alt format dă același rezultat. PDF-urile (randate din fișier) și fișierele
+        care nu se decodează rămân pe octeții fișierului.
+        Întoarce (conținut, imaginea decodată sau None) - imaginea e refolosită de analiză.
+        """
+        if image_path.lower().endswith(".pdf"):
+            return original_bytes, None
+        try:
+            img = DocumentAnalyzer._decode(original_bytes, max_edge)
+            header = f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode("utf-8")
+            return header + img.tobytes(), img
+        except Exception:
+            return original_bytes, None
 
-            # Create PIL Image for splitting
-            img = Image.open(io.BytesIO(original_bytes))
+    @staticmethod
+    def _decode(data, max_edge):
+        img = Image.open(io.BytesIO(data))
+        # Decodare JPEG direct la rezoluție redusă (Image.draft)
+        imaging.apply_draft(img, max_edge)
 
-            # Apply autocontrast to improve handwriting visibility
-            try:
-                # Convert to RGB if necessary (e.g. for PNGs with transparency) to avoid errors
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-                img = ImageOps.autocontrast(img)
-            except Exception as e:
-                logger.warning(f"Autocontrast failed: {e}")
+        # Convert to RGB if necessary (e.g. for PNGs with transparency) to avoid errors
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        return imaging.fit_within(img, max_edge)
 
-            width, height = img.size
+    @staticmethod
+    def iter_images(image_path, original_bytes, max_edge, max_pages=1):
+        """
+        Generator de imagini decodate la cel mult max_edge.
+        PDF: paginile sunt randate leneș, una câte una, direct în JPEG (imaging.iter_pdf_pages),
+        deci memoria rămâne limitată la o pagină indiferent de numărul de pagini.
+        """
+        if image_path.lower().endswith(".pdf"):
+            sources = imaging.iter_pdf_pages(original_bytes, max_edge, max_pages=max_pages)
+        else:
+            sources = iter([original_bytes])
+        try:
+            for data in sources:
+                yield DocumentAnalyzer._decode(data, max_edge)
+        finally:
+            close = getattr(sources, "close", None)
+            if close:
+                close()
 
-            # Split vertically with OVERLAP (Left: 0-55%, Right: 45-100%)
-            # This ensures we don't cut off text in the middle spine
-            split_point_left_end = int(width * 0.55)
-            split_point_right_start = int(width * 0.45)
+    @staticmethod
+    def load_image(image_path, original_bytes, max_edge):
+        """Prima pagină / imaginea, decodată o singură dată la cel mult max_edge."""
+        pages = DocumentAnalyzer.iter_images(image_path, original_bytes, max_edge)
+        try:
+            return next(pages)
+        finally:
+            pages.close()
 
-            left_crop = img.crop((0, 0, split_point_left_end, height))
-            right_crop = img.crop((split_point_right_start, 0, width, height))
+    @staticmethod
+    def _enhance(img, profile):
+        img = imaging.fit_within(img, profile["max_edge"])
+        # Apply autocontrast to improve handwriting visibility
+        try:
+            img = ImageOps.autocontrast(img)
+        except Exception as e:
+            logger.warning(f"Autocontrast failed: {e}")
+        return img
 
-            # Helper to convert PIL image to base64
-            def pil_to_base64(pil_img):
-                buffered = io.BytesIO()
-                pil_img.save(buffered, format="JPEG")
-                return base64.b64encode(buffered.getvalue()).decode("utf-8")
+    @staticmethod
+    def split_payload(img, profile):
+        """Cele 3 imagini pentru AMIABILA (full, crop stânga, crop dreapta) ca JPEG-uri."""
+        img = DocumentAnalyzer._enhance(img, profile)
+        width, height = img.size
+
+        # Split vertically with OVERLAP (Left: 0-55%, Right: 45-100%)
+        # This ensures we don't cut off text in the middle spine
+        split_point_left_end = int(width * 0.55)
+        split_point_right_start = int(width * 0.45)
+
+        left_crop = img.crop((0, 0, split_point_left_end, height))
+        right_crop = img.crop((split_point_right_start, 0, width, height))
+
+        quality = profile["quality"]
+        return [
+            imaging.encode_jpeg(img, quality),
+            imaging.encode_jpeg(left_crop, quality),
+            imaging.encode_jpeg(right_crop, quality),
+        ]
 
-            # Helper for bytes
-            def bytes_to_base64(data):
-                return base64.b64encode(data).decode("utf-8")
+    @staticmethod
+    def prepare_split_payload(image_path, original_bytes, profile):
+        """
+        Pregătește cele 3 imagini (full, crop stânga, crop dreapta) ca JPEG-uri
+        redimensionate conform profilului. Returnează (lista_jpeg, stats).
+        """
+        img = DocumentAnalyzer.load_image(image_path, original_bytes, profile["max_edge"])
+        payloads = DocumentAnalyzer.split_payload(img, profile)
+        return payloads, imaging.payload_stats(len(original_bytes), payloads)
 
-            base64_full = bytes_to_base64(original_bytes)
-            base64_left = pil_to_base64(left_crop)
-            base64_right = pil_to_base64(right_crop)
+    @staticmethod
+    def _call_model(prompt_text, payloads, detail="high", max_tokens=1000, label="extract"):
+        """Un singur apel vision cu prompt + imagini JPEG, prin backend-ul configurat. Returnează JSON-ul parsat."""
+        return get_backend().complete(prompt_text, payloads, detail=detail, max_tokens=max_tokens, label=label)
 
-        except Exception as e:
-            logger.error(f"Eroare procesare imagine (Pillow): {e}")
-            # Fallback in case of image error: rely on original bytes only if split fails
-            # But usually if PIL fails, the image is bad.
-            return {"tip_document": "UNKNOWN", "date_extrase": {}, "error": f"Image processing error: {str(e)}"}
-
-        # 2. Prompt avansat pentru strategie Split & Scan
-        prompt_text = """
-        Ești un expert în asigurări auto și procesare de documente (OCR), specializat pe documente românești.
-        Ai la dispoziție 3 imagini pentru a asigura o precizie maximă a datelor.
-
-        IMAGINILE PRIMITE:
-        1. IMAGINEA COMPLETĂ (Original): Pentru context general, tip document și analiza schiței accidentului.
-        2. CROP STÂNGA (Vehicul A): Conține DOAR datele pentru Vehiculul A (Coloana Albastră). Folosește-o pentru a extrage datele vehiculului A.
-        3. CROP DREAPTA (Vehicul B): Conține DOAR datele pentru Vehiculul B (Coloana Galbenă). Folosește-o pentru a extrage datele vehiculului B.
-
-        SARCINA PRINCIPALĂ:
-        Identifică tipul documentului și extrage datele cu maximă precizie.
-
-        INSTRUCȚIUNI CRITICE PENTRU AMIABILĂ (Constatare Amiabilă de Accident):
-
-        1. UTILIZAREA IMAGINILOR:
-           - Pentru 'nr_auto_a', 'nume_sofer_a', 'asigurator_a': Bazează-te PRIORITAR pe Imaginea 2 (Stânga).
-           - Pentru 'nr_auto_b', 'nume_sofer_b', 'asigurator_b': Bazează-te PRIORITAR pe Imaginea 3 (Dreapta).
-           - Nu amesteca datele între cele două vehicule!
-
-        2. NUMERE DE ÎNMATRICULARE (Format Românesc):
-           - Format uzual: [JJ NN LLL] sau [B NNN LLL] (ex: AG 22 PAW, B 101 ABC).
-           - JUDEȚE VALIDE: B, AB, AR, AG, BC, BH, BN, BR, BT, BV, BZ, CJ, CL, CS, CT, CV, DB, DJ, GJ, GL, GR, HD, HR, IF, IL, IS, MH, MM, MS, NT, OT, PH, SB, SJ, SM, SV, TL, TM, TR, VL, VN, VS.
-           - ATENȚIE JUDEȚE: Fii foarte atent la județul 'DB' (Dâmbovița). Adesea este scris de mână să semene cu 'B' sau '0B'.
-             Dacă vezi un număr de forma "B NN LLL" (ex: B 86 MYH), acesta este INVALID pentru București. București are forma "B NNN LLL".
-             În acest caz, verifică dacă prima literă poate fi 'D' (DB) sau alt județ (SB, AB, UB).
-             Exemplu: "B 36 NYH" -> VERIFICĂ DACA ESTE "DB 86 MYH" sau "AB 96 MYH".
-             Exemplu: "B 356 NYH" -> VERIFICĂ DACA ESTE "DB 86 MYH". Adesea "8" este citit greșit ca "3" sau "35".
-
-           - CONFUZII FRECVENTE CARACTERE:
-             - 'D' vs 'B' vs '0' (Zero)
-             - 'M' vs 'N' vs 'H'
-             - '3' vs '8' vs 'B' (Atenție la numărul 8 care poate părea 3 sau 35)
-             - '1' vs 'I' vs 'L'
-             - 'Z' vs '2' vs '7'
-
-           - Dacă ești nesigur de un caracter, returnează null pentru tot numărul decât să inventezi.
-
-        3. NUME ȘI PRENUME:
-           - PRIORITATE MAXIMĂ: Extrage numele din Rubrica 6 ("Asigurat/Deținător"). Acesta este numele legal al deținătorului.
-           - FALLBACK: Folosește Rubrica 9 ("Conducător vehicul") DOAR DACĂ Rubrica 6 este ilizibilă sau goală.
-           - CORECȚII LOGICE: Corectează numele trunchiate sau scrise neclar.
-             - "ILE" -> "ILIE"
-             - "GHE" -> "GHEORGHE"
-             - "NIC" -> "NICOLAE"
-             - "BOBLEA" -> Este aproape sigur "BOBLEAC". Verifică dacă nu cumva terminația 'C' sau 'AC' este mică/înghesuită.
-             - "DOBLEA" -> Verifică dacă este "BOBLEA" sau "BOBLEAC". 'D' inițial poate fi confundat cu 'B'.
-             - Verifică prima literă: 'D' poate fi confundat cu 'B' și invers (ex: DOBLEA vs BOBLEA).
-           - Transcrie numele complet, corectând evidentele erori de scriere olografă.
-
-        INSTRUCȚIUNI PENTRU EXTRAS DE CONT (BANCAR):
-           - IDENTIFICARE: Caută termeni precum "Extras de cont", "Cont curent", "IBAN", "Banca", "Sold", "Tranzactii".
-           - SCOP PRINCIPAL: Extrage codul IBAN complet.
-           - FORMAT IBAN ROMÂNIA: Începe obligatoriu cu "RO", urmat de 2 cifre de control, 4 caractere (cod bancă) și 16 caractere alfanumerice. Lungime totală: 24 caractere.
-           - EXEMPLU: RO98 BTRL 0120 1234 5678 90XX.
-           - IGNORĂ spațiile din IBAN la extragere (sau returnează-l compact).
-           - VERIFICĂ vizual dacă IBAN-ul este valid și complet.
-
-        INSTRUCȚIUNI PENTRU POZE CU MAȘINA (FOTO_AUTO):
-           - Dacă imaginea este o fotografie a unui vehicul (avariat sau nu) și pare a fi făcută la fața locului sau pentru dosarul de daună, clasific-o ca 'FOTO_AUTO'.
-           - Nu este nevoie să extragi date specifice (nr. înmatriculare etc.) din aceste poze, doar confirmă tipul.
-
-        INSTRUCȚIUNI DE DEZAMBIGUIZARE ÎNTRE CI, CIV și TALON:
-           - ATENȚIE MAXIMĂ: Nu confunda "Cartea de Identitate" (CI/Buletin) a persoanei cu "Cartea de Identitate a Vehiculului" (CIV) sau cu "Certificatul de Înmatriculare" (TALON).
-           - BULETIN (CI): Identifică strict o persoană fizică ("CARTEA DE IDENTITATE", CNP, Adresa). Nu are date tehnice auto.
-           - TALON: Este "Certificatul de Înmatriculare". Are dimensiuni mai mici, format pe 3 pagini pliate, și conține cuvintele "CERTIFICAT DE ÎNMATRICULARE". Conține date tehnice auto (Marca, Model, VIN).
-           - CARTEA MAȘINII (CIV): Este documentul format A4 (adesea pliat) ce conține cuvintele "CARTEA DE IDENTITATE A VEHICULULUI". Conține date tehnice auto detaliate.
-           - REGULĂ: Doar prezența "Serie Șasiu", "Marca", "Model" NU înseamnă automat "CIV". Verifică titlul documentului: "CERTIFICAT DE ÎNMATRICULARE" = TALON, "CARTEA DE IDENTITATE A VEHICULULUI" = CIV.
-
-        TIPURI ACCEPTATE (tip_document):
-        ["CI", "PERMIS", "TALON", "CIV", "RCA_PAGUBIT", "AMIABILA", "PROCURA", "EXTRAS", "ACTE_VINOVAT", "FOTO_AUTO", "PV_POLITIE", "ALTELE"]
-
-        EXTRAGERE DATE (date_extrase):
-
-        1. PENTRU AMIABILA:
-           - 'data_accident': Data evenimentului (ex: 20.05.2023).
-           - Vehicul A (Imaginea 2 - Stânga):
-             - 'nr_auto_a': Nr. Înmatriculare (Rubrica 7).
-             - 'vin_a': Serie Șasiu (Opțional/Dacă este lizibil).
-             - 'nume_sofer_a': Numele din Rubrica 6 (Prioritar) sau Rubrica 9.
-             - 'asigurator_a': Societatea de asigurări (Rubrica 8).
-
-           - Vehicul B (Imaginea 3 - Dreapta):
-             - 'nr_auto_b': Nr. Înmatriculare (Rubrica 7).
-             - 'vin_b': Serie Șasiu (Opțional/Dacă este lizibil).
-             - 'nume_sofer_b': Numele din Rubrica 6 (Prioritar) sau Rubrica 9.
-             - 'asigurator_b': Societatea de asigurări (Rubrica 8).
-
-        2. PENTRU EXTRAS DE CONT (Folosește Imaginea 1):
-           - 'iban': IBAN-ul complet identificat (RO...).
-
-        3. PENTRU POZE AUTO (FOTO_AUTO):
-           - Nu extrage nimic. Returnează doar "tip_document": "FOTO_AUTO".
-
-        4. PENTRU DOCUMENTE DE IDENTITATE (CI/BULETIN):
-           - 'nume': Nume complet.
-           - 'cnp': Cod Numeric Personal.
-           - 'adresa_domiciliu': Adresa completă de domiciliu (Strada, Nr, Bloc, Scara, Etaj, Ap, Loc, Judet).
-           - 'seria_ci': Seria CI (ex: RX).
-           - 'numar_ci': Numărul CI (ex: 123456).
-           - ATENȚIE: Nu clasifica un document drept "CI" dacă se referă la un vehicul ("Cartea de Identitate a Vehiculului" sau CIV).
-
-        5. PENTRU TALON (CERTIFICAT ÎNMATRICULARE):
-           - 'nr_auto': Nr. Înmatriculare.
-           - 'vin': Serie Șasiu.
-           - 'nume': Nume proprietar/utilizator.
-           - 'cnp': CNP proprietar (dacă apare).
-           - 'marca': Marca vehiculului (ex: VW, Ford).
-           - 'model': Modelul vehiculului (ex: Golf, Focus).
-
-        6. PENTRU CARTEA DE IDENTITATE A VEHICULULUI (CIV):
-           - 'vin': Serie Șasiu.
-           - 'marca': Marca vehiculului.
-           - 'model': Modelul vehiculului.
-           - 'nr_auto': Nr. Înmatriculare (dacă este menționat, uneori este trecut cu pixul sau pe o anexă).
-           - ATENȚIE: Documentul trebuie clasificat "CIV" și nu "CI" dacă reprezintă "Cartea de Identitate a Vehiculului".
-
-        7. PENTRU POLIȚA RCA A PĂGUBITULUI (RCA_PAGUBIT):
-           - 'nr_polita': Numărul poliței de asigurare.
-           - 'asigurator': Societatea de asigurare.
-           - 'data_expirare': Data expirării poliței.
-           - 'nr_auto': Nr. Înmatriculare al vehiculului asigurat.
-
-        8. PENTRU PROCES VERBAL POLIȚIE / ANEXA 2 (PV_POLITIE):
-           - 'data_accident': Data evenimentului (ex: 20.05.2023).
-           - Vehicul A (De regulă Victima / Păgubitul):
-             - 'nr_auto_a': Nr. Înmatriculare.
-             - 'nume_proprietar_a': Numele proprietarului.
-             - 'nume_sofer_a': Numele conducătorului auto.
-             - 'avarii_a': Avariile vehiculului (ex: "bara fata, far stanga").
-           - Vehicul B (De regulă Vinovatul, menționat la sancțiuni):
-             - 'nr_auto_b': Nr. Înmatriculare.
-             - 'nume_proprietar_b': Numele proprietarului.
-             - 'nume_sofer_b': Numele conducătorului auto (vinovatului).
-             - 'avarii_b': Avariile vehiculului.
-             - 'asigurator_b': Societatea de asigurări (RCA).
-
-        Răspunde STRICT în format JSON:
-        {
-            "tip_document": "AMIABILA",
-            "date_extrase": { ... }
-        }
+    @staticmethod
+    def classify(img):
         """
-
+        Etapa 1: tip_document dintr-o miniatură (detail=low, ~85 tokens).
+        Orice eroare => "UNKNOWN", iar analiza trece pe prompt-ul complet.
+        """
+        thumb = imaging.fit_within(img, prompts.CLASSIFY_MAX_EDGE)
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt_text},
-                            # Imagine 1: Full
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_full}"
-                                },
-                            },
-                            # Imagine 2: Stânga (Vehicul A)
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_left}"
-                                },
-                            },
-                            # Imagine 3: Dreapta (Vehicul B)
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_right}"
-                                },
-                            },
-                        ],
-                    }
-                ],
-                max_tokens=1000,
-                temperature=0.0,
-                response_format={"type": "json_object"},
+            data = DocumentAnalyzer._call_model(
+                prompts.CLASSIFY_PROMPT, [imaging.encode_jpeg(thumb, 80)], detail="low", max_tokens=50, label="classify"
+            )
+            tip = str(data.get("tip_document") or "UNKNOWN").upper().strip()
+        except RateLimited:
+            raise
+        except Exception as e:
+            logger.warning(f"Clasificare eșuată, folosesc prompt-ul complet: {e}")
+            return "UNKNOWN"
+        return tip if tip in prompts.DOC_TYPES else "UNKNOWN"
+
+    @staticmethod
+    def _analyze_uncached(image_path, original_bytes, doc_type=None, profile=None, image=None):
+        """
+        doc_type cunoscut => sare peste clasificare.
+        profile forțează profilul de preprocesare (ex: bench_ocr_payload).
+        image: imaginea deja decodată la max_edge-ul DEFAULT (normalized_content), fără a doua decodare.
+        """
+        tip = (doc_type or "").upper()
+
+        # 0. PDF digital: reguli locale pe stratul de text, fără apel la model
+        if image_path.lower().endswith(".pdf") and getattr(settings, "PDF_TEXT_FAST_PATH", True):
+            fast_result, text_tip = pdf_text.analyze_pdf_text(original_bytes, doc_type=tip or None)
+            if fast_result:
+                logger.info(f"PDF text fast path {image_path}: {fast_result['tip_document']}")
+                return DocumentAnalyzer._normalize_data(fast_result)
+            # Tipul e clar din text, dar câmpurile nu => sărim doar peste clasificarea vision
+            tip = tip or (text_tip or "")
+
+        max_edge = profile["max_edge"] if profile else imaging.UPLOAD_PROFILES["DEFAULT"]["max_edge"]
+        if image is not None and not profile:
+            pages = (page for page in [image])
+        else:
+            pages = DocumentAnalyzer.iter_images(
+                image_path, original_bytes, max_edge, max_pages=getattr(settings, "PDF_MAX_PAGES", 5)
             )
+        try:
+            # 1. Decodare unică a primei pagini (la rezoluția maximă a oricărui profil)
+            try:
+                img = next(pages)
+            except Exception as e:
+                logger.error(f"Eroare procesare imagine (Pillow/PDF): {e}")
+                return {"tip_document": "UNKNOWN", "date_extrase": {}, "error": f"Image processing error: {str(e)}"}
+
+            # 2. Etapa 1: Clasificare
+            if tip not in prompts.DOC_TYPES:
+                tip = DocumentAnalyzer.classify(img)
+                logger.info(f"Clasificare {image_path}: {tip}")
 
-            content = response.choices[0].message.content
-            data = json.loads(content)
+            if tip in prompts.NO_EXTRACTION_TYPES:
+                return {"tip_document": tip, "date_extrase": {}}
+
+            # 3. Etapa 2: Extragere specifică tipului (doar AMIABILA primește crop-urile)
+            profile = profile or imaging.upload_profile(tip)
+            try:
+                prompt_text, payloads = DocumentAnalyzer._prepare_extraction(img, tip, profile)
+                stats = imaging.payload_stats(len(original_bytes), payloads)
+                logger.info(
+                    f"Preprocesare {image_path}: {stats['bytes_in']} -> {stats['bytes_out']} octeți "
+                    f"(x{stats['ratio']}, profil {profile}, tip {tip})"
+                )
+            except Exception as e:
+                logger.error(f"Eroare procesare imagine (Pillow/PDF): {e}")
+                return {"tip_document": "UNKNOWN", "date_extrase": {}, "error": f"Image processing error: {str(e)}"}
+
+            try:
+                data = DocumentAnalyzer._call_model(prompt_text, payloads)
+                if tip != "UNKNOWN":
+                    data.setdefault("tip_document", tip)
+            except RateLimited:
+                raise
+            except Exception as e:
+                logger.error(f"Eroare OpenAI: {e}")
+                return {"tip_document": "UNKNOWN", "date_extrase": {}, "error": str(e)}
+
+            # 4. PDF cu mai multe pagini: continuăm doar cât timp lipsesc câmpuri obligatorii
+            tip = str(data.get("tip_document") or tip).upper()
+            pages_used = 1
+            while DocumentAnalyzer.missing_fields(data, tip):
+                try:
+                    img = next(pages)
+                except StopIteration:
+                    break
+                try:
+                    prompt_text, payloads = DocumentAnalyzer._prepare_extraction(img, tip, profile)
+                    page_data = DocumentAnalyzer._call_model(prompt_text, payloads)
+                except RateLimited:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Pagina {pages_used + 1} din {image_path} nu a putut fi analizată: {e}")
+                    break
+                DocumentAnalyzer._merge_page(data, page_data)
+                pages_used += 1
+
+            if pages_used > 1:
+                logger.info(
+                    f"{image_path}: {pages_used} pagini analizate, lipsă: {DocumentAnalyzer.missing_fields(data, tip)}"
+                )
             return DocumentAnalyzer._normalize_data(data)
+        finally:
+            pages.close()
 
-        except Exception as e:
-            logger.error(f"Eroare OpenAI: {e}")
-            return {"tip_document": "UNKNOWN", "date_extrase": {}, "error": str(e)}
+    @staticmethod
+    def _prepare_extraction(img, tip, profile):
+        """Returnează (prompt, lista_jpeg) pentru etapa de extragere a unei pagini."""
+        if tip in prompts.EXTRACTION_PROMPTS:
+            enhanced = DocumentAnalyzer._enhance(img, profile)
+            return prompts.EXTRACTION_PROMPTS[tip], [imaging.encode_jpeg(enhanced, profile["quality"])]
+        # AMIABILA sau clasificare eșuată (UNKNOWN) -> Split & Scan
+        prompt_text = prompts.AMIABILA_PROMPT if tip == "AMIABILA" else prompts.COMBINED_PROMPT
+        return prompt_text, DocumentAnalyzer.split_payload(img, profile)
+
+    @staticmethod
+    def missing_fields(data, tip):
+        extracted = (data or {}).get("date_extrase") or {}
+        return [key for key in prompts.REQUIRED_FIELDS.get(tip, ()) if not extracted.get(key)]
+
+    @staticmethod
+    def _merge_page(data, page_data):
+        """Completează doar câmpurile lipsă cu ce s-a găsit pe pagina curentă."""
+        extracted = data.get("date_extrase")
+        if not isinstance(extracted, dict):
+            extracted = data["date_extrase"] = {}
+        for key, value in ((page_data or {}).get("date_extrase") or {}).items():
+            if value and not extracted.get(key):
+                extracted[key] = value
 
     @staticmethod
     def analyze_multiple(image_paths):
@@ -274,101 +298,63 @@ class DocumentAnalyzer:
         Analyzes a group of images together, expecting them to potentially represent
         multiple pages of the same document (e.g., CIV).
         """
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-        content = [
-            {
-                "type": "text",
-                "text": """
-        Ești un expert în asigurări auto și procesare de documente (OCR), specializat pe documente românești.
-        Ai primit mai multe imagini simultan. Aceste imagini reprezintă probabil DIFERITE PAGINI SAU SECȚIUNI ALE ACELUIAȘI DOCUMENT (cum ar fi "Cartea de Identitate a Vehiculului" - CIV, care este pliată și fotografiată pe bucăți).
-
-        SARCINA TA:
-        - Analizează toate imaginile împreună ca un tot unitar.
-        - Identifică tipul documentului asamblat. Dacă măcar una din imagini este clar o parte din CIV (Cartea Mașinii) și celelalte par a fi celelalte pagini ale CIV-ului, returnează tipul "CIV".
-        - Extrage datele relevante coroborând informațiile din toate paginile.
-
-        INSTRUCȚIUNI DE DEZAMBIGUIZARE ÎNTRE CI, CIV și TALON:
-        - ATENȚIE MAXIMĂ: Nu confunda "Cartea de Identitate" (CI/Buletin) a persoanei cu "Cartea de Identitate a Vehiculului" (CIV) sau cu "Certificatul de Înmatriculare" (TALON).
-        - BULETIN (CI): Identifică strict o persoană fizică. Nu are date tehnice auto.
-        - TALON: Este "Certificatul de Înmatriculare". Are dimensiuni mai mici, format pe 3 pagini pliate, și conține cuvintele "CERTIFICAT DE ÎNMATRICULARE". Conține date tehnice auto (Marca, Model, VIN).
-        - CARTEA MAȘINII (CIV): Este documentul format A4 (adesea pliat) ce conține cuvintele "CARTEA DE IDENTITATE A VEHICULULUI". Conține date tehnice auto detaliate.
-        - REGULĂ: Doar prezența "Serie Șasiu", "Marca", "Model" NU înseamnă automat "CIV". Verifică titlul documentului asamblat: "CERTIFICAT DE ÎNMATRICULARE" = TALON, "CARTEA DE IDENTITATE A VEHICULULUI" = CIV.
-
-        TIPURI ACCEPTATE (tip_document):
-        ["CI", "PERMIS", "TALON", "CIV", "RCA_PAGUBIT", "AMIABILA", "PROCURA", "EXTRAS", "ACTE_VINOVAT", "FOTO_AUTO", "PV_POLITIE", "ALTELE", "UNKNOWN"]
-
-        EXTRAGERE DATE (date_extrase) - PENTRU CARTEA DE IDENTITATE A VEHICULULUI (CIV):
-        - 'vin': Serie Șasiu (de obicei se găsește pe prima pagină a CIV).
-        - 'marca': Marca vehiculului.
-        - 'model': Modelul vehiculului.
-        - 'nr_auto': Nr. Înmatriculare (dacă este menționat, uneori pe anexe).
-
-        Răspunde STRICT în format JSON:
-        {
-            "tip_document": "CIV",
-            "date_extrase": { "vin": "...", "marca": "...", "model": "..." }
-        }
-        """
-            }
-        ]
-
-        # Process each image and append to content
+        files = []
         for path in image_paths:
             try:
                 with open(path, "rb") as image_file:
-                    original_bytes = image_file.read()
-
-                # Handling PDF fallback just in case
-                if path.lower().endswith(".pdf"):
-                    doc = fitz.open("pdf", original_bytes)
-                    if doc.page_count > 0:
-                        page = doc.load_page(0)
-                        zoom_matrix = fitz.Matrix(2.0, 2.0)
-                        pix = page.get_pixmap(matrix=zoom_matrix)
-                        original_bytes = pix.tobytes("png")
-                    doc.close()
-
-                img = Image.open(io.BytesIO(original_bytes))
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-                img = ImageOps.autocontrast(img)
-
-                buffered = io.BytesIO()
-                img.save(buffered, format="JPEG")
-                b64_img = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-                content.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{b64_img}"
-                    }
-                })
+                    files.append((path, image_file.read()))
+            except Exception as e:
+                logger.error(f"Eroare citire fișier în analiză multiplă {path}: {e}")
+
+        max_edge = imaging.upload_profile("CIV")["max_edge"]
+        contents = [DocumentAnalyzer.normalized_content(path, data, max_edge)[0] for path, data in files]
+        cache_key = ocr_cache.make_key([b"multiple"] + contents, cache_version())
+        cached = ocr_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"OCR cache HIT analiză multiplă ({ocr_cache.stats()})")
+            return cached
+
+        result = DocumentAnalyzer._analyze_multiple_uncached(files)
+        if result and not result.get("error"):
+            ocr_cache.set(cache_key, result)
+        return result
+
+    @staticmethod
+    def _analyze_multiple_uncached(files):
+        # Analiza multiplă e folosită în principal pentru paginile CIV
+        profile = imaging.upload_profile("CIV")
+        payloads = []
+        bytes_in = 0
+
+        # Process each image
+        for path, original_bytes in files:
+            try:
+                # PDF-urile contribuie cu toate paginile (randate pe rând, plafonat la PDF_MAX_PAGES)
+                for img in DocumentAnalyzer.iter_images(
+                    path, original_bytes, profile["max_edge"], max_pages=getattr(settings, "PDF_MAX_PAGES", 5)
+                ):
+                    img = ImageOps.autocontrast(img)
+                    payloads.append(imaging.encode_jpeg(img, profile["quality"]))
+                bytes_in += len(original_bytes)
             except Exception as e:
                 logger.error(f"Eroare preluare imagine in analiză multiplă {path}: {e}")
                 continue
 
-        if len(content) == 1:
+        if not payloads:
              return {"tip_document": "UNKNOWN", "date_extrase": {}, "error": "No valid images could be loaded."}
 
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": content,
-                    }
-                ],
-                max_tokens=1000,
-                temperature=0.0,
-                response_format={"type": "json_object"},
-            )
+        stats = imaging.payload_stats(bytes_in, payloads)
+        logger.info(
+            f"Preprocesare analiză multiplă ({len(payloads)} imagini): "
+            f"{stats['bytes_in']} -> {stats['bytes_out']} octeți"
+        )
 
-            response_content = response.choices[0].message.content
-            data = json.loads(response_content)
+        try:
+            data = DocumentAnalyzer._call_model(prompts.MULTIPLE_PROMPT, payloads, label="multiple")
             return DocumentAnalyzer._normalize_data(data)
 
+        except RateLimited:
+            raise
         except Exception as e:
             logger.error(f"Eroare OpenAI analiză multiplă: {e}")
             return {"tip_document": "UNKNOWN", "date_extrase": {}, "error": str(e)}
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Case, CaseDocument, InvolvedVehicle
+from django.db.models import Q
+from . import case_index
+from .models import Case, CaseDocument, Client, CommunicationLog, InvolvedVehicle
 from .tasks import send_admin_new_case_email_task
 
 
@@ -18,6 +20,81 @@ def notify_admin_new_case(sender, instance, created, **kwargs):
             send_admin_new_case_email_task.delay(instance.id)
 
 
+@receiver(post_save, sender=CommunicationLog)
+def track_inbound_channel(sender, instance, created, **kwargs):
+    """
+    Ține pe Case canalul și ora ultimului mesaj primit (get_client nu mai scanează jurnalul).
+    Update atomic, doar dacă mesajul e mai nou decât cel deja înregistrat.
+    """
+    if not created or instance.direction != "IN" or not instance.case_id:
+        return
+    Case.objects.filter(pk=instance.case_id).filter(
+        Q(last_inbound_at__isnull=True) | Q(last_inbound_at__lte=instance.created_at)
+    ).update(last_inbound_channel=instance.channel, last_inbound_at=instance.created_at)
+    # Instanța dosarului din memorie (ex. cea a FlowManager-ului din chat_send) vede imediat canalul
+    if CommunicationLog.case.is_cached(instance):
+        case = instance.case
+        if case.last_inbound_at is None or case.last_inbound_at <= instance.created_at:
+            case.last_inbound_channel, case.last_inbound_at = instance.channel, instance.created_at
+
+
+# --- Indexul pentru asocierea emailurilor cu dosarele (apps/claims/case_index.py) ---
+INDEXED_FIELDS = {
+    Case: ("insurer_claim_number",),
+    InvolvedVehicle: ("case_id", "role", "license_plate"),
+    Client: ("first_name", "last_name"),
+}
+
+
+def index_entries(model, pk, values):
+    """Pattern-urile (tip, pattern, payload) pe care un rând le contribuie la index (values: INDEXED_FIELDS)."""
+    if model is Case:
+        return {(case_index.CLAIM, case_index.normalize_claim(values["insurer_claim_number"]), str(pk))}
+    if model is InvolvedVehicle:
+        if values["role"] != InvolvedVehicle.Role.VICTIM:
+            return set()
+        return {(case_index.PLATE, case_index.normalize_plate(values["license_plate"]), str(values["case_id"]))}
+    entries = case_index.client_name_entries(pk, values["first_name"], values["last_name"])
+    return {(case_index.NAME, name, payload) for name, payload in entries}
+
+
+def _instance_entries(model, instance):
+    return index_entries(model, instance.pk, {field: getattr(instance, field) for field in INDEXED_FIELDS[model]})
+
+
+def snapshot_index_entries(sender, instance, update_fields=None, **kwargs):
+    """
+    Pattern-urile rândului de dinainte de salvare, citite doar la save (nu la fiecare încărcare
+    a modelului): o interogare pe coloanele indexate, sărită dacă update_fields nu le atinge.
+    """
+    fields = INDEXED_FIELDS[sender]
+    if update_fields is not None and not set(update_fields) & ({f.removesuffix("_id") for f in fields} | set(fields)):
+        instance._index_entries = None  # nimic de publicat
+        return
+    row = None
+    if not instance._state.adding:
+        row = sender._base_manager.filter(pk=instance.pk).values(*fields).first()
+    instance._index_entries = index_entries(sender, instance.pk, row) if row else set()
+
+
+def publish_index_changes(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_index_entries", set())
+    if previous is None:
+        return
+    current = _instance_entries(sender, instance)
+    case_index.publish(remove=previous - current, add=current - previous)
+
+
+def publish_index_removal(sender, instance, **kwargs):
+    case_index.publish(remove=_instance_entries(sender, instance))
+
+
+for _model in INDEXED_FIELDS:
+    pre_save.connect(snapshot_index_entries, sender=_model, dispatch_uid=f"case_index_pre_save_{_model.__name__}")
+    post_save.connect(publish_index_changes, sender=_model, dispatch_uid=f"case_index_save_{_model.__name__}")
+    post_delete.connect(publish_index_removal, sender=_model, dispatch_uid=f"case_index_delete_{_model.__name__}")
+
+
 @receiver(post_save, sender=CaseDocument)
 def process_ocr_data(sender, instance, created, **kwargs):
     """
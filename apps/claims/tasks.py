@@ -1,31 +1,69 @@
-from celery import shared_task
-from django.core.mail import EmailMessage
+from celery import chord, shared_task
+from celery.exceptions import Retry
 from django.conf import settings
-from .models import Case, CaseDocument, Insurer, InvolvedVehicle
+from .models import Case, CaseDocument, Insurer, InvolvedVehicle, UploadBatch
 from .services import DocumentAnalyzer
+from .rate_governor import RateLimited
+from .dedup import link_duplicate
+from .debounce import debouncer, handler_for
+from . import dossier, idempotency, imap_idle, inbound, mailer, packaging
 from apps.bot.utils import WhatsAppClient, WebChatClient
-import imaplib
-import email
-from email.header import decode_header
-import re
+from config.celery import PRIORITY_BULK, PRIORITY_DEFAULT
 import os
 import requests
-import tempfile
-import shutil
+import uuid
 
 
 # --- TASK 1: Procesare Input (Documente & AI) ---
-@shared_task
-def analyze_document_task(document_id):
+# Re-programări maxime când limita OpenAI e atinsă (fiecare cu countdown calculat de guvernor)
+AI_RATE_LIMIT_MAX_RETRIES = 20
+
+# Ferestre de debounce (secunde): fiecare eveniment nou mută termenul, execuția pornește o singură dată
+GROUPED_UNKNOWNS_WINDOW = 15
+INSURER_RELAY_QUIET_PERIOD = 30 * 60
+DOSSIER_UPDATE_WINDOW = 60
+
+
+@shared_task(bind=True, max_retries=AI_RATE_LIMIT_MAX_RETRIES)
+def analyze_document_task(self, document_id):
     doc = None
+    run = None
     try:
         print(f"--- [AI WORKER] Procesez Doc ID: {document_id} cu OpenAI ---")
 
         doc = CaseDocument.objects.get(id=document_id)
         case = doc.case
 
-        # 1. Analiza OpenAI
-        result = DocumentAnalyzer.analyze(doc.file.path)
+        # 0. Idempotență: mesaj re-livrat / task duplicat pentru același fișier
+        decision, run = idempotency.claim_run(doc, self.request.id)
+        if decision == idempotency.ALREADY_DONE:
+            print(f"ℹ️ Doc ID {document_id} a fost deja analizat, ignor invocarea duplicată.")
+            return
+        if decision == idempotency.IN_PROGRESS:
+            if doc.batch_id:
+                # În chord-ul lotului un succes acum ar declanșa finalize_upload_batch_task înainte
+                # de analiza reală: așteptăm worker-ul care o ține (sau expirarea lease-ului)
+                print(f"ℹ️ Doc ID {document_id} e deja în analiză pe alt worker, reverific mai târziu.")
+                raise self.retry(countdown=settings.ANALYSIS_IN_PROGRESS_RETRY_SECONDS, max_retries=None)
+            print(f"ℹ️ Doc ID {document_id} e deja în analiză pe alt worker.")
+            return
+
+        # Poză retrimisă? O legăm de originalul deja analizat, fără apel AI
+        original = link_duplicate(doc)
+        if original:
+            print(f"♻️ Doc ID {document_id} e duplicat al Doc ID {original.id}, nu îl mai analizez.")
+            idempotency.mark_done(run)
+            notify_single_document(case, doc)
+            return
+
+        # 1. Analiza OpenAI (sau rezultatul deja plătit dintr-o rulare întreruptă)
+        if run.result is not None:
+            result = run.result
+            print(f"♻️ Refolosesc rezultatul salvat pentru Doc ID {document_id}")
+        else:
+            idempotency.mark_running(run)
+            result = DocumentAnalyzer.analyze(doc.file.path)
+            idempotency.store_result(run, result)
         print(f"🤖 Rezultat AI: {result}")
 
         # Mapăm tipul primit de la AI la Enum-ul din Django
@@ -39,6 +77,7 @@ def analyze_document_task(document_id):
             doc.ocr_data = {}
             doc.doc_type = CaseDocument.DocType.UNKNOWN
             doc.save()
+            idempotency.mark_done(run)
 
             cache_key = f"civ_wait_notified_{case.id}"
 
@@ -52,10 +91,10 @@ def analyze_document_task(document_id):
                 # Set cache to avoid spamming the user
                 cache.set(cache_key, True, timeout=120)
 
-            # Queue the multi-image fallback check to run in 15 seconds
-            # Use import delay locally to avoid circular dependencies if any
-            from apps.claims.tasks import process_grouped_unknowns_task
-            process_grouped_unknowns_task.apply_async(args=[case.id], countdown=15)
+            # Multi-image fallback: fiecare poză neidentificată mută termenul (debounce per dosar);
+            # analiza combinată pornește o singură dată, la 15 secunde după ultima poză
+            if not debouncer.touch("grouped_unknowns", case.id, GROUPED_UNKNOWNS_WINDOW):
+                process_grouped_unknowns_task.apply_async(args=[case.id], countdown=GROUPED_UNKNOWNS_WINDOW)
 
             return
 
@@ -130,32 +169,36 @@ def analyze_document_task(document_id):
         # Aplicăm update-urile atomice pe Case
         if updates:
             Case.objects.filter(pk=case.pk).update(**updates)
-
-        # 3. Verificare Flux și Notificare (Consolidată)
-        # Verificăm dacă mai sunt alte documente în procesare pentru acest dosar
-        from django.utils import timezone
-        import datetime
-
-        recent_threshold = timezone.now() - datetime.timedelta(minutes=5)
-
-        # Numărăm documentele pending (excluzând cel curent, deși el e deja salvat cu ocr_data deci nu mai e pending)
-        # Atenție: JSONField gol poate fi 'null' sau '{}'. FlowManager pune '{}'.
-        pending_count = (
-            CaseDocument.objects.filter(
-                case=case, uploaded_at__gte=recent_threshold, ocr_data__exact={}
-            )
-            .exclude(id=doc.id)
-            .count()
-        )
-
-        if pending_count == 0:
-            # Suntem ultimul task din "lot". Notificăm.
-            check_status_and_notify(case)
-        else:
-            print(f"⏳ Încă {pending_count} documente în procesare. Aștept.")
+        idempotency.mark_done(run)
+        schedule_dossier_update(case.id)
+
+        # 3. Verificare Flux și Notificare
+        # Documentele dintr-un lot sunt notificate o singură dată de finalize_upload_batch_task
+        notify_single_document(case, doc)
+
+    except Retry:
+        raise
+
+    except RateLimited as e:
+        if run:
+            idempotency.release(run)
+        if self.request.retries < self.max_retries:
+            print(f"⏳ [AI WORKER] Limită OpenAI, Doc ID {document_id} re-programat în {e.retry_after}s")
+            raise self.retry(countdown=e.retry_after, exc=e)
+        print(f"--- [AI ERROR] Limită OpenAI depășită după {self.request.retries} reîncercări ---")
+        if doc:
+            try:
+                get_client(doc.case).send_text(
+                    doc.case,
+                    "⚠️ A apărut o eroare la procesarea documentului. Te rog încearcă din nou sau încarcă o poză mai clară.",
+                )
+            except Exception:
+                pass
 
     except Exception as e:
         print(f"--- [AI ERROR] {e} ---")
+        if run:
+            idempotency.release(run)
         if doc:
             try:
                 client = get_client(doc.case)
@@ -167,17 +210,63 @@ def analyze_document_task(document_id):
                 pass
 
 
+def notify_single_document(case, doc):
+    """Documentele analizate în afara unui lot (re-analiză, admin) notifică imediat."""
+    if doc.batch_id is None:
+        check_status_and_notify(case)
+
+
+# --- Loturi de upload: un group Celery + un singur callback de notificare (chord) ---
+def dispatch_upload_batch(case, documents, priority=PRIORITY_DEFAULT):
+    """
+    Creează un UploadBatch pentru documentele primite într-un mesaj și pornește analiza
+    lor în paralel. Callback-ul rulează o singură dată, după ce toate analizele s-au terminat.
+    `priority` ordonează coada OCR (chat înaintea atașamentelor din email).
+    Întoarce AsyncResult-ul callback-ului.
+    """
+    batch = UploadBatch.objects.create(case=case, document_count=len(documents))
+    CaseDocument.objects.filter(id__in=[d.id for d in documents]).update(batch=batch)
+    header = [analyze_document_task.si(d.id).set(priority=priority) for d in documents]
+    return chord(header)(finalize_upload_batch_task.si(str(batch.id)))
+
+
+@shared_task
+def finalize_upload_batch_task(batch_id):
+    from django.utils import timezone
+
+    # Marcare atomică: o livrare dublă a callback-ului nu mai trimite încă o notificare
+    claimed = UploadBatch.objects.filter(id=batch_id, notified_at__isnull=True).update(notified_at=timezone.now())
+    if not claimed:
+        print(f"ℹ️ Lotul {batch_id} a fost deja notificat.")
+        return
+
+    batch = UploadBatch.objects.select_related("case").get(id=batch_id)
+    print(f"📦 Lot {batch_id} terminat ({batch.document_count} documente). Notific clientul.")
+    check_status_and_notify(batch.case, batch=batch)
+
+
+# Clienții de canal sunt fără stare: o instanță per proces și clasă (clientul Twilio își păstrează conexiunile)
+_channel_clients = {}
+
+
+def get_channel_client(channel):
+    client_class = WebChatClient if channel == "WEB" else WhatsAppClient
+    key = (os.getpid(), client_class)
+    client = _channel_clients.get(key)
+    if client is None:
+        client = _channel_clients[key] = client_class()
+    return client
+
+
 def get_client(case):
-    # Detectare canal preferat bazat pe ultimul mesaj primit
-    last_log = case.logs.filter(direction="IN").order_by("-created_at").first()
-    if last_log and last_log.channel == "WEB":
-        return WebChatClient()
-    return WhatsAppClient()
+    # Canalul preferat = canalul ultimului mesaj primit (denormalizat pe Case, fără query pe jurnal)
+    return get_channel_client(case.last_inbound_channel)
 
 
-def check_status_and_notify(case, processed_doc=None):
+def check_status_and_notify(case, processed_doc=None, batch=None):
     """
     Verifică ce documente lipsesc și notifică clientul pe WhatsApp/Web.
+    Cu `batch`, raportul "Am validat" acoperă exact documentele lotului.
     """
     # 0. Refresh Case pentru a vedea flag-urile actualizate de alte task-uri
     try:
@@ -201,15 +290,23 @@ def check_status_and_notify(case, processed_doc=None):
     recent_threshold = timezone.now() - datetime.timedelta(minutes=5)
 
     # Excludem documentele vechi care au fost deja validate in trecut
-    recent_docs = CaseDocument.objects.filter(
-        case=case, uploaded_at__gte=recent_threshold
-    ).exclude(ocr_data__exact={})
+    if batch is not None:
+        recent_docs = batch.documents.exclude(ocr_data__exact={})
+    else:
+        recent_docs = CaseDocument.objects.filter(
+            case=case, uploaded_at__gte=recent_threshold
+        ).exclude(ocr_data__exact={})
 
     # Construim lista de documente validate și erori
     validated_names = []
     error_messages = []
+    duplicates_count = 0
 
     for d in recent_docs:
+        # Poze retrimise: nu le mai validăm încă o dată, doar le numărăm
+        if d.duplicate_of_id:
+            duplicates_count += 1
+            continue
         # Verificăm dacă e un tip valid sau Unknown
         if d.doc_type == CaseDocument.DocType.UNKNOWN:
             # Check cache to avoid spamming the generic error if the user is already waiting
@@ -244,7 +341,7 @@ def check_status_and_notify(case, processed_doc=None):
 
     # Conditie: Video 360 SAU Minim 4 Poze
     damage_photos_count = CaseDocument.objects.filter(
-        case=case, doc_type=CaseDocument.DocType.DAMAGE_PHOTO
+        case=case, doc_type=CaseDocument.DocType.DAMAGE_PHOTO, duplicate_of__isnull=True
     ).count()
 
     if not case.has_scene_video and damage_photos_count < 4:
@@ -266,7 +363,7 @@ def check_status_and_notify(case, processed_doc=None):
             if not guilty_vehicle:
                 # Trecem in stadiul de selectare a asiguratorului vinovatului
                 case.stage = Case.Stage.SELECTING_GUILTY_INSURER
-                case.save()
+                case.save(update_fields=["stage", "updated_at"])
 
                 # Extragem toti asiguratorii din baza de date pentru a-i afisa utilizatorului
                 from apps.claims.models import Insurer
@@ -289,7 +386,7 @@ def check_status_and_notify(case, processed_doc=None):
 
             elif case.resolution_choice != Case.Resolution.UNDECIDED:
                 case.stage = Case.Stage.SIGNING_MANDATE
-                case.save()
+                case.save(update_fields=["stage", "updated_at"])
 
                 domain = settings.APP_DOMAIN
                 link = f"{domain}/mandat/semneaza/{case.id}/"
@@ -317,6 +414,9 @@ def check_status_and_notify(case, processed_doc=None):
             if error_messages:
                 parts.extend(error_messages)
 
+            if duplicates_count:
+                parts.append(f"♻️ {duplicates_count} fișier(e) erau duplicate ale unor documente deja primite; nu le-am numărat din nou.")
+
             # C. Missing
             parts.append("Mai am nevoie de:\n- " + "\n- ".join(missing))
 
@@ -325,8 +425,8 @@ def check_status_and_notify(case, processed_doc=None):
 
 
 # --- TASK 1.5: Fallback Multi-Image Processing for CIV/Unknowns ---
-@shared_task
-def process_grouped_unknowns_task(case_id):
+@shared_task(bind=True, max_retries=AI_RATE_LIMIT_MAX_RETRIES)
+def process_grouped_unknowns_task(self, case_id):
     """
     Called 15 seconds after an UNKNOWN document is uploaded.
     Collects all UNKNOWN documents uploaded in the last few minutes and analyzes them together.
@@ -388,6 +488,7 @@ def process_grouped_unknowns_task(case_id):
                     else:
                         doc.ocr_data = {"note": "Atașat la documentul principal."}
                     doc.save()
+                schedule_dossier_update(case.id)
 
             if updates:
                 Case.objects.filter(pk=case.pk).update(**updates)
@@ -406,6 +507,13 @@ def process_grouped_unknowns_task(case_id):
                 "⚠️ Analiza combinată a pozelor nu a reușit să identifice un document valid (CIV etc.). Te rog reîncearcă cu poze mai clare."
             )
 
+    except RateLimited as e:
+        if self.request.retries < self.max_retries:
+            print(f"⏳ [AI WORKER MULTI-IMAGE] Limită OpenAI, dosar {case_id} re-programat în {e.retry_after}s")
+            raise self.retry(countdown=e.retry_after, exc=e)
+        print(f"--- [AI MULTI-IMAGE ERROR] Limită OpenAI depășită: {e} ---")
+        cache.delete(f"civ_wait_notified_{case_id}")
+
     except Exception as e:
         print(f"--- [AI MULTI-IMAGE ERROR] {e} ---")
         cache.delete(f"civ_wait_notified_{case_id}")
@@ -458,7 +566,7 @@ def send_claim_email_task(case_id):
                         # Salvăm în dosar ce am găsit
                         case.insurer_name = insurer.name
                         case.insurer_email = insurer.email_claims
-                        case.save()
+                        case.save(update_fields=["insurer_name", "insurer_email", "updated_at"])
 
                         print(
                             f"✅ MATCH ASIGURATOR: '{detected_text}' -> {insurer.name} ({target_email})"
@@ -494,12 +602,13 @@ Dosarul {str(case.id)[:8]} (Client: {client.full_name}) nu a putut fi trimis la
 
 Te rugăm să completezi aceste date în baza de date și să re-inițiezi trimiterea emailului.
 """
-            EmailMessage(
+            mailer.enqueue(
+                kind="admin_alert",
+                case=case,
                 subject=alert_subject,
                 body=alert_body,
-                from_email=settings.DEFAULT_FROM_EMAIL,
                 to=["office@autodaune.ro"],
-            ).send()
+            )
 
             return  # Stop execution, nu mai trimitem la asigurator
 
@@ -517,73 +626,29 @@ Solicităm constatarea ONLINE.
 
 Contact: {client.phone_number}"""
 
-        email = EmailMessage(
+        # --- PASUL 3 + 4: Atașare Documente și Trimitere (prin outbox) ---
+        # Pozele re-encodate, actele unite în PDF, videoclipurile mari ca link; peste buget => continuări
+        emails = packaging.enqueue_case_email(
+            case,
+            kind="claim",
             subject=subject,
             body=body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
             to=[target_email],
             cc=["office@autodaune.ro"],  # Copie către administrator
+            docs=CaseDocument.objects.filter(case=case),
         )
 
-        # --- PASUL 3: Atașare Documente ---
-        docs = CaseDocument.objects.filter(case=case)
-        count = 0
-
-        # Creăm un director temporar unic pentru acest task
-        task_tmp_dir = tempfile.mkdtemp()
-
-        try:
-            for doc in docs:
-                if doc.file:
-                    try:
-                        # Determinăm tipul (PDF, Imagine, Video)
-                        fname = doc.file.name.lower()
-                        if fname.endswith(".pdf"):
-                            content_type = "application/pdf"
-                        elif fname.endswith(".png"):
-                            content_type = "image/png"
-                        elif fname.endswith(".jpg") or fname.endswith(".jpeg"):
-                            content_type = "image/jpeg"
-                        elif fname.endswith(".mp4"):
-                            content_type = "video/mp4"
-                        elif fname.endswith(".mov"):
-                            content_type = "video/quicktime"
-                        else:
-                            content_type = "application/octet-stream"
-
-                        # Nume fișier lizibil pentru atașament
-                        doc_label = doc.get_doc_type_display().replace("/", "_").replace(" ", "_")
-                        clean_name = f"{doc_label}_{count}.{fname.split('.')[-1]}"
-
-                        # Calea unică în directorul temporar
-                        tmp_path = os.path.join(task_tmp_dir, clean_name)
-
-                        # Copiem de la source path la tmp_path
-                        # doc.file.path e calea locală
-                        shutil.copy(doc.file.path, tmp_path)
-
-                        # Atașăm
-                        email.attach_file(tmp_path, content_type)
-
-                        count += 1
-                    except Exception as e:
-                        print(f"⚠️ Eroare atașare {doc.file.name}: {e}")
-
-            # --- PASUL 4: Trimitere ---
-            email.send()
-
-        finally:
-            # Curățăm directorul temporar recursiv
-            if os.path.exists(task_tmp_dir):
-                shutil.rmtree(task_tmp_dir)
+        # Firul emailului: reminderele și relay-urile răspund la primul mesaj până scrie asiguratorul
+        if not case.last_email_message_id:
+            case.last_email_message_id = emails[0].message_id
 
         # Confirmăm pe consolă
-        print(f"🚀 Email trimis cu succes la {target_email}")
+        print(f"🚀 Email pus în outbox pentru {target_email} ({len(emails)} mesaj(e))")
 
         # Tracking timpul primului mail catre asigurator
         from django.utils import timezone
         case.last_message_to_insurer_at = timezone.now()
-        case.save()
+        case.save(update_fields=["last_email_message_id", "last_message_to_insurer_at", "updated_at"])
 
         # Notă: Nu schimbăm 'stage' aici, rămâne PROCESSING_INSURER până răspund ei.
 
@@ -595,210 +660,94 @@ Contact: {client.phone_number}"""
 @shared_task
 def check_email_replies_task():
     """
-    Verifică inboxul pentru reply-uri de la asiguratori.
-    Identifică dosarul după ID-ul din subiect.
+    Verifică inboxul pentru reply-uri de la asiguratori (doar mesajele noi, vezi apps/claims/inbound.py).
+    Identifică dosarul după ID-ul din subiect (sau după textul emailului).
     Dacă e ofertă -> Declansază OFFER_DECISION.
     Altfel -> Forward la client pe WhatsApp.
     """
-    # Folosim IMAP_HOST dacă e definit (pentru separare de SMTP), altfel fallback la EMAIL_HOST
-    IMAP_HOST = os.getenv("IMAP_HOST", os.getenv("EMAIL_HOST", "imap.gmail.com"))
-    # Preferăm variabile dedicate pentru IMAP, altfel fallback la cele de email general
-    IMAP_USER = os.getenv("IMAP_USER", os.getenv("EMAIL_HOST_USER"))
-    IMAP_PASS = os.getenv("IMAP_PASSWORD", os.getenv("EMAIL_HOST_PASSWORD"))
-
-    if not IMAP_USER or not IMAP_PASS:
+    if not getattr(settings, "IMAP_USER", "") or not getattr(settings, "IMAP_PASSWORD", ""):
         print("❌ Lipsă credențiale IMAP")
         return
+    if imap_idle.listener_alive():
+        # Listener-ul IDLE procesează deja cutia pe conexiunea lui; nu o citim în paralel
+        return
 
     try:
-        mail = imaplib.IMAP4_SSL(IMAP_HOST)
-        mail.login(IMAP_USER, IMAP_PASS)
-        mail.select("inbox")
-
-        # Căutăm mesaje necitite care conțin "Dosar" în subiect
-        # Optimizare: nu procesăm spam-ul sau alte emailuri
-        status, messages = mail.search(None, "(UNSEEN)")
-        if status != "OK":
-            return
-
-        msg_ids = messages[0].split()
-        for num in msg_ids:
-            try:
-                # Fetch headers only first? No, we need body too.
-                _, msg_data = mail.fetch(num, "(RFC822)")
-                for response_part in msg_data:
-                    if isinstance(response_part, tuple):
-                        msg = email.message_from_bytes(response_part[1])
-                        subject, encoding = decode_header(msg["Subject"])[0]
-                        if isinstance(subject, bytes):
-                            subject = subject.decode(encoding or "utf-8")
-
-                        sender = msg.get("From")
-                        print(f"📧 Mesaj nou: {subject} de la {sender}")
-
-                        # 0. Parsăm body și extragem atașamente
-                        body = ""
-                        downloaded_attachments_data = [] # To be created as CaseDocument later when we have a case
-
-                        if msg.is_multipart():
-                            for part in msg.walk():
-                                content_type = part.get_content_type()
-                                content_disposition = str(part.get("Content-Disposition"))
-
-                                # Extragere Text
-                                if content_type == "text/plain" and "attachment" not in content_disposition:
-                                    payload = part.get_payload(decode=True)
-                                    if payload:
-                                        body = payload.decode(errors="ignore")
-
-                                # Extragere Atașamente temporară în memorie (sau extragem doar payload-ul)
-                                elif "attachment" in content_disposition or part.get_filename():
-                                    filename = part.get_filename()
-                                    if filename:
-                                        payload = part.get_payload(decode=True)
-                                        if payload:
-                                            downloaded_attachments_data.append({
-                                                "filename": filename,
-                                                "payload": payload
-                                            })
-                        else:
-                            payload = msg.get_payload(decode=True)
-                            if payload:
-                                body = payload.decode(errors="ignore")
-
-                        # 1. Căutăm Dosarul robust (prioritate: ID -> NrDosar -> CNP -> NrInmatriculare -> NumePăgubit)
-                        case = None
-
-                        full_text = f"{subject} {body}"
-                        full_text_lower = full_text.lower()
-
-                        # A) ID Dosar din subiect (Pattern: "Dosar [a-f0-9]{8}")
-                        match = re.search(r"Dosar ([a-f0-9]{8})", subject, re.IGNORECASE)
-                        if match:
-                            case_id_prefix = match.group(1).lower()
-                            case = Case.objects.filter(id__startswith=case_id_prefix).order_by('-created_at').first()
-
-                        # B) Număr Dosar Asigurator (dacă există)
-                        if not case:
-                            # Use iterator and only fetch necessary fields to prevent OOM
-                            cases_with_insurer_id = Case.objects.exclude(insurer_claim_number__isnull=True).exclude(insurer_claim_number__exact='').only('id', 'insurer_claim_number').order_by('-created_at').iterator()
-                            for c in cases_with_insurer_id:
-                                if c.insurer_claim_number.lower() in full_text_lower:
-                                    case = Case.objects.get(id=c.id) # get full object
-                                    break
-
-                        # C) CNP Păgubit
-                        if not case:
-                            cnp_match = re.search(r"\b([1-9][0-9]{12})\b", full_text)
-                            if cnp_match:
-                                extracted_cnp = cnp_match.group(1)
-                                case = Case.objects.filter(client__cnp=extracted_cnp).order_by('-created_at').first()
-
-                        # D) Număr Înmatriculare Păgubit
-                        if not case:
-                            # Normalize text for plates (remove spaces/dashes)
-                            normalized_text = re.sub(r'[\s\-]', '', full_text_lower)
-                            # Get distinct valid plates for victim vehicles
-                            victim_plates = InvolvedVehicle.objects.filter(role=InvolvedVehicle.Role.VICTIM).exclude(license_plate__isnull=True).exclude(license_plate__exact='').values_list('license_plate', flat=True).distinct()
-
-                            for plate in victim_plates:
-                                normalized_plate = re.sub(r'[\s\-]', '', plate.lower())
-                                if normalized_plate and normalized_plate in normalized_text:
-                                    # Found plate, find the newest case for it
-                                    case = Case.objects.filter(vehicles__role=InvolvedVehicle.Role.VICTIM, vehicles__license_plate=plate).order_by('-created_at').first()
-                                    if case:
-                                        break
-
-                        # E) Nume și Prenume Păgubit
-                        if not case:
-                            # Use iterator and only necessary fields
-                            clients = Client.objects.exclude(first_name__isnull=True).exclude(last_name__isnull=True).exclude(first_name__exact='').exclude(last_name__exact='').only('id', 'first_name', 'last_name').order_by('-created_at').iterator()
-                            for c in clients:
-                                fn = c.first_name.strip().lower()
-                                ln = c.last_name.strip().lower()
-
-                                # Use word boundaries to prevent false positives (e.g. 'Ion' matching 'Action')
-                                # Escape the names in case they have special regex characters
-                                fn_escaped = re.escape(fn)
-                                ln_escaped = re.escape(ln)
-
-                                # Check if both parts are in the text as distinct words
-                                if fn and ln:
-                                    fn_match = re.search(r'\b' + fn_escaped + r'\b', full_text_lower)
-                                    ln_match = re.search(r'\b' + ln_escaped + r'\b', full_text_lower)
-
-                                    if fn_match and ln_match:
-                                        case = Case.objects.filter(client_id=c.id).order_by('-created_at').first()
-                                        if case:
-                                            break
-
-                        if case:
-                            # Salvăm Message-ID pentru Reply
-                            msg_id = msg.get("Message-ID")
-                            if msg_id:
-                                case.last_email_message_id = msg_id
-                                case.save()
-
-                            downloaded_attachments = []
-                            from django.core.files.base import ContentFile
-
-                            for att_data in downloaded_attachments_data:
-                                doc = CaseDocument.objects.create(
-                                    case=case,
-                                    doc_type=CaseDocument.DocType.UNKNOWN,
-                                    ocr_data={}
-                                )
-                                clean_name = f"email_{case.id}_{att_data['filename']}".replace(" ", "_")
-                                doc.file.save(clean_name, ContentFile(att_data["payload"]))
-                                downloaded_attachments.append(doc)
-                                analyze_document_task.delay(doc.id)
-
-                            from django.utils import timezone
-                            case.last_message_from_insurer_at = timezone.now()
-                            case.save()
-
-                            client = get_client(case)
-                            recipient = case
-
-                            print(f"ℹ️ Mesaj de la asigurator pentru {case.id} -> Forward WhatsApp")
-
-                            # Generare Link-uri pt atașamente dacă e cazul
-                            attachments_info = ""
-                            if downloaded_attachments:
-                                attachments_info = "\n\n📄 **Documente atașate:**\n"
-                                domain = settings.APP_DOMAIN.rstrip("/")
-                                media_url_path = settings.MEDIA_URL.strip("/")
-                                for d in downloaded_attachments:
-                                    url = f"{domain}/{media_url_path}/{d.file.name}"
-                                    attachments_info += f"- {url}\n"
-
-                            # Trimitem ca o poștă
-                            msg_forward = (
-                                f"Asigurătorul vă transmite următoarele informații:\n\n"
-                                f"{body[:1000]}...\n"
-                                f"{attachments_info}\n"
-                                "Ce doriți să îi răspundeți? (Scrieți un mesaj sau încărcați documente, iar noi le vom trimite mai departe).\n\n"
-                                "Dacă sunteți de acord cu oferta/răspunsul și doriți să finalizăm cazul, apăsați pe butoanele de mai jos."
-                            )
-
-                            client.send_buttons(
-                                recipient,
-                                msg_forward,
-                                ["Accept Oferta", "Service RAR", "Dauna Totala"]
-                            )
-
-                        else:
-                            print(f"⚠️ Nu am putut asocia emailul '{subject}' niciunui dosar existent. Ignorat.")
-            except Exception as e_inner:
-                print(f"Eroare procesare email {num}: {e_inner}")
-
-        mail.close()
-        mail.logout()
+        mail = inbound.connect()
+        try:
+            stats = inbound.poll(mail, handle_insurer_reply)
+            if stats["new"]:
+                print(f"📧 [IMAP] Mesaje noi: {stats['new']}, asociate unui dosar: {stats['matched']}")
+            mail.close()
+        finally:
+            mail.logout()
 
     except Exception as e:
         print(f"Eroare IMAP: {e}")
 
 
+def handle_insurer_reply(case, reply):
+    """Reply asociat unui dosar: atașamentele devin documente, mesajul pleacă la client pe WhatsApp."""
+    print(f"📧 Mesaj nou: {reply['subject']} de la {reply['sender']}")
+
+    # Salvăm Message-ID pentru Reply
+    msg_id = reply["message_id"]
+    if msg_id:
+        case.last_email_message_id = msg_id
+        case.save(update_fields=["last_email_message_id", "updated_at"])
+
+    downloaded_attachments = []
+    from django.core.files import File
+
+    # Atașamentele sunt deja fișiere temporare (inbound.fetch_attachments): copiate în storage pe bucăți
+    for att_data in reply["attachments"]:
+        doc = CaseDocument.objects.create(
+            case=case,
+            doc_type=CaseDocument.DocType.UNKNOWN,
+            ocr_data={}
+        )
+        clean_name = f"email_{case.id}_{att_data['filename']}".replace(" ", "_")
+        doc.file.save(clean_name, File(att_data["file"], name=clean_name))
+        downloaded_attachments.append(doc)
+
+    if downloaded_attachments:
+        dispatch_upload_batch(case, downloaded_attachments, priority=PRIORITY_BULK)
+
+    from django.utils import timezone
+    case.last_message_from_insurer_at = timezone.now()
+    case.save(update_fields=["last_message_from_insurer_at", "updated_at"])
+
+    client = get_client(case)
+    recipient = case
+
+    print(f"ℹ️ Mesaj de la asigurator pentru {case.id} -> Forward WhatsApp")
+
+    # Generare Link-uri pt atașamente dacă e cazul
+    attachments_info = ""
+    if downloaded_attachments:
+        attachments_info = "\n\n📄 **Documente atașate:**\n"
+        domain = settings.APP_DOMAIN.rstrip("/")
+        media_url_path = settings.MEDIA_URL.strip("/")
+        for d in downloaded_attachments:
+            url = f"{domain}/{media_url_path}/{d.file.name}"
+            attachments_info += f"- {url}\n"
+
+    # Trimitem ca o poștă
+    msg_forward = (
+        f"Asigurătorul vă transmite următoarele informații:\n\n"
+        f"{reply['body'][:1000]}...\n"
+        f"{attachments_info}\n"
+        "Ce doriți să îi răspundeți? (Scrieți un mesaj sau încărcați documente, iar noi le vom trimite mai departe).\n\n"
+        "Dacă sunteți de acord cu oferta/răspunsul și doriți să finalizăm cazul, apăsați pe butoanele de mai jos."
+    )
+
+    client.send_buttons(
+        recipient,
+        msg_forward,
+        ["Accept Oferta", "Service RAR", "Dauna Totala"]
+    )
+
+
 # --- TASK 4: Email de Acceptare Oferta ---
 @shared_task
 def send_offer_acceptance_email_task(case_id):
@@ -850,15 +799,15 @@ def send_offer_acceptance_email_task(case_id):
         Echipa Auto Daune
         """
 
-        email = EmailMessage(
+        mailer.enqueue(
+            kind="offer_acceptance",
+            case=case,
             subject=subject,
             body=body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
             to=[case.insurer_email],
             cc=["office@autodaune.ro"],
         )
-        email.send()
-        print(f"✅ Email acceptare trimis pentru dosar {case.id}")
+        print(f"✅ Email acceptare pus în outbox pentru dosar {case.id}")
 
     except Exception as e:
         print(f"Eroare email acceptare: {e}")
@@ -887,21 +836,27 @@ def send_option_change_email_task(case_id, new_option_label):
         Echipa Auto Daune
         """
 
-        email = EmailMessage(
+        mailer.enqueue(
+            kind="option_change",
+            case=case,
             subject=subject,
             body=body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
             to=[case.insurer_email],
             cc=["office@autodaune.ro"],
         )
-        email.send()
-        print(f"✅ Email schimbare optiune trimis pentru dosar {case.id}")
+        print(f"✅ Email schimbare optiune pus în outbox pentru dosar {case.id}")
 
     except Exception as e:
         print(f"Eroare email schimbare optiune: {e}")
 
 
 # --- TASK 6: Relay WhatsApp -> Email ---
+def schedule_insurer_relay(case_id):
+    """Fiecare mesaj al clientului amână relay-ul cu 30 de minute (un singur email la final)."""
+    if not debouncer.touch("insurer_relay", case_id, INSURER_RELAY_QUIET_PERIOD):
+        trigger_delayed_relay_task.delay(case_id)
+
+
 @shared_task
 def trigger_delayed_relay_task(case_id):
     """
@@ -932,13 +887,13 @@ def trigger_delayed_relay_task(case_id):
         # when it runs, we check if any message was sent in the last 30 mins.
         # If yes, we wait again.
 
-        last_in_msg = case.logs.filter(direction="IN").order_by('-created_at').first()
-        if last_in_msg:
-            time_since_last_msg = timezone.now() - last_in_msg.created_at
+        if case.last_inbound_at:
+            time_since_last_msg = timezone.now() - case.last_inbound_at
             if time_since_last_msg < datetime.timedelta(minutes=29):
                 # User sent something recently. Let's reschedule for 30 mins after that last message.
                 remaining_wait = datetime.timedelta(minutes=30) - time_since_last_msg
-                trigger_delayed_relay_task.apply_async(args=[case.id], countdown=remaining_wait.total_seconds())
+                if not debouncer.touch("insurer_relay", case.id, remaining_wait.total_seconds()):
+                    trigger_delayed_relay_task.apply_async(args=[case.id], countdown=remaining_wait.total_seconds())
                 return
 
         # If we reached here, no new message in the last 30 mins.
@@ -987,71 +942,37 @@ def trigger_delayed_relay_task(case_id):
             headers["In-Reply-To"] = case.last_email_message_id
             headers["References"] = case.last_email_message_id
 
-        email = EmailMessage(
-            subject=subject,
-            body=body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[case.insurer_email],
-            headers=headers,
-            cc=["office@autodaune.ro"],
-        )
-
         # Colectăm și atașamentele (CaseDocument adăugate după ultimul mail)
         docs_to_send = CaseDocument.objects.filter(
             case=case,
             uploaded_at__gt=last_to_insurer if last_to_insurer else case.created_at
         )
 
-        temp_files_to_cleanup = []
-        count = 0
-
-        task_tmp_dir = tempfile.mkdtemp()
+        packaging.enqueue_case_email(
+            case,
+            kind="relay",
+            subject=subject,
+            body=body,
+            to=[case.insurer_email],
+            headers=headers,
+            cc=["office@autodaune.ro"],
+            docs=docs_to_send,
+            full_dossier=False,  # doar documentele noi, nu tot dosarul din nou
+        )
 
-        try:
-            for doc in docs_to_send:
-                if doc.file:
-                    try:
-                        fname = doc.file.name.lower()
-                        if fname.endswith(".pdf"):
-                            content_type = "application/pdf"
-                        elif fname.endswith(".png"):
-                            content_type = "image/png"
-                        elif fname.endswith(".jpg") or fname.endswith(".jpeg"):
-                            content_type = "image/jpeg"
-                        elif fname.endswith(".mp4"):
-                            content_type = "video/mp4"
-                        else:
-                            content_type = "application/octet-stream"
-
-                        doc_label = doc.get_doc_type_display().replace("/", "_").replace(" ", "_")
-                        clean_name = f"{doc_label}_{count}.{fname.split('.')[-1]}"
-                        tmp_path = os.path.join(task_tmp_dir, clean_name)
-
-                        shutil.copy(doc.file.path, tmp_path)
-                        email.attach_file(tmp_path, content_type)
-                        count += 1
-                    except Exception as e:
-                        print(f"⚠️ Eroare atașare relay {doc.file.name}: {e}")
-
-            email.send()
-
-            # Update timestamp
-            case.last_message_to_insurer_at = timezone.now()
-            case.save()
-
-            # Notificam clientul ca s-a trimis
-            client = get_client(case)
-            client.send_text(case, "✅ Răspunsul tău a fost grupat și transmis către asigurător.")
+        # Update timestamp
+        case.last_message_to_insurer_at = timezone.now()
+        case.save(update_fields=["last_message_to_insurer_at", "updated_at"])
 
-            # Curățăm flagul de relay delay
-            from django.core.cache import cache
-            cache.delete(f"relay_notified_{case.id}")
+        # Notificam clientul ca s-a trimis
+        client = get_client(case)
+        client.send_text(case, "✅ Răspunsul tău a fost grupat și transmis către asigurător.")
 
-        finally:
-            if os.path.exists(task_tmp_dir):
-                shutil.rmtree(task_tmp_dir)
+        # Curățăm flagul de relay delay
+        from django.core.cache import cache
+        cache.delete(f"relay_notified_{case.id}")
 
-        print(f"✅ Email relay trimis!")
+        print(f"✅ Email relay pus în outbox!")
 
     except Exception as e:
         print(f"Eroare relay email: {e}")
@@ -1088,115 +1009,191 @@ def send_admin_new_case_email_task(case_id):
         Echipa Auto Daune
         """
 
-        email = EmailMessage(
+        mailer.enqueue(
+            kind="admin_new_case",
+            case=case,
             subject=subject,
             body=body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[target_email]
+            to=[target_email],
         )
-        email.send()
-        print(f"✅ Email de notificare dosar nou trimis pentru dosar {case.id}")
+        print(f"✅ Email de notificare dosar nou pus în outbox pentru dosar {case.id}")
 
     except Exception as e:
         print(f"❌ Eroare la trimiterea emailului de notificare dosar nou: {e}")
 
+
+# Dosare per task de trimitere
+REMINDER_CHUNK_SIZE = 200
+
+
+def due_reminders_queryset(now=None, unreminded_only=True):
+    """
+    Dosarele PROCESSING_INSURER care au nevoie de reminder acum, într-un singur query:
+    - se așteaptă de >= 24h (după asigurator: ultimul mesaj a fost către el; altfel după client)
+    - nu s-a trimis niciun reminder în ultimele 24h (dacă unreminded_only)
+    Anotări: waiting_on ("INSURER" / "CLIENT") și waiting_since.
+    """
+    from django.db.models import Case as SqlCase, F, Q, Value, When
+    from django.utils import timezone
+    import datetime
+
+    threshold = (now or timezone.now()) - datetime.timedelta(hours=24)
+    client_turn = Q(last_message_from_insurer_at__isnull=False) & Q(
+        last_message_from_insurer_at__gte=F("last_message_to_insurer_at")
+    )
+    cases = Case.objects.filter(stage=Case.Stage.PROCESSING_INSURER, last_message_to_insurer_at__isnull=False)
+    if unreminded_only:
+        cases = cases.filter(Q(reminder_24h_sent_at__isnull=True) | Q(reminder_24h_sent_at__lte=threshold))
+    return (
+        cases.annotate(
+            waiting_on=SqlCase(When(client_turn, then=Value("CLIENT")), default=Value("INSURER")),
+            waiting_since=SqlCase(
+                When(client_turn, then=F("last_message_from_insurer_at")),
+                default=F("last_message_to_insurer_at"),
+            ),
+        )
+        .filter(waiting_since__lte=threshold)
+        .filter(Q(waiting_on="CLIENT") | Q(insurer_email__gt=""))
+    )
+
+
 @shared_task
 def send_24h_reminders_task():
     """
-    Task care rulează zilnic pentru a trimite remindere.
-    Verifică dosarele în stadiul PROCESSING_INSURER.
+    Task periodic (Celery beat) pentru remindere în stadiul PROCESSING_INSURER.
     Dacă ultimul mesaj este către asigurător și au trecut 24h, trimitem reminder asigurătorului.
     Dacă ultimul mesaj este de la asigurător și au trecut 24h, trimitem reminder clientului.
+
+    Un singur query selectează dosarele scadente și le marchează (reminder_24h_sent_at),
+    apoi trimiterea se împarte în chunk-uri pe workerii din coada outbound-email.
     """
-    from .models import Case
     from django.utils import timezone
-    import datetime
 
-    # Doar în zilele lucrătoare? (Opțional - implementăm o verificare simplă de weekend)
-    # today_weekday = timezone.now().weekday()
-    # if today_weekday >= 5: # 5=Sâmbătă, 6=Duminică
-    #     return
+    stamp = timezone.now()
+    due_ids = list(due_reminders_queryset(stamp).values_list("id", flat=True))
+    if not due_ids:
+        return 0
 
-    threshold = timezone.now() - datetime.timedelta(hours=24)
-    cases = Case.objects.filter(stage=Case.Stage.PROCESSING_INSURER)
+    # Marcăm înainte de trimitere: un sweep suprapus nu mai vede aceleași dosare
+    Case.objects.filter(id__in=due_ids).update(reminder_24h_sent_at=stamp)
 
-    for case in cases:
-        # Aflăm cine așteaptă după cine.
-        # Comparăm last_message_to_insurer_at cu last_message_from_insurer_at
+    starts = range(0, len(due_ids), REMINDER_CHUNK_SIZE)
+    for start in starts:
+        chunk = [str(case_id) for case_id in due_ids[start:start + REMINDER_CHUNK_SIZE]]
+        send_reminder_chunk_task.delay(chunk, stamp.isoformat())
+    print(f"⏰ Remindere 24h: {len(due_ids)} dosare în {len(starts)} chunk-uri")
+    return len(due_ids)
 
-        last_to = case.last_message_to_insurer_at
-        last_from = case.last_message_from_insurer_at
 
-        # Dacă nu avem deloc to_insurer, înseamnă că nu s-a trimis primul mail
-        if not last_to:
-            continue
+def _enqueue_insurer_reminder(case):
+    subject = f"Reminder: Avizare Dauna Auto - {case.client.full_name} - Dosar {str(case.id)[:8]}"
+    body = f"""
+    Buna ziua,
 
-        waiting_on_insurer = False
-        waiting_on_client = False
+    Revenim la emailul anterior. Asteptam un raspuns din partea dumneavoastra privind dosarul clientului nostru.
 
-        if not last_from:
-            # Am trimis primul mail și nu am primit răspuns
-            waiting_on_insurer = True
-            time_since = timezone.now() - last_to
-        else:
-            if last_to > last_from:
-                waiting_on_insurer = True
-                time_since = timezone.now() - last_to
+    Cu stima,
+    Echipa Auto Daune
+    """
+
+    headers = {}
+    if case.last_email_message_id:
+        headers["In-Reply-To"] = case.last_email_message_id
+        headers["References"] = case.last_email_message_id
+
+    return mailer.enqueue(
+        kind="reminder",
+        case=case,
+        subject=subject,
+        body=body,
+        to=[case.insurer_email],
+        headers=headers,
+        cc=["office@autodaune.ro"],
+    )
+
+
+@shared_task
+def send_reminder_chunk_task(case_ids, stamp):
+    """Reminderele unui chunk: emailurile merg în outbox, mesajele către clienți direct; eșecurile sunt reluate la următorul sweep."""
+    from django.utils.dateparse import parse_datetime
+
+    stamp = parse_datetime(stamp)
+    # Doar dosarele marcate de sweep-ul care a creat chunk-ul; cine așteaptă e recalculat
+    # (un mesaj venit între sweep și trimitere anulează reminderul)
+    cases = due_reminders_queryset(stamp, unreminded_only=False).filter(id__in=case_ids, reminder_24h_sent_at=stamp)
+    due = {case.id: case for case in cases.select_related("client")}
+    unsent = [case_id for case_id in case_ids if _as_uuid(case_id) not in due]
+
+    sent = 0
+    for case in due.values():
+        try:
+            if case.waiting_on == "INSURER":
+                _enqueue_insurer_reminder(case)
+                print(f"✅ Reminder 24h pus în outbox pentru asigurătorul dosarului {case.id}")
             else:
-                waiting_on_client = True
-                time_since = timezone.now() - last_from
+                client = get_client(case)
+                msg = (
+                    "Salut, asigurătorul așteaptă un răspuns de la tine de mai bine de 24 de ore.\n\n"
+                    "Te rugăm să ne scrii mesajul tău pentru a-l transmite mai departe, sau alege una din opțiunile de mai jos dacă dorești să finalizăm dosarul."
+                )
+                client.send_buttons(
+                    case,
+                    msg,
+                    ["Accept Oferta", "Service RAR", "Dauna Totala"]
+                )
+                print(f"✅ Reminder 24h trimis clientului pentru dosar {case.id}")
+            sent += 1
+        except Exception as e:
+            print(f"⚠️ Eroare reminder dosar {case.id}: {e}")
+            unsent.append(case.id)
 
-        # Trimitem reminder doar o dată (verificăm dacă am trimis deja ceva în ultimele 24h)
-        from django.core.cache import cache
-        cache_key = f"reminder_24h_sent_{case.id}"
-
-        if time_since >= datetime.timedelta(hours=24) and not cache.get(cache_key):
-            if waiting_on_insurer and case.insurer_email:
-                # Trimitem mail asiguratorului
-                try:
-                    subject = f"Reminder: Avizare Dauna Auto - {case.client.full_name} - Dosar {str(case.id)[:8]}"
-                    body = f"""
-                    Buna ziua,
-
-                    Revenim la emailul anterior. Asteptam un raspuns din partea dumneavoastra privind dosarul clientului nostru.
-
-                    Cu stima,
-                    Echipa Auto Daune
-                    """
-
-                    headers = {}
-                    if case.last_email_message_id:
-                        headers["In-Reply-To"] = case.last_email_message_id
-                        headers["References"] = case.last_email_message_id
-
-                    email = EmailMessage(
-                        subject=subject,
-                        body=body,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        to=[case.insurer_email],
-                        headers=headers,
-                        cc=["office@autodaune.ro"],
-                    )
-                    email.send()
-                    cache.set(cache_key, True, timeout=86400) # set cache to not resend for next 24h
-                    print(f"✅ Reminder 24h trimis asigurătorului pentru dosar {case.id}")
-                except Exception as e:
-                    print(f"⚠️ Eroare reminder asigurător: {e}")
-
-            elif waiting_on_client:
-                # Trimitem mesaj pe chat clientului
-                try:
-                    client = get_client(case)
-                    msg = (
-                        "Salut, asigurătorul așteaptă un răspuns de la tine de mai bine de 24 de ore.\n\n"
-                        "Te rugăm să ne scrii mesajul tău pentru a-l transmite mai departe, sau alege una din opțiunile de mai jos dacă dorești să finalizăm dosarul."
-                    )
-                    client.send_buttons(
-                        case,
-                        msg,
-                        ["Accept Oferta", "Service RAR", "Dauna Totala"]
-                    )
-                    cache.set(cache_key, True, timeout=86400) # set cache to not resend for next 24h
-                    print(f"✅ Reminder 24h trimis clientului pentru dosar {case.id}")
-                except Exception as e:
-                    print(f"⚠️ Eroare reminder client: {e}")
+    if unsent:
+        # Demarcat => intră din nou în următorul sweep, când devine scadent
+        Case.objects.filter(id__in=unsent, reminder_24h_sent_at=stamp).update(reminder_24h_sent_at=None)
+    return sent
+
+
+def _as_uuid(value):
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+# --- Outbox email (apps/claims/mailer.py) ---
+@shared_task(ignore_result=True)
+def drain_outbox_task():
+    """Golește outbox-ul pe o singură conexiune SMTP (pornit după fiecare enqueue și periodic de beat)."""
+    stats = mailer.drain()
+    if stats["sent"] or stats["failed"]:
+        print(f"📤 [OUTBOX] Trimise: {stats['sent']}, re-programate/eșuate: {stats['failed']}")
+
+
+# --- Dosarul PDF unificat (apps/claims/dossier.py) ---
+def schedule_dossier_update(case_id):
+    """Un lot de documente clasificate înseamnă o singură actualizare a PDF-ului, după ultimul."""
+    if not debouncer.touch("dossier", case_id, DOSSIER_UPDATE_WINDOW):
+        update_dossier_task.apply_async(args=[case_id], countdown=DOSSIER_UPDATE_WINDOW)
+
+
+@shared_task(ignore_result=True)
+def update_dossier_task(case_id):
+    """Adaugă în PDF doar documentele noi / re-clasificate (emailurile îl găsesc gata făcut)."""
+    case = Case.objects.filter(id=_as_uuid(case_id)).first()
+    if case is None:
+        return
+    current = dossier.sync(case)
+    print(f"📚 [DOSAR PDF] Dosar {case.id}: {len(current.entries)} documente")
+
+
+# --- Sweeper debounce (Celery beat) ---
+@shared_task(ignore_result=True)
+def sweep_debounced_task():
+    """Pornește câte o execuție pentru fiecare termen de debounce expirat."""
+    try:
+        due = debouncer.pop_due()
+    except Exception as e:
+        print(f"⚠️ [DEBOUNCE] Redis indisponibil: {e}")
+        return
+    for purpose, case_id in due:
+        try:
+            handler_for(purpose).delay(case_id)
+        except Exception as e:
+            print(f"⚠️ [DEBOUNCE] Nu am putut porni {purpose} pentru dosar {case_id}: {e}")
@@ -0,0 +1,79 @@
+import io
+import tempfile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from unittest.mock import MagicMock
+from apps.claims import ai_backends, prompts
+from apps.claims.ai_backends import OpenAIBackend, RecordReplayBackend, ReplayMiss, StubBackend, build_backend
+from apps.claims.models import Case
+from apps.claims.pdf_text import iban_is_valid
+from apps.claims.services import ANALYZER_VERSION, cache_version
+
+
+class StubBackendTestCase(SimpleTestCase):
+    def test_deterministic_per_image(self):
+        stub = StubBackend(latency=0, jitter=0)
+        first = stub.complete(prompts.CLASSIFY_PROMPT, [b"poza1"], label="classify")
+        self.assertEqual(first, stub.complete(prompts.CLASSIFY_PROMPT, [b"poza1"], label="classify"))
+        self.assertIn(first["tip_document"], prompts.DOC_TYPES)
+
+    def test_extraction_fills_required_fields(self):
+        stub = StubBackend(latency=0, jitter=0)
+        for tip, prompt_text in prompts.EXTRACTION_PROMPTS.items():
+            data = stub.complete(prompt_text, [b"document"])
+            self.assertEqual(data["tip_document"], tip)
+            for key in prompts.REQUIRED_FIELDS[tip]:
+                self.assertTrue(data["date_extrase"].get(key), f"{tip}: lipsește {key}")
+
+        iban = stub.complete(prompts.EXTRACTION_PROMPTS["EXTRAS"], [b"extras"])["date_extrase"]["iban"]
+        self.assertTrue(iban_is_valid(iban))
+
+
+class RecordReplayBackendTestCase(SimpleTestCase):
+    def test_record_then_replay_offline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            inner = MagicMock()
+            inner.complete.return_value = {"tip_document": "TALON", "date_extrase": {"nr_auto": "B 123 ABC"}}
+
+            recorder = RecordReplayBackend(directory, record=True, inner=inner)
+            recorded = recorder.complete("prompt", [b"talon"], label="extract")
+
+            replay = RecordReplayBackend(directory, inner=MagicMock(side_effect=AssertionError("fără rețea")))
+            self.assertEqual(replay.complete("prompt", [b"talon"], label="extract"), recorded)
+            self.assertEqual(inner.complete.call_count, 1)
+
+            with self.assertRaises(ReplayMiss):
+                replay.complete("prompt", [b"alta_poza"], label="extract")
+
+
+class BackendSelectionTestCase(SimpleTestCase):
+    def tearDown(self):
+        ai_backends.set_backend(None)
+
+    @override_settings(DOCUMENT_ANALYZER_BACKEND="stub", ANALYZER_STUB_LATENCY=0.2)
+    def test_build_from_settings(self):
+        backend = build_backend()
+        self.assertIsInstance(backend, StubBackend)
+        self.assertEqual(backend.latency, 0.2)
+        self.assertIsInstance(build_backend("openai"), OpenAIBackend)
+        with self.assertRaises(ValueError):
+            build_backend("altceva")
+
+    def test_stub_results_use_separate_cache_namespace(self):
+        ai_backends.set_backend(OpenAIBackend())
+        self.assertEqual(cache_version(), ANALYZER_VERSION)
+        ai_backends.set_backend(StubBackend(latency=0))
+        self.assertEqual(cache_version(), f"{ANALYZER_VERSION}:stub")
+
+
+class LoadtestCommandTestCase(TestCase):
+    def test_pipeline_runs_offline_and_cleans_up(self):
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            call_command(
+                "loadtest_pipeline", documents=3, cases=1, concurrency=1, latency=0, jitter=0, stdout=out
+            )
+        self.assertIn("procesate 3, eșuate 0", out.getvalue())
+        # Un singur lot per dosar => o singură notificare
+        self.assertIn("Notificări trimise clienților: 1;", out.getvalue())
+        self.assertFalse(Case.objects.exists())
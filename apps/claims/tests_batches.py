@@ -0,0 +1,87 @@
+from django.test import TestCase
+from unittest.mock import patch
+
+from config.celery import app as celery_app
+from apps.claims.models import Case, CaseDocument, Client, UploadBatch
+from apps.claims.tasks import dispatch_upload_batch, finalize_upload_batch_task
+
+
+class UploadBatchTestCase(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(phone_number="0700555111")
+        self.case = Case.objects.create(client=self.client_obj, stage=Case.Stage.COLLECTING_DOCS)
+        self.docs = [
+            CaseDocument.objects.create(case=self.case, doc_type=CaseDocument.DocType.UNKNOWN, file=f"lot_{i}.jpg", ocr_data={})
+            for i in range(3)
+        ]
+        celery_app.conf.task_always_eager = True
+
+    def tearDown(self):
+        celery_app.conf.task_always_eager = False
+
+    @patch("apps.claims.tasks.WhatsAppClient")
+    @patch("apps.claims.tasks.DocumentAnalyzer.analyze")
+    def test_batch_notifies_once_after_all_documents(self, mock_analyze, mock_whatsapp):
+        mock_analyze.side_effect = [
+            {"tip_document": "CI", "date_extrase": {}},
+            {"tip_document": "TALON", "date_extrase": {}},
+            {"tip_document": "FOTO_AUTO", "date_extrase": {}},
+        ]
+
+        dispatch_upload_batch(self.case, self.docs)
+
+        self.assertEqual(mock_analyze.call_count, 3)
+        mock_whatsapp.return_value.send_text.assert_called_once()
+        message = mock_whatsapp.return_value.send_text.call_args[0][1]
+        self.assertIn("Am validat: Buletin, Poză Daună / Video, Talon.", message)
+
+        batch = UploadBatch.objects.get(case=self.case)
+        self.assertEqual(batch.document_count, 3)
+        self.assertIsNotNone(batch.notified_at)
+        self.assertEqual(set(batch.documents.values_list("id", flat=True)), {d.id for d in self.docs})
+
+    @patch("apps.claims.tasks.check_status_and_notify")
+    def test_callback_is_idempotent(self, mock_notify):
+        batch = UploadBatch.objects.create(case=self.case, document_count=1)
+
+        finalize_upload_batch_task(str(batch.id))
+        finalize_upload_batch_task(str(batch.id))
+
+        mock_notify.assert_called_once()
+        self.assertEqual(mock_notify.call_args.kwargs["batch"], batch)
+
+    @patch("apps.claims.tasks.check_status_and_notify")
+    @patch("apps.claims.tasks.DocumentAnalyzer.analyze", return_value={"tip_document": "CI", "date_extrase": {}})
+    def test_batched_document_does_not_notify_by_itself(self, mock_analyze, mock_notify):
+        from apps.claims.tasks import analyze_document_task
+
+        batch = UploadBatch.objects.create(case=self.case, document_count=1)
+        CaseDocument.objects.filter(id=self.docs[0].id).update(batch=batch)
+
+        analyze_document_task(self.docs[0].id)
+        mock_notify.assert_not_called()
+
+        analyze_document_task(self.docs[1].id)
+        mock_notify.assert_called_once()
+
+
+class QueueRoutingTestCase(TestCase):
+    def route(self, task_name):
+        return celery_app.amqp.router.route({}, task_name)["queue"].name
+
+    def test_workload_classes_use_dedicated_queues(self):
+        self.assertEqual(self.route("apps.claims.tasks.analyze_document_task"), "ocr")
+        self.assertEqual(self.route("apps.claims.tasks.send_claim_email_task"), "outbound-email")
+        self.assertEqual(self.route("apps.claims.tasks.check_email_replies_task"), "inbound-email")
+        self.assertEqual(self.route("apps.claims.tasks.finalize_upload_batch_task"), "notifications")
+
+    @patch("apps.claims.tasks.chord")
+    def test_batch_priority_is_set_on_each_analysis(self, mock_chord):
+        client_obj = Client.objects.create(phone_number="0700555222")
+        case = Case.objects.create(client=client_obj)
+        docs = [CaseDocument.objects.create(case=case, file="p.jpg", ocr_data={}) for _ in range(2)]
+
+        dispatch_upload_batch(case, docs, priority=0)
+
+        header = mock_chord.call_args[0][0]
+        self.assertEqual([sig.options["priority"] for sig in header], [0, 0])
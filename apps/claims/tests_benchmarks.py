@@ -0,0 +1,28 @@
+from django.test import SimpleTestCase
+from apps.claims import benchmarks
+
+
+class PreprocessingBenchmarkTestCase(SimpleTestCase):
+    def test_pipeline_reports_stages_and_sizes(self):
+        result = benchmarks.bench_fixture("mic.pdf", "pdf", {"pages": 2}, repeat=1)
+        self.assertEqual(
+            set(result["stages"]),
+            {"render_first_page", "render_all_pages", "decode", "classify_thumb", "enhance", "crops", "base64"},
+        )
+        sizes = result["sizes"]
+        self.assertLessEqual(max(sizes["decoded_size"]), 2048)
+        self.assertEqual(sizes["base64_chars"] % 4, 0)
+        self.assertGreater(sizes["payload_bytes"], sizes["thumb_bytes"])
+
+    def test_fixtures_are_deterministic(self):
+        params = {"size": (640, 480)}
+        self.assertEqual(benchmarks.make_fixture("jpeg", params), benchmarks.make_fixture("jpeg", params))
+
+    def test_compare_flags_size_and_time_regressions(self):
+        baseline = {"a.jpg": {"stages": {"decode": {"ms": 100.0}}, "sizes": {"payload_bytes": 1000}}}
+        ok = {"name": "a.jpg", "stages": {"decode": {"ms": 120.0}}, "sizes": {"payload_bytes": 1010, "thumb_bytes": 1, "base64_chars": 1}}
+        self.assertEqual(benchmarks.compare(ok, baseline), [])
+
+        slow = {"name": "a.jpg", "stages": {"decode": {"ms": 400.0}}, "sizes": {"payload_bytes": 2000, "thumb_bytes": 1, "base64_chars": 1}}
+        problems = benchmarks.compare(slow, baseline)
+        self.assertEqual(len(problems), 2)
@@ -0,0 +1,116 @@
+import random
+import re
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from apps.claims import case_index, inbound, signals
+from apps.claims.case_index import Automaton, CaseIndex
+from apps.claims.models import Case, Client, InvolvedVehicle
+
+
+class AutomatonTestCase(SimpleTestCase):
+    def test_scan_matches_every_occurrence_like_a_regex(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            patterns = {"".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(8)}
+            text = "".join(rng.choice("abcd") for _ in range(60))
+            expected = {
+                (m.start() + len(p) - 1, p) for p in patterns for m in re.finditer(f"(?={re.escape(p)})", text)
+            }
+            self.assertEqual(set(Automaton(patterns).scan(text)), expected)
+
+
+class CaseIndexSearchTestCase(SimpleTestCase):
+    def setUp(self):
+        self.index = CaseIndex()
+        self.index.add(case_index.CLAIM, "rca-2026-1", "case-1")
+        self.index.add(case_index.PLATE, "b123abc", "case-2")
+        for name, payload in case_index.client_name_entries(5, "Ion", "Popescu"):
+            self.index.add(case_index.NAME, name, payload)
+
+    def test_claim_and_plate_are_found_in_one_pass(self):
+        found = self.index.search("Dosarul RCA-2026-1 pentru B 123 - ABC")
+        self.assertEqual(found, {"claim": {"case-1"}, "plate": {"case-2"}, "client": set()})
+
+    def test_names_need_both_parts_as_whole_words(self):
+        self.assertEqual(self.index.search("Domnul Popescu Ion")["client"], {5})
+        self.assertEqual(self.index.search("Domnul Popescu")["client"], set())
+        self.assertEqual(self.index.search("Action Popescu")["client"], set())
+
+    def test_deltas_replace_patterns(self):
+        self.index.apply({"remove": [["claim", "rca-2026-1", "case-1"]], "add": [["name", "ion", [6, "first"]]]})
+        self.assertEqual(self.index.search("RCA-2026-1")["claim"], set())
+        self.assertIn("ion", self.index.names)
+        self.assertIn((6, "first"), self.index.names["ion"])
+
+
+class CaseIndexSyncTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        case_index.reset()
+        self.addCleanup(case_index.reset)
+        self.client_obj = Client.objects.create(phone_number="0700111222", first_name="Maria", last_name="Ionescu")
+        self.case = Case.objects.create(client=self.client_obj)
+
+    def save(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_model_changes_reach_the_worker_without_a_rebuild(self):
+        case_index.get_index()
+
+        with patch.object(CaseIndex, "from_database", side_effect=AssertionError("rebuild")):
+            self.case.insurer_claim_number = "ALZ-42"
+            self.save(self.case)
+            vehicle = InvolvedVehicle(case=self.case, role=InvolvedVehicle.Role.VICTIM, license_plate="CJ 01 XYZ")
+            self.save(vehicle)
+            self.assertEqual(case_index.get_index().search("dosar alz-42")["claim"], {str(self.case.id)})
+            self.assertEqual(case_index.get_index().search("CJ01XYZ")["plate"], {str(self.case.id)})
+
+            self.case.insurer_claim_number = "ALZ-43"
+            self.save(self.case)
+            found = case_index.get_index().search("ALZ-42 ALZ-43")
+            self.assertEqual(found["claim"], {str(self.case.id)})
+            self.assertNotIn("alz-42", case_index.get_index().claims)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                vehicle.delete()
+            self.assertEqual(case_index.get_index().search("CJ01XYZ")["plate"], set())
+
+    def test_loading_rows_does_not_compute_index_entries(self):
+        InvolvedVehicle.objects.create(case=self.case, role=InvolvedVehicle.Role.VICTIM, license_plate="B 10 ABC")
+
+        with patch.object(signals, "index_entries", side_effect=AssertionError("index_entries")):
+            list(Case.objects.all())
+            list(Client.objects.all())
+            list(InvolvedVehicle.objects.select_related("case__client"))
+
+    def test_saves_outside_the_indexed_columns_skip_the_snapshot(self):
+        self.case.stage = Case.Stage.COLLECTING_DOCS
+        with self.assertNumQueries(1), patch.object(case_index, "publish") as mock_publish:
+            self.case.save(update_fields=["stage"])
+        mock_publish.assert_not_called()
+
+        self.case.insurer_claim_number = "OMN-5"
+        with patch.object(case_index, "publish") as mock_publish:
+            self.case.save(update_fields=["insurer_claim_number"])
+        mock_publish.assert_called_once()
+        self.assertEqual(mock_publish.call_args.kwargs["add"], {(case_index.CLAIM, "omn-5", str(self.case.id))})
+
+    def test_missing_deltas_fall_back_to_the_database(self):
+        case_index.get_index()
+        self.case.insurer_claim_number = "GRA-7"
+        self.save(self.case)
+        cache.delete(case_index.DELTA_KEY.format(cache.get(case_index.VERSION_KEY)))
+
+        self.assertEqual(case_index.get_index().search("GRA-7")["claim"], {str(self.case.id)})
+
+    def test_match_by_text_prefers_claim_then_plate_then_name(self):
+        other = Case.objects.create(client=Client.objects.create(phone_number="0700333444", first_name="Dan", last_name="Pop"))
+        InvolvedVehicle.objects.create(case=other, role=InvolvedVehicle.Role.VICTIM, license_plate="B 99 DAN")
+
+        self.assertEqual(inbound.match_by_text("", "Maria Ionescu, B-99-DAN"), other)
+        self.assertEqual(inbound.match_by_text("", "Maria Ionescu"), self.case)
+        self.assertIsNone(inbound.match_by_text("", "Maria"))
@@ -0,0 +1,92 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+from unittest.mock import patch
+
+from apps.bot.utils import WebChatClient, WhatsAppClient
+from apps.claims.models import Case, Client, CommunicationLog
+from apps.claims.tasks import get_client, handle_insurer_reply
+
+
+class PreferredChannelTestCase(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(phone_number="0700444555")
+        self.case = Case.objects.create(client=self.client_obj)
+
+    def test_inbound_log_updates_case_channel(self):
+        log = CommunicationLog.objects.create(case=self.case, direction="IN", channel="WEB", content="salut")
+        CommunicationLog.objects.create(case=self.case, direction="OUT", channel="WHATSAPP", content="răspuns")
+
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.last_inbound_channel, "WEB")
+        self.assertEqual(self.case.last_inbound_at, log.created_at)
+
+    def test_older_inbound_log_does_not_overwrite_newer_one(self):
+        CommunicationLog.objects.create(case=self.case, direction="IN", channel="WEB", content="nou")
+        older = timezone.now() - datetime.timedelta(hours=1)
+        with patch("django.utils.timezone.now", return_value=older):
+            CommunicationLog.objects.create(case=self.case, direction="IN", channel="WHATSAPP", content="vechi")
+
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.last_inbound_channel, "WEB")
+
+    def test_get_client_uses_denormalized_channel_without_queries(self):
+        CommunicationLog.objects.create(case=self.case, direction="IN", channel="WEB", content="salut")
+        self.case.refresh_from_db()
+
+        with self.assertNumQueries(0):
+            first = get_client(self.case)
+            second = get_client(self.case)
+        self.assertIsInstance(first, WebChatClient)
+        self.assertIs(first, second)
+
+
+class ChannelSurvivesCaseSavesTestCase(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(phone_number="0700444666", first_name="Ana", last_name="Pop")
+        self.case = Case.objects.create(client=self.client_obj, stage=Case.Stage.GREETING)
+        CommunicationLog.objects.create(case=self.case, direction="IN", channel="WHATSAPP", content="salut")
+
+    @patch("apps.claims.tasks.get_client")
+    def test_insurer_reply_on_a_stale_copy_keeps_the_channel(self, mock_get_client):
+        stale = Case.objects.get(pk=self.case.pk)
+        CommunicationLog.objects.create(case=self.case, direction="IN", channel="WEB", content="din chat")
+
+        reply = {"subject": "Oferta", "sender": "daune@asigurator.ro", "message_id": "<m1@asig>", "body": "Oferta", "attachments": []}
+        handle_insurer_reply(stale, reply)
+
+        stale.refresh_from_db()
+        self.assertEqual((stale.last_email_message_id, stale.last_inbound_channel), ("<m1@asig>", "WEB"))
+
+    def test_full_save_still_writes_the_channel_fields(self):
+        self.case.last_inbound_channel = "WEB"
+        self.case.save()
+
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.last_inbound_channel, "WEB")
+
+    def test_web_chat_message_through_flow_manager_keeps_web_channel(self):
+        session = self.client.session
+        session["case_id"] = str(self.case.id)
+        session.save()
+
+        response = self.client.post("/bot/chat/send/", {"message": "Da, deschide dosarul"})
+
+        self.assertEqual(response.status_code, 200)
+        self.case.refresh_from_db()
+        # FlowManager a salvat dosarul (etapa nouă) fără să readucă WHATSAPP
+        self.assertEqual(self.case.stage, Case.Stage.COLLECTING_DOCS)
+        self.assertEqual(self.case.last_inbound_channel, "WEB")
+        self.assertIsInstance(get_client(self.case), WebChatClient)
+        self.assertFalse(
+            CommunicationLog.objects.filter(case=self.case, direction="OUT").exclude(channel="WEB").exists()
+        )
+
+    def test_whatsapp_channel_is_used_after_switching_back(self):
+        CommunicationLog.objects.create(case=self.case, direction="IN", channel="WEB", content="web")
+        CommunicationLog.objects.create(case=self.case, direction="IN", channel="WHATSAPP", content="wa")
+        self.case.save()
+
+        self.case.refresh_from_db()
+        self.assertIsInstance(get_client(self.case), WhatsAppClient)
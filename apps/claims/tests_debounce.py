@@ -0,0 +1,71 @@
+from django.test import SimpleTestCase, TestCase
+from unittest.mock import patch, MagicMock
+from apps.claims.debounce import Debouncer
+from apps.claims.models import Case, CaseDocument, Client
+from apps.claims.tasks import analyze_document_task, sweep_debounced_task
+
+
+def debouncer_with_script(side_effect=None, return_value=None):
+    """Debouncer cu scripturile Lua înlocuite de un singur mock."""
+    redis_client = MagicMock()
+    script = MagicMock(side_effect=side_effect, return_value=return_value)
+    redis_client.register_script.return_value = script
+    return Debouncer(key="test:debounce", redis_client=redis_client), script
+
+
+class DebouncerTestCase(SimpleTestCase):
+    def test_touch_moves_deadline_for_case_and_purpose(self):
+        debouncer, script = debouncer_with_script(return_value=1)
+        self.assertTrue(debouncer.touch("grouped_unknowns", "abc", 15))
+        script.assert_called_once_with(keys=["test:debounce"], args=["grouped_unknowns|abc", 15.0])
+
+    def test_touch_reports_unavailable_redis(self):
+        debouncer, _ = debouncer_with_script(side_effect=ConnectionError("redis down"))
+        self.assertFalse(debouncer.touch("insurer_relay", "abc", 1800))
+
+    def test_unknown_purpose_is_rejected(self):
+        debouncer, _ = debouncer_with_script()
+        with self.assertRaises(ValueError):
+            debouncer.touch("nu_exista", "abc", 1)
+
+    def test_pop_due_and_pending_parse_members(self):
+        debouncer, script = debouncer_with_script(
+            side_effect=[[b"grouped_unknowns|abc", b"insurer_relay|def"], [b"insurer_relay|xyz", b"12.5"]]
+        )
+        self.assertEqual(debouncer.pop_due(), [("grouped_unknowns", "abc"), ("insurer_relay", "def")])
+        self.assertEqual(debouncer.pending(), [("insurer_relay", "xyz", 12.5)])
+
+    @patch("apps.claims.tasks.handler_for")
+    @patch("apps.claims.tasks.debouncer")
+    def test_sweeper_fires_one_execution_per_due_member(self, mock_debouncer, mock_handler_for):
+        mock_debouncer.pop_due.return_value = [("grouped_unknowns", "abc"), ("insurer_relay", "def")]
+        sweep_debounced_task()
+        self.assertEqual(
+            [c.args for c in mock_handler_for.call_args_list], [("grouped_unknowns",), ("insurer_relay",)]
+        )
+        self.assertEqual(
+            [c.args for c in mock_handler_for.return_value.delay.call_args_list], [("abc",), ("def",)]
+        )
+
+
+class UnknownDocumentDebounceTestCase(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(phone_number="0700777888")
+        self.case = Case.objects.create(client=self.client_obj, stage=Case.Stage.COLLECTING_DOCS)
+        self.doc = CaseDocument.objects.create(case=self.case, doc_type=CaseDocument.DocType.UNKNOWN, file="x.jpg", ocr_data={})
+
+    @patch("apps.claims.tasks.WhatsAppClient")
+    @patch("apps.claims.tasks.process_grouped_unknowns_task.apply_async")
+    @patch("apps.claims.tasks.debouncer")
+    @patch("apps.claims.tasks.DocumentAnalyzer.analyze", return_value={"tip_document": "UNKNOWN"})
+    def test_unknown_document_moves_deadline_instead_of_enqueueing(self, mock_analyze, mock_debouncer, mock_apply, mock_wa):
+        mock_debouncer.touch.return_value = True
+        analyze_document_task(self.doc.id)
+        mock_debouncer.touch.assert_called_once_with("grouped_unknowns", self.case.id, 15)
+        mock_apply.assert_not_called()
+
+        # Fără Redis: countdown-ul clasic
+        mock_debouncer.touch.return_value = False
+        other = CaseDocument.objects.create(case=self.case, doc_type=CaseDocument.DocType.UNKNOWN, file="y.jpg", ocr_data={})
+        analyze_document_task(other.id)
+        mock_apply.assert_called_once_with(args=[self.case.id], countdown=15)
@@ -0,0 +1,138 @@
+import io
+import random
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image, ImageDraw
+from unittest.mock import patch
+
+from apps.claims import imaging
+from apps.claims.dedup import compute_phash, link_duplicate
+from apps.claims.models import Case, CaseDocument, Client
+from apps.claims.signals import notify_admin_new_case
+from apps.claims.tasks import analyze_document_task
+
+
+def photo(seed, size=(1200, 900), quality=90):
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randint(0, size[0]), rng.randint(0, size[1])
+        color = (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255))
+        draw.ellipse((x - 150, y - 150, x + 150, y + 150), fill=color)
+    buffered = io.BytesIO()
+    img.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+def resend(data, size=(800, 600), quality=60):
+    """Aceeași poză, redimensionată și recomprimată (ca după WhatsApp)."""
+    img = Image.open(io.BytesIO(data)).resize(size)
+    buffered = io.BytesIO()
+    img.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+def shifted(data, dx=20):
+    """Aceeași mașină, cadrul mutat cu câțiva pixeli: altă poză, dar dHash-ul de 64 biți aproape egal."""
+    img = Image.open(io.BytesIO(data))
+    width, height = img.size
+    img = img.crop((dx, 0, width - 60 + dx, height)).resize((width, height))
+    buffered = io.BytesIO()
+    img.save(buffered, format="JPEG", quality=90)
+    return buffered.getvalue()
+
+
+class PerceptualHashTestCase(SimpleTestCase):
+    def test_resent_photo_is_close_and_different_photo_is_far(self):
+        original = compute_phash(photo(1))
+        self.assertEqual(len(original), 16)
+        self.assertLessEqual(imaging.hamming_distance(original, compute_phash(resend(photo(1)))), 3)
+        self.assertGreater(imaging.hamming_distance(original, compute_phash(photo(2))), 10)
+
+    def test_not_an_image(self):
+        self.assertIsNone(compute_phash(b"%PDF-1.4 nu e imagine"))
+
+
+class DuplicateDocumentTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        post_save.disconnect(notify_admin_new_case, sender=Case)
+        client = Client.objects.create(phone_number="+40711111111")
+        self.case = Case.objects.create(client=client, stage=Case.Stage.COLLECTING_DOCS)
+        post_save.connect(notify_admin_new_case, sender=Case)
+
+        self.original = self._document(photo(1), doc_type=CaseDocument.DocType.DAMAGE_PHOTO, ocr_data={"tip_document": "FOTO_AUTO"})
+        self.original.phash = compute_phash(photo(1))
+        self.original.save()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _document(self, data, doc_type=CaseDocument.DocType.UNKNOWN, ocr_data=None):
+        doc = CaseDocument(case=self.case, doc_type=doc_type, ocr_data={} if ocr_data is None else ocr_data)
+        doc.file.save("poza.jpg", ContentFile(data), save=False)
+        doc.save()
+        return doc
+
+    def test_resent_photo_is_linked_to_original(self):
+        copy = self._document(resend(photo(1)))
+        self.assertEqual(link_duplicate(copy), self.original)
+
+        copy.refresh_from_db()
+        self.assertEqual(copy.duplicate_of, self.original)
+        self.assertEqual(copy.doc_type, CaseDocument.DocType.DAMAGE_PHOTO)
+        self.assertEqual(copy.ocr_data["duplicate_of"], self.original.id)
+
+    def test_different_photo_or_pending_original_is_not_linked(self):
+        self.assertIsNone(link_duplicate(self._document(photo(2))))
+
+        CaseDocument.objects.filter(pk=self.original.pk).update(ocr_data={})
+        copy = self._document(resend(photo(1)))
+        self.assertIsNone(link_duplicate(copy))
+        self.assertIsNotNone(copy.phash)
+
+    def test_similar_but_distinct_photo_is_not_linked(self):
+        other_angle = shifted(photo(1))
+        self.assertLessEqual(imaging.hamming_distance(self.original.phash, compute_phash(other_angle)), 5)
+
+        doc = self._document(other_angle)
+
+        self.assertIsNone(link_duplicate(doc))
+        doc.refresh_from_db()
+        self.assertIsNone(doc.duplicate_of)
+
+    def test_matching_ignores_the_declared_type_of_the_copy(self):
+        # Deduplicarea rulează înainte de clasificare: tipul presupus de flux nu contează,
+        # copia confirmată preia tipul originalului
+        self.assertEqual(link_duplicate(self._document(photo(1))), self.original)
+
+        id_card = self._document(photo(7), doc_type=CaseDocument.DocType.ID_CARD, ocr_data={"tip_document": "CI"})
+        id_card.phash = compute_phash(photo(7))
+        id_card.save()
+        copy = self._document(resend(photo(7)), doc_type=CaseDocument.DocType.DAMAGE_PHOTO)
+
+        self.assertEqual(link_duplicate(copy), id_card)
+        copy.refresh_from_db()
+        self.assertEqual(copy.doc_type, CaseDocument.DocType.ID_CARD)
+
+    @patch("apps.claims.tasks.WebChatClient")
+    @patch("apps.claims.tasks.WhatsAppClient")
+    @patch("apps.claims.tasks.DocumentAnalyzer.analyze")
+    def test_task_skips_analysis_and_reports_duplicates(self, mock_analyze, mock_whatsapp, mock_web):
+        copy = self._document(resend(photo(1)))
+
+        analyze_document_task(copy.id)
+
+        mock_analyze.assert_not_called()
+        message = mock_whatsapp.return_value.send_text.call_args[0][1]
+        self.assertIn("1 fișier(e) erau duplicate", message)
+        # Duplicatul nu se numără la pozele de daună
+        self.assertIn("(ai trimis 1)", message)
@@ -0,0 +1,137 @@
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import fitz  # PyMuPDF
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from apps.claims import dossier
+from apps.claims.models import Case, CaseDocument, CaseDossier, Client
+from apps.claims.tasks import schedule_dossier_update
+
+
+def image_bytes(size=(1200, 1600), color="white"):
+    buffered = io.BytesIO()
+    Image.new("RGB", size, color).save(buffered, format="JPEG")
+    return buffered.getvalue()
+
+
+def pdf_bytes(pages=2):
+    pdf = fitz.open()
+    for _ in range(pages):
+        pdf.new_page()
+    return pdf.tobytes()
+
+
+class DossierTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        client = Client.objects.create(phone_number="0700555666", first_name="Ana", last_name="Ionescu")
+        self.case = Case.objects.create(client=client, stage=Case.Stage.COLLECTING_DOCS)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def add_doc(self, doc_type, name, data):
+        doc = CaseDocument(case=self.case, doc_type=doc_type, ocr_data={})
+        doc.file.save(name, ContentFile(data), save=False)
+        doc.save()
+        return doc
+
+    def read_pdf(self, current):
+        with default_storage.open(current.file.name, "rb") as f:
+            return fitz.open("pdf", f.read())
+
+    def test_sections_follow_document_type_order_with_bookmarks(self):
+        self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "daune.jpg", image_bytes((4000, 3000)))
+        self.add_doc(CaseDocument.DocType.ID_CARD, "buletin.jpg", image_bytes())
+        self.add_doc(CaseDocument.DocType.ACCIDENT_REPORT, "amiabila.pdf", pdf_bytes(2))
+
+        current = dossier.sync(self.case)
+
+        self.assertEqual([e["type"] for e in current.entries], ["AMIABILA", "CI", "PHOTO"])
+        pdf = self.read_pdf(current)
+        self.assertEqual(pdf.page_count, 4)
+        self.assertEqual(
+            pdf.get_toc(), [[1, "Amiabilă / PV Poliție (1)", 1], [1, "Buletin (1)", 3], [1, "Poză Daună / Video (1)", 4]]
+        )
+        # Poza 4000x3000 ajunge la rezoluție de tipar (latura lungă 1754px la 150 DPI)
+        self.assertAlmostEqual(pdf[3].rect.width, dossier.PRINT_MAX_EDGE * 72 / dossier.PRINT_DPI, places=0)
+        self.assertTrue(current.file.name.startswith(f"dossiers/{self.case.id}/{current.content_key[:16]}"))
+
+    def test_new_document_renders_only_its_own_pages(self):
+        self.add_doc(CaseDocument.DocType.ID_CARD, "buletin.jpg", image_bytes())
+        self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "daune.jpg", image_bytes())
+        first = dossier.sync(self.case)
+        old_name = first.file.name
+
+        talon = self.add_doc(CaseDocument.DocType.CAR_REGISTRATION, "talon.jpg", image_bytes())
+        with patch("apps.claims.dossier.render_document", wraps=dossier.render_document) as mock_render:
+            current = dossier.sync(self.case)
+
+        self.assertEqual([c.args[0].id for c in mock_render.call_args_list], [talon.id])
+        self.assertEqual([e["type"] for e in current.entries], ["CI", "TALON", "PHOTO"])
+        self.assertEqual(self.read_pdf(current).page_count, 3)
+        self.assertFalse(default_storage.exists(old_name))
+
+    def test_unchanged_documents_are_a_no_op(self):
+        self.add_doc(CaseDocument.DocType.ID_CARD, "buletin.jpg", image_bytes())
+        first = dossier.sync(self.case)
+
+        with patch("apps.claims.dossier.render_document") as mock_render:
+            current = dossier.sync(self.case)
+
+        mock_render.assert_not_called()
+        self.assertEqual(current.file.name, first.file.name)
+        self.assertEqual(current.content_key, first.content_key)
+
+    def test_reclassified_and_removed_documents_move_out_of_their_section(self):
+        unknown = self.add_doc(CaseDocument.DocType.UNKNOWN, "civ.jpg", image_bytes(color="red"))
+        photo = self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "daune.pdf", pdf_bytes(2))
+        dossier.sync(self.case)
+
+        CaseDocument.objects.filter(id=unknown.id).update(doc_type=CaseDocument.DocType.CAR_IDENTITY)
+        photo.delete()
+        current = dossier.sync(self.case)
+
+        self.assertEqual([e["type"] for e in current.entries], ["CIV"])
+        pdf = self.read_pdf(current)
+        self.assertEqual(pdf.page_count, 1)
+        self.assertEqual(pdf.get_toc(), [[1, "Carte Identitate Vehicul (1)", 1]])
+
+    def test_unreadable_document_is_not_retried_until_it_changes(self):
+        self.add_doc(CaseDocument.DocType.ID_CARD, "buletin.jpg", image_bytes())
+        self.add_doc(CaseDocument.DocType.CAR_REGISTRATION, "talon.jpg", b"nu e o imagine")
+        first = dossier.sync(self.case)
+
+        self.assertEqual([e["pages"] for e in first.entries], [1, 0])
+        with patch("apps.claims.dossier.render_document") as mock_render:
+            dossier.sync(self.case)
+        mock_render.assert_not_called()
+
+    def test_case_without_documents_has_no_file(self):
+        self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "video.mp4", b"\x00" * 1024)
+
+        current = dossier.sync(self.case)
+
+        self.assertFalse(current.file)
+        self.assertEqual(CaseDossier.objects.get(case=self.case).entries, [])
+
+    @patch("apps.claims.tasks.update_dossier_task.apply_async")
+    @patch("apps.claims.tasks.debouncer")
+    def test_classification_burst_schedules_one_debounced_update(self, mock_debouncer, mock_apply_async):
+        mock_debouncer.touch.return_value = True
+        schedule_dossier_update(self.case.id)
+        schedule_dossier_update(self.case.id)
+        mock_apply_async.assert_not_called()
+
+        mock_debouncer.touch.return_value = False
+        schedule_dossier_update(self.case.id)
+        mock_apply_async.assert_called_once_with(args=[self.case.id], countdown=60)
@@ -0,0 +1,113 @@
+import datetime
+import shutil
+import tempfile
+
+from celery.exceptions import Retry
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch
+
+from apps.claims import idempotency
+from apps.claims.models import AnalysisRun, Case, CaseDocument, Client, UploadBatch
+from apps.claims.rate_governor import RateLimited
+from apps.claims.tasks import analyze_document_task
+
+TALON_RESULT = {"tip_document": "TALON", "date_extrase": {"nr_auto": "B 123 ABC"}}
+
+
+@patch("apps.claims.tasks.link_duplicate", return_value=None)
+@patch("apps.claims.tasks.check_status_and_notify")
+@patch("apps.claims.tasks.DocumentAnalyzer.analyze", return_value=TALON_RESULT)
+class DuplicateDeliveryTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        client = Client.objects.create(phone_number="0700999000")
+        self.case = Case.objects.create(client=client, stage=Case.Stage.COLLECTING_DOCS)
+        self.doc = CaseDocument(case=self.case, ocr_data={})
+        self.doc.file.save("talon.jpg", ContentFile(b"continut talon"), save=False)
+        self.doc.save()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_redelivered_message_is_a_no_op(self, mock_analyze, mock_notify, _):
+        analyze_document_task(self.doc.id)
+        analyze_document_task(self.doc.id)
+
+        mock_analyze.assert_called_once()
+        mock_notify.assert_called_once()
+        run = AnalysisRun.objects.get(document=self.doc)
+        self.assertEqual(run.state, AnalysisRun.State.DONE)
+        self.assertEqual(run.result, TALON_RESULT)
+
+    def test_worker_crash_after_model_call_reuses_stored_result(self, mock_analyze, mock_notify, _):
+        # Worker-ul a plătit apelul, a salvat rezultatul și a murit înainte de doc.save()
+        AnalysisRun.objects.create(
+            document=self.doc,
+            content_hash=idempotency.content_fingerprint(self.doc),
+            state=AnalysisRun.State.RUNNING,
+            result=TALON_RESULT,
+        )
+        AnalysisRun.objects.update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+
+        analyze_document_task(self.doc.id)
+
+        mock_analyze.assert_not_called()
+        self.doc.refresh_from_db()
+        self.assertEqual(self.doc.doc_type, CaseDocument.DocType.CAR_REGISTRATION)
+        run = AnalysisRun.objects.get(document=self.doc)
+        self.assertEqual((run.state, run.attempts), (AnalysisRun.State.DONE, 2))
+
+    def test_concurrent_delivery_exits_while_first_is_running(self, mock_analyze, mock_notify, _):
+        AnalysisRun.objects.create(
+            document=self.doc, content_hash=idempotency.content_fingerprint(self.doc), state=AnalysisRun.State.RUNNING
+        )
+
+        analyze_document_task(self.doc.id)
+
+        mock_analyze.assert_not_called()
+        mock_notify.assert_not_called()
+
+    @override_settings(ANALYSIS_IN_PROGRESS_RETRY_SECONDS=15)
+    def test_duplicate_batch_task_waits_for_the_running_analysis(self, mock_analyze, mock_notify, _):
+        # Un succes imediat ar număra în chord și lotul ar fi notificat fără rezultatul acestui document
+        self.doc.batch = UploadBatch.objects.create(case=self.case, document_count=1)
+        self.doc.save(update_fields=["batch"])
+        AnalysisRun.objects.create(
+            document=self.doc, content_hash=idempotency.content_fingerprint(self.doc), state=AnalysisRun.State.RUNNING
+        )
+
+        with patch.object(analyze_document_task, "retry", side_effect=Retry()) as mock_retry:
+            with self.assertRaises(Retry):
+                analyze_document_task(self.doc.id)
+
+        mock_retry.assert_called_once_with(countdown=15, max_retries=None)
+        mock_analyze.assert_not_called()
+        mock_notify.assert_not_called()
+        # Rularea worker-ului care analizează rămâne a lui
+        self.assertEqual(AnalysisRun.objects.get(document=self.doc).state, AnalysisRun.State.RUNNING)
+
+    def test_rate_limited_run_is_released_for_the_retry(self, mock_analyze, mock_notify, _):
+        mock_analyze.side_effect = [RateLimited(5), TALON_RESULT]
+        with patch.object(analyze_document_task, "retry", side_effect=Retry()):
+            with self.assertRaises(Retry):
+                analyze_document_task(self.doc.id)
+        self.assertEqual(AnalysisRun.objects.get(document=self.doc).state, AnalysisRun.State.FAILED)
+
+        analyze_document_task(self.doc.id)
+
+        self.assertEqual(mock_analyze.call_count, 2)
+        self.assertEqual(AnalysisRun.objects.get(document=self.doc).state, AnalysisRun.State.DONE)
+
+    def test_replaced_file_content_is_analyzed_again(self, mock_analyze, mock_notify, _):
+        analyze_document_task(self.doc.id)
+        self.doc.file.save("talon_nou.jpg", ContentFile(b"alt continut"))
+
+        analyze_document_task(self.doc.id)
+
+        self.assertEqual(mock_analyze.call_count, 2)
+        self.assertEqual(AnalysisRun.objects.filter(document=self.doc).count(), 2)
@@ -0,0 +1,66 @@
+import io
+import fitz
+from django.test import SimpleTestCase
+from PIL import Image
+from apps.claims import imaging
+
+
+def _jpeg_bytes(size, quality=95):
+    img = Image.new("RGB", size, (200, 180, 160))
+    buffered = io.BytesIO()
+    img.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+class ImagingTestCase(SimpleTestCase):
+    def test_profile_lookup(self):
+        self.assertEqual(imaging.upload_profile("FOTO_AUTO")["max_edge"], 1024)
+        self.assertEqual(imaging.upload_profile("ci")["max_edge"], 1600)
+        self.assertEqual(imaging.upload_profile(None), imaging.UPLOAD_PROFILES["DEFAULT"])
+        self.assertEqual(imaging.upload_profile("UNKNOWN"), imaging.UPLOAD_PROFILES["DEFAULT"])
+
+    def test_large_jpeg_is_drafted_and_capped(self):
+        img = Image.open(io.BytesIO(_jpeg_bytes((4000, 3000))))
+        img = imaging.apply_draft(img, 2048)
+        # Decodare redusă la 1/2 direct din JPEG
+        self.assertEqual(img.size, (2000, 1500))
+        img = imaging.fit_within(img, 2048)
+        self.assertLessEqual(max(img.size), 2048)
+
+    def test_fit_within_never_upscales(self):
+        img = Image.new("RGB", (800, 600))
+        self.assertEqual(imaging.fit_within(img, 2048).size, (800, 600))
+        self.assertEqual(imaging.fit_within(img, 400).size, (400, 300))
+
+    def test_payload_stats(self):
+        original = _jpeg_bytes((3000, 2000))
+        img = imaging.fit_within(Image.open(io.BytesIO(original)), 1024)
+        out = imaging.encode_jpeg(img, 70)
+        stats = imaging.payload_stats(len(original), [out])
+        self.assertEqual(stats["bytes_out"], len(out))
+        self.assertGreater(stats["ratio"], 1)
+
+
+def _pdf_bytes(pages, size=(595, 842)):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page(width=size[0], height=size[1]).insert_text((50, 50), f"Pagina {i + 1}")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class PdfPagesTestCase(SimpleTestCase):
+    def test_pages_rendered_lazily_at_adaptive_dpi(self):
+        pages = imaging.iter_pdf_pages(_pdf_bytes(3), 2048)
+        first = Image.open(io.BytesIO(next(pages)))
+        # A4 (842pt) -> latura lungă = 2048px, JPEG
+        self.assertEqual(first.format, "JPEG")
+        self.assertEqual(max(first.size), 2048)
+        self.assertEqual(len(list(pages)), 2)
+
+    def test_max_pages_and_zoom_cap(self):
+        pages = list(imaging.iter_pdf_pages(_pdf_bytes(4, size=(200, 100)), 2048, max_pages=2))
+        self.assertEqual(len(pages), 2)
+        # Pagină mică: nu mărim peste PDF_MAX_ZOOM
+        self.assertEqual(Image.open(io.BytesIO(pages[0])).size, (600, 300))
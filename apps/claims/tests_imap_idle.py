@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from apps.claims import case_index, imap_idle
+from apps.claims.fake_imap import FakeIMAPServer
+from apps.claims.imap_idle import IdleListener
+from apps.claims.models import Case, Client
+from apps.claims.tasks import check_email_replies_task
+from apps.claims.tests_inbound import reply
+
+
+class IdleListenerTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        case_index.reset()
+        self.server = FakeIMAPServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(
+            IMAP_HOST="127.0.0.1",
+            IMAP_PORT=self.server.port,
+            IMAP_USE_SSL=False,
+            IMAP_USER=self.server.user,
+            IMAP_PASSWORD=self.server.password,
+            IMAP_RECONNECT_BACKOFF=0.05,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        client = Client.objects.create(phone_number="0700666777", first_name="Ion", last_name="Popescu")
+        self.case = Case.objects.create(client=client, stage=Case.Stage.PROCESSING_INSURER)
+        self.dosar = str(self.case.id)[:8]
+        self.delivered = queue.Queue()
+
+    def start(self):
+        self.listener = IdleListener(lambda case, envelope: self.delivered.put((case.id, envelope["subject"])))
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.listener.stop)
+        self.assertTrue(self.server.idling.wait(5))
+
+    def _run(self):
+        try:
+            self.listener.run()
+        finally:
+            connection.close()
+
+    def test_new_mail_is_delivered_on_the_same_connection(self):
+        self.start()
+
+        for subject in (f"Oferta Dosar {self.dosar}", f"Completare Dosar {self.dosar}"):
+            self.server.mailbox.append(reply(subject))
+            self.assertEqual(self.delivered.get(timeout=5), (self.case.id, subject))
+            self.assertTrue(self.server.idling.wait(5))
+
+        self.assertEqual(self.server.logins, 1)
+        self.assertTrue(imap_idle.listener_alive())
+
+    def test_dropped_connection_is_reopened_and_catches_up(self):
+        self.start()
+
+        self.server.drop_connections()
+        self.server.mailbox.append(reply(f"Oferta Dosar {self.dosar}"))
+
+        self.assertEqual(self.delivered.get(timeout=5), (self.case.id, f"Oferta Dosar {self.dosar}"))
+        self.assertEqual(self.server.logins, 2)
+
+    @override_settings(IMAP_IDLE_REFRESH=0.2)
+    def test_idle_is_refreshed_without_reconnecting(self):
+        self.start()
+
+        self.server.idling.clear()
+        self.assertTrue(self.server.idling.wait(5))
+        self.server.idling.clear()
+        self.assertTrue(self.server.idling.wait(5))
+
+        self.assertGreaterEqual(sum(command.endswith(b" IDLE") for command in self.server.commands), 3)
+        self.assertEqual(self.server.logins, 1)
+
+    def test_periodic_task_stays_out_while_the_listener_runs(self):
+        self.start()
+
+        with patch("apps.claims.inbound.connect") as mock_connect:
+            check_email_replies_task()
+        mock_connect.assert_not_called()
+
+    @override_settings(IMAP_IDLE_HEARTBEAT_TTL=1)
+    def test_fallback_resumes_shortly_after_the_listener_dies(self):
+        # Un proces omorât (SIGKILL / OOM) nu mai apucă să șteargă heartbeat-ul: acesta doar expiră
+        imap_idle._heartbeat()
+        self.assertTrue(imap_idle.listener_alive())
+        time.sleep(1.1)
+        self.assertFalse(imap_idle.listener_alive())
+
+        with patch("apps.claims.inbound.connect") as mock_connect:
+            check_email_replies_task()
+        mock_connect.assert_called_once()
+
+    def test_fallback_task_is_scheduled_by_beat(self):
+        tasks = {entry["task"] for entry in settings.CELERY_BEAT_SCHEDULE.values()}
+        self.assertIn("apps.claims.tasks.check_email_replies_task", tasks)
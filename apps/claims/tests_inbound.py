@@ -0,0 +1,253 @@
+import base64
+import imaplib
+import os
+import quopri
+import shutil
+import tempfile
+from email.message import EmailMessage
+from email.policy import SMTP
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+
+from apps.claims import case_index, inbound, mailer
+from apps.claims.fake_imap import FakeIMAPServer
+from apps.claims.models import Case, CaseDocument, Client, EmailThreadRef, MailboxState
+from apps.claims.tasks import check_email_replies_task
+
+
+def reply(subject, body="Buna ziua, atasam oferta.", attachments=(), html=False, message_id=None, in_reply_to=None, references=None):
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = "daune@asigurator.test"
+    msg["To"] = "office@autodaune.ro"
+    msg["Message-ID"] = message_id or f"<{os.urandom(4).hex()}@asigurator.test>"
+    if in_reply_to:
+        msg["In-Reply-To"] = in_reply_to
+    if references:
+        msg["References"] = references
+    msg.set_content(body)
+    if html:
+        msg.add_alternative(f"<p>{body}</p>", subtype="html")
+    for filename, data in attachments:
+        msg.add_attachment(data, maintype="application", subtype="pdf", filename=filename)
+    return msg.as_bytes(policy=SMTP)
+
+
+class FakeIMAPTestCase(TestCase):
+    def setUp(self):
+        case_index.reset()
+        self.server = FakeIMAPServer().start()
+        self.addCleanup(self.server.stop)
+        self.settings_override = override_settings(
+            IMAP_HOST="127.0.0.1",
+            IMAP_PORT=self.server.port,
+            IMAP_USE_SSL=False,
+            IMAP_USER=self.server.user,
+            IMAP_PASSWORD=self.server.password,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        client = Client.objects.create(phone_number="0700666777", first_name="Ion", last_name="Popescu")
+        self.case = Case.objects.create(client=client, stage=Case.Stage.PROCESSING_INSURER)
+        self.dosar = str(self.case.id)[:8]
+
+    def poll(self):
+        imap = inbound.connect()
+        delivered = []
+
+        def deliver(case, envelope):
+            # Fișierele temporare sunt închise după livrare: păstrăm conținutul pentru verificări
+            envelope["payloads"] = []
+            for attachment in envelope["attachments"]:
+                attachment["file"].seek(0)
+                envelope["payloads"].append((attachment["filename"], attachment["file"].read()))
+            delivered.append((case, envelope))
+
+        try:
+            stats = inbound.poll(imap, deliver)
+        finally:
+            imap.logout()
+        return stats, delivered
+
+    def fetched_items(self, uid):
+        return [item for fetched_uid, items in self.server.fetched if fetched_uid == uid for item in items]
+
+
+class InboundTestCase(FakeIMAPTestCase):
+    def test_attachments_are_downloaded_only_for_matched_messages(self):
+        pdf = os.urandom(300 * 1024)
+        matched = self.server.mailbox.append(reply(f"Oferta Dosar {self.dosar}", attachments=[("oferta.pdf", pdf)]))
+        other = self.server.mailbox.append(reply("Newsletter", attachments=[("catalog.pdf", os.urandom(300 * 1024))]))
+        self.server.mailbox.append(reply(f"Vechi Dosar {self.dosar}"), flags=["\\Seen"])
+
+        stats, delivered = self.poll()
+
+        self.assertEqual(stats, {"new": 2, "matched": 1})
+        (case, envelope), = delivered
+        self.assertEqual(case, self.case)
+        self.assertIn("atasam oferta", envelope["body"])
+        self.assertEqual(envelope["payloads"], [("oferta.pdf", pdf)])
+        # Mesajul neasociat: headere + BODYSTRUCTURE, apoi doar partea text (nu și atașamentul)
+        self.assertEqual(self.fetched_items(other)[-1:], ["BODY.PEEK[1]"])
+        self.assertFalse([i for i in self.fetched_items(other) if i.startswith("BODY.PEEK[2]")])
+        self.assertIn("BODY.PEEK[2]<0.1048576>", self.fetched_items(matched))
+        self.assertNotIn("BODY.PEEK[]", [i for _, items in self.server.fetched for i in items])
+        self.assertIn("\\Seen", self.server.mailbox.messages[0][1])
+        self.assertNotIn("\\Seen", self.server.mailbox.messages[1][1])
+        self.assertEqual(MailboxState.objects.get().last_uid, 3)
+
+    def test_next_run_fetches_only_new_uids(self):
+        self.server.mailbox.append(reply("Newsletter"))
+        self.poll()
+        self.server.fetched.clear()
+
+        stats, _ = self.poll()
+        self.assertEqual(stats, {"new": 0, "matched": 0})
+        self.assertEqual(self.server.fetched, [])
+
+        uid = self.server.mailbox.append(reply(f"Raspuns Dosar {self.dosar}"))
+        stats, delivered = self.poll()
+        self.assertEqual(stats, {"new": 1, "matched": 1})
+        self.assertEqual({fetched_uid for fetched_uid, _ in self.server.fetched}, {uid})
+
+    def test_uidvalidity_change_resynchronizes_from_unseen(self):
+        self.server.mailbox.append(reply("Newsletter"))
+        self.poll()
+
+        self.server.mailbox.reset(uidvalidity=7)
+        self.server.mailbox.append(reply(f"Oferta Dosar {self.dosar}"))
+        stats, delivered = self.poll()
+
+        self.assertEqual(stats, {"new": 1, "matched": 1})
+        state = MailboxState.objects.get()
+        self.assertEqual((state.uidvalidity, state.last_uid), (7, 1))
+
+    def test_text_strategies_use_the_text_part_only(self):
+        self.case.insurer_claim_number = "RCA-2026-778899"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.case.save()
+        self.server.mailbox.append(reply("Raspuns", body="Referitor la dosarul RCA-2026-778899", html=True))
+
+        _, delivered = self.poll()
+
+        (case, envelope), = delivered
+        self.assertEqual(case, self.case)
+        self.assertEqual(envelope["body"].strip(), "Referitor la dosarul RCA-2026-778899")
+
+    def test_reply_headers_resolve_the_case_before_any_heuristic(self):
+        other = Case.objects.create(client=self.case.client)
+        sent = mailer.enqueue(kind="claim", subject="Avizare", body="x", to=["daune@asigurator.test"], case=self.case)
+        # Subiectul indică alt dosar; firul (References) are prioritate
+        self.server.mailbox.append(
+            reply(f"Re: Dosar {str(other.id)[:8]}", message_id="<r1@asig>", references=f"<vechi@asig> {sent.message_id}")
+        )
+        # Reply la reply-ul asiguratorului: găsit după Message-ID-ul primit, fără nicio strategie pe text
+        self.server.mailbox.append(reply("Completare", in_reply_to="<r1@asig>"))
+
+        _, delivered = self.poll()
+
+        self.assertEqual([case for case, _ in delivered], [self.case, self.case])
+        self.assertEqual(EmailThreadRef.objects.get(message_id="<r1@asig>").direction, EmailThreadRef.Direction.IN)
+
+    @override_settings(IMAP_FETCH_CHUNK_KB=64, IMAP_ATTACHMENT_MEMORY_MB=1)
+    def test_attachments_are_streamed_in_ranges_to_temporary_files(self):
+        first, second = os.urandom(1100 * 1024), os.urandom(300 * 1024)
+        uid = self.server.mailbox.append(
+            reply(f"Oferta Dosar {self.dosar}", attachments=[("a.pdf", first), ("b.pdf", second)])
+        )
+        imap = inbound.connect()
+        self.addCleanup(imap.logout)
+        imap.select("INBOX")
+        envelope, = inbound.fetch_envelopes(imap, [uid])
+
+        attachments = inbound.fetch_attachments(imap, envelope)
+        self.addCleanup(inbound.close_attachments, attachments)
+
+        ranges = [i for i in self.fetched_items(uid) if i.startswith("BODY.PEEK[2]")]
+        self.assertEqual(ranges[:2], ["BODY.PEEK[2]<0.65536>", "BODY.PEEK[2]<65536.65536>"])
+        self.assertEqual([a["size"] for a in attachments], [len(first), len(second)])
+        # Primul atașament consumă bugetul de memorie al mesajului: al doilea merge direct pe disc
+        self.assertIsInstance(attachments[0]["file"], tempfile.SpooledTemporaryFile)
+        self.assertNotIsInstance(attachments[1]["file"], tempfile.SpooledTemporaryFile)
+        for attachment, payload in zip(attachments, (first, second)):
+            attachment["file"].seek(0)
+            self.assertEqual(attachment["file"].read(), payload)
+
+    def test_transfer_decoder_accepts_arbitrary_chunk_boundaries(self):
+        payload = os.urandom(5000) + "Daună totală = 100%\n".encode() * 50
+        for encoding, encoded in (
+            ("base64", base64.encodebytes(payload)),
+            ("quoted-printable", quopri.encodestring(payload)),
+        ):
+            # quopri nu reproduce exact orice secvență binară (CR izolat, spații la final de linie):
+            # comparăm cu decodarea întregului mesaj dintr-o dată
+            expected = inbound.decode_transfer(encoded, encoding)
+            for size in (1, 3, 77, 1000):
+                decoder = inbound.TransferDecoder(encoding)
+                decoded = b"".join(decoder.feed(encoded[i:i + size]) for i in range(0, len(encoded), size))
+                self.assertEqual(decoded + decoder.flush(), expected, (encoding, size))
+        self.assertEqual(inbound.decode_transfer(base64.encodebytes(payload), "base64"), payload)
+
+    def test_thread_ids_prefer_the_most_recent_reference(self):
+        envelope = {"in_reply_to": "<c@x>", "references": "<a@x> <b@x>\r\n <c@x>"}
+        self.assertEqual(inbound.thread_ids(envelope), ["<c@x>", "<b@x>", "<a@x>"])
+
+    def test_body_parts_follow_imap_section_numbering(self):
+        self.server.mailbox.append(reply("x", html=True, attachments=[("a.pdf", b"%PDF-1.4"), ("b.pdf", b"%PDF-1.4")]))
+        imap = inbound.connect()
+        self.addCleanup(imap.logout)
+        imap.select("INBOX")
+        envelope, = inbound.fetch_envelopes(imap, [1])
+
+        self.assertEqual(
+            [(p["section"], p["type"], p["filename"]) for p in envelope["parts"]],
+            [("1.1", "text/plain", ""), ("1.2", "text/html", ""), ("2", "application/pdf", "a.pdf"), ("3", "application/pdf", "b.pdf")],
+        )
+        self.assertEqual(inbound.text_part(envelope["parts"])["section"], "1.1")
+
+    def test_parse_fetch_handles_literals_and_quoted_strings(self):
+        data = [
+            (b'1 (UID 9 BODY[HEADER.FIELDS (SUBJECT)] {19}', b"Subject: \"a\" (b)\r\n\r\n"),
+            b' FLAGS (\\Seen) BODYSTRUCTURE ("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 3 1 NIL NIL NIL))',
+        ]
+
+        fields, = inbound.parse_fetch(data)
+
+        self.assertEqual(fields["UID"], b"9")
+        self.assertEqual(fields["BODY[HEADER.FIELDS (SUBJECT)]"], b"Subject: \"a\" (b)\r\n\r\n")
+        self.assertEqual(fields["FLAGS"], [b"\\Seen"])
+        self.assertEqual(inbound.body_parts(fields["BODYSTRUCTURE"])[0]["charset"], "utf-8")
+
+
+class CheckEmailRepliesTaskTest(FakeIMAPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+
+    @patch("apps.claims.tasks.dispatch_upload_batch")
+    @patch("apps.claims.tasks.get_client")
+    def test_reply_is_stored_and_forwarded(self, mock_get_client, mock_dispatch):
+        mock_get_client.return_value = MagicMock()
+        self.server.mailbox.append(
+            reply(f"Oferta Dosar {self.dosar}", attachments=[("oferta.pdf", b"%PDF-1.4 oferta")], message_id="<of@asig>")
+        )
+
+        check_email_replies_task()
+
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.last_email_message_id, "<of@asig>")
+        doc = CaseDocument.objects.get(case=self.case)
+        self.assertEqual(doc.file.open("rb").read(), b"%PDF-1.4 oferta")
+        mock_dispatch.assert_called_once()
+        mock_get_client.return_value.send_buttons.assert_called_once()
+        self.assertEqual(self.server.logins, 1)
+
+    def test_missing_credentials_skip_the_connection(self):
+        with override_settings(IMAP_PASSWORD=""), patch.object(imaplib, "IMAP4") as mock_imap:
+            check_email_replies_task()
+        mock_imap.assert_not_called()
@@ -0,0 +1,101 @@
+import email
+import os
+import shutil
+import smtplib
+import tempfile
+from email import policy
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from unittest.mock import MagicMock
+
+from apps.claims import mailer
+from apps.claims.mime_stream import ATTACHMENT_READ_SIZE, StreamingMessage, send_streaming
+
+
+def recording_smtp():
+    smtp = MagicMock(spec=smtplib.SMTP)
+    smtp.mail.return_value = (250, b"OK")
+    smtp.rcpt.return_value = (250, b"OK")
+    smtp.getreply.side_effect = [(354, b"Go ahead"), (250, b"Queued")]
+    return smtp
+
+
+class StreamingMessageTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.video = os.urandom(3 * ATTACHMENT_READ_SIZE + 123)
+        self.video_name = default_storage.save("uploads/video.mp4", ContentFile(self.video))
+        self.photo_name = default_storage.save("uploads/poza.jpg", ContentFile(b"\xff\xd8 poza"))
+        self.outbound = mailer.enqueue(
+            kind="claim",
+            subject="Avizare Dauna Auto - Ion Popescu",
+            body="Buna ziua,\n.linie care incepe cu punct\nCu stimă",
+            to=["daune@asigurator.test"],
+            cc=["office@autodaune.ro"],
+            headers={"In-Reply-To": "<abc@asigurator>"},
+            attachments=[
+                {"path": self.video_name, "filename": "Poză_Daună___Video_0.mp4", "content_type": "video/mp4"},
+                {"path": self.photo_name, "filename": "Buletin_1.jpg", "content_type": "image/jpeg"},
+            ],
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_stream_is_a_valid_mime_message_with_original_files(self):
+        chunks = list(StreamingMessage(self.outbound).chunks())
+        parsed = email.message_from_bytes(b"".join(chunks), policy=policy.default)
+
+        self.assertEqual(parsed["Message-ID"], self.outbound.message_id)
+        self.assertEqual(parsed["In-Reply-To"], "<abc@asigurator>")
+        self.assertIn("Cu stimă", parsed.get_body().get_content())
+        attachments = list(parsed.iter_attachments())
+        self.assertEqual(
+            [(a.get_filename(), a.get_content_type()) for a in attachments],
+            [("Poză_Daună___Video_0.mp4", "video/mp4"), ("Buletin_1.jpg", "image/jpeg")],
+        )
+        self.assertEqual(attachments[0].get_content(), self.video)
+        self.assertEqual(attachments[1].get_content(), b"\xff\xd8 poza")
+        # Memoria e mărginită de blocul citit, nu de mărimea fișierului
+        self.assertLess(max(len(c) for c in chunks[1:-1]), ATTACHMENT_READ_SIZE * 2)
+
+    def test_send_streaming_writes_dot_stuffed_data_on_open_session(self):
+        smtp = recording_smtp()
+
+        send_streaming(smtp, StreamingMessage(self.outbound))
+
+        smtp.mail.assert_called_once_with(self.outbound.from_email)
+        self.assertEqual([c.args[0] for c in smtp.rcpt.call_args_list], ["daune@asigurator.test", "office@autodaune.ro"])
+        smtp.putcmd.assert_called_once_with("data")
+        data = b"".join(c.args[0] for c in smtp.send.call_args_list)
+        self.assertTrue(data.endswith(b"\r\n.\r\n"))
+        self.assertIn(b"\r\n..linie care incepe cu punct", data)
+
+    def test_rejected_data_resets_the_session(self):
+        smtp = recording_smtp()
+        smtp.getreply.side_effect = [(354, b"Go ahead"), (552, b"Message too large")]
+
+        with self.assertRaises(smtplib.SMTPDataError):
+            send_streaming(smtp, StreamingMessage(self.outbound))
+        smtp.rset.assert_called_once()
+
+    def test_drain_streams_when_backend_holds_an_smtp_session(self):
+        connection = MagicMock()
+        connection.connection = recording_smtp()
+
+        mailer.send(connection, self.outbound)
+
+        connection.send_messages.assert_not_called()
+        connection.connection.putcmd.assert_called_once_with("data")
+
+
+class ContentTypeMappingTestCase(TestCase):
+    def test_shared_mapping(self):
+        self.assertEqual(mailer.content_type_for("uploads/2026/10/VIDEO.MOV"), "video/quicktime")
+        self.assertEqual(mailer.content_type_for("scan.jpeg"), "image/jpeg")
+        self.assertEqual(mailer.content_type_for("arhiva.zip"), "application/octet-stream")
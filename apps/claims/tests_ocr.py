@@ -1,11 +1,21 @@
 from django.test import SimpleTestCase
 from unittest.mock import patch, MagicMock
 from apps.claims.services import DocumentAnalyzer
+from apps.claims.ocr_cache import ocr_cache
+from apps.claims.openai_client import reset_openai_client
 import json
 import base64
+import fitz
 
 class DocumentAnalyzerTestCase(SimpleTestCase):
-    @patch("apps.claims.services.OpenAI")
+    def setUp(self):
+        ocr_cache.clear()
+        reset_openai_client()
+
+    def tearDown(self):
+        reset_openai_client()
+
+    @patch("apps.claims.openai_client.OpenAI")
     @patch("apps.claims.services.Image")
     @patch("apps.claims.services.ImageOps")
     @patch("builtins.open", new_callable=MagicMock)
@@ -19,6 +29,7 @@ class DocumentAnalyzerTestCase(SimpleTestCase):
         mock_img_instance = MagicMock()
         mock_img_instance.size = (1000, 2000) # Width, Height
         mock_img_instance.mode = 'RGB'
+        mock_img_instance.tobytes.return_value = b"pixeli"  # cheia cache-ului OCR (normalized_content)
         mock_image.open.return_value = mock_img_instance
 
         # Mock ImageOps.autocontrast to return the same image
@@ -44,9 +55,11 @@ class DocumentAnalyzerTestCase(SimpleTestCase):
             }
         }
 
+        mock_classification = MagicMock()
+        mock_classification.choices[0].message.content = json.dumps({"tip_document": "AMIABILA"})
         mock_completion = MagicMock()
         mock_completion.choices[0].message.content = json.dumps(expected_response)
-        mock_client.chat.completions.create.return_value = mock_completion
+        mock_client.chat.completions.create.side_effect = [mock_classification, mock_completion]
 
         # Execute
         result = DocumentAnalyzer.analyze("dummy_path.jpg")
@@ -68,8 +81,13 @@ class DocumentAnalyzerTestCase(SimpleTestCase):
         mock_img_instance.crop.assert_any_call((0, 0, 550, 2000))
         mock_img_instance.crop.assert_any_call((450, 0, 1000, 2000))
 
-        # 3. Check OpenAI call
-        mock_client.chat.completions.create.assert_called_once()
+        # 3. Check OpenAI calls: clasificare (1 miniatură, detail low) + extragere
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+        classify_content = mock_client.chat.completions.create.call_args_list[0].kwargs['messages'][0]['content']
+        classify_images = [item for item in classify_content if item['type'] == 'image_url']
+        self.assertEqual(len(classify_images), 1)
+        self.assertEqual(classify_images[0]['image_url']['detail'], 'low')
+
         call_args = mock_client.chat.completions.create.call_args
         messages = call_args.kwargs['messages']
 
@@ -87,3 +105,135 @@ class DocumentAnalyzerTestCase(SimpleTestCase):
 
         # 4. Check Result
         self.assertEqual(result, expected_response)
+
+
+class DocumentAnalyzerTwoStageTestCase(SimpleTestCase):
+    def setUp(self):
+        ocr_cache.clear()
+        reset_openai_client()
+
+    def tearDown(self):
+        reset_openai_client()
+
+    def _completion(self, data):
+        completion = MagicMock()
+        completion.choices[0].message.content = json.dumps(data)
+        return completion
+
+    def _mock_image(self, mock_image, mock_image_ops):
+        mock_img_instance = MagicMock()
+        mock_img_instance.size = (1000, 2000)
+        mock_img_instance.mode = 'RGB'
+        mock_img_instance.tobytes.return_value = b"pixeli"  # cheia cache-ului OCR (normalized_content)
+        mock_image.open.return_value = mock_img_instance
+        mock_image_ops.autocontrast.return_value = mock_img_instance
+        return mock_img_instance
+
+    @patch("apps.claims.openai_client.OpenAI")
+    @patch("apps.claims.services.Image")
+    @patch("apps.claims.services.ImageOps")
+    @patch("builtins.open", new_callable=MagicMock)
+    def test_photo_needs_only_classification(self, mock_open, mock_image_ops, mock_image, mock_openai):
+        mock_open.return_value.__enter__.return_value.read.return_value = b"poza_masina"
+        mock_img_instance = self._mock_image(mock_image, mock_image_ops)
+        mock_client = mock_openai.return_value
+        mock_client.chat.completions.create.return_value = self._completion({"tip_document": "FOTO_AUTO"})
+
+        result = DocumentAnalyzer.analyze("poza.jpg")
+
+        self.assertEqual(result, {"tip_document": "FOTO_AUTO", "date_extrase": {}})
+        mock_client.chat.completions.create.assert_called_once()
+        mock_img_instance.crop.assert_not_called()
+
+    @patch("apps.claims.openai_client.OpenAI")
+    @patch("apps.claims.services.Image")
+    @patch("apps.claims.services.ImageOps")
+    @patch("builtins.open", new_callable=MagicMock)
+    def test_unknown_classification_falls_back_to_combined_prompt(self, mock_open, mock_image_ops, mock_image, mock_openai):
+        mock_open.return_value.__enter__.return_value.read.return_value = b"document_neclar"
+        self._mock_image(mock_image, mock_image_ops)
+        mock_client = mock_openai.return_value
+        mock_client.chat.completions.create.side_effect = [
+            self._completion({"tip_document": "UNKNOWN"}),
+            self._completion({"tip_document": "TALON", "date_extrase": {"nr_auto": "b 123 abc"}}),
+        ]
+
+        result = DocumentAnalyzer.analyze("neclar.jpg")
+
+        self.assertEqual(result["tip_document"], "TALON")
+        self.assertEqual(result["date_extrase"]["nr_auto"], "B 123 ABC")
+        user_content = mock_client.chat.completions.create.call_args.kwargs['messages'][0]['content']
+        self.assertEqual(len([item for item in user_content if item['type'] == 'image_url']), 3)
+        self.assertIn("TIPURI ACCEPTATE", user_content[0]['text'])
+
+    @patch("apps.claims.openai_client.OpenAI")
+    @patch("apps.claims.services.Image")
+    @patch("apps.claims.services.ImageOps")
+    @patch("builtins.open", new_callable=MagicMock)
+    def test_known_doc_type_skips_classification(self, mock_open, mock_image_ops, mock_image, mock_openai):
+        mock_open.return_value.__enter__.return_value.read.return_value = b"buletin"
+        self._mock_image(mock_image, mock_image_ops)
+        mock_client = mock_openai.return_value
+        mock_client.chat.completions.create.return_value = self._completion(
+            {"date_extrase": {"nume": "POPESCU ION", "cnp": "1800101123456"}}
+        )
+
+        result = DocumentAnalyzer.analyze("ci.jpg", doc_type="CI")
+
+        mock_client.chat.completions.create.assert_called_once()
+        self.assertEqual(result["tip_document"], "CI")
+        self.assertEqual(result["date_extrase"]["cnp"], "1800101123456")
+
+
+class DocumentAnalyzerMultiPageTestCase(SimpleTestCase):
+    def setUp(self):
+        ocr_cache.clear()
+        reset_openai_client()
+
+    def tearDown(self):
+        reset_openai_client()
+
+    def _pdf(self, pages):
+        doc = fitz.open()
+        for i in range(pages):
+            doc.new_page().insert_text((50, 50), f"Pagina {i + 1}")
+        data = doc.tobytes()
+        doc.close()
+        return data
+
+    def _completion(self, data):
+        completion = MagicMock()
+        completion.choices[0].message.content = json.dumps(data)
+        return completion
+
+    @patch("apps.claims.openai_client.OpenAI")
+    @patch("builtins.open", new_callable=MagicMock)
+    def test_stops_when_required_fields_are_filled(self, mock_open, mock_openai):
+        mock_open.return_value.__enter__.return_value.read.return_value = self._pdf(4)
+        mock_client = mock_openai.return_value
+        mock_client.chat.completions.create.side_effect = [
+            self._completion({"tip_document": "CIV", "date_extrase": {"vin": "WVWZZZ1KZ6W000000"}}),
+            self._completion({"tip_document": "CIV", "date_extrase": {"vin": None, "marca": "VW", "model": "GOLF"}}),
+        ]
+
+        result = DocumentAnalyzer.analyze("civ.pdf", doc_type="CIV")
+
+        # Pagina 1 + pagina 2; paginile 3-4 nu mai sunt randate
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+        self.assertEqual(
+            result["date_extrase"], {"vin": "WVWZZZ1KZ6W000000", "marca": "VW", "model": "GOLF"}
+        )
+
+    @patch("apps.claims.openai_client.OpenAI")
+    @patch("builtins.open", new_callable=MagicMock)
+    def test_multiple_includes_all_pdf_pages(self, mock_open, mock_openai):
+        mock_open.return_value.__enter__.return_value.read.return_value = self._pdf(3)
+        mock_client = mock_openai.return_value
+        mock_client.chat.completions.create.return_value = self._completion(
+            {"tip_document": "CIV", "date_extrase": {"vin": "X"}}
+        )
+
+        DocumentAnalyzer.analyze_multiple(["civ.pdf", "civ_poza.pdf"])
+
+        user_content = mock_client.chat.completions.create.call_args.kwargs['messages'][0]['content']
+        self.assertEqual(len([item for item in user_content if item['type'] == 'image_url']), 6)
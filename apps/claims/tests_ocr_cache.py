@@ -0,0 +1,123 @@
+import io
+
+from PIL import Image
+from django.test import SimpleTestCase
+from unittest.mock import patch, MagicMock
+from apps.claims.ocr_cache import OCRResultCache, ocr_cache
+from apps.claims.services import DocumentAnalyzer
+
+
+class OCRResultCacheTestCase(SimpleTestCase):
+    def test_key_depends_on_content_and_version(self):
+        k1 = OCRResultCache.make_key([b"poza"], "v1")
+        self.assertEqual(k1, OCRResultCache.make_key([b"poza"], "v1"))
+        self.assertNotEqual(k1, OCRResultCache.make_key([b"poza2"], "v1"))
+        self.assertNotEqual(k1, OCRResultCache.make_key([b"poza"], "v2"))
+        # Concatenarea nu trebuie să producă aceeași cheie
+        self.assertNotEqual(
+            OCRResultCache.make_key([b"ab", b"c"], "v1"),
+            OCRResultCache.make_key([b"a", b"bc"], "v1"),
+        )
+
+    def test_lru_eviction_and_counters(self):
+        c = OCRResultCache(max_entries=2, ttl=60, shared=False)
+        c.set("a", {"tip_document": "CI"})
+        c.set("b", {"tip_document": "TALON"})
+        self.assertIsNotNone(c.get("a"))  # "a" devine cel mai recent folosit
+        c.set("c", {"tip_document": "CIV"})  # evacuează "b"
+
+        self.assertIsNone(c.get("b"))
+        self.assertEqual(c.get("c")["tip_document"], "CIV")
+
+        stats = c.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_ttl_expiry(self):
+        c = OCRResultCache(max_entries=10, ttl=10, shared=False)
+        with patch("apps.claims.ocr_cache.time.monotonic", return_value=100.0):
+            c.set("a", {"tip_document": "CI"})
+        with patch("apps.claims.ocr_cache.time.monotonic", return_value=105.0):
+            self.assertIsNotNone(c.get("a"))
+        with patch("apps.claims.ocr_cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(c.get("a"))
+        self.assertEqual(c.stats()["entries"], 0)
+
+    def test_returns_copies(self):
+        c = OCRResultCache(max_entries=10, ttl=60, shared=False)
+        c.set("a", {"date_extrase": {"iban": "RO12"}})
+        c.get("a")["date_extrase"]["iban"] = "MODIFICAT"
+        self.assertEqual(c.get("a")["date_extrase"]["iban"], "RO12")
+
+    def test_shared_level_fills_local(self):
+        writer = OCRResultCache(max_entries=10, ttl=60, shared=True)
+        reader = OCRResultCache(max_entries=10, ttl=60, shared=True)
+        writer.set("ocr_result:test_shared", {"tip_document": "RCA_PAGUBIT"})
+
+        self.assertEqual(reader.get("ocr_result:test_shared")["tip_document"], "RCA_PAGUBIT")
+        self.assertEqual(reader.stats()["shared_hits"], 1)
+        # A doua oară vine din memoria locală
+        reader.get("ocr_result:test_shared")
+        self.assertEqual(reader.stats()["hits"], 1)
+        writer.clear()
+
+
+class DocumentAnalyzerCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        ocr_cache.clear()
+
+    @patch("apps.claims.services.DocumentAnalyzer._analyze_uncached")
+    @patch("builtins.open", new_callable=MagicMock)
+    def test_same_bytes_analyzed_once(self, mock_open, mock_uncached):
+        mock_open.return_value.__enter__.return_value.read.return_value = b"aceeasi_poza"
+        mock_uncached.return_value = {"tip_document": "TALON", "date_extrase": {"nr_auto": "B123ABC"}}
+
+        first = DocumentAnalyzer.analyze("talon.jpg")
+        second = DocumentAnalyzer.analyze("talon_copie.jpg")
+
+        self.assertEqual(mock_uncached.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(ocr_cache.stats()["hits"], 1)
+
+    @patch("apps.claims.services.DocumentAnalyzer._analyze_uncached")
+    @patch("builtins.open", new_callable=MagicMock)
+    def test_errors_are_not_cached(self, mock_open, mock_uncached):
+        mock_open.return_value.__enter__.return_value.read.return_value = b"poza_timeout"
+        mock_uncached.return_value = {"tip_document": "UNKNOWN", "date_extrase": {}, "error": "timeout"}
+
+        DocumentAnalyzer.analyze("a.jpg")
+        DocumentAnalyzer.analyze("a.jpg")
+
+        self.assertEqual(mock_uncached.call_count, 2)
+
+    @patch("apps.claims.services.DocumentAnalyzer._analyze_uncached")
+    @patch("builtins.open", new_callable=MagicMock)
+    def test_key_is_the_normalized_image_not_the_file_bytes(self, mock_open, mock_uncached):
+        img = Image.effect_noise((640, 480), 40).convert("RGB")
+        exif = Image.Exif()
+        exif[0x0110] = "Telefon"  # Model
+
+        def encode(**kwargs):
+            buffered = io.BytesIO()
+            img.save(buffered, **kwargs)
+            return buffered.getvalue()
+
+        variants = [
+            encode(format="JPEG", quality=90),
+            encode(format="JPEG", quality=90, exif=exif),  # aceeași poză, alte metadate
+            encode(format="PNG"),
+            encode(format="BMP"),  # aceiași pixeli, alt container
+        ]
+        self.assertNotEqual(variants[0], variants[1])
+        mock_uncached.return_value = {"tip_document": "TALON", "date_extrase": {"nr_auto": "B123ABC"}}
+
+        for data in variants:
+            mock_open.return_value.__enter__.return_value.read.return_value = data
+            DocumentAnalyzer.analyze("talon.jpg")
+
+        # JPEG-urile decodează la aceiași pixeli, la fel PNG și BMP; între JPEG și PNG pixelii diferă
+        self.assertEqual(mock_uncached.call_count, 2)
+        # Analiza primește imaginea deja decodată pentru cheie
+        self.assertIsNotNone(mock_uncached.call_args.kwargs["image"])
@@ -1,10 +1,19 @@
 from django.test import SimpleTestCase
 from unittest.mock import patch, MagicMock
 from apps.claims.services import DocumentAnalyzer
+from apps.claims.ocr_cache import ocr_cache
+from apps.claims.openai_client import reset_openai_client
 import json
 
 class DocumentAnalyzerExtrasTestCase(SimpleTestCase):
-    @patch("apps.claims.services.OpenAI")
+    def setUp(self):
+        ocr_cache.clear()
+        reset_openai_client()
+
+    def tearDown(self):
+        reset_openai_client()
+
+    @patch("apps.claims.openai_client.OpenAI")
     @patch("apps.claims.services.Image")
     @patch("apps.claims.services.ImageOps")
     @patch("builtins.open", new_callable=MagicMock)
@@ -18,6 +27,7 @@ class DocumentAnalyzerExtrasTestCase(SimpleTestCase):
         mock_img_instance = MagicMock()
         mock_img_instance.size = (1000, 1000)
         mock_img_instance.mode = 'RGB'
+        mock_img_instance.tobytes.return_value = b"pixeli"  # cheia cache-ului OCR (normalized_content)
         mock_image.open.return_value = mock_img_instance
 
         # Mock ImageOps.autocontrast to return the same image
@@ -42,26 +52,34 @@ class DocumentAnalyzerExtrasTestCase(SimpleTestCase):
             "analiza_accident": {}
         }
 
+        mock_classification = MagicMock()
+        mock_classification.choices[0].message.content = json.dumps({"tip_document": "EXTRAS"})
         mock_completion = MagicMock()
         mock_completion.choices[0].message.content = json.dumps(ai_response_data)
-        mock_client.chat.completions.create.return_value = mock_completion
+        mock_client.chat.completions.create.side_effect = [mock_classification, mock_completion]
 
         # Execute
         result = DocumentAnalyzer.analyze("dummy_path_extras.jpg")
 
         # Verify Assertions
 
-        # 1. Check prompt content
-        mock_client.chat.completions.create.assert_called_once()
+        # 1. Check prompt content (al doilea apel = extragerea specifică EXTRAS)
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
         call_args = mock_client.chat.completions.create.call_args
         messages = call_args.kwargs['messages']
         user_content = messages[0]['content']
+
+        # Extrasul nu primește crop-urile stânga/dreapta
+        image_content_items = [item for item in user_content if item['type'] == 'image_url']
+        self.assertEqual(len(image_content_items), 1)
+        mock_img_instance.crop.assert_not_called()
+
         text_content = [item for item in user_content if item['type'] == 'text'][0]['text']
 
         # Verify new instructions are present
         self.assertIn("INSTRUCȚIUNI PENTRU EXTRAS DE CONT (BANCAR)", text_content)
         self.assertIn("Extrage codul IBAN complet", text_content)
-        self.assertIn("PENTRU EXTRAS DE CONT (Folosește Imaginea 1)", text_content)
+        self.assertIn("PENTRU EXTRAS DE CONT", text_content)
 
         # 2. Check Result Parsing & Normalization
         self.assertEqual(result["tip_document"], "EXTRAS")
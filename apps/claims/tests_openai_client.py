@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase, override_settings
+from unittest.mock import patch
+from apps.claims import openai_client
+from apps.claims.openai_client import LatencyTracker, get_openai_client, reset_openai_client, timed
+
+
+class OpenAIClientTestCase(SimpleTestCase):
+    def setUp(self):
+        reset_openai_client()
+
+    def tearDown(self):
+        reset_openai_client()
+
+    @override_settings(OPENAI_POOL_SIZE=4, OPENAI_CONNECT_TIMEOUT=2.0, OPENAI_READ_TIMEOUT=30.0)
+    @patch("apps.claims.openai_client.DefaultHttpxClient")
+    @patch("apps.claims.openai_client.OpenAI")
+    def test_client_is_shared_and_configured(self, mock_openai, mock_http_client):
+        first = get_openai_client()
+        second = get_openai_client()
+
+        self.assertIs(first, second)
+        mock_openai.assert_called_once()
+        limits = mock_http_client.call_args.kwargs["limits"]
+        self.assertEqual(limits.max_connections, 4)
+        self.assertEqual(limits.max_keepalive_connections, 4)
+        timeout = mock_openai.call_args.kwargs["timeout"]
+        self.assertEqual(timeout.connect, 2.0)
+        self.assertEqual(timeout.read, 30.0)
+
+    @patch("apps.claims.openai_client.DefaultHttpxClient")
+    @patch("apps.claims.openai_client.OpenAI")
+    def test_client_rebuilt_after_fork(self, mock_openai, mock_http_client):
+        get_openai_client()
+        with patch("apps.claims.openai_client.os.getpid", return_value=-1):
+            get_openai_client()
+        self.assertEqual(mock_openai.call_count, 2)
+
+    def test_latency_tracker(self):
+        tracker = LatencyTracker(window=3)
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            tracker.record("extract", seconds)
+        stats = tracker.stats()["extract"]
+        self.assertEqual(stats["count"], 3)
+        self.assertEqual(stats["max_ms"], 400.0)
+        self.assertEqual(stats["p50_ms"], 300.0)
+
+    def test_timed_records_failed_calls(self):
+        openai_client.latency.clear()
+        with self.assertRaises(RuntimeError):
+            with timed("classify"):
+                raise RuntimeError("timeout")
+        self.assertEqual(openai_client.latency.stats()["classify"]["count"], 1)
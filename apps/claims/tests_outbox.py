@@ -0,0 +1,108 @@
+import datetime
+import shutil
+import smtplib
+import tempfile
+
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch
+
+from apps.claims import mailer
+from apps.claims.models import OutboundEmail
+
+
+def queue(n=1, **fields):
+    return [
+        mailer.enqueue(kind="test", subject=f"Mesaj {i}", body="corp", to=["daune@asigurator.test"], **fields)
+        for i in range(n)
+    ]
+
+
+class OutboxDrainTestCase(TestCase):
+    def test_enqueue_schedules_drain_after_commit(self):
+        with patch("apps.claims.tasks.drain_outbox_task.delay") as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                outbound = queue()[0]
+        mock_delay.assert_called_once()
+        self.assertEqual(outbound.status, OutboundEmail.Status.PENDING)
+        self.assertTrue(outbound.message_id.startswith("<"))
+
+    def test_drain_sends_batch_on_one_connection(self):
+        queued = queue(3, headers={"In-Reply-To": "<abc@asigurator>"})
+
+        with patch("django.core.mail.backends.locmem.EmailBackend.close") as mock_close:
+            stats = mailer.drain(batch_size=2)
+
+        self.assertEqual(stats, {"sent": 3, "failed": 0})
+        self.assertEqual(len(mail.outbox), 3)
+        # Două loturi, aceeași sesiune: închisă o singură dată, la final
+        mock_close.assert_called_once()
+        self.assertEqual(mail.outbox[0].extra_headers["Message-ID"], queued[0].message_id)
+        self.assertEqual(mail.outbox[0].extra_headers["In-Reply-To"], "<abc@asigurator>")
+        sent = OutboundEmail.objects.get(id=queued[0].id)
+        self.assertEqual((sent.status, sent.attempts), (OutboundEmail.Status.SENT, 1))
+        self.assertIsNotNone(sent.send_ms)
+        self.assertGreaterEqual(sent.latency, datetime.timedelta(0))
+
+    @override_settings(OUTBOX_RETRY_BASE_SECONDS=60, OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_message_is_retried_with_backoff_then_abandoned(self):
+        outbound = queue()[0]
+
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=smtplib.SMTPServerDisconnected("închis"),
+        ):
+            self.assertEqual(mailer.drain(), {"sent": 0, "failed": 1})
+            outbound.refresh_from_db()
+            self.assertEqual((outbound.status, outbound.attempts), (OutboundEmail.Status.PENDING, 1))
+            self.assertGreater(outbound.next_attempt_at, timezone.now() + datetime.timedelta(seconds=50))
+            self.assertIn("închis", outbound.last_error)
+
+            # Încă nu e scadent
+            self.assertEqual(mailer.drain(), {"sent": 0, "failed": 0})
+
+            OutboundEmail.objects.filter(id=outbound.id).update(next_attempt_at=timezone.now())
+            mailer.drain()
+        outbound.refresh_from_db()
+        self.assertEqual((outbound.status, outbound.attempts), (OutboundEmail.Status.FAILED, 2))
+
+    def test_connection_failure_reschedules_whole_batch(self):
+        queue(2)
+        with patch("django.core.mail.backends.locmem.EmailBackend.open", side_effect=OSError("SMTP indisponibil")):
+            self.assertEqual(mailer.drain(), {"sent": 0, "failed": 2})
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING, attempts=1).count(), 2)
+        self.assertEqual(mail.outbox, [])
+
+    def test_abandoned_sending_lease_is_reclaimed(self):
+        outbound = queue()[0]
+        self.assertEqual(len(mailer.claim_batch(10)), 1)
+        self.assertEqual(mailer.claim_batch(10), [])  # lease activ
+
+        OutboundEmail.objects.filter(id=outbound.id).update(next_attempt_at=timezone.now())
+        self.assertEqual(mailer.drain(), {"sent": 1, "failed": 0})
+
+
+class OutboxAttachmentTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_attachments_are_read_from_storage_at_send_time(self):
+        name = default_storage.save("uploads/talon.jpg", ContentFile(b"continut talon"))
+        attachments = [
+            {"path": name, "filename": "Talon_0.jpg", "content_type": "image/jpeg"},
+            {"path": "uploads/sters.jpg", "filename": "Sters_1.jpg", "content_type": "image/jpeg"},
+        ]
+        queue(attachments=attachments)
+
+        mailer.drain()
+
+        self.assertEqual(mail.outbox[0].attachments, [("Talon_0.jpg", b"continut talon", "image/jpeg")])
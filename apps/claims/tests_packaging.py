@@ -0,0 +1,216 @@
+import io
+import os
+import shutil
+import tempfile
+
+import fitz  # PyMuPDF
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.claims import dossier, mailer, packaging
+from apps.claims.models import Case, CaseDocument, Client, OutboundEmail
+
+MB = 1024 * 1024
+
+
+def photo_bytes(size=(4000, 3000)):
+    buffered = io.BytesIO()
+    Image.effect_noise(size, 40).convert("RGB").save(buffered, format="JPEG", quality=95)
+    return buffered.getvalue()
+
+
+class PackagingTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, APP_DOMAIN="https://autodaune.test")
+        self.settings_override.enable()
+        client = Client.objects.create(phone_number="0700444555", first_name="Ion", last_name="Pop")
+        self.case = Case.objects.create(client=client, stage=Case.Stage.PROCESSING_INSURER)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def add_doc(self, doc_type, name, data):
+        doc = CaseDocument(case=self.case, doc_type=doc_type, ocr_data={})
+        doc.file.save(name, ContentFile(data), save=False)
+        doc.save()
+        return doc
+
+    def test_images_and_pdfs_are_sent_as_one_dossier_pdf(self):
+        self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "daune.jpg", photo_bytes())
+        self.add_doc(CaseDocument.DocType.ACCIDENT_REPORT, "amiabila_1.jpg", photo_bytes((1200, 1600)))
+        self.add_doc(CaseDocument.DocType.ID_CARD, "buletin.jpg", photo_bytes((1000, 700)))
+        self.add_doc(CaseDocument.DocType.OTHER_DOCS, "acte.zip", os.urandom(1024))
+
+        attachments, links = packaging.package_documents(self.case, self.case.documents.all())
+
+        self.assertEqual(links, [])
+        self.assertEqual([a["filename"] for a in attachments], [f"Dosar_{str(self.case.id)[:8]}.pdf", "Alte_Documente_0.zip"])
+        self.assertTrue(attachments[0]["generated"])
+        with default_storage.open(attachments[0]["path"], "rb") as f:
+            self.assertEqual(fitz.open("pdf", f.read()).page_count, 3)
+
+    def test_missing_and_duplicate_files_are_skipped(self):
+        original = self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "a.jpg", photo_bytes((400, 300)))
+        self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "b.jpg", photo_bytes((400, 300)))
+        CaseDocument.objects.create(case=self.case, doc_type=CaseDocument.DocType.DAMAGE_PHOTO, file="uploads/lipsa.jpg")
+        CaseDocument.objects.filter(file__endswith="b.jpg").update(duplicate_of=original)
+
+        attachments, _ = packaging.package_documents(self.case, self.case.documents.all())
+
+        self.assertEqual(len(attachments), 1)
+
+    @override_settings(EMAIL_VIDEO_ATTACH_MAX_MB=1)
+    def test_large_video_becomes_signed_expiring_link(self):
+        video = self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "video.mp4", os.urandom(2 * MB))
+
+        attachments, links = packaging.package_documents(self.case, [video])
+
+        self.assertEqual(attachments, [])
+        (name, url), = links
+        self.assertTrue(url.startswith("https://autodaune.test/dosar/fisier/"))
+        response = self.client.get(url.replace("https://autodaune.test", ""))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), video.file.open("rb").read())
+
+        with override_settings(DOWNLOAD_LINK_MAX_AGE_DAYS=-1):
+            self.assertEqual(self.client.get(url.replace("https://autodaune.test", "")).status_code, 410)
+        self.assertEqual(self.client.get(reverse("document_download", args=["falsificat"])).status_code, 404)
+
+    def test_split_keeps_documents_first_and_respects_budget(self):
+        items = [
+            {"filename": "Amiabila.pdf", "size": 3 * MB, "priority": packaging.PRIORITY_SCAN},
+            {"filename": "p1.jpg", "size": 6 * MB, "priority": packaging.PRIORITY_PHOTO},
+            {"filename": "p2.jpg", "size": 6 * MB, "priority": packaging.PRIORITY_PHOTO},
+            {"filename": "p3.jpg", "size": 2 * MB, "priority": packaging.PRIORITY_PHOTO},
+        ]
+        parts = packaging.split_into_parts(items, budget=10 * MB)
+
+        self.assertEqual([[a["filename"] for a in part] for part in parts], [["Amiabila.pdf", "p1.jpg"], ["p2.jpg", "p3.jpg"]])
+
+    @override_settings(EMAIL_MAX_MESSAGE_MB=1)
+    def test_over_budget_case_is_sent_as_threaded_follow_ups(self):
+        self.case.last_email_message_id = "<raspuns@asigurator>"
+        docs = [self.add_doc(CaseDocument.DocType.OTHER_DOCS, f"act_{i}.zip", os.urandom(500 * 1024)) for i in range(3)]
+
+        emails = packaging.enqueue_case_email(
+            self.case,
+            kind="relay",
+            subject="Re: Avizare Dauna Auto",
+            body="corp",
+            to=["daune@asigurator.test"],
+            headers={"In-Reply-To": "<raspuns@asigurator>", "References": "<raspuns@asigurator>"},
+            docs=docs,
+        )
+
+        self.assertEqual(len(emails), 3)
+        self.assertEqual(emails[0].subject, "Re: Avizare Dauna Auto (1/3)")
+        self.assertEqual(emails[2].subject, "Re: Avizare Dauna Auto (3/3)")
+        self.assertEqual(emails[1].headers["In-Reply-To"], emails[0].message_id)
+        self.assertEqual(emails[1].headers["References"], f"<raspuns@asigurator> {emails[0].message_id}")
+        self.assertEqual([len(e.attachments) for e in emails], [1, 1, 1])
+
+    def test_relay_sends_only_the_new_documents(self):
+        self.add_doc(CaseDocument.DocType.ID_CARD, "buletin.jpg", photo_bytes((1000, 700)))
+        self.add_doc(CaseDocument.DocType.ACCIDENT_REPORT, "amiabila.jpg", photo_bytes((1000, 700)))
+        new = self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "dauna_noua.jpg", photo_bytes((1000, 700)))
+
+        attachments, _ = packaging.package_documents(self.case, [new], full_dossier=False)
+
+        attachment, = attachments
+        self.assertEqual(attachment["filename"], f"Completare_Dosar_{str(self.case.id)[:8]}.pdf")
+        with default_storage.open(attachment["path"], "rb") as f:
+            self.assertEqual(fitz.open("pdf", f.read()).page_count, 1)
+
+    @override_settings(EMAIL_MAX_MESSAGE_MB=1)
+    def test_dossier_over_budget_is_split_at_document_and_page_boundaries(self):
+        budget = packaging.attachment_budget()
+        for i in range(3):
+            self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, f"dauna_{i}.jpg", photo_bytes((800, 600)))
+        scan = fitz.open()
+        for _ in range(4):
+            page = scan.new_page(width=400, height=300)
+            page.insert_image(page.rect, stream=photo_bytes((800, 600)))
+        self.add_doc(CaseDocument.DocType.ACCIDENT_REPORT, "amiabila_scan.pdf", scan.tobytes())
+        self.assertGreater(dossier.sync(self.case).file.size, budget)
+
+        emails = packaging.enqueue_case_email(
+            self.case, kind="claim", subject="Avizare", body="corp", to=["daune@asigurator.test"], docs=self.case.documents.all()
+        )
+
+        self.assertGreater(len(emails), 1)
+        attachments = [a for email in emails for a in email.attachments]
+        self.assertTrue(all(sum(a["size"] for a in email.attachments) <= budget for email in emails))
+        # Mai multe părți decât documente: scanul de 4 pagini a fost tăiat pe pagini
+        self.assertGreater(len(attachments), 4)
+        self.assertEqual(attachments[0]["filename"], f"Dosar_{str(self.case.id)[:8]}_partea_1_din_{len(attachments)}.pdf")
+        pages = 0
+        for attachment in attachments:
+            with default_storage.open(attachment["path"], "rb") as f:
+                pages += fitz.open("pdf", f.read()).page_count
+        self.assertEqual(pages, 7)
+
+    def test_dossier_rebuilt_after_enqueue_is_sent_as_enqueued_and_then_removed(self):
+        self.add_doc(CaseDocument.DocType.ID_CARD, "buletin.jpg", photo_bytes((1000, 700)))
+        outbound, = packaging.enqueue_case_email(
+            self.case, kind="claim", subject="Avizare", body="corp", to=["daune@asigurator.test"], docs=self.case.documents.all()
+        )
+        enqueued = outbound.attachments[0]["path"]
+
+        self.add_doc(CaseDocument.DocType.CAR_REGISTRATION, "talon.jpg", photo_bytes((1000, 700)))
+        current = dossier.sync(self.case).file.name
+        # Versiunea veche e încă referită de emailul netrimis
+        self.assertNotEqual(current, enqueued)
+        self.assertTrue(default_storage.exists(enqueued))
+
+        mailer.drain()
+
+        self.assertEqual(OutboundEmail.objects.get(id=outbound.id).status, OutboundEmail.Status.SENT)
+        (_, content, _), = mail.outbox[-1].attachments
+        self.assertEqual(fitz.open("pdf", content).page_count, 1)
+        self.assertFalse(default_storage.exists(enqueued))
+        self.assertTrue(default_storage.exists(current))
+
+    def test_relay_addendum_is_removed_once_sent(self):
+        self.add_doc(CaseDocument.DocType.ID_CARD, "buletin.jpg", photo_bytes((1000, 700)))
+        new = self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, "dauna_noua.jpg", photo_bytes((1000, 700)))
+        outbound, = packaging.enqueue_case_email(
+            self.case, kind="relay", subject="Re: Dosar", body="corp", to=["daune@asigurator.test"], docs=[new], full_dossier=False
+        )
+        addendum = outbound.attachments[0]["path"]
+        self.assertTrue(default_storage.exists(addendum))
+
+        mailer.drain()
+
+        self.assertEqual(len(mail.outbox[-1].attachments), 1)
+        self.assertFalse(default_storage.exists(addendum))
+
+    @override_settings(EMAIL_MAX_MESSAGE_MB=1)
+    def test_split_parts_are_removed_after_sending_and_with_the_old_dossier(self):
+        for i in range(3):
+            self.add_doc(CaseDocument.DocType.DAMAGE_PHOTO, f"dauna_{i}.jpg", photo_bytes((800, 600)))
+        emails = packaging.enqueue_case_email(
+            self.case, kind="claim", subject="Avizare", body="corp", to=["daune@asigurator.test"], docs=self.case.documents.all()
+        )
+        parts = [a["path"] for email in emails for a in email.attachments]
+        self.assertGreater(len(parts), 1)
+        main = self.case.dossier.file.name
+        self.assertEqual(sorted(dossier.parts_of(main)), sorted(parts))
+
+        mailer.drain()
+
+        self.assertFalse(any(default_storage.exists(part) for part in parts))
+        self.assertTrue(default_storage.exists(main))
+
+        # Părți rămase de la o trimitere anterioară: dispar odată cu versiunea veche a dosarului
+        leftover = dossier.split(main, self.case.dossier.entries, packaging.attachment_budget())
+        self.add_doc(CaseDocument.DocType.ID_CARD, "buletin.jpg", photo_bytes((400, 300)))
+        dossier.sync(self.case)
+
+        self.assertFalse(default_storage.exists(main))
+        self.assertFalse(any(default_storage.exists(part) for part, _ in leftover))
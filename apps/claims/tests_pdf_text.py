@@ -0,0 +1,89 @@
+import fitz
+from django.test import SimpleTestCase
+from unittest.mock import patch, MagicMock
+from apps.claims import pdf_text
+from apps.claims.ocr_cache import ocr_cache
+from apps.claims.openai_client import reset_openai_client
+from apps.claims.services import DocumentAnalyzer
+
+VALID_IBAN = "RO49AAAA1B31007593840000"
+
+RCA_TEXT = """ALLIANZ-TIRIAC ASIGURARI S.A.
+POLITA DE ASIGURARE OBLIGATORIE DE RASPUNDERE CIVILA AUTO (RCA)
+Seria RO/25/V25/BZ Nr. 0123456789
+Asigurat: POPESCU ION, CI seria RX nr 123456
+Perioada de valabilitate: 01.03.2025 - 28.02.2026
+Vehicul: Volkswagen Golf
+Nr. inmatriculare: AG 22 PAW
+Serie sasiu: WVWZZZ1KZ6W000000
+Prima de asigurare: 1.250,00 LEI
+"""
+
+EXTRAS_TEXT = f"""BANCA TRANSILVANIA
+EXTRAS DE CONT nr. 10 / 31.05.2025
+Titular cont: POPESCU ION
+IBAN: {VALID_IBAN[:4]} {VALID_IBAN[4:8]} {VALID_IBAN[8:12]} {VALID_IBAN[12:16]} {VALID_IBAN[16:20]} {VALID_IBAN[20:]}
+Sold initial: 1.000,00 RON
+Sold final: 1.250,00 RON
+Tranzactii: plata card, transfer intrabancar, dobanda
+"""
+
+
+def make_pdf(text):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((40, 60), text, fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class PdfTextRulesTestCase(SimpleTestCase):
+    def test_iban_checksum(self):
+        self.assertTrue(pdf_text.iban_is_valid(VALID_IBAN))
+        self.assertFalse(pdf_text.iban_is_valid(VALID_IBAN[:-1] + "1"))
+        self.assertFalse(pdf_text.iban_is_valid("RO49AAAA"))
+
+    def test_rca_policy(self):
+        result, tip = pdf_text.analyze_pdf_text(make_pdf(RCA_TEXT))
+        self.assertEqual(tip, "RCA_PAGUBIT")
+        self.assertEqual(result["sursa_extragere"], "text_pdf")
+        date = result["date_extrase"]
+        self.assertEqual(date["nr_polita"], "RO/25/V25/BZ 0123456789")
+        self.assertEqual(date["data_expirare"], "28.02.2026")
+        self.assertEqual(date["nr_auto"], "AG 22 PAW")
+        self.assertEqual(date["asigurator"], "ALLIANZ")
+
+    def test_bank_statement(self):
+        result, tip = pdf_text.analyze_pdf_text(make_pdf(EXTRAS_TEXT))
+        self.assertEqual(tip, "EXTRAS")
+        self.assertEqual(result["date_extrase"], {"iban": VALID_IBAN})
+
+    def test_invalid_iban_is_low_confidence(self):
+        text = EXTRAS_TEXT.replace(VALID_IBAN[-4:], "0001")
+        result, tip = pdf_text.analyze_pdf_text(make_pdf(text))
+        self.assertIsNone(result)
+        self.assertEqual(tip, "EXTRAS")
+
+    def test_scanned_pdf_has_no_text(self):
+        self.assertEqual(pdf_text.analyze_pdf_text(make_pdf("")), (None, None))
+
+
+class DocumentAnalyzerPdfFastPathTestCase(SimpleTestCase):
+    def setUp(self):
+        ocr_cache.clear()
+        reset_openai_client()
+
+    def tearDown(self):
+        reset_openai_client()
+
+    @patch("apps.claims.openai_client.OpenAI")
+    @patch("builtins.open", new_callable=MagicMock)
+    def test_digital_pdf_skips_model(self, mock_open, mock_openai):
+        mock_open.return_value.__enter__.return_value.read.return_value = make_pdf(EXTRAS_TEXT)
+
+        result = DocumentAnalyzer.analyze("extras.pdf")
+
+        self.assertEqual(result["tip_document"], "EXTRAS")
+        self.assertEqual(result["date_extrase"]["iban"], VALID_IBAN)
+        mock_openai.assert_not_called()
@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase, TestCase
+from unittest.mock import patch, MagicMock
+from celery.exceptions import Retry
+from apps.claims.models import Case, CaseDocument, Client
+from apps.claims.rate_governor import RateGovernor, RateLimited, estimate_tokens
+from apps.claims.tasks import analyze_document_task
+
+
+def governor_with_waits(*waits_ms, **kwargs):
+    """Guvernor cu scriptul Lua înlocuit: returnează pe rând milisecundele de așteptare."""
+    redis_client = MagicMock()
+    script = MagicMock(side_effect=list(waits_ms))
+    redis_client.register_script.return_value = script
+    return RateGovernor(rpm=60, tpm=10000, redis_client=redis_client, **kwargs), script
+
+
+class RateGovernorTestCase(SimpleTestCase):
+    def test_acquire_passes_request_and_token_cost(self):
+        gov, script = governor_with_waits(0, max_wait=5)
+        gov.acquire(1500)
+        script.assert_called_once_with(keys=["openai_rate:rpm", "openai_rate:tpm"], args=[60, 10000, 1500])
+
+    @patch("apps.claims.rate_governor.time.sleep")
+    def test_waits_for_capacity_within_max_wait(self, mock_sleep):
+        gov, script = governor_with_waits(1500, 0, max_wait=5)
+        gov.acquire(100)
+        mock_sleep.assert_called_once_with(1.5)
+        self.assertEqual(script.call_count, 2)
+
+    @patch("apps.claims.rate_governor.time.sleep")
+    def test_raises_when_wait_exceeds_max_wait(self, mock_sleep):
+        gov, _ = governor_with_waits(42300, max_wait=5)
+        with self.assertRaises(RateLimited) as ctx:
+            gov.acquire(100)
+        self.assertEqual(ctx.exception.retry_after, 42)
+        mock_sleep.assert_not_called()
+
+    def test_fail_open_with_circuit_breaker(self):
+        gov, script = governor_with_waits(ConnectionError("redis down"), max_wait=5, cooldown=30)
+        gov.acquire(100)
+        gov.acquire(100)
+        # Al doilea apel nu mai atinge Redis cât timp circuitul e deschis
+        self.assertEqual(script.call_count, 1)
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens("x" * 400, images=1, detail="low", max_tokens=50), 100 + 85 + 50)
+        self.assertEqual(estimate_tokens("", images=3, detail="high", max_tokens=0), 3 * 765)
+
+
+class AnalyzeTaskRateLimitTestCase(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(phone_number="0700123999")
+        self.case = Case.objects.create(client=self.client_obj)
+        self.doc = CaseDocument.objects.create(case=self.case, doc_type=CaseDocument.DocType.UNKNOWN, file="a.jpg")
+
+    @patch("apps.claims.tasks.WhatsAppClient.send_text")
+    @patch("apps.claims.tasks.DocumentAnalyzer.analyze", side_effect=RateLimited(12))
+    def test_rate_limited_task_is_requeued_without_error_message(self, mock_analyze, mock_send):
+        with patch.object(analyze_document_task, "retry", side_effect=Retry()) as mock_retry:
+            with self.assertRaises(Retry):
+                analyze_document_task(self.doc.id)
+
+        self.assertEqual(mock_retry.call_args.kwargs["countdown"], 12)
+        mock_send.assert_not_called()
+        self.doc.refresh_from_db()
+        self.assertFalse(self.doc.ocr_data)
@@ -0,0 +1,76 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+from unittest.mock import patch
+
+from apps.claims.models import Case, Client, OutboundEmail
+from apps.claims.tasks import due_reminders_queryset, send_24h_reminders_task, send_reminder_chunk_task
+
+
+class ReminderSweepTestCase(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.client_obj = Client.objects.create(phone_number="0700123123", first_name="Ion", last_name="Pop")
+
+    def make_case(self, to_hours_ago, from_hours_ago=None, **fields):
+        fields.setdefault("insurer_email", "daune@asigurator.test")
+        return Case.objects.create(
+            client=self.client_obj,
+            stage=Case.Stage.PROCESSING_INSURER,
+            last_message_to_insurer_at=self.now - datetime.timedelta(hours=to_hours_ago),
+            last_message_from_insurer_at=(
+                self.now - datetime.timedelta(hours=from_hours_ago) if from_hours_ago is not None else None
+            ),
+            **fields,
+        )
+
+    def test_due_selection_annotates_who_is_waiting(self):
+        insurer_side = self.make_case(30)
+        client_side = self.make_case(40, 26)
+        self.make_case(2)  # asiguratorul are încă timp
+        self.make_case(30, 3)  # clientul are încă timp
+        self.make_case(30, insurer_email=None)  # fără email nu avem cui scrie
+        self.make_case(30, insurer_email="")
+        self.make_case(30, reminder_24h_sent_at=self.now - datetime.timedelta(hours=5))
+
+        due = {case.id: case.waiting_on for case in due_reminders_queryset(self.now)}
+
+        self.assertEqual(due, {insurer_side.id: "INSURER", client_side.id: "CLIENT"})
+
+    @patch("apps.claims.tasks.send_reminder_chunk_task.delay")
+    def test_sweep_stamps_and_fans_out_chunks(self, mock_delay):
+        cases = [self.make_case(30) for _ in range(3)]
+
+        with patch("apps.claims.tasks.REMINDER_CHUNK_SIZE", 2):
+            self.assertEqual(send_24h_reminders_task(), 3)
+
+        self.assertEqual([len(c.args[0]) for c in mock_delay.call_args_list], [2, 1])
+        self.assertFalse(Case.objects.filter(id__in=[c.id for c in cases], reminder_24h_sent_at__isnull=True).exists())
+        # Sweep-ul următor nu mai retrimite
+        self.assertEqual(send_24h_reminders_task(), 0)
+
+    @patch("apps.claims.tasks.get_client")
+    def test_chunk_queues_insurer_mails_and_unmarks_failures(self, mock_get_client):
+        insurer_cases = [self.make_case(30, reminder_24h_sent_at=self.now) for _ in range(2)]
+        client_case = self.make_case(40, 26, reminder_24h_sent_at=self.now)
+        mock_get_client.return_value.send_buttons.side_effect = RuntimeError("Twilio indisponibil")
+
+        sent = send_reminder_chunk_task([str(c.id) for c in insurer_cases + [client_case]], self.now.isoformat())
+
+        self.assertEqual(sent, 2)
+        queued = OutboundEmail.objects.filter(kind="reminder")
+        self.assertEqual({o.case_id for o in queued}, {c.id for c in insurer_cases})
+        self.assertTrue(all(o.subject.startswith("Reminder: Avizare Dauna Auto") for o in queued))
+        client_case.refresh_from_db()
+        self.assertIsNone(client_case.reminder_24h_sent_at)
+
+    def test_chunk_skips_case_answered_after_sweep(self):
+        case = self.make_case(30, reminder_24h_sent_at=self.now)
+        Case.objects.filter(id=case.id).update(last_message_from_insurer_at=self.now)
+
+        self.assertEqual(send_reminder_chunk_task([str(case.id)], self.now.isoformat()), 0)
+
+        self.assertFalse(OutboundEmail.objects.filter(kind="reminder").exists())
+        case.refresh_from_db()
+        self.assertIsNone(case.reminder_24h_sent_at)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import document_download_view
+
+urlpatterns = [
+    path("fisier/<str:token>/", document_download_view, name="document_download"),
+]
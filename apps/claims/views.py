@@ -1,3 +1,28 @@
-from django.shortcuts import render
+import os
 
-# Create your views here.
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+
+from .models import CaseDocument
+from .packaging import load_download_token
+
+
+def document_download_view(request, token):
+    """
+    Descărcare prin link semnat (videoclipurile prea mari pentru emailul către asigurator).
+    Linkul expiră după DOWNLOAD_LINK_MAX_AGE_DAYS; fișierul e trimis în flux din storage.
+    """
+    try:
+        doc_id = load_download_token(token)
+    except signing.SignatureExpired:
+        return HttpResponse("Linkul de descărcare a expirat. Vă rugăm să ne contactați pentru unul nou.", status=410)
+    except signing.BadSignature:
+        raise Http404("Link invalid")
+
+    doc = get_object_or_404(CaseDocument, id=doc_id)
+    try:
+        stream = doc.file.open("rb")
+    except OSError:
+        raise Http404("Fișier indisponibil")
+    return FileResponse(stream, as_attachment=True, filename=os.path.basename(doc.file.name))
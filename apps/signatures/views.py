@@ -107,7 +107,7 @@ def _handle_signature_submission(request, case):
     case.stage = (
         Case.Stage.PROCESSING_INSURER
     )  # Trecem la etapa de discuție cu asiguratorul
-    case.save()
+    case.save(update_fields=["has_mandate_signed", "stage", "updated_at"])
 
     # --- E. Declanșare Trimitere Email (Asincron) ---
     print(f"🚀 [VIEW] Declanșez task-ul de email pentru dosar {case.id}")
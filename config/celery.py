@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from kombu import Queue
 
 # Setăm setările default de Django pentru Celery
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -9,5 +10,61 @@ app = Celery('config')
 # Folosim setările din settings.py care încep cu CELERY_
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
+# --- Cozi per tip de încărcare ---
+# Fiecare coadă are workerii ei (vezi Procfile), ca o analiză gpt-4o de 20s, un email de 25 MB
+# către asigurator și polling-ul IMAP să nu concureze pentru aceleași sloturi.
+#   ocr             - analiza documentelor (I/O lung spre OpenAI)
+#   outbound-email  - email-uri SMTP către asiguratori / admin
+#   inbound-email   - citire IMAP
+#   notifications   - mesaje scurte către client (WhatsApp/Web), sweeper-ul de debounce
+QUEUE_OCR = 'ocr'
+QUEUE_OUTBOUND_EMAIL = 'outbound-email'
+QUEUE_INBOUND_EMAIL = 'inbound-email'
+QUEUE_NOTIFICATIONS = 'notifications'
+
+# Priorități în coada OCR. Pe Redis, numărul MAI MIC e servit primul (invers față de RabbitMQ).
+# Brokerul e Redis: prioritățile vin din priority_steps (mai jos); pe RabbitMQ coada OCR ar avea
+# nevoie de queue_arguments={'x-max-priority': ...} și ordinea numerelor ar trebui inversată.
+PRIORITY_INTERACTIVE = 0  # poze trimise din chat: clientul așteaptă "Analizez..."
+PRIORITY_DEFAULT = 3
+PRIORITY_BULK = 6  # atașamente din email-uri de la asigurator
+
+app.conf.task_queues = (
+    Queue(QUEUE_OCR),
+    Queue(QUEUE_OUTBOUND_EMAIL),
+    Queue(QUEUE_INBOUND_EMAIL),
+    Queue(QUEUE_NOTIFICATIONS),
+)
+app.conf.task_default_queue = QUEUE_NOTIFICATIONS
+app.conf.task_default_priority = PRIORITY_DEFAULT
+
+app.conf.task_routes = {
+    'apps.claims.tasks.analyze_document_task': {'queue': QUEUE_OCR},
+    'apps.claims.tasks.process_grouped_unknowns_task': {'queue': QUEUE_OCR},
+    'apps.claims.tasks.check_email_replies_task': {'queue': QUEUE_INBOUND_EMAIL},
+    'apps.claims.tasks.send_claim_email_task': {'queue': QUEUE_OUTBOUND_EMAIL},
+    'apps.claims.tasks.send_offer_acceptance_email_task': {'queue': QUEUE_OUTBOUND_EMAIL},
+    'apps.claims.tasks.send_option_change_email_task': {'queue': QUEUE_OUTBOUND_EMAIL},
+    'apps.claims.tasks.trigger_delayed_relay_task': {'queue': QUEUE_OUTBOUND_EMAIL},
+    'apps.claims.tasks.send_admin_new_case_email_task': {'queue': QUEUE_OUTBOUND_EMAIL},
+    'apps.claims.tasks.send_24h_reminders_task': {'queue': QUEUE_OUTBOUND_EMAIL},
+    'apps.claims.tasks.send_reminder_chunk_task': {'queue': QUEUE_OUTBOUND_EMAIL},
+    'apps.claims.tasks.drain_outbox_task': {'queue': QUEUE_OUTBOUND_EMAIL},
+    'apps.claims.tasks.update_dossier_task': {'queue': QUEUE_OUTBOUND_EMAIL},
+    'apps.claims.tasks.finalize_upload_batch_task': {'queue': QUEUE_NOTIFICATIONS},
+    'apps.claims.tasks.sweep_debounced_task': {'queue': QUEUE_NOTIFICATIONS},
+}
+
+# Redis emulează prioritățile cu câte o listă per nivel; 4 niveluri sunt de ajuns pentru 0/3/6/9
+app.conf.broker_transport_options = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': [0, 3, 6, 9],
+    'sep': ':',
+}
+
+# Prefetch implicit 1: un worker ocupat cu o analiză de 20s nu ține în rezervă task-uri pe care
+# alt worker le-ar putea lua, iar prioritățile se aplică la fiecare task nou (Procfile îl poate mări per coadă).
+app.conf.worker_prefetch_multiplier = 1
+
 # Caută automat fișiere tasks.py în toate aplicațiile instalate
 app.autodiscover_tasks()
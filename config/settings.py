@@ -162,11 +162,69 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "office@autodaune.ro")
 
+# Email (IMAP) - reply-urile asiguratorilor (apps/claims/inbound.py); implicit aceleași credențiale ca SMTP
+IMAP_HOST = os.getenv("IMAP_HOST", os.getenv("EMAIL_HOST", "imap.gmail.com"))
+IMAP_PORT = int(os.getenv("IMAP_PORT", 993))
+IMAP_USE_SSL = os.getenv("IMAP_USE_SSL", "True") == "True"
+IMAP_USER = os.getenv("IMAP_USER", EMAIL_HOST_USER)
+IMAP_PASSWORD = os.getenv("IMAP_PASSWORD", EMAIL_HOST_PASSWORD)
+IMAP_MAILBOX = os.getenv("IMAP_MAILBOX", "INBOX")
+IMAP_FETCH_BATCH = int(os.getenv("IMAP_FETCH_BATCH", 200))  # UID-uri per FETCH de headere
+IMAP_FETCH_CHUNK_KB = int(os.getenv("IMAP_FETCH_CHUNK_KB", 1024))  # atașamente: bucata per FETCH parțial
+IMAP_ATTACHMENT_MEMORY_MB = int(os.getenv("IMAP_ATTACHMENT_MEMORY_MB", 8))  # per mesaj; peste => fișier temporar pe disc
+# Listener-ul IMAP IDLE (python manage.py imap_idle, apps/claims/imap_idle.py)
+IMAP_IDLE_REFRESH = int(os.getenv("IMAP_IDLE_REFRESH", 1500))  # secunde; RFC 2177: sub 29 min
+IMAP_IDLE_POLL_INTERVAL = int(os.getenv("IMAP_IDLE_POLL_INTERVAL", 30))  # doar pentru servere fără IDLE
+IMAP_RECONNECT_BACKOFF = float(os.getenv("IMAP_RECONNECT_BACKOFF", 1))
+IMAP_RECONNECT_MAX = float(os.getenv("IMAP_RECONNECT_MAX", 300))
+# Heartbeat-ul listener-ului e reîmprospătat la fiecare secundă de așteptare; după ce expiră
+# (proces oprit), check_email_replies_task citește din nou cutia
+IMAP_IDLE_HEARTBEAT_TTL = int(os.getenv("IMAP_IDLE_HEARTBEAT_TTL", 30))  # secunde
+# Indexul nr. dosar / nr. auto / nume (apps/claims/case_index.py) e reconstruit din DB cel puțin atât de des
+CASE_INDEX_MAX_AGE = int(os.getenv("CASE_INDEX_MAX_AGE", 3600))  # secunde
+
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Client partajat per worker (pool HTTPS cu keep-alive, vezi apps/claims/openai_client.py)
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", 10))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", 5))  # secunde
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", 60))  # secunde
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 60))  # secunde
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+# Limite comune tuturor workerilor (token bucket în Redis, vezi apps/claims/rate_governor.py)
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", 500))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", 30000))
+OPENAI_RATE_MAX_WAIT = float(os.getenv("OPENAI_RATE_MAX_WAIT", 20))  # peste asta task-ul se re-programează
+
+# Backend analiză documente: "openai" | "record" | "replay" | "stub" (vezi apps/claims/ai_backends.py)
+DOCUMENT_ANALYZER_BACKEND = os.getenv("DOCUMENT_ANALYZER_BACKEND", "openai")
+ANALYZER_REPLAY_DIR = os.getenv("ANALYZER_REPLAY_DIR", BASE_DIR / "analyzer_replay")
+ANALYZER_STUB_LATENCY = float(os.getenv("ANALYZER_STUB_LATENCY", 1.5))  # secunde per apel
+ANALYZER_STUB_JITTER = float(os.getenv("ANALYZER_STUB_JITTER", 0.5))
+
+# Cache rezultate OCR (cheie = SHA-256 conținut fișier + versiune prompt/model)
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", 512))  # intrări în memoria fiecărui worker
+OCR_CACHE_TTL = int(os.getenv("OCR_CACHE_TTL", 7 * 24 * 3600))  # secunde
+OCR_CACHE_SHARED = os.getenv("OCR_CACHE_SHARED", "True") == "True"  # nivel 2 în cache-ul Django (Redis)
+
+# PDF-uri digitale (polițe RCA, extrase): extragere din stratul de text, fără apel la OpenAI
+PDF_TEXT_FAST_PATH = os.getenv("PDF_TEXT_FAST_PATH", "True") == "True"
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 5))  # pagini randate pe rând până se completează câmpurile
+
+# Idempotență analyze_document_task: după cât timp o analiză "în lucru" e considerată abandonată
+ANALYSIS_LEASE_SECONDS = int(os.getenv("ANALYSIS_LEASE_SECONDS", 600))
+# Document dintr-un lot aflat deja în analiză: task-ul duplicat reverifică la acest interval
+# (fără limită de reîncercări; după expirarea lease-ului preia el rularea)
+ANALYSIS_IN_PROGRESS_RETRY_SECONDS = int(os.getenv("ANALYSIS_IN_PROGRESS_RETRY_SECONDS", 15))
+
+# Poze retrimise în același dosar: legate de original prin hash perceptual, fără re-analiză
+DUPLICATE_DETECTION = os.getenv("DUPLICATE_DETECTION", "True") == "True"
+PHASH_DUPLICATE_DISTANCE = int(os.getenv("PHASH_DUPLICATE_DISTANCE", 5))  # biți diferiți din 64
+PHASH_CONFIRM_DISTANCE = int(os.getenv("PHASH_CONFIRM_DISTANCE", 32))  # confirmare: biți diferiți din 1024
 
 
 # Celery & Redis Configuration
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_ACCEPT_CONTENT = ["json"]
@@ -174,6 +232,44 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
 
+# Outbox email (apps/claims/mailer.py): un worker golește coada pe o singură conexiune SMTP
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_RETRY_BASE_SECONDS = int(os.getenv("OUTBOX_RETRY_BASE_SECONDS", 60))  # dublat la fiecare eșec
+OUTBOX_RETRY_MAX_SECONDS = int(os.getenv("OUTBOX_RETRY_MAX_SECONDS", 3600))
+OUTBOX_SEND_LEASE_SECONDS = int(os.getenv("OUTBOX_SEND_LEASE_SECONDS", 300))
+OUTBOX_MESSAGE_ID_DOMAIN = os.getenv("OUTBOX_MESSAGE_ID_DOMAIN") or None
+
+# Emailuri către asigurator (apps/claims/packaging.py): peste buget => continuări în același fir
+EMAIL_MAX_MESSAGE_MB = int(os.getenv("EMAIL_MAX_MESSAGE_MB", 20))
+EMAIL_VIDEO_ATTACH_MAX_MB = int(os.getenv("EMAIL_VIDEO_ATTACH_MAX_MB", 10))  # peste => link de descărcare
+DOWNLOAD_LINK_MAX_AGE_DAYS = int(os.getenv("DOWNLOAD_LINK_MAX_AGE_DAYS", 30))
+
+# Celery beat: sweeper-ul de debounce (apps/claims/debounce.py), reminderele de 24h, reluările din outbox
+DEBOUNCE_SWEEP_INTERVAL = float(os.getenv("DEBOUNCE_SWEEP_INTERVAL", 5))  # secunde
+CELERY_BEAT_SCHEDULE = {
+    "sweep-debounced": {
+        "task": "apps.claims.tasks.sweep_debounced_task",
+        "schedule": DEBOUNCE_SWEEP_INTERVAL,
+    },
+    # Reminder 24h: starea e în DB (Case.reminder_24h_sent_at), deci sweep-ul orar e ieftin și idempotent
+    "send-24h-reminders": {
+        "task": "apps.claims.tasks.send_24h_reminders_task",
+        "schedule": float(os.getenv("REMINDER_SWEEP_INTERVAL", 3600)),
+    },
+    # Plasa de siguranță pentru listener-ul IMAP IDLE: task-ul iese imediat cât timp listener-ul
+    # are heartbeat, și citește cutia (de la checkpoint) dacă procesul imap_idle s-a oprit
+    "check-email-replies": {
+        "task": "apps.claims.tasks.check_email_replies_task",
+        "schedule": float(os.getenv("EMAIL_CHECK_INTERVAL", 60)),
+    },
+    # Fiecare enqueue pornește deja o golire; beat-ul preia reluările cu backoff
+    "drain-outbox": {
+        "task": "apps.claims.tasks.drain_outbox_task",
+        "schedule": float(os.getenv("OUTBOX_DRAIN_INTERVAL", 60)),
+    },
+}
+
 # Caching Configuration
 if DEBUG:
     CACHES = {
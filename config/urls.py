@@ -25,6 +25,7 @@ urlpatterns = [
     path("", include("apps.core.urls")),
     path("bot/", include("apps.bot.urls")),
     path("mandat/", include("apps.signatures.urls")),
+    path("dosar/", include("apps.claims.urls")),
 ]
 
 if settings.DEBUG: